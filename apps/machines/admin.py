@@ -10,8 +10,11 @@ from django.http import HttpResponseRedirect
 from .models import (
     Machine, TypeMachine, InformationSysteme,
     InterfaceReseau, LogicielInstalle, HistoriqueMachine,
-    CategorieLogiciel, LogicielReference, AutorisationLogiciel, DemandeAutorisation
+    CategorieLogiciel, LogicielReference, AutorisationLogiciel, DemandeAutorisation,
+    SynchronisationCatalogue
 )
+from .politique import invalider_politique
+from .autorisations import evaluer_autorisations
 
 
 @admin.register(TypeMachine)
@@ -26,6 +29,7 @@ class TypeMachineAdmin(admin.ModelAdmin):
 class MachineAdmin(admin.ModelAdmin):
     """Administration des machines"""
     list_display = ['nom', 'numero_serie', 'type_machine', 'utilisateur', 'structure', 'statut', 'est_en_ligne']
+    list_select_related = ['type_machine', 'utilisateur', 'structure', 'status_monitoring']
     list_filter = ['statut', 'type_machine', 'structure', 'site']
     search_fields = ['nom', 'numero_serie', 'numero_inventaire', 'marque', 'modele']
     readonly_fields = ['id', 'date_creation', 'date_modification', 'derniere_synchronisation', 'est_en_ligne']
@@ -164,16 +168,19 @@ class LogicielReferenceAdmin(admin.ModelAdmin):
     
     def synchroniser_depuis_desktop(self, request, queryset):
         """Action pour synchroniser les logiciels de référence depuis les logiciels installés sur les machines"""
-        from .models import LogicielReference
-        
-        resultats = LogicielReference.synchroniser_depuis_logiciels_installes()
+        from .catalogue import lancer_synchronisation_catalogue
         
-        message = (
-            f"Synchronisation terminée : "
-            f"{resultats['crees']} logiciel(s) créé(s), "
-            f"{resultats['mis_a_jour']} logiciel(s) mis à jour, "
-            f"{resultats['total_traites']} logiciel(s) traité(s) au total."
-        )
+        tache, lancee = lancer_synchronisation_catalogue()
+        if lancee:
+            message = (
+                f"Synchronisation lancée en arrière-plan : suivez sa progression dans "
+                f"« Synchronisations du catalogue » ({tache.crees}/{tache.total} logiciel(s) déjà créé(s))."
+            )
+        else:
+            message = (
+                f"Une synchronisation est déjà en cours : "
+                f"{tache.crees}/{tache.total} logiciel(s) créé(s), {tache.mis_a_jour} mis à jour."
+            )
         
         self.message_user(request, message)
     synchroniser_depuis_desktop.short_description = "Synchroniser depuis les logiciels installés (Desktop)"
@@ -293,14 +300,13 @@ class LogicielReferenceAdmin(admin.ModelAdmin):
     def interdire_logiciels(self, request, queryset):
         """Action pour marquer les logiciels comme interdits (niveau de sécurité)"""
         updated = queryset.update(niveau_securite='interdit')
+        # update() ne déclenche pas les signaux : invalider les snapshots explicitement
+        invalider_politique()
         
         # Forcer la vérification des autorisations pour tous les logiciels installés correspondants
-        from .models import LogicielInstalle
-        logiciels_installes = LogicielInstalle.objects.filter(logiciel_reference__in=queryset)
-        for logiciel_installe in logiciels_installes:
-            logiciel_installe.verifier_autorisation()
+        resultats = evaluer_autorisations(LogicielInstalle.objects.filter(logiciel_reference__in=queryset))
         
-        self.message_user(request, f'{updated} logiciel(s) marqué(s) comme INTERDIT. {logiciels_installes.count()} logiciel(s) installé(s) mis à jour.')
+        self.message_user(request, f'{updated} logiciel(s) marqué(s) comme INTERDIT. {resultats["changements"]} logiciel(s) installé(s) mis à jour.')
     interdire_logiciels.short_description = "⛔ Marquer comme INTERDIT (politique de sécurité)"
 
 
@@ -523,6 +529,7 @@ class AutorisationLogicielAdmin(admin.ModelAdmin):
             autorise_par=request.user,
             motif=f'Autorisé en masse par {request.user.username}'
         )
+        invalider_politique()
         self.message_user(request, f'{updated} autorisation(s) accordée(s).')
     autoriser_pour_cibles.short_description = "Autoriser ces logiciels pour les cibles sélectionnées"
 
@@ -612,20 +619,22 @@ class LogicielInstalleAdmin(admin.ModelAdmin):
     
     def verifier_autorisations(self, request, queryset):
         """Action pour vérifier les autorisations des logiciels sélectionnés"""
-        for logiciel in queryset:
-            logiciel.verifier_autorisation()
-        self.message_user(request, f'Autorisations vérifiées pour {queryset.count()} logiciel(s).')
+        resultats = evaluer_autorisations(queryset)
+        invalider_politique(set(queryset.values_list('machine__utilisateur', flat=True)))
+        self.message_user(request, f'Autorisations vérifiées pour {resultats["total_logiciels"]} logiciel(s).')
     verifier_autorisations.short_description = "Vérifier les autorisations"
     
     def autoriser_logiciels(self, request, queryset):
         """Action pour autoriser manuellement des logiciels"""
         updated = queryset.update(autorise=True, bloque=False, motif_blocage='')
+        invalider_politique(set(queryset.values_list('machine__utilisateur', flat=True)))
         self.message_user(request, f'{updated} logiciel(s) autorisé(s).')
     autoriser_logiciels.short_description = "Autoriser les logiciels sélectionnés"
     
     def bloquer_logiciels(self, request, queryset):
         """Action pour bloquer manuellement des logiciels"""
         updated = queryset.update(autorise=False, bloque=True, motif_blocage='Bloqué manuellement par un administrateur')
+        invalider_politique(set(queryset.values_list('machine__utilisateur', flat=True)))
         self.message_user(request, f'{updated} logiciel(s) bloqué(s).')
     bloquer_logiciels.short_description = "Bloquer les logiciels sélectionnés"
     
@@ -683,6 +692,20 @@ class HistoriqueMachineAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('machine', 'utilisateur', 'machine__structure')
 
 
+@admin.register(SynchronisationCatalogue)
+class SynchronisationCatalogueAdmin(admin.ModelAdmin):
+    """Suivi des synchronisations du catalogue des logiciels de référence"""
+    list_display = ['date_debut', 'statut', 'pourcentage', 'crees', 'total', 'mis_a_jour', 'date_modification', 'date_fin']
+    list_filter = ['statut']
+    readonly_fields = [
+        'statut', 'editeurs_completes', 'curseur', 'total', 'crees', 'mis_a_jour', 'erreur',
+        'date_debut', 'date_modification', 'date_fin'
+    ]
+    
+    def has_add_permission(self, request):
+        return False
+
+
 # Personnalisation de l'interface d'administration
 class MachinesAdminSite(admin.AdminSite):
     """Site d'administration personnalisé pour les machines"""
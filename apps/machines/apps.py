@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class MachinesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.machines'
-    verbose_name = 'Gestion des Machines'
\ No newline at end of file
+    verbose_name = 'Gestion des Machines'
+
+    def ready(self):
+        from . import checks  # noqa: F401 (enregistrement des vérifications)
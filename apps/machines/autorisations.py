@@ -0,0 +1,202 @@
+"""
+Évaluation ensembliste des autorisations des logiciels installés
+
+Remplace l'évaluation ligne par ligne de `LogicielInstalle.verifier_autorisation` :
+les références et les refus concernés sont chargés en un nombre constant de
+requêtes, la précédence (utilisateur > groupe > structure > site) est résolue
+en mémoire et seules les lignes modifiées sont réécrites avec `bulk_update`.
+"""
+from .references import normaliser_nom, resolveur
+
+# Ordre de précédence des refus : le plus spécifique l'emporte
+PRECEDENCE_REFUS = ('utilisateur', 'groupe', 'structure', 'site')
+
+MOTIF_INTERDIT = "Logiciel interdit par la politique de sécurité"
+MOTIF_REFUS_DEFAUT = "Autorisation refusée par l'administrateur"
+
+CHAMPS_STATUT = ['autorise', 'bloque', 'motif_blocage']
+
+
+def _charger_logiciels(logiciels):
+    """Charger les logiciels installés avec l'utilisateur de leur machine"""
+    from .models import LogicielInstalle
+
+    if isinstance(logiciels, LogicielInstalle):
+        return [logiciels]
+    if hasattr(logiciels, 'select_related'):
+        return list(
+            logiciels.select_related('machine__utilisateur').only(
+                'id', 'nom', 'version', 'editeur', 'logiciel_reference',
+                'autorise', 'bloque', 'motif_blocage',
+                'machine__id', 'machine__nom',
+                'machine__utilisateur__id', 'machine__utilisateur__groupe',
+                'machine__utilisateur__structure', 'machine__utilisateur__site',
+            )
+        )
+    return list(logiciels)
+
+
+def _lier_references(logiciels, creer_references_manquantes=False, description=''):
+    """
+    Lier les logiciels sans référence à une référence de même nom normalisé
+
+    Les noms sont résolus par `resolveur` (au plus une requête pour les noms
+    absents de son cache) ; les références manquantes peuvent être créées en
+    masse. Retourne les logiciels nouvellement liés.
+    """
+    from .models import LogicielReference
+
+    sans_reference = [l for l in logiciels if not l.logiciel_reference_id and l.nom]
+    if not sans_reference:
+        return []
+
+    references = resolveur.resoudre(l.nom for l in sans_reference)
+
+    if creer_references_manquantes:
+        manquants = {}
+        for logiciel in sans_reference:
+            cle = normaliser_nom(logiciel.nom)
+            if cle and cle not in references and cle not in manquants:
+                manquants[cle] = LogicielReference(
+                    nom=logiciel.nom,
+                    nom_normalise=cle,
+                    editeur=getattr(logiciel, 'editeur', '') or '',
+                    niveau_securite='libre',  # Par défaut, autoriser sans restriction
+                    description=description or 'Logiciel détecté automatiquement depuis les machines',
+                    actif=True
+                )
+        if manquants:
+            LogicielReference.objects.bulk_create(manquants.values(), ignore_conflicts=True)
+            references.update(resolveur.resoudre(manquants.keys()))
+
+    lies = []
+    for logiciel in sans_reference:
+        reference_id = references.get(normaliser_nom(logiciel.nom))
+        if reference_id:
+            logiciel.logiciel_reference_id = reference_id
+            lies.append(logiciel)
+    return lies
+
+
+def _charger_politique(reference_ids):
+    """Charger les niveaux de sécurité et les refus des références concernées (2 requêtes)"""
+    from .models import LogicielReference, AutorisationLogiciel
+
+    niveaux = dict(
+        LogicielReference.objects.filter(id__in=reference_ids).values_list('id', 'niveau_securite')
+    )
+
+    # refus[(reference_id, type_cible, cible_id)] = motif
+    refus = {}
+    autorisations_refusees = AutorisationLogiciel.objects.filter(
+        logiciel_id__in=reference_ids,
+        statut='refuse'
+    ).values_list('logiciel_id', 'utilisateur_id', 'groupe_id', 'structure_id', 'site_id', 'motif')
+    for reference_id, utilisateur_id, groupe_id, structure_id, site_id, motif in autorisations_refusees:
+        for type_cible, cible_id in zip(PRECEDENCE_REFUS, (utilisateur_id, groupe_id, structure_id, site_id)):
+            if cible_id is not None:
+                refus.setdefault((reference_id, type_cible, cible_id), motif or MOTIF_REFUS_DEFAUT)
+
+    return niveaux, refus
+
+
+def _cibles_utilisateur(utilisateur):
+    """Identifiants de l'utilisateur dans l'ordre de précédence des refus"""
+    if utilisateur is None:
+        return ()
+    return (
+        ('utilisateur', utilisateur.pk),
+        ('groupe', utilisateur.groupe_id),
+        ('structure', utilisateur.structure_id),
+        ('site', utilisateur.site_id),
+    )
+
+
+def resoudre_statut(reference_id, utilisateur, niveaux, refus):
+    """Calculer (autorise, bloque, motif) pour un logiciel à partir de la politique chargée"""
+    if not reference_id:
+        # Logiciel non référencé, autoriser par défaut
+        return True, False, ''
+
+    # Seuls les logiciels explicitement interdits sont bloqués pour tous
+    if niveaux.get(reference_id) == 'interdit':
+        return False, True, MOTIF_INTERDIT
+
+    for type_cible, cible_id in _cibles_utilisateur(utilisateur):
+        if cible_id is None:
+            continue
+        motif = refus.get((reference_id, type_cible, cible_id))
+        if motif is not None:
+            return False, True, motif
+
+    return True, False, ''
+
+
+def evaluer_autorisations(logiciels, creer_references_manquantes=False, description='', details=False):
+    """
+    Évaluer en masse les autorisations d'un ensemble de logiciels installés
+
+    `logiciels` est un queryset de LogicielInstalle (ou une liste d'instances).
+    Retourne un dict de statistiques ; avec `details=True`, la liste des
+    changements de statut est incluse.
+    """
+    from .models import LogicielInstalle
+
+    logiciels = _charger_logiciels(logiciels)
+    resultats = {
+        'total_logiciels': len(logiciels),
+        'logiciels_autorises': 0,
+        'logiciels_bloques': 0,
+        'logiciels_lies': 0,
+        'nouveaux_bloques': 0,
+        'changements': 0,
+        'details': [],
+    }
+    if not logiciels:
+        return resultats
+
+    lies = _lier_references(logiciels, creer_references_manquantes, description)
+    resultats['logiciels_lies'] = len(lies)
+
+    reference_ids = {l.logiciel_reference_id for l in logiciels if l.logiciel_reference_id}
+    niveaux, refus = _charger_politique(reference_ids)
+
+    modifies = {id(l): l for l in lies}
+    for logiciel in logiciels:
+        utilisateur = logiciel.machine.utilisateur if logiciel.machine_id else None
+        autorise, bloque, motif = resoudre_statut(logiciel.logiciel_reference_id, utilisateur, niveaux, refus)
+
+        if autorise:
+            resultats['logiciels_autorises'] += 1
+        if bloque:
+            resultats['logiciels_bloques'] += 1
+
+        if (logiciel.autorise, logiciel.bloque, logiciel.motif_blocage) != (autorise, bloque, motif):
+            resultats['changements'] += 1
+            if bloque and not logiciel.bloque:
+                resultats['nouveaux_bloques'] += 1
+            if details:
+                resultats['details'].append({
+                    'nom': logiciel.nom,
+                    'version': logiciel.version,
+                    'machine': logiciel.machine.nom,
+                    'ancien_statut': {
+                        'autorise': logiciel.autorise,
+                        'bloque': logiciel.bloque,
+                        'motif': logiciel.motif_blocage
+                    },
+                    'nouveau_statut': {
+                        'autorise': autorise,
+                        'bloque': bloque,
+                        'motif': motif
+                    }
+                })
+            logiciel.autorise, logiciel.bloque, logiciel.motif_blocage = autorise, bloque, motif
+            modifies[id(logiciel)] = logiciel
+
+    if modifies:
+        LogicielInstalle.objects.bulk_update(
+            modifies.values(), CHAMPS_STATUT + ['logiciel_reference'], batch_size=500
+        )
+
+    return resultats
@@ -0,0 +1,227 @@
+"""
+Synchronisation du catalogue des logiciels de référence
+
+Crée un `LogicielReference` pour chaque nom de logiciel installé qui n'en a pas
+encore et complète l'éditeur des références qui n'en ont pas. Le traitement est
+ensembliste, quel que soit le nombre de logiciels :
+
+- l'éditeur des références existantes est complété par un seul UPDATE
+  (sous-requête corrélée sur les logiciels installés) ;
+- les noms manquants sont calculés par anti-jointure (NOT EXISTS) et créés par
+  lots de `TAILLE_LOT` avec `bulk_create(ignore_conflicts=True)` ; un nom qui
+  ne diffère d'une référence existante (ou d'un autre nom du lot) que par la
+  casse ou les espaces n'est pas créé (`nom_normalise`), et seules les
+  références effectivement insérées sont comptées (nombre de lignes de
+  l'INSERT, exact même si une autre exécution insère les mêmes noms).
+
+L'avancement est conservé dans `SynchronisationCatalogue` (curseur sur le nom,
+compteurs), enregistré avec chaque lot : une synchronisation interrompue ou
+en échec reprend au lot suivant. `lancer_synchronisation_catalogue()` l'exécute dans un
+thread (action d'administration) ; la commande
+`python manage.py synchroniser_catalogue_logiciels` l'exécute au premier plan.
+Les deux réservent la tâche sous verrou (`reserver_synchronisation`) : une
+synchronisation qui avance déjà n'est jamais exécutée une seconde fois.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Exists, Max, OuterRef, Subquery
+from django.db.models.constants import OnConflict
+from django.db.models.sql import InsertQuery
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .models import LogicielInstalle, LogicielReference, SynchronisationCatalogue
+from .references import normaliser_nom
+
+# Références créées par transaction
+TAILLE_LOT = 1000
+# Une synchronisation en cours sans avancement depuis ce délai est considérée interrompue
+DELAI_INACTIVITE = timedelta(minutes=5)
+
+DESCRIPTION_AUTOMATIQUE = 'Logiciel détecté automatiquement depuis les machines'
+
+logger = logging.getLogger(__name__)
+
+
+class SynchronisationEnCours(Exception):
+    """Une synchronisation du catalogue avance déjà dans un autre processus"""
+
+    def __init__(self, tache):
+        super().__init__(f"Synchronisation du catalogue déjà en cours ({tache.pourcentage} %)")
+        self.tache = tache
+
+
+def noms_manquants():
+    """
+    Noms installés sans référence, avec un éditeur non vide si l'un des logiciels en a un
+
+    L'anti-jointure porte sur le nom exact et sur sa casse (`nom_normalise`) ;
+    les variantes d'espacement sont écartées par `creer_lot`.
+    """
+    return LogicielInstalle.objects.exclude(nom='').filter(
+        ~Exists(LogicielReference.objects.filter(nom=OuterRef('nom'))),
+        ~Exists(LogicielReference.objects.filter(nom_normalise=Lower(OuterRef('nom')))),
+    ).values('nom').annotate(editeur=Max('editeur')).order_by('nom')
+
+
+def completer_editeurs():
+    """Renseigner l'éditeur des références qui n'en ont pas (un UPDATE) ; retourne le nombre de lignes"""
+    installes = LogicielInstalle.objects.filter(nom=OuterRef('nom')).exclude(editeur='')
+    return LogicielReference.objects.filter(editeur='').filter(Exists(installes)).update(
+        editeur=Subquery(installes.order_by('editeur').values('editeur')[:1]),
+        date_modification=timezone.now(),
+    )
+
+
+def creer_lot(lot):
+    """
+    Créer les références d'un lot de noms manquants ; retourne le nombre de lignes insérées
+
+    Un nom dont la forme normalisée figure plus haut dans le lot n'est pas
+    inséré ; une variante d'une référence existante est écartée par l'index
+    unique sur `nom_normalise`.
+    """
+    a_creer = {}
+    for logiciel in lot:
+        a_creer.setdefault(normaliser_nom(logiciel['nom']), logiciel)
+
+    return inserer_sans_conflits([
+        LogicielReference(
+            nom=logiciel['nom'],
+            nom_normalise=nom_normalise,
+            editeur=logiciel['editeur'] or '',
+            niveau_securite='libre',  # Par défaut, autoriser sans restriction
+            description=DESCRIPTION_AUTOMATIQUE,
+            actif=True,
+        )
+        for nom_normalise, logiciel in a_creer.items()
+    ])
+
+
+def inserer_sans_conflits(references):
+    """
+    Équivalent de `bulk_create(ignore_conflicts=True)` qui retourne le nombre de lignes insérées
+
+    `bulk_create` ne dit pas quelles lignes ont été écartées ; le nombre de
+    lignes de chaque INSERT (OR IGNORE / ON CONFLICT DO NOTHING) ne compte que
+    celles de cette exécution, même si un autre processus insère les mêmes noms.
+    """
+    if not references:
+        return 0
+    opts = LogicielReference._meta
+    champs = [champ for champ in opts.concrete_fields if champ is not opts.pk]
+    taille = connection.ops.bulk_batch_size(champs, references) or len(references)
+
+    inseres = 0
+    with connection.cursor() as curseur:
+        for debut in range(0, len(references), taille):
+            requete = InsertQuery(LogicielReference, on_conflict=OnConflict.IGNORE)
+            requete.insert_values(champs, references[debut:debut + taille])
+            for sql, params in requete.get_compiler(connection=connection).as_sql():
+                curseur.execute(sql, params)
+                inseres += curseur.rowcount
+    return inseres
+
+
+def est_active(tache):
+    """La synchronisation a-t-elle avancé récemment (exécution en cours ailleurs) ?"""
+    return tache.statut == 'en_cours' and timezone.now() - tache.date_modification < DELAI_INACTIVITE
+
+
+def executer_synchronisation(tache, progression=None):
+    """Exécuter (ou reprendre) une synchronisation jusqu'au bout"""
+    if tache.statut == 'echec':
+        tache.statut = 'en_cours'
+        tache.erreur = ''
+        tache.date_fin = None
+        tache.save(update_fields=['statut', 'erreur', 'date_fin', 'date_modification'])
+
+    try:
+        if not tache.editeurs_completes:
+            with transaction.atomic():
+                tache.mis_a_jour = completer_editeurs()
+                tache.total = tache.crees + noms_manquants().filter(nom__gt=tache.curseur).count()
+                tache.editeurs_completes = True
+                tache.save()
+            if progression:
+                progression(tache)
+
+        while True:
+            lot = list(noms_manquants().filter(nom__gt=tache.curseur)[:TAILLE_LOT])
+            if not lot:
+                break
+            with transaction.atomic():
+                tache.crees += creer_lot(lot)
+                tache.curseur = lot[-1]['nom']
+                tache.save(update_fields=['crees', 'curseur', 'date_modification'])
+            if progression:
+                progression(tache)
+    except BaseException as e:
+        # Interruption comprise (Ctrl+C) : la tâche est aussitôt reprenable
+        tache.statut = 'echec'
+        tache.erreur = str(e) or type(e).__name__
+        tache.date_fin = timezone.now()
+        tache.save(update_fields=['statut', 'erreur', 'date_fin', 'date_modification'])
+        raise
+
+    tache.statut = 'terminee'
+    tache.date_fin = timezone.now()
+    tache.save(update_fields=['statut', 'date_fin', 'date_modification'])
+    return tache
+
+
+def reserver_synchronisation():
+    """
+    Réserver la synchronisation à exécuter ; retourne (tâche, réservée)
+
+    La dernière tâche est lue sous verrou de ligne : deux lancements simultanés
+    ne peuvent pas reprendre la même tâche. Si elle avance déjà ailleurs, elle
+    est retournée sans être réservée ; sinon la tâche inachevée est marquée
+    comme reprise, ou une nouvelle tâche est créée.
+    """
+    with transaction.atomic():
+        tache = SynchronisationCatalogue.objects.select_for_update().first()
+        if tache is None or tache.statut not in ('en_cours', 'echec'):
+            return SynchronisationCatalogue.objects.create(), True
+        if est_active(tache):
+            return tache, False
+        tache.save(update_fields=['date_modification'])
+        return tache, True
+
+
+def synchroniser_catalogue(progression=None):
+    """
+    Reprendre la synchronisation inachevée ou en démarrer une nouvelle, au premier plan
+
+    Lève SynchronisationEnCours si une synchronisation avance déjà ailleurs.
+    """
+    tache, reservee = reserver_synchronisation()
+    if not reservee:
+        raise SynchronisationEnCours(tache)
+    return executer_synchronisation(tache, progression)
+
+
+def lancer_synchronisation_catalogue():
+    """
+    Lancer la synchronisation dans un thread
+
+    Retourne (tâche, lancée) : si une synchronisation avance déjà, elle est
+    retournée sans en lancer une autre.
+    """
+    tache, reservee = reserver_synchronisation()
+    if not reservee:
+        return tache, False
+
+    def executer():
+        try:
+            executer_synchronisation(tache)
+        except Exception:
+            logger.exception('Synchronisation du catalogue interrompue')
+        finally:
+            connection.close()
+
+    threading.Thread(target=executer, daemon=True).start()
+    return tache, True
@@ -0,0 +1,21 @@
+"""
+Vérifications de configuration de l'application machines
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from .politique import cache_partage
+
+
+@register(Tags.caches, deploy=True)
+def verifier_cache_partage(app_configs, **kwargs):
+    """Les snapshots de politique et le long-poll exigent un cache partagé en production"""
+    if settings.DEBUG or cache_partage():
+        return []
+    return [Error(
+        "Le cache par défaut (%s) est propre à chaque processus : l'invalidation des "
+        "snapshots de politique de blocage et les signaux du canal d'événements "
+        "n'atteignent pas les autres workers." % settings.CACHES['default']['BACKEND'],
+        hint="Définir CACHE_BACKEND (et CACHE_LOCATION) vers un cache partagé : Redis ou Memcached.",
+        id='machines.E001',
+    )]
@@ -0,0 +1,82 @@
+"""
+Empreintes de contenu de l'inventaire d'une machine
+
+La plupart des synchronisations envoient exactement le même inventaire que la
+précédente. Chaque section (informations système, interfaces réseau, logiciels)
+est résumée par une empreinte stable ; le serveur conserve les dernières
+empreintes de chaque machine et ne retraite que les sections qui ont changé.
+
+L'agent peut calculer lui-même ces empreintes avec `calculer_empreinte` et les
+envoyer avec son inventaire ; à défaut, elles sont calculées côté serveur.
+"""
+import hashlib
+import json
+
+SECTIONS_INVENTAIRE = ('info_systeme', 'interfaces_reseau', 'logiciels')
+
+# Valeurs instantanées qui changent à chaque collecte sans que l'inventaire change
+CHAMPS_VOLATILS = {
+    'ram_disponible', 'ram_disponible_gb',
+    'stockage_libre', 'stockage_libre_gb',
+    'cpu_frequence', 'partitions',
+}
+
+
+def calculer_empreinte(donnees):
+    """Empreinte SHA-256 d'une structure JSON sous forme canonique"""
+    contenu = json.dumps(donnees, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(contenu.encode('utf-8')).hexdigest()
+
+
+def donnees_section(machine_data, section):
+    """
+    Extraire le contenu d'une section tel qu'il est pris en compte dans son empreinte
+
+    Les champs de base de la machine (nom, marque, modèle...) sont rattachés à la
+    section des informations système. L'ordre des logiciels n'est pas significatif.
+    """
+    if section == 'info_systeme':
+        info_systeme = machine_data.get('info_systeme') or {}
+        return {
+            'machine': {
+                champ: valeur for champ, valeur in machine_data.items()
+                if champ not in SECTIONS_INVENTAIRE
+            },
+            'info_systeme': {
+                champ: valeur for champ, valeur in info_systeme.items()
+                if champ not in CHAMPS_VOLATILS
+            },
+        }
+    if section == 'logiciels':
+        return sorted(
+            machine_data.get('logiciels') or [],
+            key=lambda l: (str(l.get('nom', '')), str(l.get('version', '')))
+        )
+    return machine_data.get(section) or []
+
+
+def calculer_empreintes(machine_data, empreintes_recues=None):
+    """
+    Retourne l'empreinte de chaque section de l'inventaire
+
+    Les empreintes envoyées par l'agent sont utilisées telles quelles ; celles qui
+    manquent sont calculées à partir des données reçues.
+    """
+    empreintes_recues = empreintes_recues or {}
+    empreintes = {}
+    for section in SECTIONS_INVENTAIRE:
+        empreinte = empreintes_recues.get(section)
+        if not empreinte and section in machine_data:
+            empreinte = calculer_empreinte(donnees_section(machine_data, section))
+        if empreinte:
+            empreintes[section] = str(empreinte)
+    return empreintes
+
+
+def sections_modifiees(empreintes_stockees, empreintes):
+    """Sections dont l'empreinte diffère de la dernière synchronisation"""
+    empreintes_stockees = empreintes_stockees or {}
+    return [
+        section for section in SECTIONS_INVENTAIRE
+        if section in empreintes and empreintes_stockees.get(section) != empreintes[section]
+    ]
@@ -0,0 +1,683 @@
+"""
+Collecte de l'inventaire de la machine locale
+
+Utilisé par l'agent desktop (et, à défaut, par le serveur) pour construire les
+données envoyées à `synchroniser_machine_locale`. Ce module ne dépend pas de
+Django afin de pouvoir être importé par l'application desktop.
+
+Les sondes indépendantes (système, CPU, mémoire, disques, réseau, logiciels)
+s'exécutent en parallèle dans un pool de threads et leur durée est mesurée. La
+liste des logiciels est mise en cache sur disque et n'est recollectée que si la
+base du gestionnaire de paquets a changé (date de modification de
+/var/lib/dpkg/status, de la rpmdb, des clés de registre Uninstall...).
+"""
+import json
+import logging
+import os
+import platform
+import re
+import socket
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import psutil
+
+# Fichiers et répertoires dont la date de modification change à chaque (dés)installation
+BASES_PAQUETS_LINUX = {
+    'dpkg': ['/var/lib/dpkg/status'],
+    'rpm': ['/var/lib/rpm/rpmdb.sqlite', '/var/lib/rpm/Packages', '/usr/lib/sysimage/rpm/rpmdb.sqlite'],
+    'pacman': ['/var/lib/pacman/local'],
+    'apk': ['/lib/apk/db/installed'],
+}
+
+# Gestionnaires de paquets Linux, par ordre de préférence (après la lecture directe de la base dpkg)
+GESTIONNAIRES_LINUX = [
+    ('dpkg', ['dpkg', '-l']),  # Debian/Ubuntu
+    ('rpm', ['rpm', '-qa', '--queryformat', '%{NAME}\t%{VERSION}\t%{SIZE}\n']),   # RedHat/CentOS/Fedora
+    ('pacman', ['pacman', '-Q']),  # Arch Linux
+    ('apk', ['apk', 'list', '--installed'])  # Alpine Linux
+]
+
+CHEMIN_STATUT_DPKG = '/var/lib/dpkg/status'
+
+CLES_REGISTRE_WINDOWS = [
+    ('HKEY_LOCAL_MACHINE', r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
+    ('HKEY_LOCAL_MACHINE', r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"),
+    ('HKEY_CURRENT_USER', r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall")
+]
+
+DOSSIER_APPLICATIONS_MACOS = '/Applications'
+
+CHEMIN_CACHE_DEFAUT = os.path.join(os.path.expanduser('~'), '.itsm', 'inventaire_logiciels.json')
+
+# Version du format du cache : l'incrémenter invalide les caches existants
+VERSION_CACHE = 2
+
+logger = logging.getLogger(__name__)
+
+
+def _octets_en_go(valeur):
+    return round(valeur / (1024**3), 2)
+
+
+# ---------------------------------------------------------------------------
+# Sondes matérielles
+# ---------------------------------------------------------------------------
+
+def sonder_systeme():
+    """Nom de la machine et système d'exploitation"""
+    os_info = platform.uname()
+    return {
+        'nom': socket.gethostname(),
+        'os_nom': os_info.system,
+        'os_version': os_info.release,
+        'os_architecture': os_info.machine,
+        'os_build': os_info.version,
+    }
+
+
+def sonder_cpu():
+    """Informations CPU avec gestion d'erreurs"""
+    try:
+        cpu_coeurs = psutil.cpu_count(logical=False) or 1
+        cpu_threads = psutil.cpu_count(logical=True) or 1
+        # Fréquence CPU en GHz
+        cpu_freq = psutil.cpu_freq()
+        cpu_frequence_ghz = round(cpu_freq.current / 1000, 2) if cpu_freq and cpu_freq.current else 0.0
+    except Exception:
+        cpu_coeurs = 1
+        cpu_threads = 1
+        cpu_frequence_ghz = 0.0
+
+    return {
+        'cpu_nom': platform.processor() or 'Processeur inconnu',
+        'cpu_architecture': platform.machine(),
+        'cpu_coeurs': cpu_coeurs,
+        'cpu_threads': cpu_threads,
+        'cpu_frequence': cpu_frequence_ghz,  # Fréquence en GHz
+    }
+
+
+def sonder_memoire():
+    """Informations mémoire, en bytes (entiers requis par le modèle) et en GB pour l'affichage"""
+    try:
+        memory = psutil.virtual_memory()
+        ram_totale, ram_disponible = memory.total, memory.available
+    except Exception:
+        ram_totale, ram_disponible = 0, 0
+
+    return {
+        'ram_totale': int(ram_totale),
+        'ram_disponible': int(ram_disponible),
+        'ram_totale_gb': _octets_en_go(ram_totale),
+        'ram_disponible_gb': _octets_en_go(ram_disponible),
+    }
+
+
+def sonder_disques():
+    """Informations stockage - partitions physiques + total"""
+    partitions_info = []
+    stockage_total_global = 0
+    stockage_libre_global = 0
+
+    try:
+        # Les pseudo-systèmes de fichiers (all=False) et les doublons de montage sont ignorés
+        peripheriques_vus = set()
+        for partition in psutil.disk_partitions(all=False):
+            if partition.device in peripheriques_vus:
+                continue
+            try:
+                usage = psutil.disk_usage(partition.mountpoint)
+            except (PermissionError, OSError):
+                # Ignorer les partitions inaccessibles
+                continue
+            peripheriques_vus.add(partition.device)
+
+            utilise = usage.total - usage.free
+            partitions_info.append({
+                'device': partition.device,
+                'mountpoint': partition.mountpoint,
+                'fstype': partition.fstype,
+                'total_bytes': usage.total,
+                'libre_bytes': usage.free,
+                'utilise_bytes': utilise,
+                'total_gb': _octets_en_go(usage.total),
+                'libre_gb': _octets_en_go(usage.free),
+                'utilise_gb': _octets_en_go(utilise),
+                'pourcentage_utilise': round((utilise / usage.total) * 100, 1) if usage.total > 0 else 0
+            })
+
+            # Ajouter au total global
+            stockage_total_global += usage.total
+            stockage_libre_global += usage.free
+
+    except Exception as e:
+        logger.warning('Erreur lors de la collecte des partitions : %s', e)
+        # Fallback sur la partition principale
+        try:
+            disk = psutil.disk_usage('C:' if platform.system() == 'Windows' else '/')
+            stockage_total_global = disk.total
+            stockage_libre_global = disk.free
+        except Exception:
+            stockage_total_global = 0
+            stockage_libre_global = 0
+
+    return {
+        'stockage_total': int(stockage_total_global),
+        'stockage_libre': int(stockage_libre_global),
+        'stockage_total_gb': _octets_en_go(stockage_total_global),
+        'stockage_libre_gb': _octets_en_go(stockage_libre_global),
+        'partitions': partitions_info,
+    }
+
+
+def sonder_reseau():
+    """Interfaces réseau IPv4"""
+    interfaces = []
+    try:
+        for interface_name, interface_addresses in psutil.net_if_addrs().items():
+            for address in interface_addresses:
+                if address.family == socket.AF_INET:  # IPv4
+                    interfaces.append({
+                        'nom': interface_name,
+                        'type_interface': 'ethernet',
+                        'adresse_ip': address.address,
+                        'masque_reseau': getattr(address, 'netmask', ''),
+                        'actif': True
+                    })
+    except Exception:
+        # Interface par défaut si erreur
+        interfaces = [{
+            'nom': 'Interface par défaut',
+            'type_interface': 'ethernet',
+            'adresse_ip': '127.0.0.1',
+            'masque_reseau': '255.0.0.0',
+            'actif': True
+        }]
+    return interfaces
+
+
+# ---------------------------------------------------------------------------
+# Logiciels installés
+# ---------------------------------------------------------------------------
+
+def _logiciel(nom, version='', editeur='', taille=None):
+    return {
+        'nom': nom,
+        'version': version,
+        'editeur': editeur,
+        'date_installation': None,
+        'taille': taille
+    }
+
+
+# Les parseurs Linux consomment un itérable de lignes (fichier, stdout d'un
+# processus...) et produisent des tuples (nom, version, taille en bytes)
+
+# ii  nom[:arch]  version  architecture  description
+_LIGNE_DPKG = re.compile(r'^ii\s+(\S+)\s+(\S+)\s')
+# nom<TAB>version<TAB>taille (format --queryformat), ou nom-version-release.arch
+_LIGNE_RPM_FORMAT = re.compile(r'^([^\t]+)\t([^\t]*)\t(\d*)$')
+_LIGNE_RPM = re.compile(r'^(.+)-([^-]+)-[^-]+$')
+# nom version
+_LIGNE_PACMAN = re.compile(r'^(\S+) (\S+)$')
+# nom-version-rN architecture {origine} (licence) [installed]
+_LIGNE_APK = re.compile(r'^(\S+?)-(\d[^\s-]*-r\d+)\s')
+
+
+def parser_dpkg(lignes):
+    """Parser la sortie de dpkg -l (seuls les paquets installés 'ii' sont retenus)"""
+    match = _LIGNE_DPKG.match
+    for ligne in lignes:
+        resultat = match(ligne)
+        if resultat:
+            yield resultat.group(1), resultat.group(2), None
+
+
+def parser_rpm(lignes):
+    """Parser la sortie de rpm -qa (avec ou sans --queryformat)"""
+    match_format, match = _LIGNE_RPM_FORMAT.match, _LIGNE_RPM.match
+    for ligne in lignes:
+        ligne = ligne.rstrip('\n')
+        resultat = match_format(ligne)
+        if resultat:
+            taille = resultat.group(3)
+            yield resultat.group(1), resultat.group(2), int(taille) if taille else None
+            continue
+        resultat = match(ligne.strip())
+        if resultat:
+            yield resultat.group(1), resultat.group(2), None
+
+
+def parser_pacman(lignes):
+    """Parser la sortie de pacman -Q"""
+    match = _LIGNE_PACMAN.match
+    for ligne in lignes:
+        resultat = match(ligne.rstrip('\n'))
+        if resultat:
+            yield resultat.group(1), resultat.group(2), None
+
+
+def parser_apk(lignes):
+    """Parser la sortie de apk list --installed"""
+    match = _LIGNE_APK.match
+    for ligne in lignes:
+        resultat = match(ligne)
+        if resultat:
+            yield resultat.group(1), resultat.group(2), None
+
+
+def parser_statut_dpkg(lignes):
+    """
+    Parser directement la base dpkg (/var/lib/dpkg/status), sans lancer dpkg
+
+    Les paquets multi-architecture sont nommés `nom:arch` comme dans `dpkg -l`.
+    """
+    champs = {}
+    for ligne in lignes:
+        if ligne[:1] in (' ', '\t'):
+            # Ligne de continuation (description, conffiles...)
+            continue
+        if ligne.strip():
+            cle, _, valeur = ligne.partition(':')
+            champs[cle] = valeur.strip()
+            continue
+        paquet = _paquet_dpkg_installe(champs)
+        if paquet:
+            yield paquet
+        champs = {}
+    paquet = _paquet_dpkg_installe(champs)
+    if paquet:
+        yield paquet
+
+
+def _paquet_dpkg_installe(champs):
+    """Tuple (nom, version, taille) d'une entrée de la base dpkg, None si non installée"""
+    if not champs.get('Package') or not champs.get('Status', '').endswith(' installed'):
+        return None
+    nom = champs['Package']
+    if champs.get('Multi-Arch') == 'same' and champs.get('Architecture'):
+        nom = f"{nom}:{champs['Architecture']}"
+    taille = champs.get('Installed-Size')
+    return nom, champs.get('Version', ''), int(taille) * 1024 if taille and taille.isdigit() else None
+
+
+PARSEURS_LINUX = {
+    'dpkg': parser_dpkg,
+    'rpm': parser_rpm,
+    'pacman': parser_pacman,
+    'apk': parser_apk,
+}
+
+
+def lignes_commande(commande, timeout=30):
+    """
+    Lire la sortie standard d'une commande ligne par ligne
+
+    Lève FileNotFoundError si la commande n'existe pas et
+    subprocess.CalledProcessError si elle échoue ou dépasse le délai.
+    """
+    with subprocess.Popen(commande, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                          text=True, errors='replace') as processus:
+        minuterie = threading.Timer(timeout, processus.kill)
+        minuterie.start()
+        try:
+            yield from processus.stdout
+        finally:
+            minuterie.cancel()
+            processus.stdout.close()
+            processus.wait()
+    if processus.returncode != 0:
+        raise subprocess.CalledProcessError(processus.returncode, commande)
+
+
+def lignes_fichier(chemin):
+    """Lire un fichier texte ligne par ligne"""
+    with open(chemin, 'r', encoding='utf-8', errors='replace') as f:
+        yield from f
+
+
+def collecter_logiciels_linux():
+    """Collecter les logiciels installés sur Linux via la base dpkg ou le premier gestionnaire disponible"""
+    sources = []
+    if os.path.exists(CHEMIN_STATUT_DPKG):
+        sources.append(('base dpkg', lambda: parser_statut_dpkg(lignes_fichier(CHEMIN_STATUT_DPKG))))
+    for nom_gestionnaire, commande in GESTIONNAIRES_LINUX:
+        sources.append((nom_gestionnaire, lambda nom=nom_gestionnaire, cmd=commande: PARSEURS_LINUX[nom](lignes_commande(cmd))))
+
+    for nom_source, paquets in sources:
+        try:
+            logiciels = [_logiciel(nom, version, taille=taille) for nom, version, taille in paquets()]
+        except (OSError, subprocess.CalledProcessError):
+            continue
+        logger.debug('%d logiciels collectés via %s', len(logiciels), nom_source)
+        return logiciels
+
+    return []
+
+
+def collecter_logiciels_windows():
+    """Collecter les logiciels installés sur Windows via le registre"""
+    logiciels = []
+
+    try:
+        import winreg
+    except ImportError:
+        logger.warning('Module winreg non disponible (pas sur Windows)')
+        return logiciels
+
+    for nom_hkey, subkey_path in CLES_REGISTRE_WINDOWS:
+        try:
+            with winreg.OpenKey(getattr(winreg, nom_hkey), subkey_path) as key:
+                for i in range(winreg.QueryInfoKey(key)[0]):
+                    try:
+                        subkey_name = winreg.EnumKey(key, i)
+                        with winreg.OpenKey(key, subkey_name) as subkey:
+                            logiciel = _lire_logiciel_registre(winreg, subkey)
+                            if logiciel:
+                                logiciels.append(logiciel)
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.warning("Erreur d'accès au registre %s : %s", subkey_path, e)
+            continue
+
+    logger.debug('%d logiciels collectés sur Windows', len(logiciels))
+    return logiciels
+
+
+def _lire_logiciel_registre(winreg, subkey):
+    """Lire une entrée Uninstall du registre (None si elle doit être ignorée)"""
+    def valeur(nom):
+        try:
+            return winreg.QueryValueEx(subkey, nom)[0]
+        except FileNotFoundError:
+            return None
+
+    nom = valeur("DisplayName")
+    # Pas de DisplayName, ou mises à jour et composants système : ignorer cette entrée
+    if not nom or any(skip in nom.lower() for skip in ['update', 'hotfix', 'security update', 'kb']):
+        return None
+
+    logiciel = _logiciel(nom, valeur("DisplayVersion") or '', valeur("Publisher") or '')
+
+    # Date d'installation au format YYYYMMDD
+    install_date = valeur("InstallDate")
+    if install_date and len(install_date) == 8:
+        try:
+            logiciel['date_installation'] = datetime(
+                int(install_date[:4]), int(install_date[4:6]), int(install_date[6:8])
+            ).isoformat()
+        except ValueError:
+            pass
+
+    # Taille en KB, convertie en bytes
+    try:
+        logiciel['taille'] = int(valeur("EstimatedSize")) * 1024
+    except (TypeError, ValueError):
+        pass
+
+    return logiciel
+
+
+def collecter_logiciels_macos():
+    """Collecter les applications installées dans /Applications sur macOS"""
+    import plistlib
+
+    logiciels = []
+    if not os.path.exists(DOSSIER_APPLICATIONS_MACOS):
+        return logiciels
+
+    for app_name in os.listdir(DOSSIER_APPLICATIONS_MACOS):
+        if not app_name.endswith('.app'):
+            continue
+        app_path = os.path.join(DOSSIER_APPLICATIONS_MACOS, app_name)
+        info_plist = os.path.join(app_path, 'Contents', 'Info.plist')
+        if not os.path.exists(info_plist):
+            continue
+        try:
+            with open(info_plist, 'rb') as f:
+                plist_data = plistlib.load(f)
+        except Exception:
+            continue
+
+        identifiant = plist_data.get('CFBundleIdentifier', '')
+        logiciel = _logiciel(
+            plist_data.get('CFBundleDisplayName', app_name.replace('.app', '')),
+            plist_data.get('CFBundleShortVersionString', ''),
+            identifiant.split('.')[1] if '.' in identifiant else ''
+        )
+
+        # Taille de l'application
+        try:
+            result = subprocess.run(['du', '-s', app_path], capture_output=True, text=True)
+            if result.returncode == 0:
+                logiciel['taille'] = int(result.stdout.split()[0]) * 1024
+        except Exception:
+            pass
+
+        logiciels.append(logiciel)
+
+    logger.debug('%d logiciels collectés sur macOS', len(logiciels))
+    return logiciels
+
+
+COLLECTEURS_LOGICIELS = {
+    'Windows': collecter_logiciels_windows,
+    'Linux': collecter_logiciels_linux,
+    'Darwin': collecter_logiciels_macos,
+}
+
+
+def signature_base_paquets(os_name=None):
+    """
+    Signature de la base des logiciels installés : liste de (chemin, mtime_ns)
+
+    Elle change dès qu'un paquet est installé, mis à jour ou supprimé. Retourne
+    None si aucune source de signature n'est disponible (pas de cache possible).
+    """
+    os_name = os_name or platform.system()
+    signature = []
+
+    if os_name == 'Linux':
+        for chemins in BASES_PAQUETS_LINUX.values():
+            for chemin in chemins:
+                try:
+                    signature.append([chemin, os.stat(chemin).st_mtime_ns])
+                except OSError:
+                    continue
+
+    elif os_name == 'Windows':
+        try:
+            import winreg
+        except ImportError:
+            return None
+        for nom_hkey, subkey_path in CLES_REGISTRE_WINDOWS:
+            try:
+                with winreg.OpenKey(getattr(winreg, nom_hkey), subkey_path) as key:
+                    # La clé change quand une sous-clé est ajoutée ou supprimée, mais une mise
+                    # à jour n'écrit que dans sa propre sous-clé : retenir la plus récente
+                    nb_sous_cles, _, derniere_ecriture = winreg.QueryInfoKey(key)
+                    for i in range(nb_sous_cles):
+                        try:
+                            with winreg.OpenKey(key, winreg.EnumKey(key, i)) as subkey:
+                                derniere_ecriture = max(derniere_ecriture, winreg.QueryInfoKey(subkey)[2])
+                        except OSError:
+                            continue
+                    signature.append([f"{nom_hkey}\\{subkey_path}", derniere_ecriture])
+            except OSError:
+                continue
+
+    elif os_name == 'Darwin':
+        try:
+            signature.append([DOSSIER_APPLICATIONS_MACOS, os.stat(DOSSIER_APPLICATIONS_MACOS).st_mtime_ns])
+            for app_name in os.listdir(DOSSIER_APPLICATIONS_MACOS):
+                info_plist = os.path.join(DOSSIER_APPLICATIONS_MACOS, app_name, 'Contents', 'Info.plist')
+                try:
+                    signature.append([info_plist, os.stat(info_plist).st_mtime_ns])
+                except OSError:
+                    continue
+        except OSError:
+            return None
+
+    return signature or None
+
+
+class CacheLogiciels:
+    """Cache sur disque de la dernière liste de logiciels collectée et de sa signature"""
+
+    def __init__(self, chemin=None):
+        self.chemin = chemin or os.environ.get('ITSM_INVENTAIRE_CACHE', CHEMIN_CACHE_DEFAUT)
+
+    def lire(self, signature):
+        """Retourne la liste en cache si la signature correspond, sinon None"""
+        if signature is None:
+            return None
+        try:
+            with open(self.chemin, 'r', encoding='utf-8') as f:
+                contenu = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if contenu.get('version') != VERSION_CACHE or contenu.get('signature') != signature:
+            return None
+        return contenu.get('logiciels')
+
+    def ecrire(self, signature, logiciels):
+        """Enregistrer la liste (écriture atomique par fichier temporaire)"""
+        if signature is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.chemin) or '.', exist_ok=True)
+            temporaire = f"{self.chemin}.tmp"
+            with open(temporaire, 'w', encoding='utf-8') as f:
+                json.dump({'version': VERSION_CACHE, 'signature': signature, 'logiciels': logiciels}, f)
+            os.replace(temporaire, self.chemin)
+        except OSError as e:
+            logger.warning("Impossible d'écrire le cache d'inventaire %s : %s", self.chemin, e)
+
+
+def sonder_logiciels(cache=None):
+    """Logiciels installés, relus depuis le cache si la base de paquets n'a pas changé"""
+    os_name = platform.system()
+    collecteur = COLLECTEURS_LOGICIELS.get(os_name)
+    if collecteur is None:
+        logger.warning('OS non supporté pour la collecte de logiciels : %s', os_name)
+        return []
+
+    signature = signature_base_paquets(os_name)
+    if cache is not None:
+        logiciels = cache.lire(signature)
+        if logiciels is not None:
+            logger.debug('%d logiciels relus depuis le cache (base de paquets inchangée)', len(logiciels))
+            return logiciels
+
+    try:
+        logiciels = collecteur()
+    except Exception as e:
+        logger.warning('Erreur lors de la collecte des logiciels : %s', e)
+        return []
+
+    # Une liste vide signale plutôt une collecte en échec : ne pas la figer dans le cache
+    if cache is not None and logiciels:
+        cache.ecrire(signature, logiciels)
+    return logiciels
+
+
+class CollecteurInventaire:
+    """
+    Collecteur de l'inventaire de la machine locale
+
+    `collecter()` retourne les données au format attendu par
+    `synchroniser_machine_locale` ; la durée de chaque sonde (en ms) est
+    disponible dans `durees` après l'appel.
+    """
+
+    def __init__(self, chemin_cache=None, utiliser_cache=True, max_workers=6):
+        self.cache = CacheLogiciels(chemin_cache) if utiliser_cache else None
+        self.max_workers = max_workers
+        self.durees = {}
+
+    def _sondes(self):
+        return {
+            'systeme': sonder_systeme,
+            'cpu': sonder_cpu,
+            'memoire': sonder_memoire,
+            'disques': sonder_disques,
+            'reseau': sonder_reseau,
+            'logiciels': lambda: sonder_logiciels(self.cache),
+        }
+
+    def _executer(self, nom, sonde):
+        debut = time.perf_counter()
+        try:
+            return sonde()
+        finally:
+            self.durees[nom] = round((time.perf_counter() - debut) * 1000, 1)
+
+    def collecter(self):
+        """Exécuter les sondes en parallèle et assembler l'inventaire"""
+        debut = time.perf_counter()
+        self.durees = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {
+                nom: pool.submit(self._executer, nom, sonde)
+                for nom, sonde in self._sondes().items()
+            }
+            resultats = {}
+            for nom, future in futures.items():
+                try:
+                    resultats[nom] = future.result()
+                except Exception as e:
+                    logger.warning("Sonde d'inventaire '%s' en erreur : %s", nom, e)
+                    resultats[nom] = None
+
+        self.durees['total'] = round((time.perf_counter() - debut) * 1000, 1)
+        return self._assembler(resultats)
+
+    def _assembler(self, resultats):
+        systeme = resultats['systeme'] or {
+            'nom': socket.gethostname(),
+            'os_nom': platform.system(),
+            'os_version': platform.release(),
+            'os_architecture': platform.machine(),
+            'os_build': platform.version(),
+        }
+        cpu = resultats['cpu'] or {
+            'cpu_nom': 'Processeur inconnu',
+            'cpu_architecture': platform.machine(),
+            'cpu_coeurs': 1,
+            'cpu_threads': 1,
+            'cpu_frequence': 0.0,
+        }
+        memoire = resultats['memoire'] or {
+            'ram_totale': 0, 'ram_disponible': 0, 'ram_totale_gb': 0.0, 'ram_disponible_gb': 0.0,
+        }
+        disques = resultats['disques'] or {
+            'stockage_total': 0, 'stockage_libre': 0, 'stockage_total_gb': 0.0,
+            'stockage_libre_gb': 0.0, 'partitions': [],
+        }
+
+        nom_machine = systeme.pop('nom')
+        return {
+            'nom': nom_machine,
+            'numero_serie': '',  # Nécessiterait des commandes système spécifiques
+            'marque': '',
+            'modele': '',
+            'info_systeme': {
+                **systeme,
+                **cpu,
+                **memoire,
+                'stockage_total': disques['stockage_total'],
+                'stockage_libre': disques['stockage_libre'],
+                'stockage_total_gb': disques['stockage_total_gb'],
+                'stockage_libre_gb': disques['stockage_libre_gb'],
+                'nom_machine': nom_machine,
+                'partitions': disques['partitions'],  # Détails de toutes les partitions
+            },
+            'interfaces_reseau': resultats['reseau'] or [],
+            'logiciels': resultats['logiciels'] or [],
+        }
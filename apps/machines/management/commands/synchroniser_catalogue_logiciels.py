@@ -0,0 +1,27 @@
+"""
+Synchronisation du catalogue des logiciels de référence depuis les logiciels installés
+
+Reprend la dernière synchronisation inachevée s'il y en a une ; ne fait rien
+si une synchronisation avance déjà (action d'administration, autre commande).
+"""
+from django.core.management.base import BaseCommand
+
+from apps.machines.catalogue import SynchronisationEnCours, synchroniser_catalogue
+
+
+class Command(BaseCommand):
+    help = "Créer les logiciels de référence manquants et compléter leurs éditeurs"
+
+    def handle(self, *args, **options):
+        def progression(tache):
+            self.stdout.write(f"🔄 {tache.crees}/{tache.total} logiciel(s) créé(s) ({tache.pourcentage} %)")
+
+        try:
+            tache = synchroniser_catalogue(progression=progression)
+        except SynchronisationEnCours as e:
+            self.stdout.write(f"⚠️ {e} : rien à faire.")
+            return
+        self.stdout.write(
+            f"✅ Synchronisation terminée : {tache.crees} logiciel(s) créé(s), "
+            f"{tache.mis_a_jour} logiciel(s) mis à jour."
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('machines', '0006_alter_logicielreference_niveau_securite'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='machine',
+            name='empreintes_inventaire',
+            field=models.JSONField(blank=True, default=dict, help_text="Empreintes des sections de l'inventaire à la dernière synchronisation"),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('machines', '0007_machine_empreintes_inventaire'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='historiquemachine',
+            index=models.Index(fields=['date_modification', 'id'], name='machines_hi_date_mo_28861e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historiquemachine',
+            index=models.Index(fields=['machine', 'date_modification', 'id'], name='machines_hi_machine_ead69a_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('machines', '0008_index_pagination_curseur'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SynchronisationCatalogue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('statut', models.CharField(choices=[('en_cours', 'En cours'), ('terminee', 'Terminée'), ('echec', 'Échec')], default='en_cours', max_length=20)),
+                ('editeurs_completes', models.BooleanField(default=False)),
+                ('curseur', models.CharField(blank=True, help_text='Dernier nom de logiciel traité', max_length=200)),
+                ('total', models.PositiveIntegerField(default=0, help_text='Logiciels de référence à créer')),
+                ('crees', models.PositiveIntegerField(default=0)),
+                ('mis_a_jour', models.PositiveIntegerField(default=0)),
+                ('erreur', models.TextField(blank=True)),
+                ('date_debut', models.DateTimeField(auto_now_add=True)),
+                ('date_modification', models.DateTimeField(auto_now=True)),
+                ('date_fin', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Synchronisation du catalogue',
+                'verbose_name_plural': 'Synchronisations du catalogue',
+                'ordering': ['-date_debut'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='logicielinstalle',
+            index=models.Index(fields=['nom', 'editeur'], name='machines_lo_nom_baac24_idx'),
+        ),
+    ]
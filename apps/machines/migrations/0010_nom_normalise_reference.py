@@ -0,0 +1,79 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:45
+
+from django.db import migrations, models
+
+
+# Du moins au plus strict : une fusion garde le niveau le plus strict du groupe
+RANGS_NIVEAUX = {'libre': 0, 'controle': 1, 'restreint': 2, 'interdit': 3}
+CIBLES_AUTORISATION = ('utilisateur', 'groupe', 'structure', 'site')
+
+
+def normaliser_noms(apps, schema_editor):
+    """
+    Renseigner nom_normalise et fusionner les références qui ne diffèrent que par la casse ou les espaces
+
+    La plus ancienne référence de chaque groupe est gardée, avec le niveau de
+    sécurité le plus strict du groupe. Les logiciels installés, demandes et
+    autorisations des doublons lui sont rattachés, puis les doublons sont
+    supprimés. Une autorisation qui ferait doublon avec une autorisation de la
+    référence gardée (même utilisateur, groupe, structure ou site) est supprimée.
+    """
+    LogicielReference = apps.get_model('machines', 'LogicielReference')
+    LogicielInstalle = apps.get_model('machines', 'LogicielInstalle')
+    DemandeAutorisation = apps.get_model('machines', 'DemandeAutorisation')
+    AutorisationLogiciel = apps.get_model('machines', 'AutorisationLogiciel')
+
+    groupes = {}
+    for reference in LogicielReference.objects.order_by('id').only('id', 'nom', 'niveau_securite').iterator():
+        cle = ' '.join((reference.nom or '').split()).casefold()
+        if cle:
+            groupes.setdefault(cle, []).append(reference)
+
+    gardees = []
+    for cle, references in groupes.items():
+        gardee, doublons = references[0], references[1:]
+        gardee.nom_normalise = cle
+        gardees.append(gardee)
+        if not doublons:
+            continue
+        ids = [doublon.id for doublon in doublons]
+        gardee.niveau_securite = max(
+            (reference.niveau_securite for reference in references), key=lambda niveau: RANGS_NIVEAUX.get(niveau, 0)
+        )
+        LogicielInstalle.objects.filter(logiciel_reference_id__in=ids).update(logiciel_reference_id=gardee.id)
+        DemandeAutorisation.objects.filter(logiciel_reference_id__in=ids).update(logiciel_reference_id=gardee.id)
+        for autorisation in AutorisationLogiciel.objects.filter(logiciel_id__in=ids).order_by('id'):
+            # Unicité par (logiciel, cible) pour chacune des cibles renseignées
+            cibles = {
+                f'{cible}_id': getattr(autorisation, f'{cible}_id')
+                for cible in CIBLES_AUTORISATION if getattr(autorisation, f'{cible}_id') is not None
+            }
+            if any(AutorisationLogiciel.objects.filter(logiciel_id=gardee.id, **{champ: valeur}).exists()
+                   for champ, valeur in cibles.items()):
+                autorisation.delete()
+            else:
+                autorisation.logiciel_id = gardee.id
+                autorisation.save(update_fields=['logiciel'])
+        LogicielReference.objects.filter(id__in=ids).delete()
+    LogicielReference.objects.bulk_update(gardees, ['nom_normalise', 'niveau_securite'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('machines', '0009_synchronisation_catalogue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logicielreference',
+            name='nom_normalise',
+            field=models.CharField(editable=False, help_text='Nom en minuscules, espaces regroupés (voir apps.machines.references)', max_length=200, null=True),
+        ),
+        migrations.RunPython(normaliser_noms, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='logicielreference',
+            name='nom_normalise',
+            field=models.CharField(editable=False, help_text='Nom en minuscules, espaces regroupés (voir apps.machines.references)', max_length=200, null=True, unique=True),
+        ),
+    ]
@@ -2,7 +2,10 @@
 Modèles pour la gestion des machines et informations système
 """
 from django.db import models
+from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 import uuid
 import json
 
@@ -65,6 +68,8 @@ class Machine(models.Model):
     date_creation = models.DateTimeField(auto_now_add=True)
     date_modification = models.DateTimeField(auto_now=True)
     derniere_synchronisation = models.DateTimeField(null=True, blank=True)
+    empreintes_inventaire = models.JSONField(default=dict, blank=True,
+                                             help_text="Empreintes des sections de l'inventaire à la dernière synchronisation")
     
     # Commentaires
     commentaires = models.TextField(blank=True)
@@ -79,12 +84,18 @@ class Machine(models.Model):
     
     @property
     def est_en_ligne(self):
-        """Vérifie si la machine est en ligne (basé sur la dernière synchronisation)"""
-        if not self.derniere_synchronisation:
-            return False
+        """Vérifie si la machine est en ligne (dernière synchronisation ou dernier sondage réussi)"""
+        from django.core.exceptions import ObjectDoesNotExist
         from django.utils import timezone
         from datetime import timedelta
-        return timezone.now() - self.derniere_synchronisation < timedelta(minutes=10)
+        limite = timezone.now() - timedelta(minutes=10)
+        if self.derniere_synchronisation and self.derniere_synchronisation > limite:
+            return True
+        try:
+            statut = self.status_monitoring
+        except ObjectDoesNotExist:
+            return False
+        return bool(statut.ping_success and statut.last_ping_time and statut.last_ping_time > limite)
 
 
 class InformationSysteme(models.Model):
@@ -199,6 +210,10 @@ class LogicielReference(models.Model):
     ]
     
     nom = models.CharField(max_length=200, unique=True)
+    nom_normalise = models.CharField(
+        max_length=200, unique=True, null=True, editable=False,
+        help_text="Nom en minuscules, espaces regroupés (voir apps.machines.references)"
+    )
     editeur = models.CharField(max_length=100, blank=True)
     description = models.TextField(blank=True)
     categorie = models.ForeignKey(CategorieLogiciel, on_delete=models.SET_NULL, null=True, blank=True)
@@ -228,55 +243,46 @@ class LogicielReference(models.Model):
     def __str__(self):
         return f"{self.nom} ({self.get_niveau_securite_display()})"
     
+    def clean(self):
+        """Refuser un nom qui ne diffère d'une référence existante que par la casse ou les espaces"""
+        from .references import normaliser_nom
+        super().clean()
+        if self.nom and LogicielReference.objects.filter(
+            nom_normalise=normaliser_nom(self.nom)
+        ).exclude(pk=self.pk).exists():
+            raise ValidationError({'nom': "Un logiciel de référence porte déjà ce nom (casse et espaces ignorés)."})
+    
+    def save(self, *args, **kwargs):
+        from .references import normaliser_nom
+        self.nom_normalise = normaliser_nom(self.nom)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'nom' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'nom_normalise'}
+        super().save(*args, **kwargs)
+    
     @classmethod
-    def synchroniser_depuis_logiciels_installes(cls):
+    def from_db(cls, db, field_names, values):
+        """Mémoriser le niveau de sécurité chargé pour détecter ses changements"""
+        instance = super().from_db(db, field_names, values)
+        instance._niveau_securite_charge = instance.__dict__.get('niveau_securite')
+        return instance
+    
+    @classmethod
+    def synchroniser_depuis_logiciels_installes(cls, progression=None):
         """
         Synchronise les logiciels de référence avec tous les logiciels installés détectés
         Crée automatiquement les logiciels de référence manquants
-        """
-        # Utiliser django.apps pour éviter les problèmes d'importation circulaire
-        from django.apps import apps
-        LogicielInstalle = apps.get_model('machines', 'LogicielInstalle')
-        
-        logiciels_crees = 0
-        logiciels_mis_a_jour = 0
-        
-        # Récupérer tous les logiciels installés uniques (nom + éditeur)
-        logiciels_installes = LogicielInstalle.objects.values(
-            'nom', 'editeur'
-        ).distinct().order_by('nom')
-        
-        for logiciel_data in logiciels_installes:
-            nom = logiciel_data['nom']
-            editeur = logiciel_data['editeur'] or ''
-            
-            if not nom:  # Ignorer les logiciels sans nom
-                continue
-            
-            # Vérifier si le logiciel de référence existe déjà
-            logiciel_ref, created = cls.objects.get_or_create(
-                nom=nom,
-                defaults={
-                    'editeur': editeur,
-                    'niveau_securite': 'libre',  # Par défaut, autoriser sans restriction
-                    'description': f'Logiciel détecté automatiquement depuis les machines',
-                    'actif': True
-                }
-            )
-            
-            if created:
-                logiciels_crees += 1
-            else:
-                # Mettre à jour l'éditeur si il était vide
-                if not logiciel_ref.editeur and editeur:
-                    logiciel_ref.editeur = editeur
-                    logiciel_ref.save()
-                    logiciels_mis_a_jour += 1
         
+        Traitement ensembliste par lots, reprenable : voir `apps.machines.catalogue`.
+        `progression` est appelé avec la `SynchronisationCatalogue` après chaque lot.
+        Lève `SynchronisationEnCours` si une synchronisation avance déjà ailleurs.
+        """
+        from .catalogue import synchroniser_catalogue
+        tache = synchroniser_catalogue(progression=progression)
         return {
-            'crees': logiciels_crees,
-            'mis_a_jour': logiciels_mis_a_jour,
-            'total_traites': len(logiciels_installes)
+            'crees': tache.crees,
+            'mis_a_jour': tache.mis_a_jour,
+            'total_traites': tache.total,
         }
     
     @classmethod
@@ -460,81 +466,21 @@ class LogicielInstalle(models.Model):
         verbose_name_plural = "Logiciels installés"
         unique_together = ['machine', 'nom', 'version']
         ordering = ['nom']
+        indexes = [
+            models.Index(fields=['nom', 'editeur']),
+        ]
     
     def __str__(self):
         return f"{self.nom} {self.version} - {self.machine.nom}"
     
     def verifier_autorisation(self):
-        """Vérifie et met à jour le statut d'autorisation du logiciel"""
-        # Par défaut, tous les logiciels sont autorisés
-        ancien_autorise = self.autorise
-        ancien_bloque = self.bloque
-        ancien_motif = self.motif_blocage
-
-        self.autorise = True
-        self.bloque = False
-        self.motif_blocage = ""
-        
-        if not self.logiciel_reference:
-            # Logiciel non référencé, chercher par nom
-            try:
-                self.logiciel_reference = LogicielReference.objects.get(nom__iexact=self.nom)
-            except LogicielReference.DoesNotExist:
-                # Logiciel non référencé, autoriser par défaut
-                # Sauvegarder seulement si il y a eu des changements
-                if (ancien_autorise != self.autorise or
-                    ancien_bloque != self.bloque or
-                    ancien_motif != self.motif_blocage):
-                    self.save(update_fields=['autorise', 'bloque', 'motif_blocage'])
-                return
-        
-        logiciel_ref = self.logiciel_reference
-        utilisateur = self.machine.utilisateur
-        
-        # Seuls les logiciels explicitement interdits sont bloqués
-        if logiciel_ref.niveau_securite == 'interdit':
-            self.autorise = False
-            self.bloque = True
-            self.motif_blocage = "Logiciel interdit par la politique de sécurité"
-        else:
-            # Vérifier s'il y a des autorisations explicitement refusées QUI CONCERNENT CET UTILISATEUR
-            autorisations_refusees = AutorisationLogiciel.objects.filter(
-                logiciel=logiciel_ref,
-                statut='refuse'
-            )
-            
-            # Vérifier chaque autorisation refusée pour voir si elle concerne cet utilisateur
-            autorisation_applicable = None
-            for autorisation in autorisations_refusees:
-                if autorisation.utilisateur == utilisateur:
-                    # Blocage spécifique à cet utilisateur
-                    autorisation_applicable = autorisation
-                    break
-                elif autorisation.groupe and utilisateur.groupe == autorisation.groupe:
-                    # Blocage pour le groupe de cet utilisateur
-                    autorisation_applicable = autorisation
-                    break
-                elif autorisation.structure and utilisateur.structure == autorisation.structure:
-                    # Blocage pour la structure de cet utilisateur
-                    autorisation_applicable = autorisation
-                    break
-                elif autorisation.site and utilisateur.site == autorisation.site:
-                    # Blocage pour le site de cet utilisateur
-                    autorisation_applicable = autorisation
-                    break
-            
-            # Si une autorisation refusée concerne cet utilisateur, bloquer
-            if autorisation_applicable:
-                self.autorise = False
-                self.bloque = True
-                self.motif_blocage = autorisation_applicable.motif or f"Autorisation refusée par l'administrateur"
-            # Sinon, l'utilisateur n'est pas concerné par les blocages, rester autorisé
-        
-        # Sauvegarder seulement si il y a eu des changements pour éviter les boucles infinies
-        if (ancien_autorise != self.autorise or
-            ancien_bloque != self.bloque or
-            ancien_motif != self.motif_blocage):
-            self.save(update_fields=['autorise', 'bloque', 'motif_blocage'])
+        """Vérifie et met à jour le statut d'autorisation du logiciel
+
+        Pour plusieurs logiciels, utiliser directement
+        `apps.machines.autorisations.evaluer_autorisations` sur un queryset.
+        """
+        from .autorisations import evaluer_autorisations
+        evaluer_autorisations(self)
 
     def get_logiciels_bloques_pour_machine(self):
         """Retourne la liste des logiciels bloqués pour cette machine"""
@@ -572,6 +518,91 @@ class HistoriqueMachine(models.Model):
         verbose_name = "Historique machine"
         verbose_name_plural = "Historiques machines"
         ordering = ['-date_modification']
+        indexes = [
+            # Pagination par curseur (date, id)
+            models.Index(fields=['date_modification', 'id']),
+            models.Index(fields=['machine', 'date_modification', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.machine.nom} - {self.get_type_modification_display()} - {self.date_modification}"
+
+
+class SynchronisationCatalogue(models.Model):
+    """Exécution (reprenable) de la synchronisation du catalogue des logiciels de référence"""
+    
+    STATUT_CHOICES = [
+        ('en_cours', 'En cours'),
+        ('terminee', 'Terminée'),
+        ('echec', 'Échec'),
+    ]
+    
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='en_cours')
+    editeurs_completes = models.BooleanField(default=False)
+    curseur = models.CharField(max_length=200, blank=True, help_text="Dernier nom de logiciel traité")
+    
+    # Progression
+    total = models.PositiveIntegerField(default=0, help_text="Logiciels de référence à créer")
+    crees = models.PositiveIntegerField(default=0)
+    mis_a_jour = models.PositiveIntegerField(default=0)
+    erreur = models.TextField(blank=True)
+    
+    # Dates
+    date_debut = models.DateTimeField(auto_now_add=True)
+    date_modification = models.DateTimeField(auto_now=True)
+    date_fin = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = "Synchronisation du catalogue"
+        verbose_name_plural = "Synchronisations du catalogue"
+        ordering = ['-date_debut']
     
     def __str__(self):
-        return f"{self.machine.nom} - {self.get_type_modification_display()} - {self.date_modification}"
\ No newline at end of file
+        return f"Synchronisation du {self.date_debut:%d/%m/%Y %H:%M} - {self.get_statut_display()} ({self.pourcentage} %)"
+    
+    @property
+    def pourcentage(self):
+        """Avancement de la création des références manquantes"""
+        if self.statut == 'terminee':
+            return 100
+        if not self.total:
+            return 0
+        return min(100, round(self.crees * 100 / self.total))
+
+
+@receiver(post_save, sender=AutorisationLogiciel)
+@receiver(post_delete, sender=AutorisationLogiciel)
+def invalider_politique_autorisation(sender, instance, **kwargs):
+    """Une autorisation peut concerner un groupe, une structure ou un site : invalider tous les snapshots"""
+    from .politique import invalider_politique
+    invalider_politique()
+
+
+@receiver(post_save, sender=LogicielReference)
+def invalider_politique_reference(sender, instance, created, **kwargs):
+    """Invalider les snapshots quand le niveau de sécurité d'une référence change"""
+    from .politique import invalider_politique
+    ancien_niveau = getattr(instance, '_niveau_securite_charge', None)
+    if created:
+        # Une nouvelle référence 'libre' ne bloque rien (cas des références auto-détectées)
+        if instance.niveau_securite == 'interdit':
+            invalider_politique()
+    elif ancien_niveau != instance.niveau_securite:
+        invalider_politique()
+    instance._niveau_securite_charge = instance.niveau_securite
+
+
+@receiver(post_save, sender=LogicielReference)
+@receiver(post_delete, sender=LogicielReference)
+def invalider_resolveur_references(sender, instance, **kwargs):
+    """Vider les caches de résolution des noms quand une référence change"""
+    from .references import invalider_resolveur
+    invalider_resolveur()
+
+
+@receiver(post_delete, sender=LogicielReference)
+def invalider_politique_suppression_reference(sender, instance, **kwargs):
+    """Invalider les snapshots quand une référence interdite est supprimée"""
+    from .politique import invalider_politique
+    if instance.niveau_securite == 'interdit':
+        invalider_politique()
@@ -0,0 +1,143 @@
+"""
+Snapshot de la politique de blocage des logiciels par utilisateur
+
+Les agents desktop interrogent `logiciels_bloques` toutes les 2 secondes. Plutôt
+que de réévaluer toutes les autorisations à chaque appel, la liste des logiciels
+bloqués est matérialisée une fois par utilisateur puis servie depuis le cache
+avec un ETag. Le snapshot est invalidé (par incrément de version) quand une
+autorisation, le niveau de sécurité d'une référence ou la liste des logiciels
+d'une machine change.
+
+L'invalidation suppose un cache partagé entre les workers : avec un cache propre
+à chaque processus (LocMemCache, le défaut de développement), un worker ne voit
+pas les incréments de version des autres. La durée de vie des snapshots y est
+alors ramenée à `DUREE_SNAPSHOT_LOCAL`, et `manage.py check --deploy` échoue
+si DEBUG est désactivé (`apps.machines.checks`).
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Durée de vie d'un snapshot : filet de sécurité si une invalidation est manquée
+DUREE_SNAPSHOT = 60 * 60
+# Durée de vie avec un cache par processus : retard maximal d'une invalidation
+# faite par un autre worker
+DUREE_SNAPSHOT_LOCAL = 60
+
+# Backends de cache propres à chaque processus
+CACHES_PAR_PROCESSUS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+CLE_VERSION_GLOBALE = 'machines:politique:version'
+CLE_VERSION_UTILISATEUR = 'machines:politique:version:{user_id}'
+CLE_SNAPSHOT = 'machines:politique:snapshot:{user_id}:{globale}:{utilisateur}'
+
+
+def cache_partage():
+    """Le cache par défaut est-il partagé entre les processus ?"""
+    return settings.CACHES['default']['BACKEND'] not in CACHES_PAR_PROCESSUS
+
+
+def _get_version(cle):
+    """Lire un compteur de version en l'initialisant si nécessaire"""
+    version = cache.get(cle)
+    if version is None:
+        cache.add(cle, 1, timeout=None)
+        version = cache.get(cle, 1)
+    return version
+
+
+def _incrementer_version(cle):
+    """Incrémenter un compteur de version (création si absent)"""
+    try:
+        return cache.incr(cle)
+    except ValueError:
+        cache.set(cle, 2, timeout=None)
+        return 2
+
+
+def get_version_politique(user_id):
+    """Retourne le couple (version globale, version utilisateur)"""
+    return (
+        _get_version(CLE_VERSION_GLOBALE),
+        _get_version(CLE_VERSION_UTILISATEUR.format(user_id=user_id)),
+    )
+
+
+def invalider_politique(user_ids=None):
+    """
+    Invalider les snapshots de politique
+
+    Sans argument, tous les utilisateurs sont invalidés (changement d'autorisation
+    ou de niveau de sécurité). Sinon seuls les utilisateurs indiqués le sont
+    (changement de la liste des logiciels d'une machine).
+    """
+    if user_ids is None:
+        _incrementer_version(CLE_VERSION_GLOBALE)
+        return
+    for user_id in user_ids:
+        if user_id:
+            _incrementer_version(CLE_VERSION_UTILISATEUR.format(user_id=user_id))
+
+
+def _calculer_etag(logiciels):
+    """Calculer un ETag stable à partir du contenu de la liste"""
+    contenu = json.dumps(logiciels, sort_keys=True, ensure_ascii=False)
+    return '"{}"'.format(hashlib.sha1(contenu.encode('utf-8')).hexdigest())
+
+
+def construire_snapshot(user):
+    """Réévaluer les autorisations de l'utilisateur et matérialiser sa liste de blocage"""
+    from .models import LogicielInstalle
+    from .autorisations import evaluer_autorisations
+
+    evaluer_autorisations(LogicielInstalle.objects.filter(machine__utilisateur=user))
+
+    logiciels_bloques = LogicielInstalle.objects.filter(
+        machine__utilisateur=user,
+        bloque=True
+    ).select_related('machine', 'logiciel_reference').order_by('nom', 'version', 'machine__nom')
+
+    # Supprimer les doublons basés sur nom + version + machine
+    logiciels_uniques = {}
+    for logiciel in logiciels_bloques:
+        cle = (logiciel.nom, logiciel.version or '', logiciel.machine.nom)
+        if cle not in logiciels_uniques:
+            logiciels_uniques[cle] = {
+                'nom': logiciel.nom,
+                'version': logiciel.version or '',
+                'editeur': logiciel.editeur or '',
+                'motif_blocage': logiciel.motif_blocage or 'Logiciel bloqué',
+                'machine': logiciel.machine.nom,
+                'autorise': logiciel.autorise,
+                'niveau_securite': logiciel.logiciel_reference.niveau_securite if logiciel.logiciel_reference else 'libre'
+            }
+
+    logiciels = list(logiciels_uniques.values())
+    return {
+        'logiciels': logiciels,
+        'etag': _calculer_etag(logiciels),
+    }
+
+
+def get_snapshot(user):
+    """
+    Retourne le snapshot de politique de l'utilisateur depuis le cache
+
+    Le snapshot n'est reconstruit que si sa version a changé depuis la dernière
+    matérialisation. Retourne un dict avec `logiciels`, `etag` et `version`.
+    """
+    version_globale, version_utilisateur = get_version_politique(user.pk)
+    cle = CLE_SNAPSHOT.format(
+        user_id=user.pk, globale=version_globale, utilisateur=version_utilisateur
+    )
+    snapshot = cache.get(cle)
+    if snapshot is None:
+        snapshot = construire_snapshot(user)
+        snapshot['version'] = f"{version_globale}.{version_utilisateur}"
+        cache.set(cle, snapshot, timeout=DUREE_SNAPSHOT if cache_partage() else DUREE_SNAPSHOT_LOCAL)
+    return snapshot
@@ -0,0 +1,102 @@
+"""
+Résolution des noms de logiciels installés vers les logiciels de référence
+
+Les noms sont comparés sous forme normalisée (`normaliser_nom` : espaces
+regroupés, casse repliée), stockée dans `LogicielReference.nom_normalise` avec
+un index unique. `resolveur` garde en mémoire, par processus, les associations
+nom normalisé → identifiant de référence les plus récemment utilisées (LRU) :
+lier les logiciels d'une machine coûte au plus une requête `IN` pour les noms
+absents du cache.
+
+Seules les références trouvées sont mises en cache, une fois la transaction
+en cours validée. Le cache est vidé dans tous les processus quand une
+référence est enregistrée ou supprimée (compteur de version en cache,
+incrémenté par un signal).
+"""
+import threading
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db import transaction
+
+# Nombre maximal de noms gardés en mémoire par processus
+TAILLE_CACHE = 20000
+
+CLE_VERSION = 'machines:references:version'
+
+
+def normaliser_nom(nom):
+    """Nom comparable : espaces regroupés et casse repliée"""
+    return ' '.join((nom or '').split()).casefold()
+
+
+def _get_version():
+    """Lire le compteur de version des références en l'initialisant si nécessaire"""
+    version = cache.get(CLE_VERSION)
+    if version is None:
+        cache.add(CLE_VERSION, 1, timeout=None)
+        version = cache.get(CLE_VERSION, 1)
+    return version
+
+
+def invalider_resolveur():
+    """Vider le cache de résolution de tous les processus"""
+    try:
+        cache.incr(CLE_VERSION)
+    except ValueError:
+        cache.set(CLE_VERSION, 2, timeout=None)
+
+
+class ResolveurReferences:
+    """Cache LRU nom normalisé → identifiant de `LogicielReference`"""
+
+    def __init__(self, taille=TAILLE_CACHE):
+        self.taille = taille
+        self.verrou = threading.Lock()
+        self.identifiants = OrderedDict()
+        self.version = None
+
+    def resoudre(self, noms):
+        """{nom normalisé: id de référence} pour les noms qui ont une référence"""
+        from .models import LogicielReference
+
+        cles = {normaliser_nom(nom) for nom in noms}
+        cles.discard('')
+        version = _get_version()
+        trouves = {}
+        manquants = []
+        with self.verrou:
+            if version != self.version:
+                self.identifiants.clear()
+                self.version = version
+            for cle in cles:
+                reference_id = self.identifiants.get(cle)
+                if reference_id is None:
+                    manquants.append(cle)
+                else:
+                    self.identifiants.move_to_end(cle)
+                    trouves[cle] = reference_id
+
+        if manquants:
+            lus = dict(
+                LogicielReference.objects.filter(nom_normalise__in=manquants).values_list('nom_normalise', 'id')
+            )
+            # Une référence créée dans une transaction annulée ne doit pas rester en cache
+            transaction.on_commit(lambda: self.memoriser(lus, version))
+            trouves.update(lus)
+        return trouves
+
+    def memoriser(self, identifiants, version):
+        with self.verrou:
+            if version == self.version:
+                self.identifiants.update(identifiants)
+                while len(self.identifiants) > self.taille:
+                    self.identifiants.popitem(last=False)
+
+    def vider(self):
+        with self.verrou:
+            self.identifiants.clear()
+            self.version = None
+
+
+resolveur = ResolveurReferences()
@@ -1,12 +1,21 @@
 """
 Serializers pour l'application machines
 """
+import logging
+
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 from .models import (
     Machine, TypeMachine, InformationSysteme, 
     InterfaceReseau, LogicielInstalle, HistoriqueMachine
 )
 from apps.users.serializers import UserSerializer
+from itsm_backend.champs import ChampsDynamiquesMixin
+from itsm_backend.journalisation import completer_resume
+from .politique import invalider_politique
+
+logger = logging.getLogger(__name__)
 
 
 class TypeMachineSerializer(serializers.ModelSerializer):
@@ -43,11 +52,40 @@ class InterfaceReseauSerializer(serializers.ModelSerializer):
         ]
 
 
+class LogicielsInstallesListSerializer(serializers.ListSerializer):
+    """
+    Valide tous les logiciels reçus avant toute écriture
+    
+    Seules les lignes invalides sont rapportées, indexées par leur position
+    dans la liste et accompagnées du nom du logiciel, plutôt qu'une liste
+    d'erreurs vides de la taille de l'inventaire.
+    """
+    
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            return super().to_internal_value(data)
+        
+        valides = []
+        erreurs = {}
+        for indice, element in enumerate(data):
+            try:
+                valides.append(self.child.run_validation(element))
+            except serializers.ValidationError as e:
+                erreurs[indice] = {
+                    'nom': element.get('nom') if isinstance(element, dict) else None,
+                    'erreurs': e.detail,
+                }
+        if erreurs:
+            raise serializers.ValidationError(erreurs)
+        return valides
+
+
 class LogicielInstalleSerializer(serializers.ModelSerializer):
     """Serializer pour les logiciels installés"""
     
     class Meta:
         model = LogicielInstalle
+        list_serializer_class = LogicielsInstallesListSerializer
         fields = [
             'nom', 'version', 'editeur', 'date_installation', 'taille',
             'licence_requise', 'licence_valide', 'autorise', 'bloque',
@@ -58,7 +96,7 @@ class LogicielInstalleSerializer(serializers.ModelSerializer):
 
 
 
-class MachineSerializer(serializers.ModelSerializer):
+class MachineSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer pour les machines"""
     utilisateur_info = UserSerializer(source='utilisateur', read_only=True)
     type_machine_info = TypeMachineSerializer(source='type_machine', read_only=True)
@@ -83,6 +121,29 @@ class MachineSerializer(serializers.ModelSerializer):
         ]
 
 
+class MachineResumeSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
+    """Serializer résumé pour les listes de machines (inventaire via ?expand=)"""
+    utilisateur_nom = serializers.CharField(source='utilisateur.nom_complet', read_only=True, default=None)
+    type_machine_nom = serializers.CharField(source='type_machine.nom', read_only=True, default=None)
+    est_en_ligne = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = Machine
+        fields = [
+            'id', 'nom', 'numero_serie', 'numero_inventaire', 'type_machine', 'type_machine_nom',
+            'utilisateur', 'utilisateur_nom', 'structure', 'site', 'statut',
+            'marque', 'modele', 'derniere_synchronisation', 'est_en_ligne'
+        ]
+        read_only_fields = fields
+        extensions = {
+            'utilisateur_info': lambda: UserSerializer(source='utilisateur', read_only=True),
+            'type_machine_info': lambda: TypeMachineSerializer(source='type_machine', read_only=True),
+            'info_systeme': lambda: InformationSystemeSerializer(read_only=True),
+            'interfaces_reseau': lambda: InterfaceReseauSerializer(many=True, read_only=True),
+            'logiciels': lambda: LogicielInstalleSerializer(many=True, read_only=True),
+        }
+
+
 class MachineCreateUpdateSerializer(serializers.ModelSerializer):
     """Serializer pour créer/mettre à jour les machines depuis l'app desktop"""
     info_systeme = InformationSystemeSerializer(required=False)
@@ -97,19 +158,24 @@ class MachineCreateUpdateSerializer(serializers.ModelSerializer):
             'info_systeme', 'interfaces_reseau', 'logiciels'
         ]
     
+    @transaction.atomic(savepoint=False)
     def create(self, validated_data):
-        """Créer une machine avec ses informations système"""
-        print(f"🔍 Données reçues dans create: {list(validated_data.keys())}")
+        """
+        Créer une machine avec ses informations système (en une seule transaction)
+        
+        Toutes les lignes ont été validées avant l'appel : les interfaces et les
+        logiciels sont insérés en masse, et une erreur d'écriture annule toute
+        la création au lieu de laisser une machine incomplète. Appelée dans la
+        transaction de la vue, elle n'ouvre pas de point de sauvegarde.
+        """
         info_systeme_data = validated_data.pop('info_systeme', None)
         interfaces_data = validated_data.pop('interfaces_reseau', [])
         logiciels_data = validated_data.pop('logiciels', [])
-        print(f"🔍 Logiciels extraits: {len(logiciels_data)} logiciels")
         
         # Assigner automatiquement l'utilisateur connecté et sa structure
         user = self.context['request'].user
         validated_data['utilisateur'] = user
         
-        # AJOUTER CETTE LOGIQUE DE GESTION DES CHAMPS UNIQUE
         # Gérer les champs UNIQUE - convertir les chaînes vides en None pour éviter les violations de contrainte
         if 'numero_serie' in validated_data and not validated_data['numero_serie']:
             validated_data['numero_serie'] = None
@@ -135,119 +201,90 @@ class MachineCreateUpdateSerializer(serializers.ModelSerializer):
                 }
             )
             validated_data['structure'] = structure_defaut
-            print(f"⚠️ Utilisateur {user.username} sans structure, assignation à la structure par défaut")
+            logger.warning('Utilisateur %s sans structure, assignation à la structure par défaut', user.username)
         
-        try:
-            # Créer la machine
-            machine = Machine.objects.create(**validated_data)
-            print(f"✅ Machine créée en base: {machine.id} - {machine.nom}")
-            print(f"📋 Numéro d'inventaire: {machine.numero_inventaire}")
-            
-            # Préparer les données pour l'historique
-            donnees_creation = {
-                'machine_id': str(machine.id),
-                'nom': machine.nom,
-                'utilisateur': user.username,
-                'structure': machine.structure.nom if machine.structure else None,
-                'numero_inventaire': machine.numero_inventaire,
-                'source': 'application_desktop'
+        machine = Machine.objects.create(**validated_data)
+        
+        # Préparer les données pour l'historique
+        donnees_creation = {
+            'machine_id': str(machine.id),
+            'nom': machine.nom,
+            'utilisateur': user.username,
+            'structure': machine.structure.nom if machine.structure else None,
+            'numero_inventaire': machine.numero_inventaire,
+            'source': 'application_desktop'
+        }
+        
+        if info_systeme_data:
+            InformationSysteme.objects.create(machine=machine, **info_systeme_data)
+            donnees_creation['info_systeme'] = {
+                'os': f"{info_systeme_data.get('os_nom', '')} {info_systeme_data.get('os_version', '')}",
+                'cpu': info_systeme_data.get('cpu_nom', ''),
+                'ram_gb': round(info_systeme_data.get('ram_totale', 0) / (1024**3), 2) if info_systeme_data.get('ram_totale') else 0,
+                'stockage_gb': round(info_systeme_data.get('stockage_total', 0) / (1024**3), 2) if info_systeme_data.get('stockage_total') else 0
             }
-            
-            # Créer les informations système
-            interfaces_creees = []
-            logiciels_crees = []
-            
-            if info_systeme_data:
-                info_systeme = InformationSysteme.objects.create(machine=machine, **info_systeme_data)
-                print(f"✅ Informations système créées: {info_systeme.id}")
-                
-                # Ajouter les infos système aux données de log
-                donnees_creation['info_systeme'] = {
-                    'os': f"{info_systeme_data.get('os_nom', '')} {info_systeme_data.get('os_version', '')}",
-                    'cpu': info_systeme_data.get('cpu_nom', ''),
-                    'ram_gb': round(info_systeme_data.get('ram_totale', 0) / (1024**3), 2) if info_systeme_data.get('ram_totale') else 0,
-                    'stockage_gb': round(info_systeme_data.get('stockage_total', 0) / (1024**3), 2) if info_systeme_data.get('stockage_total') else 0
-                }
-            
-            # Créer les interfaces réseau avec gestion des noms dupliqués
-            interface_names_count = {}
-            for interface_data in interfaces_data:
-                nom_original = interface_data['nom']
-                
-                # Gérer les noms dupliqués en ajoutant un suffixe
-                if nom_original in interface_names_count:
-                    interface_names_count[nom_original] += 1
-                    interface_data['nom'] = f"{nom_original} ({interface_names_count[nom_original]})"
-                else:
-                    interface_names_count[nom_original] = 0
-                
-                interface = InterfaceReseau.objects.create(machine=machine, **interface_data)
-                print(f"✅ Interface réseau créée: {interface.nom}")
-                
-                interfaces_creees.append({
-                    'nom': interface.nom,
-                    'type': interface.type_interface,
-                    'ip': interface.adresse_ip
-                })
-            
-            # Créer les logiciels
-            print(f"🔍 Nombre de logiciels à créer: {len(logiciels_data)}")
-            if logiciels_data:
-                print(f"🔍 Premier logiciel: {logiciels_data[0] if logiciels_data else 'Aucun'}")
-            
-            for i, logiciel_data in enumerate(logiciels_data):
-                try:
-                    print(f"🔍 Création logiciel {i+1}/{len(logiciels_data)}: {logiciel_data.get('nom', 'Nom manquant')}")
-                    logiciel = LogicielInstalle.objects.create(machine=machine, **logiciel_data)
-                    print(f"✅ Logiciel créé en base: ID={logiciel.id}, Nom={logiciel.nom}, Version={logiciel.version}")
-                    
-                    logiciels_crees.append({
-                        'nom': logiciel.nom,
-                        'version': logiciel.version,
-                        'editeur': logiciel.editeur
-                    })
-                except Exception as e:
-                    print(f"❌ Erreur création logiciel {logiciel_data.get('nom', 'Inconnu')}: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
-            
-            # Ajouter les interfaces et logiciels aux données de log
-            donnees_creation['interfaces_reseau'] = interfaces_creees
-            donnees_creation['logiciels'] = logiciels_crees
-            donnees_creation['nb_interfaces'] = len(interfaces_creees)
-            donnees_creation['nb_logiciels'] = len(logiciels_crees)
-            
-            # Créer l'historique détaillé
-            from .models import HistoriqueMachine
-            HistoriqueMachine.objects.create(
-                machine=machine,
-                type_modification='creation',
-                description=f'Machine créée automatiquement depuis l\'application desktop - '
-                           f'OS: {donnees_creation.get("info_systeme", {}).get("os", "N/A")}, '
-                           f'RAM: {donnees_creation.get("info_systeme", {}).get("ram_gb", 0)}GB, '
-                           f'{donnees_creation.get("nb_interfaces", 0)} interface(s), '
-                           f'{donnees_creation.get("nb_logiciels", 0)} logiciel(s)',
-                utilisateur=user,
-                donnees_apres=donnees_creation
-            )
-            
-            print(f"📝 Historique créé avec {len(interfaces_creees)} interfaces et {len(logiciels_crees)} logiciels")
-            
-            return machine
-            
-        except Exception as e:
-            print(f"❌ Erreur lors de la création de la machine: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            raise
+        
+        # Interfaces réseau, avec un suffixe pour les noms dupliqués
+        interfaces = []
+        interface_names_count = {}
+        for interface_data in interfaces_data:
+            nom_original = interface_data['nom']
+            if nom_original in interface_names_count:
+                interface_names_count[nom_original] += 1
+                interface_data['nom'] = f"{nom_original} ({interface_names_count[nom_original]})"
+            else:
+                interface_names_count[nom_original] = 0
+            interfaces.append(InterfaceReseau(machine=machine, **interface_data))
+        InterfaceReseau.objects.bulk_create(interfaces)
+        
+        # Logiciels, un seul par (nom, version) comme lors des mises à jour
+        logiciels = {}
+        for logiciel_data in logiciels_data:
+            cle = (logiciel_data['nom'], logiciel_data.get('version', ''))
+            if cle not in logiciels:
+                # Taille inconnue (0 envoyé par l'agent) : None, comme lors des mises à jour
+                logiciel_data['taille'] = logiciel_data.get('taille') or None
+                logiciels[cle] = LogicielInstalle(machine=machine, **logiciel_data)
+        LogicielInstalle.objects.bulk_create(logiciels.values(), batch_size=500)
+        
+        donnees_creation['interfaces_reseau'] = [
+            {'nom': interface.nom, 'type': interface.type_interface, 'ip': interface.adresse_ip}
+            for interface in interfaces
+        ]
+        donnees_creation['logiciels'] = [
+            {'nom': logiciel.nom, 'version': logiciel.version, 'editeur': logiciel.editeur}
+            for logiciel in logiciels.values()
+        ]
+        donnees_creation['nb_interfaces'] = len(interfaces)
+        donnees_creation['nb_logiciels'] = len(logiciels)
+        
+        # Créer l'historique détaillé
+        HistoriqueMachine.objects.create(
+            machine=machine,
+            type_modification='creation',
+            description=f'Machine créée automatiquement depuis l\'application desktop - '
+                       f'OS: {donnees_creation.get("info_systeme", {}).get("os", "N/A")}, '
+                       f'RAM: {donnees_creation.get("info_systeme", {}).get("ram_gb", 0)}GB, '
+                       f'{donnees_creation["nb_interfaces"]} interface(s), '
+                       f'{donnees_creation["nb_logiciels"]} logiciel(s)',
+            utilisateur=user,
+            donnees_apres=donnees_creation
+        )
+        
+        completer_resume(nb_interfaces=len(interfaces), nb_logiciels=len(logiciels))
+        
+        # La liste des logiciels de l'utilisateur a changé
+        invalider_politique([machine.utilisateur_id])
+        
+        return machine
     
+    @transaction.atomic
     def update(self, instance, validated_data):
-        """Mettre à jour une machine et ses informations"""
-        print(f"🔍 Données reçues dans update: {list(validated_data.keys())}")
+        """Mettre à jour une machine et ses informations (en une seule transaction)"""
         info_systeme_data = validated_data.pop('info_systeme', None)
-        interfaces_data = validated_data.pop('interfaces_reseau', [])
-        logiciels_data = validated_data.pop('logiciels', [])
-        print(f"🔍 Logiciels extraits pour mise à jour: {len(logiciels_data)} logiciels")
+        # Une section absente (mise à jour partielle) n'est pas modifiée
+        interfaces_data = validated_data.pop('interfaces_reseau', None)
+        logiciels_data = validated_data.pop('logiciels', None)
         
         # Gérer les champs UNIQUE - convertir les chaînes vides en None pour éviter les violations de contrainte
         if 'numero_serie' in validated_data and not validated_data['numero_serie']:
@@ -289,9 +326,6 @@ class MachineCreateUpdateSerializer(serializers.ModelSerializer):
         }
         
         # Mettre à jour les informations système
-        interfaces_creees = []
-        logiciels_crees = []
-        
         if info_systeme_data:
             info_systeme, created = InformationSysteme.objects.get_or_create(
                 machine=instance,
@@ -309,83 +343,26 @@ class MachineCreateUpdateSerializer(serializers.ModelSerializer):
                 'ram_gb': round(info_systeme_data.get('ram_totale', 0) / (1024**3), 2) if info_systeme_data.get('ram_totale') else 0,
                 'stockage_gb': round(info_systeme_data.get('stockage_total', 0) / (1024**3), 2) if info_systeme_data.get('stockage_total') else 0
             }
-            
-            print(f"✅ Informations système mises à jour pour {instance.nom}")
         
-        # Mettre à jour les interfaces réseau (remplacer toutes)
-        instance.interfaces_reseau.all().delete()
-        interface_names_count = {}
-        for interface_data in interfaces_data:
-            nom_original = interface_data['nom']
-            
-            # Gérer les noms dupliqués en ajoutant un suffixe
-            if nom_original in interface_names_count:
-                interface_names_count[nom_original] += 1
-                interface_data['nom'] = f"{nom_original} ({interface_names_count[nom_original]})"
-            else:
-                interface_names_count[nom_original] = 0
-            
-            interface = InterfaceReseau.objects.create(machine=instance, **interface_data)
-            interfaces_creees.append({
-                'nom': interface.nom,
-                'type': interface.type_interface,
-                'ip': interface.adresse_ip
-            })
-        
-        # Mettre à jour les logiciels (remplacer tous)
-        nb_logiciels_avant = instance.logiciels.count()
-        print(f"🔍 Suppression de {nb_logiciels_avant} logiciels existants pour {instance.nom}")
-        instance.logiciels.all().delete()
-        
-        print(f"🔍 Nombre de nouveaux logiciels à créer: {len(logiciels_data)}")
-        for i, logiciel_data in enumerate(logiciels_data):
-            try:
-                # Nettoyer et valider les données avant création
-                logiciel_clean = {
-                    'nom': str(logiciel_data.get('nom', 'Logiciel inconnu'))[:200],  # Limiter à 200 caractères
-                    'version': str(logiciel_data.get('version', ''))[:100],  # Limiter à 100 caractères
-                    'editeur': str(logiciel_data.get('editeur', ''))[:100],  # Limiter à 100 caractères
-                }
-
-                # Ajouter les champs optionnels s'ils existent
-                if logiciel_data.get('date_installation'):
-                    logiciel_clean['date_installation'] = logiciel_data['date_installation']
-                if logiciel_data.get('taille'):
-                    logiciel_clean['taille'] = logiciel_data['taille']
-
-                print(f"🔍 Création logiciel {i+1}/{len(logiciels_data)}: {logiciel_clean['nom']}")
-                logiciel, created = LogicielInstalle.objects.get_or_create(
-                    machine=instance,
-                    nom=logiciel_clean['nom'],
-                    version=logiciel_clean['version'],
-                    defaults=logiciel_clean
-                )
-                if created:
-                    print(f"✅ Logiciel créé en base: ID={logiciel.id}, Nom={logiciel.nom}")
-                else:
-                    # Mettre à jour les autres champs si le logiciel existe déjà
-                    for field, value in logiciel_clean.items():
-                        if field not in ['nom', 'version']:  # Ne pas modifier les champs de la contrainte unique
-                            setattr(logiciel, field, value)
-                    logiciel.save()
-                    print(f"✅ Logiciel mis à jour en base: ID={logiciel.id}, Nom={logiciel.nom}")
-                
-                logiciels_crees.append({
-                    'nom': logiciel.nom,
-                    'version': logiciel.version,
-                    'editeur': logiciel.editeur
-                })
-            except Exception as e:
-                print(f"❌ Erreur mise à jour logiciel {logiciel_data.get('nom', 'Inconnu')}: {str(e)}")
-                print(f"🔍 Données du logiciel problématique: {logiciel_data}")
-                import traceback
-                traceback.print_exc()
-        
-        # Ajouter les interfaces et logiciels aux données de log
-        donnees_apres['interfaces_reseau'] = interfaces_creees
-        donnees_apres['logiciels'] = logiciels_crees
-        donnees_apres['nb_interfaces'] = len(interfaces_creees)
-        donnees_apres['nb_logiciels'] = len(logiciels_crees)
+        # Mettre à jour les interfaces réseau et les logiciels par différence avec l'existant
+        if interfaces_data is not None:
+            interfaces_creees = self._synchroniser_interfaces(instance, interfaces_data)
+            donnees_apres['interfaces_reseau'] = interfaces_creees
+            donnees_apres['nb_interfaces'] = len(interfaces_creees)
+        
+        diff_logiciels = {'ajoutes': [], 'supprimes': [], 'nb_modifies': 0}
+        if logiciels_data is not None:
+            diff_logiciels = self._synchroniser_logiciels(instance, logiciels_data)
+            completer_resume(
+                logiciels_ajoutes=len(diff_logiciels['ajoutes']),
+                logiciels_supprimes=len(diff_logiciels['supprimes']),
+                logiciels_modifies=diff_logiciels['nb_modifies'],
+                nb_logiciels=diff_logiciels['nb_logiciels']
+            )
+            donnees_apres['logiciels_ajoutes'] = diff_logiciels['ajoutes']
+            donnees_apres['logiciels_supprimes'] = diff_logiciels['supprimes']
+            donnees_apres['nb_logiciels_modifies'] = diff_logiciels['nb_modifies']
+            donnees_apres['nb_logiciels'] = diff_logiciels['nb_logiciels']
         
         # Créer l'historique détaillé de la mise à jour
         from .models import HistoriqueMachine
@@ -395,18 +372,131 @@ class MachineCreateUpdateSerializer(serializers.ModelSerializer):
             description=f'Machine mise à jour depuis l\'application desktop - '
                        f'OS: {donnees_apres.get("info_systeme", {}).get("os", "N/A")}, '
                        f'RAM: {donnees_apres.get("info_systeme", {}).get("ram_gb", 0)}GB, '
-                       f'{donnees_apres.get("nb_interfaces", 0)} interface(s) '
+                       f'{donnees_apres.get("nb_interfaces", donnees_avant.get("nb_interfaces_avant", 0))} interface(s) '
                        f'(avant: {donnees_avant.get("nb_interfaces_avant", 0)}), '
-                       f'{donnees_apres.get("nb_logiciels", 0)} logiciel(s) '
+                       f'{donnees_apres.get("nb_logiciels", donnees_avant.get("nb_logiciels_avant", 0))} logiciel(s) '
                        f'(avant: {donnees_avant.get("nb_logiciels_avant", 0)})',
             utilisateur=user,
             donnees_avant=donnees_avant,
             donnees_apres=donnees_apres
         )
         
-        print(f"📝 Historique de mise à jour créé pour {instance.nom} avec {len(interfaces_creees)} interfaces et {len(logiciels_crees)} logiciels")
+        # La liste des logiciels de l'utilisateur a changé
+        if diff_logiciels['ajoutes'] or diff_logiciels['supprimes']:
+            invalider_politique([instance.utilisateur_id])
         
         return instance
+    
+    def _synchroniser_interfaces(self, instance, interfaces_data):
+        """Mettre à jour les interfaces réseau par différence sur leur nom"""
+        # Gérer les noms dupliqués en ajoutant un suffixe
+        interfaces_recues = {}
+        interface_names_count = {}
+        for interface_data in interfaces_data:
+            nom_original = interface_data['nom']
+            if nom_original in interface_names_count:
+                interface_names_count[nom_original] += 1
+                interface_data['nom'] = f"{nom_original} ({interface_names_count[nom_original]})"
+            else:
+                interface_names_count[nom_original] = 0
+            interfaces_recues[interface_data['nom']] = interface_data
+        
+        existantes = {interface.nom: interface for interface in instance.interfaces_reseau.all()}
+        
+        a_supprimer = [interface.pk for nom, interface in existantes.items() if nom not in interfaces_recues]
+        if a_supprimer:
+            InterfaceReseau.objects.filter(pk__in=a_supprimer).delete()
+        
+        a_creer = []
+        a_modifier = []
+        champs_modifies = set()
+        for nom, interface_data in interfaces_recues.items():
+            interface = existantes.get(nom)
+            if interface is None:
+                a_creer.append(InterfaceReseau(machine=instance, **interface_data))
+                continue
+            for champ, valeur in interface_data.items():
+                if getattr(interface, champ) != valeur:
+                    setattr(interface, champ, valeur)
+                    champs_modifies.add(champ)
+                    if not a_modifier or a_modifier[-1] is not interface:
+                        a_modifier.append(interface)
+        
+        if a_creer:
+            InterfaceReseau.objects.bulk_create(a_creer)
+        if a_modifier:
+            maintenant = timezone.now()
+            for interface in a_modifier:
+                interface.date_derniere_maj = maintenant
+            InterfaceReseau.objects.bulk_update(a_modifier, list(champs_modifies) + ['date_derniere_maj'])
+        
+        return [
+            {'nom': data['nom'], 'type': data.get('type_interface'), 'ip': data.get('adresse_ip')}
+            for data in interfaces_recues.values()
+        ]
+    
+    def _synchroniser_logiciels(self, instance, logiciels_data):
+        """
+        Mettre à jour les logiciels installés par différence sur (nom, version)
+        
+        Les nouveaux logiciels sont insérés en masse, les disparus supprimés en une
+        requête et seuls les logiciels dont un champ a changé sont réécrits. Les
+        lignes conservées gardent leur date_detection et leur logiciel_reference.
+        """
+        champs_comparables = ('editeur', 'date_installation', 'taille')
+        
+        # Nettoyer les données reçues et éliminer les doublons (nom, version)
+        logiciels_recus = {}
+        for logiciel_data in logiciels_data:
+            logiciel_clean = {
+                'nom': str(logiciel_data.get('nom', 'Logiciel inconnu'))[:200],  # Limiter à 200 caractères
+                'version': str(logiciel_data.get('version', ''))[:100],  # Limiter à 100 caractères
+                'editeur': str(logiciel_data.get('editeur', ''))[:100],  # Limiter à 100 caractères
+                'date_installation': logiciel_data.get('date_installation') or None,
+                'taille': logiciel_data.get('taille') or None,
+            }
+            logiciels_recus.setdefault((logiciel_clean['nom'], logiciel_clean['version']), logiciel_clean)
+        
+        existants = {
+            (logiciel.nom, logiciel.version): logiciel
+            for logiciel in instance.logiciels.only('id', 'machine', 'nom', 'version', *champs_comparables)
+        }
+        
+        supprimes = [cle for cle in existants if cle not in logiciels_recus]
+        if supprimes:
+            LogicielInstalle.objects.filter(pk__in=[existants[cle].pk for cle in supprimes]).delete()
+        
+        a_creer = []
+        a_modifier = []
+        for cle, logiciel_clean in logiciels_recus.items():
+            logiciel = existants.get(cle)
+            if logiciel is None:
+                a_creer.append(LogicielInstalle(machine=instance, **logiciel_clean))
+                continue
+            modifie = False
+            for champ in champs_comparables:
+                if getattr(logiciel, champ) != logiciel_clean[champ]:
+                    setattr(logiciel, champ, logiciel_clean[champ])
+                    modifie = True
+            if modifie:
+                a_modifier.append(logiciel)
+        
+        if a_creer:
+            LogicielInstalle.objects.bulk_create(a_creer, batch_size=500)
+        if a_modifier:
+            maintenant = timezone.now()
+            for logiciel in a_modifier:
+                logiciel.date_derniere_maj = maintenant
+            LogicielInstalle.objects.bulk_update(
+                a_modifier, list(champs_comparables) + ['date_derniere_maj'], batch_size=500
+            )
+        
+        return {
+            'ajoutes': [{'nom': l.nom, 'version': l.version} for l in a_creer],
+            'supprimes': [{'nom': nom, 'version': version} for nom, version in supprimes],
+            'nb_modifies': len(a_modifier),
+            'nb_logiciels': len(logiciels_recus),
+        }
 
 
 class HistoriqueMachineSerializer(serializers.ModelSerializer):
@@ -9,9 +9,10 @@ from .views_admin import (
 )
 
 router = DefaultRouter()
-router.register(r'', MachineViewSet, basename='machine')
 router.register(r'types', TypeMachineViewSet, basename='type-machine')
 router.register(r'historique', HistoriqueMachineViewSet, basename='historique')
+# Enregistré en dernier : sa route de détail capturerait les préfixes ci-dessus
+router.register(r'', MachineViewSet, basename='machine')
 
 urlpatterns = [
     path('', include(router.urls)),
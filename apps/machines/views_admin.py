@@ -14,6 +14,7 @@ from .models import (
     LogicielReference, AutorisationLogiciel, CategorieLogiciel,
     LogicielInstalle
 )
+from .autorisations import evaluer_autorisations
 from apps.users.models import Structure, Site, Groupe
 
 User = get_user_model()
@@ -171,9 +172,7 @@ def creer_blocages(logiciels, cible_type, cibles_ids, user, motif):
                 count += 1
     
     # Forcer la vérification des autorisations pour les logiciels installés
-    logiciels_installes = LogicielInstalle.objects.filter(logiciel_reference__in=logiciels)
-    for logiciel_installe in logiciels_installes:
-        logiciel_installe.verifier_autorisation()
+    evaluer_autorisations(LogicielInstalle.objects.filter(logiciel_reference__in=logiciels))
     
     return count
 
@@ -264,9 +263,7 @@ def creer_autorisations(logiciels, cible_type, cibles_ids, user, motif):
                 count += 1
     
     # Forcer la vérification des autorisations pour les logiciels installés
-    logiciels_installes = LogicielInstalle.objects.filter(logiciel_reference__in=logiciels)
-    for logiciel_installe in logiciels_installes:
-        logiciel_installe.verifier_autorisation()
+    evaluer_autorisations(LogicielInstalle.objects.filter(logiciel_reference__in=logiciels))
     
     return count
 
@@ -281,9 +278,7 @@ def interdire_logiciels(logiciels, user):
             count += 1
     
     # Forcer la vérification des autorisations pour les logiciels installés
-    logiciels_installes = LogicielInstalle.objects.filter(logiciel_reference__in=logiciels)
-    for logiciel_installe in logiciels_installes:
-        logiciel_installe.verifier_autorisation()
+    evaluer_autorisations(LogicielInstalle.objects.filter(logiciel_reference__in=logiciels))
     
     return count
 
@@ -0,0 +1,304 @@
+"""
+Agrégation et rétention des métriques de performance
+
+Les échantillons bruts (`MetriquePerformance`) sont résumés en trois niveaux
+d'`AgregatMetrique` : 1 minute, 1 heure et 1 jour (intervalles UTC). Chaque
+niveau est calculé directement depuis les échantillons bruts, pour que le 95e
+centile soit exact et pas un centile de centiles.
+
+`agreger_metriques()` est incrémentale et reprenable : pour chaque niveau, la
+fin du dernier intervalle traité est conservée dans `EtatAgregation` et les
+intervalles sont clos `RETARD_MAX` après leur fin. Un échantillon reçu plus
+tard (agent resté hors ligne) marque son niveau (`marquer_echantillons_tardifs`) :
+le passage suivant recalcule les intervalles depuis cet échantillon. Elle est lancée périodiquement par la commande
+`python manage.py agreger_metriques`, qui purge ensuite les données au-delà de
+leur durée de rétention (`MONITORING_RETENTION_*`).
+
+`serie_metriques()` sert les graphiques : elle choisit le niveau dont la
+granularité donne au plus `points_max` points sur la période demandée, si bien
+que le coût d'une requête dépend du nombre de points affichés et non du nombre
+d'échantillons.
+"""
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min, Value
+from django.db.models.functions import Coalesce, Least
+from django.utils import timezone
+
+from .models import AgregatMetrique, EtatAgregation, MetriquePerformance
+
+# Durée des intervalles de chaque niveau, du plus fin au plus grossier
+NIVEAUX = {
+    '1m': timedelta(minutes=1),
+    '1h': timedelta(hours=1),
+    '1d': timedelta(days=1),
+}
+# Intervalle d'échantillonnage de l'agent, utilisé comme granularité des données brutes
+INTERVALLE_BRUT = timedelta(seconds=5)
+
+# Délai avant de clore un intervalle (échantillons reçus en retard)
+RETARD_MAX = timedelta(minutes=2)
+# Période traitée par transaction pour chaque niveau
+FENETRES = {
+    '1m': timedelta(hours=1),
+    '1h': timedelta(days=1),
+    '1d': timedelta(days=1),
+}
+# Échantillons antérieurs lus pour calculer le premier débit réseau d'une fenêtre
+RECUL_RESEAU = timedelta(minutes=5)
+
+# Paramètres de rétention (en jours) de chaque niveau
+PARAMETRES_RETENTION = {
+    'brut': 'MONITORING_RETENTION_BRUTES',
+    '1m': 'MONITORING_RETENTION_1M',
+    '1h': 'MONITORING_RETENTION_1H',
+    '1d': 'MONITORING_RETENTION_1D',
+}
+
+METRIQUES = ('cpu', 'memory', 'disk', 'network_sent', 'network_recv')
+STATISTIQUES = ('min', 'avg', 'max', 'p95')
+CHAMPS_AGREGAT = [f'{metrique}_{statistique}' for metrique in METRIQUES for statistique in STATISTIQUES]
+
+EPOQUE = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def debut_intervalle(date, duree):
+    """Début de l'intervalle (aligné sur l'époque Unix, en UTC) contenant `date`"""
+    secondes = duree.total_seconds()
+    return EPOQUE + timedelta(seconds=math.floor((date - EPOQUE).total_seconds() / secondes) * secondes)
+
+
+def resumer(valeurs):
+    """(min, moyenne, max, 95e centile par rang le plus proche) ; None si aucune valeur"""
+    if not valeurs:
+        return None, None, None, None
+    valeurs = sorted(valeurs)
+    rang = max(math.ceil(0.95 * len(valeurs)) - 1, 0)
+    return valeurs[0], sum(valeurs) / len(valeurs), valeurs[-1], valeurs[rang]
+
+
+def debit(precedent, courant, secondes):
+    """Débit en octets/s entre deux compteurs ; None si le compteur a été réinitialisé"""
+    if precedent is None or secondes <= 0 or courant < precedent:
+        return None
+    return (courant - precedent) / secondes
+
+
+def lire_echantillons(debut, fin, machine=None):
+    """
+    Échantillons de [debut, fin) avec leurs débits réseau, par machine puis par date
+
+    Génère (machine_id, timestamp, {métrique: valeur}). Les échantillons
+    précédant `debut` ne servent qu'au calcul du premier débit.
+    """
+    lignes = MetriquePerformance.objects.filter(timestamp__gte=debut - RECUL_RESEAU, timestamp__lt=fin)
+    if machine is not None:
+        lignes = lignes.filter(machine=machine)
+    lignes = lignes.order_by('machine_id', 'timestamp').values_list(
+        'machine_id', 'timestamp', 'cpu_percent', 'memory_percent', 'disk_percent',
+        'network_bytes_sent', 'network_bytes_recv'
+    )
+    precedent = None
+    for machine_id, date, cpu, memoire, disque, envoyes, recus in lignes.iterator(chunk_size=5000):
+        if precedent is not None and precedent[0] == machine_id:
+            secondes = (date - precedent[1]).total_seconds()
+            debit_envoi = debit(precedent[2], envoyes, secondes)
+            debit_reception = debit(precedent[3], recus, secondes)
+        else:
+            debit_envoi = debit_reception = None
+        precedent = (machine_id, date, envoyes, recus)
+        if date >= debut:
+            yield machine_id, date, {
+                'cpu': cpu,
+                'memory': memoire,
+                'disk': disque,
+                'network_sent': debit_envoi,
+                'network_recv': debit_reception,
+            }
+
+
+def construire_agregat(machine_id, niveau, debut, valeurs):
+    """Agrégat d'un intervalle à partir des valeurs par métrique"""
+    champs = {}
+    for metrique in METRIQUES:
+        resume = resumer([v for v in valeurs[metrique] if v is not None])
+        champs.update({f'{metrique}_{statistique}': r for statistique, r in zip(STATISTIQUES, resume)})
+    return AgregatMetrique(
+        machine_id=machine_id,
+        niveau=niveau,
+        debut=debut,
+        nb_echantillons=len(valeurs['cpu']),
+        **champs
+    )
+
+
+def calculer_agregats(niveau, debut, fin):
+    """Agrégats de tous les intervalles de [debut, fin) pour un niveau"""
+    duree = NIVEAUX[niveau]
+    agregats = []
+    cle_courante = None
+    valeurs = None
+    for machine_id, date, echantillon in lire_echantillons(debut, fin):
+        cle = (machine_id, debut_intervalle(date, duree))
+        if cle != cle_courante:
+            if cle_courante is not None:
+                agregats.append(construire_agregat(cle_courante[0], niveau, cle_courante[1], valeurs))
+            cle_courante = cle
+            valeurs = {metrique: [] for metrique in METRIQUES}
+        for metrique in METRIQUES:
+            valeurs[metrique].append(echantillon[metrique])
+    if cle_courante is not None:
+        agregats.append(construire_agregat(cle_courante[0], niveau, cle_courante[1], valeurs))
+    return agregats
+
+
+def marquer_echantillons_tardifs(date):
+    """
+    Signaler un échantillon de `date` reçu après l'agrégation de son intervalle
+
+    Pour chaque niveau déjà agrégé au-delà de `date`, `a_recalculer_depuis`
+    devient le plus ancien des échantillons tardifs. Appelée dans la
+    transaction d'ingestion.
+    """
+    EtatAgregation.objects.filter(jusqu_a__gt=date).update(
+        a_recalculer_depuis=Least(Coalesce('a_recalculer_depuis', Value(date)), Value(date))
+    )
+
+
+def agreger_niveau(niveau, maintenant=None):
+    """
+    Agréger les intervalles clos d'un niveau depuis le dernier passage
+
+    Chaque fenêtre est écrite dans sa propre transaction avec l'avancement de
+    `EtatAgregation` : une interruption reprend à la fenêtre suivante. Si des
+    échantillons tardifs ont été reçus, l'avancement recule d'abord jusqu'à
+    l'intervalle du plus ancien et les agrégats existants sont remplacés.
+    Retourne le nombre d'agrégats écrits.
+    """
+    duree = NIVEAUX[niveau]
+    maintenant = maintenant or timezone.now()
+    fin = debut_intervalle(maintenant - RETARD_MAX, duree)
+
+    EtatAgregation.objects.get_or_create(niveau=niveau)
+    with transaction.atomic():
+        etat = EtatAgregation.objects.select_for_update().get(niveau=niveau)
+        if etat.a_recalculer_depuis is not None:
+            if etat.jusqu_a is not None:
+                etat.jusqu_a = min(etat.jusqu_a, debut_intervalle(etat.a_recalculer_depuis, duree))
+            etat.a_recalculer_depuis = None
+            etat.save(update_fields=['jusqu_a', 'a_recalculer_depuis'])
+    debut = etat.jusqu_a
+    if debut is None:
+        premier = MetriquePerformance.objects.aggregate(premier=Min('timestamp'))['premier']
+        if premier is None:
+            return 0
+        debut = debut_intervalle(premier, duree)
+
+    total = 0
+    while debut < fin:
+        fin_fenetre = min(debut + max(FENETRES[niveau], duree), fin)
+        agregats = calculer_agregats(niveau, debut, fin_fenetre)
+        with transaction.atomic():
+            AgregatMetrique.objects.bulk_create(
+                agregats,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['machine', 'niveau', 'debut'],
+                update_fields=['nb_echantillons', *CHAMPS_AGREGAT],
+            )
+            EtatAgregation.objects.filter(niveau=niveau).update(jusqu_a=fin_fenetre)
+        total += len(agregats)
+        debut = fin_fenetre
+    return total
+
+
+def agreger_metriques(maintenant=None):
+    """Agréger tous les niveaux ; retourne {niveau: nombre d'agrégats écrits}"""
+    maintenant = maintenant or timezone.now()
+    return {niveau: agreger_niveau(niveau, maintenant) for niveau in NIVEAUX}
+
+
+def get_retention(niveau):
+    """Durée de rétention d'un niveau ('brut' pour les échantillons), None si illimitée"""
+    jours = getattr(settings, PARAMETRES_RETENTION[niveau], 0)
+    return timedelta(days=jours) if jours else None
+
+
+def purger_metriques(maintenant=None):
+    """
+    Supprimer les données plus anciennes que leur durée de rétention
+
+    Les échantillons bruts ne sont jamais supprimés avant d'avoir été agrégés
+    dans tous les niveaux, ni s'ils attendent d'être réagrégés. Retourne {niveau: nombre de lignes supprimées}.
+    """
+    maintenant = maintenant or timezone.now()
+    supprimes = {}
+
+    retention = get_retention('brut')
+    if retention is not None:
+        limite = maintenant - retention
+        etats = {niveau: (jusqu_a, a_recalculer) for niveau, jusqu_a, a_recalculer
+                 in EtatAgregation.objects.values_list('niveau', 'jusqu_a', 'a_recalculer_depuis')}
+        for niveau in NIVEAUX:
+            jusqu_a, a_recalculer = etats.get(niveau, (None, None))
+            limite = min(limite, jusqu_a or EPOQUE, a_recalculer or limite)
+        supprimes['brut'] = MetriquePerformance.objects.filter(timestamp__lt=limite).delete()[0]
+
+    for niveau in NIVEAUX:
+        retention = get_retention(niveau)
+        if retention is not None:
+            supprimes[niveau] = AgregatMetrique.objects.filter(
+                niveau=niveau, debut__lt=maintenant - retention
+            ).delete()[0]
+    return supprimes
+
+
+def choisir_niveau(debut, fin, points_max, maintenant=None):
+    """
+    Niveau le plus fin donnant au plus `points_max` points sur [debut, fin)
+
+    Un niveau dont la rétention ne couvre pas `debut` est écarté ; à défaut,
+    le niveau le plus grossier est utilisé.
+    """
+    maintenant = maintenant or timezone.now()
+    etendue = fin - debut
+    for niveau, duree in (('brut', INTERVALLE_BRUT), *NIVEAUX.items()):
+        retention = get_retention(niveau)
+        if retention is not None and debut < maintenant - retention:
+            continue
+        if etendue / duree <= points_max:
+            return niveau
+    return list(NIVEAUX)[-1]
+
+
+def serie_metriques(machine, debut, fin, points_max=300):
+    """
+    Série de points pour un graphique : {'niveau': ..., 'points': [...]}
+
+    Chaque point a un début (`t`), un nombre d'échantillons et, par métrique,
+    min/avg/max/p95 (identiques pour un échantillon brut).
+    """
+    niveau = choisir_niveau(debut, fin, points_max)
+    points = []
+    if niveau == 'brut':
+        for _, date, echantillon in lire_echantillons(debut, fin, machine):
+            point = {'t': date.isoformat(), 'nb': 1}
+            for metrique in METRIQUES:
+                valeur = echantillon[metrique]
+                point[metrique] = dict.fromkeys(STATISTIQUES, valeur) if valeur is not None else None
+            points.append(point)
+    else:
+        agregats = AgregatMetrique.objects.filter(
+            machine=machine, niveau=niveau, debut__gte=debut_intervalle(debut, NIVEAUX[niveau]), debut__lt=fin
+        ).order_by('debut').values('debut', 'nb_echantillons', *CHAMPS_AGREGAT)
+        for agregat in agregats:
+            point = {'t': agregat['debut'].isoformat(), 'nb': agregat['nb_echantillons']}
+            for metrique in METRIQUES:
+                valeurs = {statistique: agregat[f'{metrique}_{statistique}'] for statistique in STATISTIQUES}
+                point[metrique] = valeurs if valeurs['avg'] is not None else None
+            points.append(point)
+    return {'niveau': niveau, 'points': points}
+
@@ -0,0 +1,258 @@
+"""
+Évaluation des seuils d'alerte à l'ingestion des métriques
+
+Chaque lot d'échantillons reçu par `ingerer_metriques` est comparé aux seuils
+actifs (`SeuillAlerte`) de la structure de la machine :
+
+- les seuils sont gardés en mémoire, indexés par structure puis par métrique,
+  et rechargés quand un seuil est créé, modifié ou supprimé (compteur de
+  version en cache, incrémenté par un signal) ;
+- un changement de niveau n'est retenu qu'après `ECHANTILLONS_DECLENCHEMENT`
+  échantillons consécutifs (anti-rebond), et un niveau n'est quitté qu'une fois
+  la valeur repassée `HYSTERESIS` points sous son seuil : une valeur qui oscille
+  autour d'un seuil ne crée pas d'alerte à chaque passage ;
+- une seule alerte est ouverte par (machine, métrique) : elle est créée ou mise
+  à jour en un `INSERT ... ON CONFLICT` sur `cle_deduplication`, sans lecture
+  préalable, puis résolue par un `UPDATE` quand la valeur revient à la normale.
+
+L'état de chaque (machine, métrique) est conservé par processus et initialisé
+depuis les alertes ouvertes au premier lot d'une machine. Il est relu quand les
+alertes de la machine changent ailleurs (résolution manuelle, autre processus) :
+un compteur de version par machine, en cache, est incrémenté à chaque écriture.
+Seules les métriques en pourcentage (CPU, mémoire, disque) sont évaluées ici.
+"""
+import threading
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AlerteSysteme, SeuillAlerte
+
+# Champ de `MetriquePerformance` évalué pour chaque métrique de seuil
+CHAMPS_METRIQUES = {
+    'cpu': 'cpu_percent',
+    'memory': 'memory_percent',
+    'disk': 'disk_percent',
+}
+# Niveaux d'alerte, du moins au plus grave (None : normal)
+RANGS = {None: 0, 'warning': 1, 'critical': 2}
+
+# Échantillons consécutifs nécessaires pour changer de niveau
+ECHANTILLONS_DECLENCHEMENT = 3
+ECHANTILLONS_RETABLISSEMENT = 3
+# Écart (en points de pourcentage) sous un seuil pour quitter son niveau
+HYSTERESIS = 5.0
+
+CLE_VERSION = 'monitoring:seuils:version'
+CLE_VERSION_ALERTES = 'monitoring:alertes:{}:version'
+
+
+def _get_version(cle=CLE_VERSION):
+    """Lire un compteur de version (seuils par défaut) en l'initialisant si nécessaire"""
+    version = cache.get(cle)
+    if version is None:
+        cache.add(cle, 1, timeout=None)
+        version = cache.get(cle, 1)
+    return version
+
+
+def _incrementer(cle):
+    try:
+        cache.incr(cle)
+    except ValueError:
+        cache.set(cle, 2, timeout=None)
+
+
+def invalider_seuils():
+    """Forcer le rechargement de la table des seuils dans tous les processus"""
+    _incrementer(CLE_VERSION)
+
+
+def invalider_alertes(machine_id):
+    """Forcer la relecture des états d'alerte d'une machine dans tous les processus"""
+    _incrementer(CLE_VERSION_ALERTES.format(machine_id))
+
+
+def niveau_cible(valeur, seuil, niveau_actuel):
+    """Niveau correspondant à une valeur, avec hystérésis à la descente"""
+    if valeur >= seuil.seuil_critical:
+        return 'critical'
+    if niveau_actuel == 'critical' and valeur > seuil.seuil_critical - HYSTERESIS:
+        return 'critical'
+    if valeur >= seuil.seuil_warning:
+        return 'warning'
+    if niveau_actuel is not None and valeur > seuil.seuil_warning - HYSTERESIS:
+        return 'warning'
+    return None
+
+
+class EtatMetrique:
+    """Niveau retenu et changement en attente pour une (machine, métrique)"""
+    __slots__ = ('niveau', 'candidat', 'compteur')
+
+    def __init__(self, niveau=None):
+        self.niveau = niveau
+        self.candidat = None
+        self.compteur = 0
+
+    def observer(self, cible):
+        """Prendre en compte le niveau d'un échantillon ; True si le niveau retenu change"""
+        if cible == self.niveau:
+            self.candidat = None
+            self.compteur = 0
+            return False
+        if cible == self.candidat:
+            self.compteur += 1
+        else:
+            self.candidat = cible
+            self.compteur = 1
+        requis = (ECHANTILLONS_DECLENCHEMENT if RANGS[cible] > RANGS[self.niveau]
+                  else ECHANTILLONS_RETABLISSEMENT)
+        if self.compteur < requis:
+            return False
+        self.niveau = cible
+        self.candidat = None
+        self.compteur = 0
+        return True
+
+
+class MoteurSeuils:
+    """Table des seuils et états d'alerte d'un processus"""
+
+    def __init__(self):
+        self.verrou = threading.Lock()
+        self.version = None
+        self.seuils = {}
+        self.etats = {}
+        self.versions_etats = {}
+        self.derniers_timestamps = {}
+
+    def get_seuils(self, structure_id):
+        """{métrique: SeuillAlerte} actifs d'une structure, table rechargée si elle a changé"""
+        version = _get_version()
+        if version != self.version:
+            seuils = {}
+            for seuil in SeuillAlerte.objects.filter(actif=True, metrique__in=CHAMPS_METRIQUES):
+                seuils.setdefault(seuil.structure_id, {})[seuil.metrique] = seuil
+            self.seuils = seuils
+            self.version = version
+        return self.seuils.get(structure_id, {})
+
+    def get_etats(self, machine_id):
+        """États des métriques d'une machine, (re)lus depuis ses alertes ouvertes si elles ont changé"""
+        version = _get_version(CLE_VERSION_ALERTES.format(machine_id))
+        etats = self.etats.get(machine_id)
+        if etats is None or self.versions_etats.get(machine_id) != version:
+            etats = {metrique: EtatMetrique() for metrique in CHAMPS_METRIQUES}
+            ouvertes = AlerteSysteme.objects.filter(
+                machine_id=machine_id, cle_deduplication__isnull=False
+            ).values_list('metrique', 'niveau')
+            for metrique, niveau in ouvertes:
+                if metrique in etats and niveau in RANGS:
+                    etats[metrique].niveau = niveau
+            self.etats[machine_id] = etats
+            self.versions_etats[machine_id] = version
+        return etats
+
+    def evaluer(self, machine, metriques):
+        """
+        Évaluer un lot d'échantillons d'une machine et écrire les alertes
+
+        Les échantillons déjà évalués (lot renvoyé par l'agent) sont ignorés.
+        Retourne {métrique: nouveau niveau} pour les niveaux qui ont changé.
+        """
+        if not metriques:
+            return {}
+        with self.verrou:
+            seuils = self.get_seuils(machine.structure_id)
+            if not seuils:
+                return {}
+            etats = self.get_etats(machine.pk)
+            initiaux = {metrique: etat.niveau for metrique, etat in etats.items()}
+            declencheurs = {}
+
+            dernier = self.derniers_timestamps.get(machine.pk)
+            for metrique_performance in sorted(metriques, key=lambda m: m.timestamp):
+                if dernier is not None and metrique_performance.timestamp <= dernier:
+                    continue
+                dernier = metrique_performance.timestamp
+                for metrique, seuil in seuils.items():
+                    valeur = getattr(metrique_performance, CHAMPS_METRIQUES[metrique])
+                    etat = etats[metrique]
+                    if etat.observer(niveau_cible(valeur, seuil, etat.niveau)):
+                        declencheurs[metrique] = valeur
+            if dernier is not None:
+                self.derniers_timestamps[machine.pk] = dernier
+
+            changements = {
+                metrique: etats[metrique].niveau
+                for metrique in declencheurs if etats[metrique].niveau != initiaux[metrique]
+            }
+        if changements:
+            ecrire_alertes(machine, changements, declencheurs, seuils)
+        return changements
+
+    def reinitialiser(self):
+        """Oublier la table et les états (tests)"""
+        with self.verrou:
+            self.version = None
+            self.seuils = {}
+            self.etats = {}
+            self.versions_etats = {}
+            self.derniers_timestamps = {}
+
+
+def cle_deduplication(machine_id, metrique):
+    return f'{machine_id}:{metrique}'
+
+
+def ecrire_alertes(machine, changements, valeurs, seuils):
+    """Ouvrir ou mettre à jour (une requête) puis résoudre (une requête) les alertes d'une machine"""
+    maintenant = timezone.now()
+    ouvertes = []
+    resolues = []
+    for metrique, niveau in changements.items():
+        if niveau is None:
+            resolues.append(cle_deduplication(machine.pk, metrique))
+            continue
+        seuil = seuils[metrique]
+        valeur_seuil = seuil.seuil_critical if niveau == 'critical' else seuil.seuil_warning
+        libelle = dict(SeuillAlerte.METRIQUE_CHOICES)[metrique]
+        ouvertes.append(AlerteSysteme(
+            machine=machine,
+            metrique=metrique,
+            cle_deduplication=cle_deduplication(machine.pk, metrique),
+            niveau=niveau,
+            type_alerte=metrique,
+            titre=f"{seuil.nom} : {libelle} {'critique' if niveau == 'critical' else 'élevé'}",
+            description=f"{libelle} à {valeurs[metrique]:.1f} % sur {machine.nom} (seuil {valeur_seuil:.1f} %)",
+            valeur_seuil=valeur_seuil,
+            valeur_actuelle=valeurs[metrique],
+        ))
+
+    with transaction.atomic():
+        if ouvertes:
+            AlerteSysteme.objects.bulk_create(
+                ouvertes,
+                update_conflicts=True,
+                unique_fields=['cle_deduplication'],
+                update_fields=['niveau', 'titre', 'description', 'valeur_seuil',
+                               'valeur_actuelle', 'date_modification'],
+            )
+        if resolues:
+            AlerteSysteme.objects.filter(cle_deduplication__in=resolues).update(
+                resolu=True,
+                date_resolution=maintenant,
+                cle_deduplication=None,
+                date_modification=maintenant,
+            )
+    invalider_alertes(machine.pk)
+
+
+moteur = MoteurSeuils()
+
+
+def evaluer_seuils(machine, metriques):
+    """Évaluer un lot d'échantillons avec le moteur du processus"""
+    return moteur.evaluer(machine, metriques)
@@ -0,0 +1,164 @@
+"""
+Ingestion par lots des métriques de performance envoyées par les agents
+
+L'agent accumule ses échantillons psutil et les envoie par lots, compressés
+(`Content-Encoding: gzip`), à `POST /api/v1/monitoring/metriques/ingestion/` :
+
+    {"machine": "<uuid>", "echantillons": [
+        {"timestamp": 1700000000.0, "cpu_percent": 12.5, "memory_percent": 40.1,
+         "disk_percent": 71.0, "network_bytes_sent": 123, ...},
+        ...
+    ]}
+
+Les échantillons sont validés sans serializer DRF (trop coûteux par ligne) et
+écrits avec un seul `bulk_create` par lot, dans une transaction. Un échantillon
+déjà reçu (même machine, même timestamp) est ignoré : l'agent peut renvoyer un
+lot dont il n'a pas reçu l'accusé de réception.
+
+Un lot contenant des échantillons antérieurs à des intervalles déjà agrégés
+les signale pour réagrégation (`apps.monitoring.agregation`). Les échantillons
+acceptés sont ensuite comparés aux seuils d'alerte de la structure de la
+machine (`apps.monitoring.alertes`).
+"""
+import io
+import math
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .agregation import marquer_echantillons_tardifs
+from .alertes import evaluer_seuils
+from .models import MetriquePerformance
+
+# Champs obligatoires de chaque échantillon (pourcentages)
+CHAMPS_POURCENTAGE = ('cpu_percent', 'memory_percent', 'disk_percent')
+# Champs facultatifs (0 si absents)
+CHAMPS_ENTIERS = (
+    'cpu_count', 'memory_total', 'memory_used', 'disk_total', 'disk_used',
+    'network_bytes_sent', 'network_bytes_recv',
+)
+# Valeur maximale d'un entier (BigIntegerField ; IntegerField pour cpu_count)
+ENTIER_MAX = 2 ** 63 - 1
+ENTIERS_MAX = {'cpu_count': 2 ** 31 - 1}
+
+# Nombre maximal d'échantillons par lot
+TAILLE_MAX_LOT = 5000
+# Taille maximale du corps une fois décompressé (octets)
+TAILLE_MAX_DECOMPRESSEE = 16 * 1024 * 1024
+# Lignes par requête INSERT
+TAILLE_INSERTION = 1000
+# Avance tolérée de l'horloge de l'agent
+DECALAGE_HORLOGE_MAX = timedelta(minutes=5)
+
+
+def decompresser(contenu, encodage):
+    """Décompresser un corps gzip/deflate en bornant la taille produite"""
+    wbits = 16 + zlib.MAX_WBITS if encodage == 'gzip' else zlib.MAX_WBITS
+    decompresseur = zlib.decompressobj(wbits)
+    try:
+        donnees = decompresseur.decompress(contenu, TAILLE_MAX_DECOMPRESSEE + 1)
+    except zlib.error as e:
+        raise ParseError(f'Contenu compressé invalide : {e}')
+    if len(donnees) > TAILLE_MAX_DECOMPRESSEE or decompresseur.unconsumed_tail:
+        raise ParseError('Contenu décompressé trop volumineux.')
+    return donnees
+
+
+class JSONCompresseParser(JSONParser):
+    """JSON, éventuellement compressé (`Content-Encoding: gzip` ou `deflate`)"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get('request')
+        encodage = request.META.get('HTTP_CONTENT_ENCODING', '').lower() if request is not None else ''
+        if encodage in ('gzip', 'deflate'):
+            stream = io.BytesIO(decompresser(stream.read(), encodage))
+        return super().parse(stream, media_type, parser_context)
+
+
+def lire_timestamp(valeur):
+    """Timestamp Unix (secondes) ou date ISO 8601 ; None si illisible"""
+    if isinstance(valeur, bool):
+        return None
+    if isinstance(valeur, (int, float)):
+        try:
+            return datetime.fromtimestamp(valeur, tz=dt_timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            return None
+    if isinstance(valeur, str):
+        try:
+            date = parse_datetime(valeur)
+        except ValueError:
+            return None
+        if date is not None and timezone.is_naive(date):
+            date = timezone.make_aware(date)
+        return date
+    return None
+
+
+def hors_limites(valeurs):
+    """Premier champ non fini (pourcentages) ou hors de 0..ENTIER_MAX (entiers), sinon None"""
+    for champ in CHAMPS_POURCENTAGE:
+        if not math.isfinite(valeurs[champ]):
+            return champ
+    for champ in CHAMPS_ENTIERS:
+        if not 0 <= valeurs[champ] <= ENTIERS_MAX.get(champ, ENTIER_MAX):
+            return champ
+    return None
+
+
+def construire_metriques(machine, echantillons):
+    """
+    Valider les échantillons et construire les instances (non enregistrées)
+
+    Retourne (métriques, rejets) ; chaque rejet indique l'indice de
+    l'échantillon dans le lot et la raison.
+    """
+    limite = timezone.now() + DECALAGE_HORLOGE_MAX
+    metriques = []
+    rejets = []
+    for indice, echantillon in enumerate(echantillons):
+        if not isinstance(echantillon, dict):
+            rejets.append({'indice': indice, 'erreur': 'Échantillon invalide'})
+            continue
+        date = lire_timestamp(echantillon.get('timestamp'))
+        if date is None or date > limite:
+            rejets.append({'indice': indice, 'erreur': 'timestamp invalide'})
+            continue
+        try:
+            valeurs = {champ: float(echantillon[champ]) for champ in CHAMPS_POURCENTAGE}
+            valeurs.update({champ: int(echantillon.get(champ) or 0) for champ in CHAMPS_ENTIERS})
+        except KeyError as e:
+            rejets.append({'indice': indice, 'erreur': f'{e.args[0]} manquant'})
+            continue
+        except (TypeError, ValueError, OverflowError):
+            rejets.append({'indice': indice, 'erreur': 'Valeur non numérique'})
+            continue
+        champ = hors_limites(valeurs)
+        if champ is not None:
+            rejets.append({'indice': indice, 'erreur': f'{champ} hors limites'})
+            continue
+        metriques.append(MetriquePerformance(machine=machine, timestamp=date, **valeurs))
+    return metriques, rejets
+
+
+def ingerer_metriques(machine, echantillons):
+    """
+    Enregistrer un lot d'échantillons d'une machine en une transaction, puis
+    évaluer les seuils d'alerte
+
+    Retourne (métriques écrites, rejets).
+    """
+    metriques, rejets = construire_metriques(machine, echantillons)
+    if metriques:
+        with transaction.atomic():
+            MetriquePerformance.objects.bulk_create(
+                metriques, batch_size=TAILLE_INSERTION, ignore_conflicts=True
+            )
+            marquer_echantillons_tardifs(min(metrique.timestamp for metrique in metriques))
+        evaluer_seuils(machine, metriques)
+    return metriques, rejets
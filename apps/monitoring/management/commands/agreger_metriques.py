@@ -0,0 +1,34 @@
+"""
+Agrégation des métriques de performance (1 minute, 1 heure, 1 jour) et purge
+
+A lancer périodiquement (cron, toutes les minutes) ou en continu avec --continu.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.monitoring.agregation import agreger_metriques, purger_metriques
+
+
+class Command(BaseCommand):
+    help = "Agréger les métriques de performance et purger les données expirées"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--continu', action='store_true',
+                            help="Relancer l'agrégation en boucle")
+        parser.add_argument('--intervalle', type=int, default=60,
+                            help="Secondes entre deux passages en mode continu (défaut : 60)")
+        parser.add_argument('--sans-purge', action='store_true',
+                            help="Ne pas supprimer les données expirées")
+
+    def handle(self, *args, **options):
+        while True:
+            debut = time.perf_counter()
+            ecrits = agreger_metriques()
+            message = f"📈 Agrégats écrits : {ecrits}"
+            if not options['sans_purge']:
+                message += f" - lignes purgées : {purger_metriques()}"
+            self.stdout.write(f"{message} ({(time.perf_counter() - debut) * 1000:.0f} ms)")
+            if not options['continu']:
+                break
+            time.sleep(options['intervalle'])
@@ -0,0 +1,44 @@
+"""
+Sondage d'accessibilité des machines (StatusMachine)
+
+A lancer périodiquement (cron, toutes les minutes) ou en continu avec --continu.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.monitoring.sondage import sonder_machines
+
+
+class Command(BaseCommand):
+    help = "Sonder l'accessibilité des machines et enregistrer leur statut"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int,
+                            help="Port TCP sondé (défaut : MONITORING_SONDE_PORT)")
+        parser.add_argument('--chemin',
+                            help="Chemin HTTP sondé au lieu d'une simple connexion (défaut : MONITORING_SONDE_CHEMIN)")
+        parser.add_argument('--concurrence', type=int,
+                            help="Connexions simultanées (défaut : MONITORING_SONDE_CONCURRENCE)")
+        parser.add_argument('--delai', type=float,
+                            help="Délai maximal par machine en secondes (défaut : MONITORING_SONDE_DELAI)")
+        parser.add_argument('--continu', action='store_true',
+                            help="Relancer le sondage en boucle")
+        parser.add_argument('--intervalle', type=int, default=60,
+                            help="Secondes entre deux passages en mode continu (défaut : 60)")
+
+    def handle(self, *args, **options):
+        while True:
+            resume = sonder_machines(
+                port=options['port'],
+                chemin=options['chemin'],
+                concurrence=options['concurrence'],
+                delai=options['delai'],
+            )
+            self.stdout.write(
+                f"📡 {resume['accessibles']}/{resume['cibles']} machines accessibles "
+                f"({resume['duree'] * 1000:.0f} ms)"
+            )
+            if not options['continu']:
+                break
+            time.sleep(options['intervalle'])
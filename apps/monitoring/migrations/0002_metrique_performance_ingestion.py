@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    """
+    Clé primaire entière et unicité (machine, timestamp) pour l'ingestion par lots
+
+    Aucune route n'écrivait encore dans cette table : elle est recréée plutôt
+    que de convertir des UUID en entiers.
+    """
+
+    dependencies = [
+        ('machines', '0001_initial'),
+        ('monitoring', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='MetriquePerformance',
+        ),
+        migrations.CreateModel(
+            name='MetriquePerformance',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('cpu_percent', models.FloatField(help_text='Utilisation CPU en %')),
+                ('cpu_count', models.IntegerField(help_text='Nombre de cœurs CPU')),
+                ('memory_total', models.BigIntegerField(help_text='Mémoire totale en bytes')),
+                ('memory_used', models.BigIntegerField(help_text='Mémoire utilisée en bytes')),
+                ('memory_percent', models.FloatField(help_text='Utilisation mémoire en %')),
+                ('disk_total', models.BigIntegerField(help_text='Espace disque total en bytes')),
+                ('disk_used', models.BigIntegerField(help_text='Espace disque utilisé en bytes')),
+                ('disk_percent', models.FloatField(help_text='Utilisation disque en %')),
+                ('network_bytes_sent', models.BigIntegerField(default=0)),
+                ('network_bytes_recv', models.BigIntegerField(default=0)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('machine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metriques', to='machines.machine')),
+            ],
+            options={
+                'verbose_name': 'Métrique de performance',
+                'verbose_name_plural': 'Métriques de performance',
+                'ordering': ['-timestamp'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='metriqueperformance',
+            constraint=models.UniqueConstraint(fields=('machine', 'timestamp'), name='metrique_machine_timestamp_unique'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('machines', '0008_index_pagination_curseur'),
+        ('monitoring', '0002_metrique_performance_ingestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgregatMetrique',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('niveau', models.CharField(choices=[('1m', '1 minute'), ('1h', '1 heure'), ('1d', '1 jour')], max_length=2)),
+                ('debut', models.DateTimeField(help_text="Début de l'intervalle")),
+                ('nb_echantillons', models.PositiveIntegerField(default=0)),
+                ('cpu_min', models.FloatField()),
+                ('cpu_avg', models.FloatField()),
+                ('cpu_max', models.FloatField()),
+                ('cpu_p95', models.FloatField()),
+                ('memory_min', models.FloatField()),
+                ('memory_avg', models.FloatField()),
+                ('memory_max', models.FloatField()),
+                ('memory_p95', models.FloatField()),
+                ('disk_min', models.FloatField()),
+                ('disk_avg', models.FloatField()),
+                ('disk_max', models.FloatField()),
+                ('disk_p95', models.FloatField()),
+                ('network_sent_min', models.FloatField(blank=True, null=True)),
+                ('network_sent_avg', models.FloatField(blank=True, null=True)),
+                ('network_sent_max', models.FloatField(blank=True, null=True)),
+                ('network_sent_p95', models.FloatField(blank=True, null=True)),
+                ('network_recv_min', models.FloatField(blank=True, null=True)),
+                ('network_recv_avg', models.FloatField(blank=True, null=True)),
+                ('network_recv_max', models.FloatField(blank=True, null=True)),
+                ('network_recv_p95', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Agrégat de métriques',
+                'verbose_name_plural': 'Agrégats de métriques',
+                'ordering': ['niveau', '-debut'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EtatAgregation',
+            fields=[
+                ('niveau', models.CharField(choices=[('1m', '1 minute'), ('1h', '1 heure'), ('1d', '1 jour')], max_length=2, primary_key=True, serialize=False)),
+                ('jusqu_a', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': "État d'agrégation",
+                'verbose_name_plural': "États d'agrégation",
+            },
+        ),
+        migrations.AddIndex(
+            model_name='metriqueperformance',
+            index=models.Index(fields=['timestamp'], name='monitoring__timesta_e418da_idx'),
+        ),
+        migrations.AddField(
+            model_name='agregatmetrique',
+            name='machine',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='agregats_metriques', to='machines.machine'),
+        ),
+        migrations.AddIndex(
+            model_name='agregatmetrique',
+            index=models.Index(fields=['niveau', 'debut'], name='monitoring__niveau_b4725d_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='agregatmetrique',
+            constraint=models.UniqueConstraint(fields=('machine', 'niveau', 'debut'), name='agregat_machine_niveau_debut_unique'),
+        ),
+    ]
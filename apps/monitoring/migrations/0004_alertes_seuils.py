@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0003_agregats_metriques'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alertesysteme',
+            name='cle_deduplication',
+            field=models.CharField(blank=True, editable=False, help_text="machine:métrique tant que l'alerte de seuil est ouverte", max_length=80, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='alertesysteme',
+            name='metrique',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+    ]
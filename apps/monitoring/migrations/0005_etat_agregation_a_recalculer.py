@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0004_alertes_seuils'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='etatagregation',
+            name='a_recalculer_depuis',
+            field=models.DateTimeField(blank=True, help_text='Plus ancien échantillon reçu en retard, avant jusqu_a, depuis le dernier passage', null=True),
+        ),
+    ]
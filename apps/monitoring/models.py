@@ -2,7 +2,10 @@
 Modèles pour le monitoring et la supervision
 """
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 import uuid
 
 User = get_user_model()
@@ -87,6 +90,13 @@ class AlerteSysteme(models.Model):
     valeur_seuil = models.FloatField(null=True, blank=True)
     valeur_actuelle = models.FloatField(null=True, blank=True)
     
+    # Alertes de seuil (voir apps.monitoring.alertes)
+    metrique = models.CharField(max_length=20, blank=True, default='')
+    cle_deduplication = models.CharField(
+        max_length=80, null=True, blank=True, unique=True, editable=False,
+        help_text="machine:métrique tant que l'alerte de seuil est ouverte"
+    )
+    
     class Meta:
         verbose_name = "Alerte système"
         verbose_name_plural = "Alertes système"
@@ -94,12 +104,25 @@ class AlerteSysteme(models.Model):
     
     def __str__(self):
         return f"{self.titre} - {self.machine.nom} ({self.get_niveau_display()})"
+    
+    def save(self, *args, **kwargs):
+        # Une alerte résolue libère sa clé : le prochain dépassement ouvre une nouvelle alerte
+        if self.resolu:
+            self.cle_deduplication = None
+        super().save(*args, **kwargs)
 
 
 class MetriquePerformance(models.Model):
-    """Métriques de performance des machines"""
+    """
+    Métriques de performance des machines
+
+    Une ligne par échantillon envoyé par l'agent : clé entière auto-incrémentée
+    (plus compacte qu'un UUID et insérée en fin d'index) et unicité sur
+    (machine, timestamp) pour que le renvoi d'un lot après une erreur réseau
+    n'écrive pas de doublons.
+    """
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.BigAutoField(primary_key=True)
     machine = models.ForeignKey('machines.Machine', on_delete=models.CASCADE, related_name='metriques')
     
     # Métriques CPU
@@ -120,21 +143,109 @@ class MetriquePerformance(models.Model):
     network_bytes_sent = models.BigIntegerField(default=0)
     network_bytes_recv = models.BigIntegerField(default=0)
     
-    # Timestamp
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Timestamp (heure de l'échantillon sur l'agent)
+    timestamp = models.DateTimeField(default=timezone.now)
     
     class Meta:
         verbose_name = "Métrique de performance"
         verbose_name_plural = "Métriques de performance"
         ordering = ['-timestamp']
+        constraints = [
+            # Sert aussi d'index pour les séries d'une machine
+            models.UniqueConstraint(fields=['machine', 'timestamp'], name='metrique_machine_timestamp_unique'),
+        ]
         indexes = [
-            models.Index(fields=['machine', '-timestamp']),
+            # Agrégation par intervalle et purge de toutes les machines
+            models.Index(fields=['timestamp']),
         ]
     
     def __str__(self):
         return f"{self.machine.nom} - {self.timestamp}"
 
 
+class AgregatMetrique(models.Model):
+    """
+    Métriques de performance agrégées par intervalle (1 minute, 1 heure, 1 jour)
+
+    Pour chaque métrique : minimum, moyenne, maximum et 95e centile des
+    échantillons de l'intervalle. Le réseau est exprimé en débit (octets/s)
+    calculé entre échantillons consécutifs. Voir `apps.monitoring.agregation`.
+    """
+    
+    NIVEAU_CHOICES = [
+        ('1m', '1 minute'),
+        ('1h', '1 heure'),
+        ('1d', '1 jour'),
+    ]
+    
+    id = models.BigAutoField(primary_key=True)
+    machine = models.ForeignKey('machines.Machine', on_delete=models.CASCADE, related_name='agregats_metriques')
+    niveau = models.CharField(max_length=2, choices=NIVEAU_CHOICES)
+    debut = models.DateTimeField(help_text="Début de l'intervalle")
+    nb_echantillons = models.PositiveIntegerField(default=0)
+    
+    # CPU (%)
+    cpu_min = models.FloatField()
+    cpu_avg = models.FloatField()
+    cpu_max = models.FloatField()
+    cpu_p95 = models.FloatField()
+    
+    # Mémoire (%)
+    memory_min = models.FloatField()
+    memory_avg = models.FloatField()
+    memory_max = models.FloatField()
+    memory_p95 = models.FloatField()
+    
+    # Disque (%)
+    disk_min = models.FloatField()
+    disk_avg = models.FloatField()
+    disk_max = models.FloatField()
+    disk_p95 = models.FloatField()
+    
+    # Réseau (octets/s ; vide sans échantillon précédent)
+    network_sent_min = models.FloatField(null=True, blank=True)
+    network_sent_avg = models.FloatField(null=True, blank=True)
+    network_sent_max = models.FloatField(null=True, blank=True)
+    network_sent_p95 = models.FloatField(null=True, blank=True)
+    network_recv_min = models.FloatField(null=True, blank=True)
+    network_recv_avg = models.FloatField(null=True, blank=True)
+    network_recv_max = models.FloatField(null=True, blank=True)
+    network_recv_p95 = models.FloatField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = "Agrégat de métriques"
+        verbose_name_plural = "Agrégats de métriques"
+        ordering = ['niveau', '-debut']
+        constraints = [
+            models.UniqueConstraint(fields=['machine', 'niveau', 'debut'], name='agregat_machine_niveau_debut_unique'),
+        ]
+        indexes = [
+            # Purge par niveau
+            models.Index(fields=['niveau', 'debut']),
+        ]
+    
+    def __str__(self):
+        return f"{self.machine.nom} - {self.niveau} - {self.debut}"
+
+
+class EtatAgregation(models.Model):
+    """Fin du dernier intervalle agrégé pour chaque niveau (reprise de la tâche)"""
+    
+    niveau = models.CharField(max_length=2, primary_key=True, choices=AgregatMetrique.NIVEAU_CHOICES)
+    jusqu_a = models.DateTimeField(null=True, blank=True)
+    a_recalculer_depuis = models.DateTimeField(
+        null=True, blank=True,
+        help_text="Plus ancien échantillon reçu en retard, avant jusqu_a, depuis le dernier passage"
+    )
+    
+    class Meta:
+        verbose_name = "État d'agrégation"
+        verbose_name_plural = "États d'agrégation"
+    
+    def __str__(self):
+        return f"{self.niveau} agrégé jusqu'à {self.jusqu_a}"
+
+
 class SeuillAlerte(models.Model):
     """Configuration des seuils d'alerte"""
     
@@ -210,4 +321,20 @@ class RapportMonitoring(models.Model):
         ordering = ['-date_generation']
     
     def __str__(self):
-        return f"{self.nom} - {self.date_debut.strftime('%Y-%m-%d')}"
\ No newline at end of file
+        return f"{self.nom} - {self.date_debut.strftime('%Y-%m-%d')}"
+
+
+@receiver(post_save, sender=SeuillAlerte)
+@receiver(post_delete, sender=SeuillAlerte)
+def invalider_table_seuils(sender, instance, **kwargs):
+    """Recharger la table des seuils des moteurs d'évaluation au prochain lot"""
+    from .alertes import invalider_seuils
+    invalider_seuils()
+
+
+@receiver(post_save, sender=AlerteSysteme)
+@receiver(post_delete, sender=AlerteSysteme)
+def invalider_etats_alertes(sender, instance, **kwargs):
+    """Relire les états d'alerte de la machine au prochain lot (résolution manuelle...)"""
+    from .alertes import invalider_alertes
+    invalider_alertes(instance.machine_id)
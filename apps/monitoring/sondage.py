@@ -0,0 +1,145 @@
+"""
+Sondage d'accessibilité des machines
+
+Renseigne `StatusMachine` (`ping_success`, `temps_reponse`, `last_ping_time`,
+`statut`) pour toutes les machines actives ayant une adresse IP :
+
+- chaque machine est sondée par une connexion TCP sur un port configurable
+  (`MONITORING_SONDE_PORT`) ou, si `MONITORING_SONDE_CHEMIN` est défini, par
+  une requête HTTP GET vers ce chemin (réponse 2xx attendue) ;
+- les connexions sont faites avec asyncio, au plus `MONITORING_SONDE_CONCURRENCE`
+  à la fois, chacune bornée par `MONITORING_SONDE_DELAI` secondes : un passage
+  sur plusieurs milliers de machines dure quelques secondes, et non la somme
+  des délais des machines éteintes ;
+- les résultats sont écrits en une requête par lot (`INSERT ... ON CONFLICT
+  DO UPDATE` sur la machine).
+
+Lancé par la commande `python manage.py sonder_machines`.
+"""
+import asyncio
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.machines.models import InterfaceReseau
+from .models import StatusMachine
+
+Cible = namedtuple('Cible', ['machine_id', 'hote', 'port'])
+Resultat = namedtuple('Resultat', ['machine_id', 'succes', 'temps_reponse'])
+
+# Lignes par requête d'écriture des statuts
+TAILLE_ECRITURE = 500
+# Taille maximale lue de la ligne de statut HTTP
+TAILLE_LIGNE_STATUT = 256
+
+
+def get_parametres_sonde():
+    """(port, chemin, concurrence, délai) depuis les settings"""
+    return (
+        getattr(settings, 'MONITORING_SONDE_PORT', 445),
+        getattr(settings, 'MONITORING_SONDE_CHEMIN', ''),
+        getattr(settings, 'MONITORING_SONDE_CONCURRENCE', 500),
+        getattr(settings, 'MONITORING_SONDE_DELAI', 2.0),
+    )
+
+
+def lister_cibles(port):
+    """Une cible par machine active : l'adresse de sa première interface active"""
+    interfaces = InterfaceReseau.objects.filter(
+        actif=True, adresse_ip__isnull=False, machine__statut='actif'
+    ).order_by('machine_id', 'nom').values_list('machine_id', 'adresse_ip')
+    cibles = {}
+    for machine_id, adresse_ip in interfaces.iterator(chunk_size=2000):
+        if machine_id not in cibles:
+            cibles[machine_id] = Cible(machine_id, adresse_ip, port)
+    return list(cibles.values())
+
+
+async def sonder(cible, delai, chemin=''):
+    """Sonder une cible ; le temps de réponse est en millisecondes"""
+    debut = time.perf_counter()
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(cible.hote, cible.port), delai)
+        if chemin:
+            writer.write(f'GET {chemin} HTTP/1.0\r\nHost: {cible.hote}\r\n\r\n'.encode('ascii'))
+            ligne = await asyncio.wait_for(reader.readline(), delai - (time.perf_counter() - debut))
+            parties = ligne[:TAILLE_LIGNE_STATUT].split()
+            if len(parties) < 2 or not parties[1].startswith(b'2'):
+                return Resultat(cible.machine_id, False, None)
+        return Resultat(cible.machine_id, True, (time.perf_counter() - debut) * 1000)
+    except (OSError, asyncio.TimeoutError, ValueError):
+        return Resultat(cible.machine_id, False, None)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def sonder_cibles(cibles, concurrence, delai, chemin=''):
+    """
+    Sonder toutes les cibles avec au plus `concurrence` connexions simultanées
+
+    Un nombre fixe de tâches consomme la liste : la mémoire ne dépend pas du
+    nombre de cibles. Retourne les résultats dans un ordre quelconque.
+    """
+    resultats = []
+    restantes = iter(cibles)
+
+    async def travailleur():
+        for cible in restantes:
+            resultats.append(await sonder(cible, delai, chemin))
+
+    await asyncio.gather(*[travailleur() for _ in range(max(1, min(concurrence, len(cibles))))])
+    return resultats
+
+
+def enregistrer_resultats(resultats, date=None):
+    """Écrire les résultats dans `StatusMachine`, une requête par lot de `TAILLE_ECRITURE`"""
+    date = date or timezone.now()
+    statuts = [
+        StatusMachine(
+            machine_id=resultat.machine_id,
+            statut='online' if resultat.succes else 'offline',
+            ping_success=resultat.succes,
+            temps_reponse=resultat.temps_reponse,
+            last_ping_time=date,
+        )
+        for resultat in resultats
+    ]
+    with transaction.atomic():
+        StatusMachine.objects.bulk_create(
+            statuts,
+            batch_size=TAILLE_ECRITURE,
+            update_conflicts=True,
+            unique_fields=['machine'],
+            update_fields=['statut', 'ping_success', 'temps_reponse', 'last_ping_time', 'derniere_verification'],
+        )
+    return len(statuts)
+
+
+def sonder_machines(port=None, chemin=None, concurrence=None, delai=None):
+    """
+    Sonder toutes les machines et enregistrer leur statut
+
+    Les paramètres absents sont lus dans les settings. Retourne
+    {'cibles', 'accessibles', 'duree'} (durée du sondage en secondes).
+    """
+    port_defaut, chemin_defaut, concurrence_defaut, delai_defaut = get_parametres_sonde()
+    port = port or port_defaut
+    chemin = chemin_defaut if chemin is None else chemin
+    concurrence = concurrence or concurrence_defaut
+    delai = delai or delai_defaut
+
+    cibles = lister_cibles(port)
+    debut = time.perf_counter()
+    resultats = asyncio.run(sonder_cibles(cibles, concurrence, delai, chemin)) if cibles else []
+    duree = time.perf_counter() - debut
+    enregistrer_resultats(resultats)
+    return {
+        'cibles': len(cibles),
+        'accessibles': sum(1 for resultat in resultats if resultat.succes),
+        'duree': duree,
+    }
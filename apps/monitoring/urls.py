@@ -1,8 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from .views import HeartbeatView, IngestionMetriquesView, SerieMetriquesView
+
 router = DefaultRouter()
 
 urlpatterns = [
+    path('metriques/ingestion/', IngestionMetriquesView.as_view(), name='metriques-ingestion'),
+    path('metriques/serie/', SerieMetriquesView.as_view(), name='metriques-serie'),
+    path('heartbeat/', HeartbeatView.as_view(), name='heartbeat'),
     path('', include(router.urls)),
-]
\ No newline at end of file
+]
@@ -0,0 +1,178 @@
+"""
+Vues pour l'application monitoring
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+
+from apps.machines.models import Machine
+from .agregation import serie_metriques
+from .ingestion import JSONCompresseParser, TAILLE_MAX_LOT, ingerer_metriques
+from .models import StatusMachine
+
+
+class MachinesVisiblesMixin:
+    """Machines dont l'utilisateur peut envoyer et consulter les métriques"""
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = Machine.objects.all()
+        if user.role == 'admin':
+            return queryset
+        elif user.role in ['technicien', 'manager']:
+            return queryset.filter(structure=user.structure)
+        return queryset.filter(utilisateur=user)
+
+    def get_machine(self, machine_id):
+        """Machine visible demandée, ou None"""
+        if not machine_id:
+            return None
+        try:
+            return self.get_queryset().get(pk=machine_id)
+        except (Machine.DoesNotExist, DjangoValidationError, ValueError):
+            return None
+
+
+class IngestionMetriquesView(MachinesVisiblesMixin, generics.GenericAPIView):
+    """
+    Réception des lots d'échantillons de performance envoyés par les agents
+
+    Corps JSON `{"machine": <id>, "echantillons": [...]}`, éventuellement
+    compressé (`Content-Encoding: gzip`). Voir `apps.monitoring.ingestion`.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [JSONCompresseParser]
+
+    def post(self, request):
+        donnees = request.data if isinstance(request.data, dict) else {}
+        echantillons = donnees.get('echantillons')
+        if not donnees.get('machine') or not isinstance(echantillons, list):
+            return Response(
+                {'error': 'Champs machine et echantillons requis'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(echantillons) > TAILLE_MAX_LOT:
+            return Response(
+                {'error': f'Lot trop volumineux (maximum {TAILLE_MAX_LOT} échantillons)'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        machine = self.get_machine(donnees['machine'])
+        if machine is None:
+            return Response({'error': 'Machine non trouvée'}, status=status.HTTP_404_NOT_FOUND)
+
+        metriques, rejets = ingerer_metriques(machine, echantillons)
+        return Response({
+            'recus': len(echantillons),
+            'acceptes': len(metriques),
+            'rejetes': rejets,
+        }, status=status.HTTP_201_CREATED)
+
+
+class SerieMetriquesView(MachinesVisiblesMixin, generics.GenericAPIView):
+    """
+    Série de métriques d'une machine pour les graphiques
+
+    `?machine=<id>&debut=<ISO>&fin=<ISO>&points=300` : les dernières 24 heures
+    par défaut. Le niveau d'agrégat est choisi pour renvoyer au plus `points`
+    points (voir `apps.monitoring.agregation.serie_metriques`).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    POINTS_DEFAUT = 300
+    POINTS_MAX = 2000
+
+    def get(self, request):
+        machine = self.get_machine(request.query_params.get('machine'))
+        if machine is None:
+            return Response({'error': 'Machine non trouvée'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            fin = self.lire_date('fin') or timezone.now()
+            debut = self.lire_date('debut') or fin - timedelta(hours=24)
+            points = int(request.query_params.get('points', self.POINTS_DEFAUT))
+        except ValueError:
+            return Response({'error': 'Paramètres invalides'}, status=status.HTTP_400_BAD_REQUEST)
+        if debut >= fin:
+            return Response({'error': 'debut doit précéder fin'}, status=status.HTTP_400_BAD_REQUEST)
+        points = min(max(points, 1), self.POINTS_MAX)
+
+        serie = serie_metriques(machine, debut, fin, points)
+        return Response({
+            'machine': str(machine.pk),
+            'debut': debut.isoformat(),
+            'fin': fin.isoformat(),
+            **serie,
+        })
+
+    def lire_date(self, parametre):
+        """Date ISO 8601 du paramètre (None s'il est absent, ValueError si illisible)"""
+        valeur = self.request.query_params.get(parametre)
+        if not valeur:
+            return None
+        date = parse_datetime(valeur.replace(' ', '+'))
+        if date is None:
+            raise ValueError(parametre)
+        if timezone.is_naive(date):
+            date = timezone.make_aware(date)
+        return date
+
+
+class HeartbeatView(MachinesVisiblesMixin, generics.GenericAPIView):
+    """
+    Signal de vie de l'agent, indépendant de la synchronisation d'inventaire
+
+    Corps `{"machine": <id>, "cpu_percent": 12.5, "memory_percent": 40.1,
+    "disk_percent": 71.0}` (jauges facultatives). Un seul UPDATE met à jour
+    `derniere_synchronisation` (et donc `est_en_ligne`) ; les jauges éventuelles
+    sont écrites dans `StatusMachine`. Les signaux reçus moins de
+    `MONITORING_INTERVALLE_HEARTBEAT` secondes après le dernier enregistré sont
+    acceptés sans écriture : la réponse indique l'intervalle à respecter.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    CLE_HEARTBEAT = 'monitoring:heartbeat:{user_id}:{machine_id}'
+    JAUGES = {
+        'cpu_percent': 'cpu_usage',
+        'memory_percent': 'ram_usage',
+        'disk_percent': 'disk_usage',
+    }
+
+    def post(self, request):
+        donnees = request.data if isinstance(request.data, dict) else {}
+        machine_id = str(donnees.get('machine') or '')
+        if not machine_id:
+            return Response({'error': 'Champ machine requis'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            jauges = {
+                champ: float(donnees[cle]) for cle, champ in self.JAUGES.items() if donnees.get(cle) is not None
+            }
+        except (TypeError, ValueError):
+            return Response({'error': 'Jauges non numériques'}, status=status.HTTP_400_BAD_REQUEST)
+
+        intervalle = getattr(settings, 'MONITORING_INTERVALLE_HEARTBEAT', 60)
+        cle = self.CLE_HEARTBEAT.format(user_id=request.user.pk, machine_id=machine_id)
+        if cache.get(cle):
+            return Response({'enregistre': False, 'intervalle': intervalle})
+
+        maintenant = timezone.now()
+        try:
+            mis_a_jour = self.get_queryset().filter(pk=machine_id).update(derniere_synchronisation=maintenant)
+        except (DjangoValidationError, ValueError):
+            mis_a_jour = 0
+        if not mis_a_jour:
+            return Response({'error': 'Machine non trouvée'}, status=status.HTTP_404_NOT_FOUND)
+        cache.set(cle, 1, timeout=intervalle)
+
+        if jauges:
+            StatusMachine.objects.bulk_create(
+                [StatusMachine(machine_id=machine_id, statut='online', **jauges)],
+                update_conflicts=True,
+                unique_fields=['machine'],
+                update_fields=['statut', 'derniere_verification', *jauges],
+            )
+        return Response({'enregistre': True, 'intervalle': intervalle})
@@ -15,6 +15,7 @@ class CategorieTicketAdmin(admin.ModelAdmin):
     list_display = ['nom', 'couleur_display', 'sla_heures', 'assignation_auto', 'actif']
     list_filter = ['actif', 'assignation_auto']
     search_fields = ['nom', 'description']
+    filter_horizontal = ['techniciens']
     
     def couleur_display(self, obj):
         return format_html(
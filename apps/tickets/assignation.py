@@ -0,0 +1,130 @@
+"""
+Assignation automatique des nouveaux tickets aux techniciens
+
+Le technicien est choisi parmi les techniciens actifs, en privilégiant ceux qui
+sont compétents pour la catégorie du ticket (`CategorieTicket.techniciens`) et
+rattachés au site du demandeur ; ces contraintes sont relâchées une à une si
+aucun technicien ne les satisfait.
+
+Le choix est une seule requête triée sur les compteurs de `ChargeTechnicien`
+(indexés), selon une stratégie interchangeable :
+
+- `moins_charge` : le moins de tickets ouverts, puis le plus ancien assigné ;
+- `round_robin` : chacun son tour (le plus ancien assigné) ;
+- `ponderee_sla` : la plus faible charge pondérée par la priorité des tickets.
+
+La stratégie par défaut est définie par `TICKETS_STRATEGIE_ASSIGNATION`.
+
+Le compteur du technicien choisi est verrouillé (`select_for_update`) jusqu'à
+la fin de la transaction qui enregistre le ticket : une création concurrente
+saute la ligne verrouillée (`skip_locked`) et choisit le technicien suivant au
+lieu de lire des compteurs périmés. Sous SQLite, qui ignore `FOR UPDATE`, les
+transactions d'écriture sont de toute façon sérialisées par le verrou de la base.
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ChargeTechnicien
+
+
+class StrategieAssignation:
+    """
+    Stratégie de choix du technicien
+
+    `tri` donne les attributs de `ChargeTechnicien` à minimiser, dans l'ordre.
+    Il sert à la fois au tri de la requête et à la clé des tas de la simulation
+    (`scripts/benchmark_assignation.py`). Les valeurs nulles (jamais assigné)
+    passent en premier.
+    """
+    nom = None
+    tri = ()
+
+    def ordre(self):
+        return [F(champ).asc(nulls_first=True) for champ in self.tri] + ['technicien_id']
+
+    def cle(self, charge):
+        return tuple(getattr(charge, champ) or 0 for champ in self.tri)
+
+    def choisir(self, charges):
+        """
+        Retourne la charge du technicien choisi dans le queryset, verrouillée, ou None
+
+        Les charges verrouillées par une autre création sont sautées ; si toutes
+        le sont, attendre la première plutôt que de relâcher les contraintes.
+        """
+        charges = charges.order_by(*self.ordre()).select_related('technicien')
+        charge = charges.select_for_update(skip_locked=True, of=('self',)).first()
+        if charge is None and connection.features.has_select_for_update_skip_locked:
+            charge = charges.select_for_update(of=('self',)).first()
+        return charge
+
+
+class StrategieMoinsCharge(StrategieAssignation):
+    nom = 'moins_charge'
+    tri = ('tickets_ouverts', 'derniere_assignation')
+
+
+class StrategieRoundRobin(StrategieAssignation):
+    nom = 'round_robin'
+    tri = ('derniere_assignation',)
+
+
+class StrategiePondereeSLA(StrategieAssignation):
+    nom = 'ponderee_sla'
+    tri = ('charge_ponderee', 'derniere_assignation')
+
+
+STRATEGIES = {
+    strategie.nom: strategie
+    for strategie in (StrategieMoinsCharge, StrategieRoundRobin, StrategiePondereeSLA)
+}
+
+
+def get_strategie(nom=None):
+    """Instancier une stratégie par son nom (stratégie configurée par défaut)"""
+    nom = nom or getattr(settings, 'TICKETS_STRATEGIE_ASSIGNATION', StrategieMoinsCharge.nom)
+    try:
+        return STRATEGIES[nom]()
+    except KeyError:
+        raise ValueError(f"Stratégie d'assignation inconnue : {nom}") from None
+
+
+def choisir_technicien(categorie=None, site=None, strategie=None):
+    """
+    Choisir et réserver le technicien à assigner à un nouveau ticket
+
+    Retourne l'utilisateur choisi, ou None s'il n'y a aucun technicien actif.
+    La date de dernière assignation du technicien est mise à jour ; ses
+    compteurs le seront à l'enregistrement du ticket. À appeler dans la
+    transaction qui enregistre le ticket : le verrou sur la charge du
+    technicien est conservé jusqu'à son commit.
+    """
+    if not isinstance(strategie, StrategieAssignation):
+        strategie = get_strategie(strategie)
+
+    charges = ChargeTechnicien.objects.filter(
+        technicien__role='technicien',
+        technicien__is_active=True,
+    )
+    filtres = []
+    if categorie is not None and categorie.techniciens.exists():
+        filtres.append({'technicien__categories_competence': categorie})
+    if site is not None:
+        filtres.append({'technicien__site': site})
+
+    # Contraintes relâchées de la dernière (site) à la première (compétence)
+    charge = None
+    for nombre in range(len(filtres), -1, -1):
+        candidats = charges
+        for filtre in filtres[:nombre]:
+            candidats = candidats.filter(**filtre)
+        charge = strategie.choisir(candidats)
+        if charge is not None:
+            break
+    if charge is None:
+        return None
+
+    ChargeTechnicien.objects.filter(pk=charge.pk).update(derniere_assignation=timezone.now())
+    return charge.technicien
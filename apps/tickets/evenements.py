@@ -0,0 +1,191 @@
+"""
+Canal d'événements par long-poll pour les clients desktop et mobile
+
+Plutôt que d'interroger `logiciels_bloques` toutes les 2 secondes et les
+notifications toutes les 30 secondes, chaque client garde une requête ouverte
+sur `/api/v1/evenements/`. Le serveur ne répond que lorsqu'il a des changements
+à transmettre (ou à l'expiration du délai d'attente) et ne renvoie que les
+deltas depuis le curseur du client :
+
+- `politique` : la liste des logiciels bloqués de l'utilisateur a changé ;
+- `notification` : nouvelles notifications de ticket ;
+- `statut_ticket` : changement de statut d'un ticket demandé ou assigné.
+
+Pendant l'attente, seuls des compteurs en cache sont consultés ; ils sont
+incrémentés par les signaux des modèles et par l'invalidation de la politique.
+En production multi-processus, le cache doit être partagé (CACHE_BACKEND).
+
+Chaque requête en attente occupe un fil d'exécution du serveur pendant au plus
+ATTENTE_MAX secondes. Avec des workers synchrones, quelques clients connectés
+suffisent à bloquer tous les workers : déployer avec des workers à threads
+(`gunicorn --worker-class gthread --threads 50`, le nombre de threads
+dimensionné sur le nombre de clients connectés) et un `--timeout` supérieur à
+ATTENTE_MAX (30 s par défaut pour gunicorn).
+
+Les curseurs portent (date, id) du dernier élément transmis, comme
+PaginationCurseur : deux notifications créées à la même microseconde ne
+peuvent pas se masquer l'une l'autre.
+"""
+import base64
+import binascii
+import json
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+CLE_SIGNAL = 'evenements:signal:{user_id}'
+
+# Délai d'attente d'une requête long-poll (secondes), nettement sous le
+# timeout des workers (30 s par défaut pour gunicorn)
+ATTENTE_DEFAUT = 20
+ATTENTE_MAX = 25
+INTERVALLE_VERIFICATION = 0.5
+
+
+def signaler_evenement(user_ids):
+    """Réveiller les requêtes en attente des utilisateurs indiqués"""
+    for user_id in user_ids:
+        if not user_id:
+            continue
+        cle = CLE_SIGNAL.format(user_id=user_id)
+        try:
+            cache.incr(cle)
+        except ValueError:
+            cache.set(cle, 1, timeout=None)
+
+
+def _etat_signaux(user):
+    """Compteurs dont le changement justifie de recalculer les deltas"""
+    from apps.machines.politique import get_version_politique
+    return cache.get(CLE_SIGNAL.format(user_id=user.pk), 0), get_version_politique(user.pk)
+
+
+def encoder_curseur(curseur):
+    """Curseur opaque transmis au client"""
+    contenu = json.dumps(curseur, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(contenu).decode('ascii')
+
+
+def decoder_curseur(valeur):
+    """Décoder un curseur client (None s'il est absent ou invalide)"""
+    if not valeur:
+        return None
+    try:
+        curseur = json.loads(base64.urlsafe_b64decode(valeur.encode('ascii')))
+    except (binascii.Error, ValueError, UnicodeError):
+        return None
+    if not isinstance(curseur, dict) or not {'n', 't', 'v', 'e'} <= set(curseur):
+        return None
+    if not all(isinstance(curseur[cle], str) for cle in ('n', 't', 'v', 'e')):
+        return None
+    try:
+        if parse_datetime(curseur['n']) is None or parse_datetime(curseur['t']) is None:
+            return None
+        # Identifiants des derniers éléments transmis (absents des anciens curseurs)
+        for cle in ('ni', 'ti'):
+            if curseur.setdefault(cle, ''):
+                uuid.UUID(curseur[cle])
+    except (ValueError, TypeError, AttributeError):
+        return None
+    return curseur
+
+
+def curseur_initial(user):
+    """Curseur positionné sur l'état actuel : seuls les changements futurs seront transmis"""
+    from apps.machines.politique import get_snapshot
+
+    maintenant = timezone.now().isoformat()
+    snapshot = get_snapshot(user)
+    return {'n': maintenant, 'ni': '', 't': maintenant, 'ti': '', 'v': snapshot['version'], 'e': snapshot['etag']}
+
+
+def _apres(champ, date, pk):
+    """Filtre des éléments postérieurs au curseur (date, id) sur `champ`"""
+    if not pk:
+        return Q(**{f'{champ}__gt': date})
+    return Q(**{f'{champ}__gt': date}) | Q(**{champ: date, 'pk__gt': pk})
+
+
+def calculer_deltas(user, curseur):
+    """Retourne (événements, nouveau curseur) depuis le curseur donné"""
+    from apps.machines.politique import get_snapshot, get_version_politique
+    from .models import Ticket, NotificationTicket
+    from .serializers import NotificationTicketSerializer
+
+    evenements = []
+    curseur = dict(curseur)
+
+    # Politique de blocage : ne reconstruire le snapshot que si sa version a changé
+    version = '{}.{}'.format(*get_version_politique(user.pk))
+    if version != curseur['v']:
+        snapshot = get_snapshot(user)
+        curseur['v'] = snapshot['version']
+        if snapshot['etag'] != curseur['e']:
+            curseur['e'] = snapshot['etag']
+            evenements.append({
+                'type': 'politique',
+                'version': snapshot['version'],
+                'etag': snapshot['etag'],
+                'logiciels': snapshot['logiciels'],
+            })
+
+    # Nouvelles notifications (mêmes règles que NotificationListView)
+    notifications = list(
+        NotificationTicket.objects.filter(
+            _apres('date_creation', parse_datetime(curseur['n']), curseur['ni']),
+            destinataire=user,
+            ticket__assigne_a=user
+        ).select_related('ticket', 'commentaire', 'commentaire__auteur').order_by('date_creation', 'pk')
+    )
+    if notifications:
+        curseur['n'] = notifications[-1].date_creation.isoformat()
+        curseur['ni'] = str(notifications[-1].pk)
+        for donnees in NotificationTicketSerializer(notifications, many=True).data:
+            evenements.append({'type': 'notification', 'notification': donnees})
+
+    # Changements de statut des tickets demandés ou assignés
+    tickets = list(
+        Ticket.objects.filter(
+            Q(demandeur=user) | Q(assigne_a=user),
+            _apres('date_changement_statut', parse_datetime(curseur['t']), curseur['ti'])
+        ).only('id', 'numero', 'titre', 'statut', 'date_changement_statut').order_by('date_changement_statut', 'pk')
+    )
+    if tickets:
+        curseur['t'] = tickets[-1].date_changement_statut.isoformat()
+        curseur['ti'] = str(tickets[-1].pk)
+        for ticket in tickets:
+            evenements.append({
+                'type': 'statut_ticket',
+                'ticket_id': str(ticket.id),
+                'numero': ticket.numero,
+                'titre': ticket.titre,
+                'statut': ticket.statut,
+                'date_changement_statut': ticket.date_changement_statut.isoformat(),
+            })
+
+    return evenements, curseur
+
+
+def attendre_evenements(user, curseur, attente=ATTENTE_DEFAUT):
+    """
+    Attendre des événements pour l'utilisateur pendant au plus `attente` secondes
+
+    Les deltas sont calculés une première fois (événements survenus pendant la
+    reconnexion du client), puis uniquement quand un compteur change.
+    """
+    fin = time.monotonic() + attente
+    signaux = _etat_signaux(user)
+    evenements, curseur = calculer_deltas(user, curseur)
+
+    while not evenements and time.monotonic() < fin:
+        time.sleep(min(INTERVALLE_VERIFICATION, max(fin - time.monotonic(), 0)))
+        nouveaux_signaux = _etat_signaux(user)
+        if nouveaux_signaux != signaux:
+            signaux = nouveaux_signaux
+            evenements, curseur = calculer_deltas(user, curseur)
+
+    return evenements, curseur
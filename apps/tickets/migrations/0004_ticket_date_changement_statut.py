@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0003_alter_ticket_statut'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='date_changement_statut',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Date du dernier changement de statut', null=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0004_ticket_date_changement_statut'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompteurTicket',
+            fields=[
+                ('annee', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('dernier_numero', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Compteur de tickets',
+                'verbose_name_plural': 'Compteurs de tickets',
+                'ordering': ['-annee'],
+            },
+        ),
+    ]
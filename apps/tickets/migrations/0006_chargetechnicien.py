@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+POIDS_PRIORITE = {'basse': 1, 'normale': 2, 'haute': 4, 'critique': 8, 'urgente': 8}
+
+
+def initialiser_charges(apps, schema_editor):
+    """Créer les compteurs de charge à partir des tickets ouverts existants"""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Ticket = apps.get_model('tickets', 'Ticket')
+    ChargeTechnicien = apps.get_model('tickets', 'ChargeTechnicien')
+
+    charges = {pk: [0, 0] for pk in User.objects.filter(role='technicien').values_list('pk', flat=True)}
+    tickets = Ticket.objects.filter(assigne_a__isnull=False).exclude(statut__in=['resolu', 'ferme', 'rejete'])
+    for technicien_id, priorite, nombre in (
+        tickets.order_by().values_list('assigne_a', 'priorite').annotate(nombre=models.Count('pk'))
+    ):
+        charge = charges.setdefault(technicien_id, [0, 0])
+        charge[0] += nombre
+        charge[1] += nombre * POIDS_PRIORITE.get(priorite, 1)
+
+    ChargeTechnicien.objects.bulk_create([
+        ChargeTechnicien(technicien_id=pk, tickets_ouverts=ouverts, charge_ponderee=ponderee)
+        for pk, (ouverts, ponderee) in charges.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0001_initial'),
+        ('tickets', '0005_compteurticket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categorieticket',
+            name='techniciens',
+            field=models.ManyToManyField(blank=True, help_text='Techniciens compétents (tous si vide)', limit_choices_to={'role': 'technicien'}, related_name='categories_competence', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.CreateModel(
+            name='ChargeTechnicien',
+            fields=[
+                ('technicien', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='charge', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('tickets_ouverts', models.IntegerField(default=0)),
+                ('charge_ponderee', models.IntegerField(default=0, help_text='Somme des poids de priorité des tickets ouverts')),
+                ('derniere_assignation', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Charge de technicien',
+                'verbose_name_plural': 'Charges des techniciens',
+                'indexes': [models.Index(fields=['tickets_ouverts', 'derniere_assignation'], name='tickets_cha_tickets_6aa9e6_idx'), models.Index(fields=['charge_ponderee', 'derniere_assignation'], name='tickets_cha_charge__26a127_idx'), models.Index(fields=['derniere_assignation'], name='tickets_cha_dernier_80c176_idx')],
+            },
+        ),
+        migrations.RunPython(initialiser_charges, migrations.RunPython.noop),
+    ]
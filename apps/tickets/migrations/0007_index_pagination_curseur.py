@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0006_chargetechnicien'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificationticket',
+            index=models.Index(fields=['destinataire', 'date_creation', 'id'], name='tickets_not_destina_4d07bf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['date_creation', 'id'], name='tickets_tic_date_cr_bd5c78_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['demandeur', 'date_creation', 'id'], name='tickets_tic_demande_fd2e9f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['assigne_a', 'date_creation', 'id'], name='tickets_tic_assigne_4a9aa4_idx'),
+        ),
+    ]
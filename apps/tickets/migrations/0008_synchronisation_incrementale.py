@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:03
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+import django.utils.timezone
+
+
+def initialiser_date_modification(apps, schema_editor):
+    """Dater les notifications existantes de leur dernière lecture ou de leur création"""
+    NotificationTicket = apps.get_model('tickets', 'NotificationTicket')
+    NotificationTicket.objects.update(date_modification=Coalesce('date_lecture', 'date_creation'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0007_index_pagination_curseur'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuppressionSynchronisee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modele', models.CharField(choices=[('ticket', 'Ticket'), ('commentaire', 'Commentaire'), ('notification', 'Notification')], max_length=20)),
+                ('objet_id', models.UUIDField()),
+                ('date_suppression', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Suppression synchronisée',
+                'verbose_name_plural': 'Suppressions synchronisées',
+            },
+        ),
+        migrations.AddField(
+            model_name='notificationticket',
+            name='date_modification',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(initialiser_date_modification, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='commentaireticket',
+            index=models.Index(fields=['date_modification', 'id'], name='tickets_com_date_mo_cf5f2a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationticket',
+            index=models.Index(fields=['destinataire', 'date_modification', 'id'], name='tickets_not_destina_b423ad_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['date_modification', 'id'], name='tickets_tic_date_mo_07c8fa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='suppressionsynchronisee',
+            index=models.Index(fields=['modele', 'date_suppression'], name='tickets_sup_modele_c30677_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:05
+
+from django.db import migrations, models
+
+
+POIDS_PRIORITE = {'basse': 1, 'normale': 2, 'haute': 4, 'critique': 8, 'urgente': 8}
+
+
+def retirer_tickets_rejetes(apps, schema_editor):
+    """Reconstruire les compteurs de charge : les tickets rejetés n'y comptent plus"""
+    ChargeTechnicien = apps.get_model('tickets', 'ChargeTechnicien')
+    Ticket = apps.get_model('tickets', 'Ticket')
+
+    charges = {pk: [0, 0] for pk in ChargeTechnicien.objects.values_list('technicien_id', flat=True)}
+    tickets = Ticket.objects.filter(assigne_a__isnull=False).exclude(statut__in=['resolu', 'ferme', 'rejete'])
+    for technicien_id, priorite, nombre in (
+        tickets.order_by().values_list('assigne_a', 'priorite').annotate(nombre=models.Count('pk'))
+    ):
+        charge = charges.setdefault(technicien_id, [0, 0])
+        charge[0] += nombre
+        charge[1] += nombre * POIDS_PRIORITE.get(priorite, 1)
+
+    for technicien_id, (ouverts, ponderee) in charges.items():
+        ChargeTechnicien.objects.update_or_create(
+            technicien_id=technicien_id,
+            defaults={'tickets_ouverts': ouverts, 'charge_ponderee': ponderee},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0008_synchronisation_incrementale'),
+    ]
+
+    operations = [
+        migrations.RunPython(retirer_tickets_rejetes, migrations.RunPython.noop),
+    ]
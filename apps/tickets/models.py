@@ -1,10 +1,11 @@
 """
 Modèles pour la gestion des tickets (incidents et demandes)
 """
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
 from django.contrib.auth import get_user_model
 from django.core.validators import FileExtensionValidator
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 import uuid
@@ -23,6 +24,11 @@ class CategorieTicket(models.Model):
     # Paramètres de traitement
     sla_heures = models.IntegerField(default=24, help_text="SLA en heures")
     assignation_auto = models.BooleanField(default=False)
+    techniciens = models.ManyToManyField(
+        User, blank=True, related_name='categories_competence',
+        limit_choices_to={'role': 'technicien'},
+        help_text="Techniciens compétents (tous si vide)"
+    )
     
     class Meta:
         verbose_name = "Catégorie de ticket"
@@ -33,6 +39,136 @@ class CategorieTicket(models.Model):
         return self.nom
 
 
+class CompteurTicket(models.Model):
+    """
+    Séquence annuelle des numéros de ticket
+
+    Une ligne par année : chaque allocation est un UPDATE atomique
+    `dernier_numero = dernier_numero + 1` sur cette ligne, relu dans la même
+    transaction. Le verrou d'écriture pris par l'UPDATE (ligne sous PostgreSQL,
+    base sous SQLite) sérialise les allocations de tous les processus jusqu'au
+    commit, sans compter les tickets. Un numéro alloué dans une transaction
+    annulée est perdu : la séquence peut avoir des trous, mais jamais de doublons.
+    """
+    annee = models.PositiveIntegerField(primary_key=True)
+    dernier_numero = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Compteur de tickets"
+        verbose_name_plural = "Compteurs de tickets"
+        ordering = ['-annee']
+
+    def __str__(self):
+        return f"{self.annee} : {self.dernier_numero}"
+
+    @staticmethod
+    def numero_initial(annee):
+        """Dernier numéro déjà attribué pour l'année (tickets antérieurs au compteur)"""
+        dernier = (
+            Ticket.objects.filter(numero__regex=rf'^T{annee}[0-9]{{6}}$')
+            .order_by('-numero')
+            .values_list('numero', flat=True)
+            .first()
+        )
+        return int(dernier[5:]) if dernier else 0
+
+    @classmethod
+    def allouer(cls, annee):
+        """Réserver et retourner le prochain numéro de séquence de l'année"""
+        with transaction.atomic():
+            if not cls.objects.filter(annee=annee).update(dernier_numero=F('dernier_numero') + 1):
+                # Première allocation de l'année : créer la ligne, ou reprendre
+                # si un autre processus l'a créée entre-temps
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(annee=annee, dernier_numero=cls.numero_initial(annee) + 1)
+                except IntegrityError:
+                    cls.objects.filter(annee=annee).update(dernier_numero=F('dernier_numero') + 1)
+            return cls.objects.filter(annee=annee).values_list('dernier_numero', flat=True).get()
+
+
+# Contribution d'un ticket chargé sans ses champs de charge (champs différés)
+CHARGE_INCONNUE = object()
+
+# Statuts pour lesquels un ticket ne compte plus dans la charge de son technicien
+STATUTS_FERMES = ('resolu', 'ferme', 'rejete')
+
+# Poids d'un ticket ouvert dans la charge pondérée par l'urgence (SLA)
+POIDS_PRIORITE = {
+    'basse': 1,
+    'normale': 2,
+    'haute': 4,
+    'critique': 8,
+    'urgente': 8,
+}
+
+
+class ChargeTechnicien(models.Model):
+    """
+    Charge de travail courante d'un technicien
+
+    Les compteurs sont tenus à jour de façon incrémentale à chaque assignation,
+    réassignation, résolution ou suppression d'un ticket, ce qui permet de
+    choisir le technicien le moins chargé par une requête indexée au lieu de
+    compter ses tickets. `recalculer` reconstruit tous les compteurs (après des
+    `QuerySet.update()` qui contournent `Ticket.save`).
+    """
+    technicien = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True,
+                                      related_name='charge')
+    tickets_ouverts = models.IntegerField(default=0)
+    charge_ponderee = models.IntegerField(default=0, help_text="Somme des poids de priorité des tickets ouverts")
+    derniere_assignation = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Charge de technicien"
+        verbose_name_plural = "Charges des techniciens"
+        indexes = [
+            models.Index(fields=['tickets_ouverts', 'derniere_assignation']),
+            models.Index(fields=['charge_ponderee', 'derniere_assignation']),
+            models.Index(fields=['derniere_assignation']),
+        ]
+
+    def __str__(self):
+        return f"{self.technicien_id} : {self.tickets_ouverts} ticket(s) ouvert(s)"
+
+    @classmethod
+    def appliquer(cls, contribution, sens):
+        """Ajouter (sens=1) ou retirer (sens=-1) la contribution d'un ticket"""
+        if contribution is None:
+            return
+        technicien_id, poids = contribution
+        if not cls.objects.filter(technicien_id=technicien_id).update(
+            tickets_ouverts=F('tickets_ouverts') + sens,
+            charge_ponderee=F('charge_ponderee') + sens * poids,
+        ) and sens > 0:
+            # Premier ticket d'un technicien sans compteur
+            cls.recalculer([technicien_id])
+
+    @classmethod
+    def recalculer(cls, technicien_ids=None):
+        """Reconstruire les compteurs à partir des tickets ouverts (tous les techniciens par défaut)"""
+        techniciens = User.objects.filter(role='technicien')
+        tickets = Ticket.objects.filter(assigne_a__isnull=False).exclude(statut__in=STATUTS_FERMES)
+        if technicien_ids is not None:
+            techniciens = User.objects.filter(pk__in=technicien_ids)
+            tickets = tickets.filter(assigne_a__in=technicien_ids)
+
+        charges = {pk: [0, 0] for pk in techniciens.values_list('pk', flat=True)}
+        for technicien_id, priorite, nombre in (
+            tickets.order_by().values_list('assigne_a', 'priorite').annotate(nombre=models.Count('pk'))
+        ):
+            charge = charges.setdefault(technicien_id, [0, 0])
+            charge[0] += nombre
+            charge[1] += nombre * POIDS_PRIORITE.get(priorite, 1)
+
+        with transaction.atomic():
+            for technicien_id, (tickets_ouverts, charge_ponderee) in charges.items():
+                cls.objects.update_or_create(
+                    technicien_id=technicien_id,
+                    defaults={'tickets_ouverts': tickets_ouverts, 'charge_ponderee': charge_ponderee},
+                )
+
+
 class Ticket(models.Model):
     """Modèle principal pour les tickets"""
     
@@ -101,20 +237,61 @@ class Ticket(models.Model):
     
     # Métadonnées
     date_modification = models.DateTimeField(auto_now=True)
+    date_changement_statut = models.DateTimeField(null=True, blank=True, db_index=True,
+                                                  help_text="Date du dernier changement de statut")
     
     class Meta:
         verbose_name = "Ticket"
         verbose_name_plural = "Tickets"
         ordering = ['-date_creation']
+        indexes = [
+            # Pagination par curseur (date, id)
+            models.Index(fields=['date_creation', 'id']),
+            models.Index(fields=['demandeur', 'date_creation', 'id']),
+            models.Index(fields=['assigne_a', 'date_creation', 'id']),
+            # Synchronisation incrémentale (?since=)
+            models.Index(fields=['date_modification', 'id']),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Mémoriser le statut chargé pour détecter ses changements à l'enregistrement
+        instance._statut_charge = instance.__dict__.get('statut')
+        if {'assigne_a_id', 'statut', 'priorite'} <= instance.__dict__.keys():
+            instance._charge_chargee = instance.contribution_charge()
+        else:
+            instance._charge_chargee = CHARGE_INCONNUE
+        return instance
+    
+    def contribution_charge(self):
+        """(technicien, poids) compté dans la charge du technicien, ou None si le ticket n'y compte pas"""
+        assigne_a_id = self.__dict__.get('assigne_a_id')
+        if not assigne_a_id or self.__dict__.get('statut') in STATUTS_FERMES:
+            return None
+        return assigne_a_id, POIDS_PRIORITE.get(self.__dict__.get('priorite'), 1)
     
     def save(self, *args, **kwargs):
+        self._statut_modifie = self._state.adding or self.statut != getattr(self, '_statut_charge', None)
+        if self._statut_modifie:
+            self.date_changement_statut = timezone.now()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'statut' in update_fields:
+                kwargs['update_fields'] = set(update_fields) | {'date_changement_statut'}
         if not self.numero:
-            # Générer un numéro de ticket unique
-            from django.utils import timezone
+            # Générer un numéro de ticket unique à partir de la séquence annuelle
             year = timezone.now().year
-            count = Ticket.objects.filter(date_creation__year=year).count() + 1
-            self.numero = f"T{year}{count:06d}"
+            self.numero = f"T{year}{CompteurTicket.allouer(year):06d}"
+        ancienne_charge = getattr(self, '_charge_chargee', None)
+        if ancienne_charge is CHARGE_INCONNUE:
+            # Instance chargée avec des champs différés : relire l'état enregistré
+            ancienne_charge = Ticket.objects.only('assigne_a', 'statut', 'priorite').get(pk=self.pk).contribution_charge()
         super().save(*args, **kwargs)
+        self._statut_charge = self.statut
+        self._charge_chargee = self.contribution_charge()
+        if ancienne_charge != self._charge_chargee:
+            ChargeTechnicien.appliquer(ancienne_charge, -1)
+            ChargeTechnicien.appliquer(self._charge_chargee, 1)
     
     def __str__(self):
         return f"{self.numero} - {self.titre}"
@@ -174,6 +351,10 @@ class CommentaireTicket(models.Model):
         verbose_name = "Commentaire de ticket"
         verbose_name_plural = "Commentaires de tickets"
         ordering = ['date_creation']
+        indexes = [
+            # Synchronisation incrémentale (?since=)
+            models.Index(fields=['date_modification', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.ticket.numero} - {self.auteur.nom_complet} - {self.date_creation}"
@@ -316,11 +497,18 @@ class NotificationTicket(models.Model):
     date_lecture = models.DateTimeField(null=True, blank=True)
     
     date_creation = models.DateTimeField(auto_now_add=True)
+    date_modification = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = "Notification de ticket"
         verbose_name_plural = "Notifications de tickets"
         ordering = ['-date_creation']
+        indexes = [
+            # Pagination par curseur (date, id) des notifications d'un destinataire
+            models.Index(fields=['destinataire', 'date_creation', 'id']),
+            # Synchronisation incrémentale (?since=)
+            models.Index(fields=['destinataire', 'date_modification', 'id']),
+        ]
         unique_together = ['commentaire', 'destinataire']  # Éviter les doublons
     
     def __str__(self):
@@ -334,6 +522,37 @@ class NotificationTicket(models.Model):
             self.save()
 
 
+class SuppressionSynchronisee(models.Model):
+    """
+    Trace d'un objet supprimé (tombstone) pour la synchronisation incrémentale
+
+    Les clients qui synchronisent avec `?since=` reçoivent les identifiants des
+    objets supprimés depuis leur jeton. Les traces plus anciennes que
+    `RETENTION_SUPPRESSIONS` sont purgées ; un jeton antérieur impose alors une
+    resynchronisation complète.
+    """
+    
+    MODELE_CHOICES = [
+        ('ticket', 'Ticket'),
+        ('commentaire', 'Commentaire'),
+        ('notification', 'Notification'),
+    ]
+    
+    modele = models.CharField(max_length=20, choices=MODELE_CHOICES)
+    objet_id = models.UUIDField()
+    date_suppression = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = "Suppression synchronisée"
+        verbose_name_plural = "Suppressions synchronisées"
+        indexes = [
+            models.Index(fields=['modele', 'date_suppression']),
+        ]
+    
+    def __str__(self):
+        return f"{self.modele} {self.objet_id} supprimé le {self.date_suppression}"
+
+
 @receiver(post_save, sender=CommentaireTicket)
 def creer_notification_commentaire(sender, instance, created, **kwargs):
     """Créer une notification quand un commentaire est ajouté - seulement pour les techniciens assignés"""
@@ -348,4 +567,62 @@ def creer_notification_commentaire(sender, instance, created, **kwargs):
                 commentaire=instance,
                 destinataire=instance.ticket.assigne_a,
                 defaults={'lu': False}
-            )
\ No newline at end of file
+            )
+
+
+@receiver(post_save, sender=NotificationTicket)
+def signaler_notification(sender, instance, created, **kwargs):
+    """Réveiller le canal d'événements du destinataire d'une nouvelle notification"""
+    if created:
+        from .evenements import signaler_evenement
+        signaler_evenement([instance.destinataire_id])
+
+
+@receiver(post_save, sender=Ticket)
+def signaler_changement_statut(sender, instance, **kwargs):
+    """Réveiller le canal d'événements du demandeur et du technicien quand le statut change"""
+    if getattr(instance, '_statut_modifie', False):
+        from .evenements import signaler_evenement
+        signaler_evenement([instance.demandeur_id, instance.assigne_a_id])
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+def invalider_statistiques_ticket(sender, instance, **kwargs):
+    """Rendre obsolètes les statistiques en cache quand un ticket change"""
+    from .statistiques import invalider_statistiques
+    invalider_statistiques()
+
+
+@receiver(post_delete, sender=Ticket)
+def retirer_charge_ticket(sender, instance, **kwargs):
+    """Retirer un ticket supprimé de la charge de son technicien"""
+    contribution = getattr(instance, '_charge_chargee', None)
+    if contribution is CHARGE_INCONNUE:
+        assigne_a_id = instance.__dict__.get('assigne_a_id')
+        ChargeTechnicien.recalculer([assigne_a_id] if assigne_a_id else None)
+    else:
+        ChargeTechnicien.appliquer(contribution, -1)
+
+
+@receiver(post_delete, sender=Ticket)
+@receiver(post_delete, sender=CommentaireTicket)
+@receiver(post_delete, sender=NotificationTicket)
+def tracer_suppression(sender, instance, **kwargs):
+    """Conserver l'identifiant des objets supprimés pour les clients synchronisés"""
+    modele = {
+        Ticket: 'ticket',
+        CommentaireTicket: 'commentaire',
+        NotificationTicket: 'notification',
+    }[sender]
+    SuppressionSynchronisee.objects.create(modele=modele, objet_id=instance.pk)
+
+
+@receiver(post_save, sender=User)
+def creer_charge_technicien(sender, instance, created, **kwargs):
+    """Créer le compteur de charge des techniciens"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and 'role' not in update_fields:
+        return
+    if instance.role == 'technicien':
+        ChargeTechnicien.objects.get_or_create(technicien=instance)
@@ -7,6 +7,7 @@ from .models import (
     PieceJointeTicket, EscaladeTicket, ModeleTicket, SLA, NotificationTicket
 )
 from apps.users.serializers import UserSerializer
+from itsm_backend.champs import ChampsDynamiquesMixin
 
 
 class CategorieTicketSerializer(serializers.ModelSerializer):
@@ -17,7 +18,7 @@ class CategorieTicketSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class TicketSerializer(serializers.ModelSerializer):
+class TicketSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer pour les tickets"""
     demandeur_info = UserSerializer(source='demandeur', read_only=True)
     assigne_a_info = UserSerializer(source='assigne_a', read_only=True)
@@ -47,6 +48,31 @@ class TicketSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class TicketResumeSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
+    """Serializer résumé pour les listes de tickets (détails des personnes via ?expand=)"""
+    demandeur_nom = serializers.CharField(source='demandeur.nom_complet', read_only=True)
+    assigne_a_nom = serializers.CharField(source='assigne_a.nom_complet', read_only=True, default=None)
+    categorie_nom = serializers.CharField(source='categorie.nom', read_only=True, default=None)
+    
+    class Meta:
+        model = Ticket
+        fields = [
+            'id', 'numero', 'titre', 'description', 'type_ticket',
+            'categorie', 'categorie_nom', 'priorite', 'statut',
+            'demandeur', 'demandeur_nom', 'assigne_a', 'assigne_a_nom',
+            'machine', 'date_creation', 'date_echeance', 'date_modification',
+            'est_en_retard'
+        ]
+        read_only_fields = fields
+        extensions = {
+            'demandeur_info': lambda: UserSerializer(source='demandeur', read_only=True),
+            'assigne_a_info': lambda: UserSerializer(source='assigne_a', read_only=True),
+            'categorie_info': lambda: CategorieTicketSerializer(source='categorie', read_only=True),
+            'date_resolution': lambda: serializers.DateTimeField(read_only=True),
+            'temps_ouvert': lambda: serializers.ReadOnlyField(),
+        }
+
+
 class CommentaireTicketSerializer(serializers.ModelSerializer):
     """Serializer pour les commentaires de tickets"""
     auteur_info = UserSerializer(source='auteur', read_only=True)
@@ -0,0 +1,136 @@
+"""
+Statistiques agrégées des tickets
+
+Toutes les valeurs globales (total, répartition par statut et par priorité,
+retards, résolutions du mois) sont calculées en une seule requête d'agrégation
+conditionnelle. Les ventilations optionnelles (catégorie, technicien, mois)
+ajoutent chacune une requête groupée.
+
+Les résultats sont mis en cache par portée de rôle (tous les administrateurs
+partagent la même portée, les autres utilisateurs ont la leur) pendant une
+courte durée, et invalidés par incrément de version à chaque enregistrement ou
+suppression de ticket.
+"""
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Ticket
+
+# Durée de vie des statistiques en cache (secondes)
+DUREE_STATISTIQUES = 60
+
+CLE_VERSION = 'tickets:statistiques:version'
+CLE_STATISTIQUES = 'tickets:statistiques:{version}:{portee}:{ventilations}'
+
+VENTILATIONS = ('categorie', 'technicien', 'mois')
+
+# Statuts pris en compte pour les tickets en retard
+STATUTS_OUVERTS = ['nouveau', 'assigne', 'en_cours']
+
+
+def get_version():
+    """Version courante des statistiques (initialisée si nécessaire)"""
+    version = cache.get(CLE_VERSION)
+    if version is None:
+        cache.add(CLE_VERSION, 1, timeout=None)
+        version = cache.get(CLE_VERSION, 1)
+    return version
+
+
+def invalider_statistiques():
+    """Rendre obsolètes toutes les statistiques en cache"""
+    try:
+        cache.incr(CLE_VERSION)
+    except ValueError:
+        cache.set(CLE_VERSION, 2, timeout=None)
+
+
+def portee_utilisateur(user):
+    """Portée de visibilité des tickets : partagée par les admins, individuelle sinon"""
+    if user.role == 'admin':
+        return 'admin'
+    return f'{user.role}:{user.pk}'
+
+
+def lire_ventilations(valeur):
+    """Ventilations demandées (`?ventilation=categorie,mois`), dans l'ordre canonique"""
+    demandees = {v.strip() for v in (valeur or '').split(',') if v.strip()}
+    return [v for v in VENTILATIONS if v in demandees]
+
+
+def calculer_statistiques(queryset, ventilations=()):
+    """Calculer les statistiques d'un queryset de tickets"""
+    maintenant = timezone.now()
+    debut_mois = timezone.localtime(maintenant).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    # Pas de select_related/prefetch inutiles dans les agrégations
+    queryset = queryset.select_related(None).prefetch_related(None).order_by()
+
+    agregats = {
+        'total': Count('pk'),
+        'en_retard': Count('pk', filter=Q(date_echeance__lt=maintenant, statut__in=STATUTS_OUVERTS)),
+        'resolus_ce_mois': Count('pk', filter=Q(date_resolution__gte=debut_mois)),
+    }
+    for statut, label in Ticket.STATUT_CHOICES:
+        agregats[f'statut_{statut}'] = Count('pk', filter=Q(statut=statut))
+    for priorite, label in Ticket.PRIORITE_CHOICES:
+        agregats[f'priorite_{priorite}'] = Count('pk', filter=Q(priorite=priorite))
+    resultat = queryset.aggregate(**agregats)
+
+    stats = {
+        'total': resultat['total'],
+        'par_statut': {statut: resultat[f'statut_{statut}'] for statut, label in Ticket.STATUT_CHOICES},
+        'par_priorite': {priorite: resultat[f'priorite_{priorite}'] for priorite, label in Ticket.PRIORITE_CHOICES},
+        'en_retard': resultat['en_retard'],
+        'resolus_ce_mois': resultat['resolus_ce_mois'],
+    }
+
+    if 'categorie' in ventilations:
+        stats['par_categorie'] = [
+            {'categorie': ligne['categorie'], 'nom': ligne['categorie__nom'], 'total': ligne['total']}
+            for ligne in queryset.values('categorie', 'categorie__nom').annotate(total=Count('pk')).order_by('categorie__nom')
+        ]
+
+    if 'technicien' in ventilations:
+        stats['par_technicien'] = [
+            {
+                'technicien': ligne['assigne_a'],
+                'nom': ' '.join(filter(None, [ligne['assigne_a__prenom'], ligne['assigne_a__nom']])),
+                'total': ligne['total'],
+                'ouverts': ligne['ouverts'],
+            }
+            for ligne in queryset.values('assigne_a', 'assigne_a__prenom', 'assigne_a__nom').annotate(
+                total=Count('pk'),
+                ouverts=Count('pk', filter=Q(statut__in=STATUTS_OUVERTS)),
+            ).order_by('assigne_a__nom', 'assigne_a__prenom')
+        ]
+
+    if 'mois' in ventilations:
+        stats['par_mois'] = [
+            {
+                'mois': ligne['mois'].strftime('%Y-%m'),
+                'crees': ligne['crees'],
+                'resolus': ligne['resolus'],
+            }
+            for ligne in queryset.annotate(mois=TruncMonth('date_creation')).values('mois').annotate(
+                crees=Count('pk'),
+                resolus=Count('pk', filter=Q(statut__in=['resolu', 'ferme'])),
+            ).order_by('mois')
+        ]
+
+    return stats
+
+
+def get_statistiques(user, queryset, ventilations=()):
+    """Statistiques des tickets visibles par l'utilisateur, servies depuis le cache"""
+    cle = CLE_STATISTIQUES.format(
+        version=get_version(),
+        portee=portee_utilisateur(user),
+        ventilations=','.join(ventilations) or '-',
+    )
+    stats = cache.get(cle)
+    if stats is None:
+        stats = calculer_statistiques(queryset, ventilations)
+        cache.set(cle, stats, timeout=DUREE_STATISTIQUES)
+    return stats
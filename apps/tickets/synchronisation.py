@@ -0,0 +1,168 @@
+"""
+Synchronisation incrémentale des tickets, commentaires et notifications
+
+Plutôt que de retélécharger les listes complètes à chaque rafraîchissement, les
+clients conservent un jeton de synchronisation et demandent uniquement ce qui a
+changé depuis : `GET .../?since=<jeton>`.
+
+- Toute réponse de liste porte l'en-tête `X-Sync-Token`, jeton valable pour
+  l'état renvoyé ;
+- `?since=` accepte ce jeton opaque ou un horodatage ISO 8601 ; `?since=0`
+  synchronise depuis le début ;
+- la réponse contient les objets créés ou modifiés (`date_modification`), les
+  identifiants des objets supprimés depuis le jeton (`supprimes`, d'après
+  `SuppressionSynchronisee`) et le nouveau jeton. Si `complet` est faux, il
+  reste des modifications : rappeler immédiatement avec le nouveau jeton.
+
+Les modifications sont parcourues dans l'ordre (`date_modification`, id) par
+lots. Un jeton de fin de synchronisation recule de `MARGE_SYNCHRONISATION` pour
+ne pas manquer les transactions validées juste après la requête : quelques
+objets peuvent être renvoyés deux fois, les clients fusionnent par identifiant.
+"""
+import base64
+import binascii
+import json
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from .models import SuppressionSynchronisee
+
+PARAMETRE_SINCE = 'since'
+EN_TETE_JETON = 'X-Sync-Token'
+
+# Recul du jeton de fin de synchronisation (transactions en cours de validation)
+MARGE_SYNCHRONISATION = timedelta(seconds=5)
+# Durée de conservation des suppressions : au-delà, resynchronisation complète
+RETENTION_SUPPRESSIONS = timedelta(days=30)
+# Nombre maximal d'objets modifiés par réponse
+TAILLE_LOT = 500
+
+CLE_PURGE = 'tickets:synchronisation:purge'
+INTERVALLE_PURGE = 3600
+
+
+class JetonExpire(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'Jeton de synchronisation expiré : resynchronisation complète nécessaire.'
+    default_code = 'jeton_expire'
+
+
+def encoder_jeton(date, pk=None):
+    """Jeton opaque transmis au client"""
+    contenu = {'d': date.isoformat(), 'i': str(pk) if pk else ''}
+    return base64.urlsafe_b64encode(json.dumps(contenu, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def jeton_courant():
+    """Jeton couvrant tout ce qui est validé à cet instant"""
+    return encoder_jeton(timezone.now() - MARGE_SYNCHRONISATION)
+
+
+def lire_since(valeur):
+    """
+    Décoder `?since=` en (date, id) ; (None, '') pour `0` (depuis le début)
+
+    Lève ValidationError si la valeur n'est ni un jeton ni un horodatage.
+    """
+    valeur = (valeur or '').strip()
+    if valeur in ('', '0'):
+        return None, ''
+
+    # Horodatage ISO (le '+' du fuseau devient une espace dans une query string)
+    date = parse_datetime(valeur.replace(' ', '+'))
+    pk = ''
+    if date is None:
+        try:
+            contenu = json.loads(base64.urlsafe_b64decode(valeur.encode('ascii')))
+            date = parse_datetime(contenu['d'])
+            pk = contenu.get('i') or ''
+        except (binascii.Error, ValueError, UnicodeError, KeyError, TypeError):
+            date = None
+    if date is None:
+        raise ValidationError({PARAMETRE_SINCE: 'Jeton de synchronisation invalide.'})
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date, pk
+
+
+def purger_suppressions():
+    """Supprimer les traces plus anciennes que la durée de conservation (au plus une fois par heure)"""
+    if cache.add(CLE_PURGE, 1, timeout=INTERVALLE_PURGE):
+        SuppressionSynchronisee.objects.filter(
+            date_suppression__lt=timezone.now() - RETENTION_SUPPRESSIONS
+        ).delete()
+
+
+class SynchronisationMixin:
+    """
+    Mixin de vue de liste ajoutant `?since=` et l'en-tête `X-Sync-Token`
+
+    `modele_synchronise` est le nom du modèle dans `SuppressionSynchronisee`.
+    Le queryset filtré par rôle de `get_queryset()` s'applique aux deltas.
+    """
+    modele_synchronise = None
+    champ_synchronisation = 'date_modification'
+
+    def list(self, request, *args, **kwargs):
+        if PARAMETRE_SINCE in request.query_params:
+            return self.lister_modifications(request)
+        # Jeton pris avant la requête : rien de ce qui suit ne peut être manqué
+        jeton = jeton_courant()
+        response = super().list(request, *args, **kwargs)
+        response[EN_TETE_JETON] = jeton
+        return response
+
+    def lister_modifications(self, request):
+        date, pk = lire_since(request.query_params.get(PARAMETRE_SINCE))
+        debut = timezone.now()
+        if date is not None and date < debut - RETENTION_SUPPRESSIONS:
+            raise JetonExpire()
+        purger_suppressions()
+
+        champ = self.champ_synchronisation
+        queryset = self.filter_queryset(self.get_queryset())
+        if pk:
+            try:
+                pk = queryset.model._meta.pk.to_python(pk)
+            except DjangoValidationError:
+                raise ValidationError({PARAMETRE_SINCE: 'Jeton de synchronisation invalide.'})
+            # Suite d'une synchronisation incomplète : reprise après le dernier objet
+            queryset = queryset.filter(Q(**{f'{champ}__gt': date}) | Q(**{champ: date, 'pk__gt': pk}))
+        elif date is not None:
+            queryset = queryset.filter(**{f'{champ}__gte': date})
+        elements = list(queryset.order_by(champ, 'pk')[:TAILLE_LOT + 1])
+        complet = len(elements) <= TAILLE_LOT
+        elements = elements[:TAILLE_LOT]
+
+        supprimes = []
+        if date is not None:
+            supprimes = [
+                str(objet_id) for objet_id in SuppressionSynchronisee.objects.filter(
+                    modele=self.modele_synchronise,
+                    date_suppression__gte=date,
+                ).values_list('objet_id', flat=True).distinct()
+            ]
+
+        if complet:
+            jeton = encoder_jeton(debut - MARGE_SYNCHRONISATION)
+        else:
+            dernier = elements[-1]
+            jeton = encoder_jeton(getattr(dernier, champ), dernier.pk)
+
+        serializer = self.get_serializer(elements, many=True)
+        response = Response({
+            'jeton': jeton,
+            'complet': complet,
+            'results': serializer.data,
+            'supprimes': supprimes,
+        })
+        response[EN_TETE_JETON] = jeton
+        return response
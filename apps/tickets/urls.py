@@ -2,14 +2,13 @@
 URLs pour l'application tickets
 """
 from django.urls import path, include
-from rest_framework.routers import DefaultRouter
+from rest_framework.routers import DefaultRouter, SimpleRouter
 from .views import (
     TicketViewSet, CategorieTicketViewSet, CommentaireTicketViewSet,
     PieceJointeTicketViewSet, EscaladeTicketViewSet, ModeleTicketViewSet, SLAViewSet, NotificationTicketViewSet
 )
 
 router = DefaultRouter()
-router.register(r'', TicketViewSet, basename='ticket')
 router.register(r'categories', CategorieTicketViewSet, basename='categorie')
 router.register(r'commentaires', CommentaireTicketViewSet, basename='commentaire')
 router.register(r'pieces-jointes', PieceJointeTicketViewSet, basename='piece-jointe')
@@ -17,6 +16,13 @@ router.register(r'escalades', EscaladeTicketViewSet, basename='escalade')
 router.register(r'modeles', ModeleTicketViewSet, basename='modele')
 router.register(r'sla', SLAViewSet, basename='sla')
 router.register(r'notifications', NotificationTicketViewSet, basename='notification')
+# Enregistré en dernier : sa route de détail capturerait les préfixes ci-dessus
+router.register(r'', TicketViewSet, basename='ticket')
+
+# Endpoint direct /api/v1/notifications/
+notifications_router = SimpleRouter()
+notifications_router.register(r'', NotificationTicketViewSet, basename='notification-directe')
+notifications_urlpatterns = notifications_router.urls
 
 from .views import NotificationListView
 
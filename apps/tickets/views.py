@@ -4,38 +4,62 @@ Vues pour l'application tickets
 from rest_framework import viewsets, status, permissions, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q, Count
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 from datetime import timedelta
 
+from itsm_backend.champs import ChampsDynamiquesViewMixin
+from itsm_backend.pagination import PaginationCurseur
 from .models import (
     Ticket, CategorieTicket, CommentaireTicket,
     PieceJointeTicket, EscaladeTicket, ModeleTicket, SLA, NotificationTicket
 )
 from .serializers import (
-    TicketSerializer, TicketCreateSerializer, CategorieTicketSerializer,
+    TicketSerializer, TicketResumeSerializer, TicketCreateSerializer, CategorieTicketSerializer,
     CommentaireTicketSerializer, PieceJointeTicketSerializer,
     EscaladeTicketSerializer, ModeleTicketSerializer, SLASerializer, NotificationTicketSerializer
 )
+from .assignation import choisir_technicien
+from .statistiques import get_statistiques, lire_ventilations
+from .synchronisation import SynchronisationMixin
+from .evenements import (
+    ATTENTE_DEFAUT, ATTENTE_MAX, attendre_evenements, curseur_initial,
+    decoder_curseur, encoder_curseur
+)
 
 
-class TicketViewSet(viewsets.ModelViewSet):
+class TicketViewSet(ChampsDynamiquesViewMixin, SynchronisationMixin, viewsets.ModelViewSet):
     """ViewSet pour la gestion des tickets"""
     queryset = Ticket.objects.all()
+    modele_synchronise = 'ticket'
     permission_classes = [permissions.IsAuthenticated]
+    serializer_class = TicketSerializer
+    serializer_liste_class = TicketResumeSerializer
+    actions_liste = ('list', 'mes_tickets', 'assignes')
+    pagination_class = PaginationCurseur
+    # Requêtes SQL par action, authentification comprise (voir itsm_backend/instrumentation.py)
+    budget_requetes = {'list': 3, 'retrieve': 3, 'mes_tickets': 3, 'assignes': 3}
+    
+    # Relations imbriquées par UserSerializer
+    RELATIONS_UTILISATEUR = ('structure', 'groupe', 'site')
     
     def get_serializer_class(self):
         """Retourner le serializer approprié selon l'action"""
         if self.action == 'create':
             return TicketCreateSerializer
-        return TicketSerializer
+        return super().get_serializer_class()
     
     def get_queryset(self):
         """Filtrer les tickets selon l'utilisateur"""
         user = self.request.user
         queryset = Ticket.objects.select_related(
-            'demandeur', 'assigne_a', 'categorie', 'machine'
-        ).prefetch_related('commentaires', 'pieces_jointes')
+            'demandeur', 'assigne_a', 'categorie'
+        )
+        extensions = self.extensions_demandees() if self.est_action_liste() else {'demandeur_info', 'assigne_a_info'}
+        for personne in ('demandeur', 'assigne_a'):
+            if f'{personne}_info' in extensions:
+                queryset = queryset.select_related(*[f'{personne}__{r}' for r in self.RELATIONS_UTILISATEUR])
         
         # Filtrer selon le rôle de l'utilisateur
         if user.role == 'admin':
@@ -50,18 +74,15 @@ class TicketViewSet(viewsets.ModelViewSet):
             # Les utilisateurs normaux voient seulement leurs tickets
             return queryset.filter(demandeur=user)
     
+    @transaction.atomic
     def perform_create(self, serializer):
-        """Créer un ticket avec l'utilisateur connecté comme demandeur et assignation aléatoire d'un technicien"""
-        import random
-        from apps.users.models import User
-        
-        # Récupérer tous les techniciens disponibles
-        techniciens = User.objects.filter(role='technicien', is_active=True)
-        
-        # Assigner aléatoirement un technicien si disponible
-        technicien_assigne = None
-        if techniciens.exists():
-            technicien_assigne = random.choice(techniciens)
+        """Créer un ticket avec l'utilisateur connecté comme demandeur et l'assigner au technicien le plus disponible"""
+        # Choisir le technicien selon la stratégie d'assignation configurée (sa charge
+        # reste verrouillée jusqu'au commit, compteurs mis à jour compris)
+        technicien_assigne = choisir_technicien(
+            categorie=serializer.validated_data.get('categorie'),
+            site=self.request.user.site_id,
+        )
         
         # Sauvegarder le ticket avec assignation
         ticket = serializer.save(
@@ -171,30 +192,13 @@ class TicketViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def statistiques(self, request):
-        """Récupérer les statistiques des tickets"""
-        queryset = self.get_queryset()
-        
-        stats = {
-            'total': queryset.count(),
-            'par_statut': {},
-            'par_priorite': {},
-            'en_retard': queryset.filter(
-                date_echeance__lt=timezone.now(),
-                statut__in=['nouveau', 'assigne', 'en_cours']
-            ).count(),
-            'resolus_ce_mois': queryset.filter(
-                date_resolution__gte=timezone.now().replace(day=1)
-            ).count()
-        }
-        
-        # Statistiques par statut
-        for statut, label in Ticket.STATUT_CHOICES:
-            stats['par_statut'][statut] = queryset.filter(statut=statut).count()
-        
-        # Statistiques par priorité
-        for priorite, label in Ticket.PRIORITE_CHOICES:
-            stats['par_priorite'][priorite] = queryset.filter(priorite=priorite).count()
+        """
+        Récupérer les statistiques des tickets
         
+        `?ventilation=categorie,technicien,mois` ajoute les répartitions correspondantes.
+        """
+        ventilations = lire_ventilations(request.query_params.get('ventilation'))
+        stats = get_statistiques(request.user, self.get_queryset(), ventilations)
         return Response(stats)
 
 
@@ -205,8 +209,10 @@ class CategorieTicketViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class CommentaireTicketViewSet(viewsets.ModelViewSet):
+class CommentaireTicketViewSet(SynchronisationMixin, viewsets.ModelViewSet):
     """ViewSet pour les commentaires de tickets"""
+    modele_synchronise = 'commentaire'
+    filterset_fields = ['ticket']
     serializer_class = CommentaireTicketSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -269,10 +275,13 @@ class SLAViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class NotificationTicketViewSet(viewsets.ModelViewSet):
+class NotificationTicketViewSet(SynchronisationMixin, viewsets.ModelViewSet):
     """ViewSet pour les notifications de tickets"""
+    modele_synchronise = 'notification'
     serializer_class = NotificationTicketSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PaginationCurseur
+    budget_requetes = {'list': 3}
     
     def get_queryset(self):
         """Récupérer les notifications de l'utilisateur connecté - seulement pour les tickets assignés"""
@@ -285,7 +294,9 @@ class NotificationTicketViewSet(viewsets.ModelViewSet):
     def mark_all_read(self, request):
         """Marquer toutes les notifications comme lues"""
         notifications = self.get_queryset().filter(lu=False)
-        count = notifications.update(lu=True, date_lecture=timezone.now())
+        maintenant = timezone.now()
+        # update() ne renseigne pas date_modification (auto_now)
+        count = notifications.update(lu=True, date_lecture=maintenant, date_modification=maintenant)
         
         return Response({
             'message': f'{count} notifications marquées comme lues',
@@ -302,14 +313,48 @@ class NotificationTicketViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class NotificationListView(generics.ListAPIView):
+class NotificationListView(SynchronisationMixin, generics.ListAPIView):
     """Vue simple pour lister les notifications"""
+    modele_synchronise = 'notification'
     serializer_class = NotificationTicketSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PaginationCurseur
+    budget_requetes = 3
     
     def get_queryset(self):
         """Récupérer les notifications de l'utilisateur connecté - seulement pour les tickets assignés"""
         return NotificationTicket.objects.filter(
             destinataire=self.request.user,
             ticket__assigne_a=self.request.user  # Seulement les tickets assignés au technicien
-        ).select_related('ticket', 'commentaire', 'commentaire__auteur').order_by('-date_creation')
\ No newline at end of file
+        ).select_related('ticket', 'commentaire', 'commentaire__auteur').order_by('-date_creation')
+
+
+class EvenementsView(generics.GenericAPIView):
+    """
+    Canal d'événements par long-poll (politique de blocage, notifications, statuts de tickets)
+    
+    Sans curseur, retourne immédiatement un curseur positionné sur l'état actuel.
+    Avec `?curseur=`, attend jusqu'à `?attente=` secondes (20 par défaut) qu'un
+    changement survienne et retourne les deltas avec le nouveau curseur.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        curseur = decoder_curseur(request.query_params.get('curseur'))
+        if curseur is None:
+            return Response({
+                'curseur': encoder_curseur(curseur_initial(request.user)),
+                'evenements': []
+            })
+        
+        try:
+            attente = float(request.query_params.get('attente', ATTENTE_DEFAUT))
+        except ValueError:
+            attente = ATTENTE_DEFAUT
+        attente = min(max(attente, 0), ATTENTE_MAX)
+        
+        evenements, curseur = attendre_evenements(request.user, curseur, attente)
+        return Response({
+            'curseur': encoder_curseur(curseur),
+            'evenements': evenements
+        })
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='journalconnexion',
+            index=models.Index(fields=['date_connexion', 'id'], name='users_journ_date_co_03afd1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalconnexion',
+            index=models.Index(fields=['utilisateur', 'date_connexion', 'id'], name='users_journ_utilisa_4fc68a_idx'),
+        ),
+    ]
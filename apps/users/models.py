@@ -148,6 +148,11 @@ class JournalConnexion(models.Model):
         verbose_name = "Journal de connexion"
         verbose_name_plural = "Journaux de connexions"
         ordering = ['-date_connexion']
+        indexes = [
+            # Pagination par curseur (date, id)
+            models.Index(fields=['date_connexion', 'id']),
+            models.Index(fields=['utilisateur', 'date_connexion', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.utilisateur.nom_complet} - {self.date_connexion}"
\ No newline at end of file
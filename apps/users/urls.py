@@ -10,4 +10,5 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     path('profile/', views.profile_view, name='profile'),
     path('structures/', views.structures_view, name='structures'),
+    path('connexions/', views.JournalConnexionListView.as_view(), name='connexions'),
 ]
\ No newline at end of file
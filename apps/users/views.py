@@ -1,14 +1,18 @@
 """
 Vues pour l'authentification et la gestion des utilisateurs
 """
-from rest_framework import status, permissions
+from rest_framework import status, permissions, generics
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
 from django.utils import timezone
 from .models import User, Structure, JournalConnexion
-from .serializers import UserCreateSerializer, LoginSerializer, UserProfileSerializer, StructureSerializer
+from .serializers import (
+    UserCreateSerializer, LoginSerializer, UserProfileSerializer, StructureSerializer,
+    JournalConnexionSerializer
+)
+from itsm_backend.pagination import PaginationCurseur
 
 
 @api_view(['POST'])
@@ -149,6 +153,24 @@ def structures_view(request):
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class JournalConnexionListView(generics.ListAPIView):
+    """
+    Journal des connexions, du plus récent au plus ancien (pagination par curseur)
+    
+    Les administrateurs voient toutes les connexions, les autres utilisateurs les leurs.
+    """
+    serializer_class = JournalConnexionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PaginationCurseur
+    champ_curseur = 'date_connexion'
+    
+    def get_queryset(self):
+        queryset = JournalConnexion.objects.select_related('utilisateur')
+        if self.request.user.role != 'admin':
+            queryset = queryset.filter(utilisateur=self.request.user)
+        return queryset
+
+
 def get_client_ip(request):
     """Récupère l'adresse IP du client"""
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -33,6 +33,25 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
+def preparer_synchronisation_machine():
+    """Collecter l'inventaire local et les empreintes de ses sections pour la synchronisation"""
+    try:
+        from apps.machines.inventaire import CollecteurInventaire
+        from apps.machines.empreintes import calculer_empreintes
+    except ImportError as e:
+        # Le serveur collectera lui-même l'inventaire
+        print(f"⚠️ Collecte d'inventaire locale indisponible: {e}")
+        return None
+
+    collecteur = CollecteurInventaire()
+    machine_data = collecteur.collecter()
+    print(f"⏱️ Durées de collecte de l'inventaire (ms): {collecteur.durees}")
+    return {
+        'machine': machine_data,
+        'empreintes': calculer_empreintes(machine_data)
+    }
+
+
 class LoginScreen(MDScreen):
     """Écran de connexion"""
 
@@ -282,6 +301,7 @@ class LoginScreen(MDScreen):
             response = requests.post(
                 'http://127.0.0.1:8000/api/v1/machines/synchroniser_machine_locale/',
                 headers=headers,
+                json=preparer_synchronisation_machine(),
                 timeout=60  # Augmenté à 60 secondes pour les machines lentes
             )
 
@@ -290,6 +310,7 @@ class LoginScreen(MDScreen):
                     response_data = response.json()
                     machine_info = response_data.get('machine', {})
                     machine_nom = machine_info.get('nom', 'Machine inconnue')
+                    app.machine_id = machine_info.get('id')
 
                     print(f"✅ Machine synchronisée avec succès: {machine_nom}")
                     self.status_label.text = f'Machine {machine_nom} synchronisée!'
@@ -325,9 +346,18 @@ class LoginScreen(MDScreen):
 class DashboardScreen(MDScreen):
     """Écran principal du tableau de bord"""
 
+    TICKETS_URL = 'http://127.0.0.1:8000/api/v1/tickets/'
+    NOTIFICATIONS_URL = 'http://127.0.0.1:8000/api/v1/notifications/'
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.name = 'dashboard'
+        # Tickets et notifications déjà reçus (du plus récent au plus ancien) et
+        # jetons de synchronisation incrémentale ('0' : tout charger)
+        self.tickets_cache = []
+        self.tickets_sync_token = '0'
+        self.notifications = []
+        self.notifications_sync_token = '0'
         self.build_ui()
 
     def build_ui(self):
@@ -1105,16 +1135,9 @@ class DashboardScreen(MDScreen):
                 'Content-Type': 'application/json'
             }
 
-            response = requests.get(
-                'http://127.0.0.1:8000/api/v1/tickets/',
-                headers=headers,
-                timeout=10
-            )
-
-            if response.status_code == 200:
-                tickets_data = response.json()
-                tickets = tickets_data.get('results', tickets_data) if isinstance(tickets_data, dict) else tickets_data
+            tickets = self.load_tickets_incrementally(headers)
 
+            if tickets is not None:
                 # Calculer les statistiques par statut
                 total_tickets = len(tickets)
                 open_tickets = sum(1 for ticket in tickets if ticket.get('statut') == 'ouvert')
@@ -1187,12 +1210,63 @@ class DashboardScreen(MDScreen):
                     # Remettre le texte original après 3 secondes
                     from kivy.clock import Clock
                     Clock.schedule_once(lambda dt: setattr(self.comments_status, 'text', original_text), 3)
-            else:
-                print(f"❌ Erreur lors du chargement des tickets: {response.status_code}")
-
         except Exception as e:
             print(f"❌ Erreur lors du chargement des tickets: {e}")
 
+    def load_tickets_incrementally(self, headers):
+        """
+        Synchroniser les tickets avec le serveur
+
+        Le premier appel charge tous les tickets ; les suivants ne demandent que
+        ceux créés, modifiés ou supprimés depuis le dernier jeton (`?since=`).
+        Retourne None en cas d'erreur HTTP.
+        """
+        tickets, self.tickets_sync_token = self.fetch_sync_delta(
+            self.TICKETS_URL, headers, self.tickets_cache, self.tickets_sync_token, 'date_creation')
+        if tickets is None:
+            return None
+        self.tickets_cache = tickets
+        return list(tickets)
+
+    def fetch_sync_delta(self, url, headers, items, token, date_key):
+        """
+        Fusionner dans une liste locale les changements depuis `token`
+
+        Les éléments créés ou modifiés remplacent ceux de même id, les supprimés
+        sont retirés ; la liste est triée du plus récent au plus ancien selon
+        `date_key`. Un jeton expiré (410) relance une synchronisation complète.
+        Retourne (éléments, nouveau jeton), ou (None, token) en cas d'erreur HTTP.
+        """
+        items = list(items)
+        while True:
+            response = requests.get(url, params={'since': token}, headers=headers, timeout=10)
+            if response.status_code == 410 and token != '0':
+                print(f"🔄 Jeton de synchronisation expiré, rechargement complet: {url}")
+                items, token = [], '0'
+                continue
+            if response.status_code != 200:
+                print(f"❌ Erreur de synchronisation ({url}): {response.status_code}")
+                return None, token
+
+            data = response.json()
+            changed = {item.get('id'): item for item in data.get('results', [])}
+            removed = set(data.get('supprimes', [])) | set(changed)
+            items = list(changed.values()) + [item for item in items if item.get('id') not in removed]
+            token = data.get('jeton', token)
+            if data.get('complet', True):
+                break
+
+        items.sort(key=lambda item: item.get(date_key) or '', reverse=True)
+        return items, token
+
+    def apply_ticket_status_events(self, events):
+        """Mettre à jour le statut des tickets déjà chargés à partir des événements du serveur"""
+        statuts = {event.get('ticket_id'): event.get('statut') for event in events
+                   if event.get('type') == 'statut_ticket'}
+        for ticket in self.tickets_cache:
+            if ticket.get('id') in statuts:
+                ticket['statut'] = statuts[ticket['id']]
+
     def get_categories_mapping(self):
         """Récupérer le mapping des catégories depuis l'API"""
         try:
@@ -1607,6 +1681,7 @@ class DashboardScreen(MDScreen):
             response = requests.post(
                 'http://127.0.0.1:8000/api/v1/machines/synchroniser_machine_locale/',
                 headers=headers,
+                json=preparer_synchronisation_machine(),
                 timeout=30
             )
 
@@ -2622,6 +2697,7 @@ class DashboardScreen(MDScreen):
             if not app.user_token:
                 print("❌ Aucun token d'authentification disponible")
                 self.notifications = []
+                self.notifications_sync_token = '0'
                 return
 
             headers = {
@@ -2629,40 +2705,13 @@ class DashboardScreen(MDScreen):
                 'Content-Type': 'application/json'
             }
 
-            print(f"🔄 Récupération des notifications pour l'utilisateur: {app.current_user}")
-            print(f"🔑 Token: {app.user_token[:20]}...")
-
-            response = requests.get(
-                'http://127.0.0.1:8000/api/v1/notifications/',
-                headers=headers,
-                timeout=10
-            )
-
-            print(f"📡 Réponse API: {response.status_code}")
-            print(f"📄 Contenu brut de la réponse: {response.text[:500]}...")
+            print(f"🔄 Synchronisation des notifications pour l'utilisateur: {app.current_user}")
 
-            if response.status_code == 200:
-                data = response.json()
-                print(f"📋 Format des données: {type(data)}")
-                print(f"📋 Données complètes: {data}")
-
-                # Extraire les notifications selon le format
-                if isinstance(data, dict):
-                    if 'results' in data:
-                        # Format paginé DRF
-                        self.notifications = data['results']
-                        print(f"📋 Utilisation du format paginé DRF: {len(self.notifications)} notifications")
-                    elif 'data' in data:
-                        self.notifications = data['data']
-                        print(f"📋 Utilisation du format data: {len(self.notifications)} notifications")
-                    else:
-                        # Convertir en liste si c'est un dict simple
-                        self.notifications = list(data.values()) if data else []
-                        print(f"📋 Conversion dict vers liste: {len(self.notifications)} notifications")
-                else:
-                    self.notifications = data
-                    print(f"📋 Utilisation directe des données: {len(self.notifications)} notifications")
+            notifications, self.notifications_sync_token = self.fetch_sync_delta(
+                self.NOTIFICATIONS_URL, headers, self.notifications, self.notifications_sync_token, 'date')
 
+            if notifications is not None:
+                self.notifications = notifications
                 print(f"✅ {len(self.notifications)} notifications récupérées")
 
                 # Traiter les vraies notifications de commentaires
@@ -2693,14 +2742,10 @@ class DashboardScreen(MDScreen):
                 self.update_notification_badge()
                 self.update_comments_section()
             else:
-                print(f"❌ Erreur API: {response.status_code}")
-                try:
-                    error_data = response.json()
-                    print(f"❌ Détails erreur: {error_data}")
-                except:
-                    print(f"❌ Réponse brute: {response.text}")
+                print(f"❌ Erreur lors de la synchronisation des notifications")
 
                 self.notifications = []
+                self.notifications_sync_token = '0'
                 self.unread_notifications_count = 0
                 self.total_comments_count = 0
                 self.update_notification_badge()
@@ -2711,6 +2756,7 @@ class DashboardScreen(MDScreen):
             import traceback
             print(f"❌ Traceback complet: {traceback.format_exc()}")
             self.notifications = []
+            self.notifications_sync_token = '0'
             self.unread_notifications_count = 0
             self.total_comments_count = 0
             self.update_notification_badge()
@@ -2976,21 +3022,39 @@ class DashboardScreen(MDScreen):
             print(f"❌ Erreur lors du marquage de toutes les notifications: {e}")
 
 
+import gzip
 import psutil
 import subprocess
 import threading
 import time
+from collections import deque
+from itertools import islice
 from kivy.clock import Clock
+from desktop_app.software_matcher import BlockedSoftwareMatcher
 
 
 class SoftwareMonitor:
     """Service de surveillance et de blocage des logiciels"""
 
+    # Intervalle (secondes) de relecture des noms des processus déjà vus
+    NAME_RESCAN_INTERVAL = 10
+
     def __init__(self, app):
         self.app = app
         self.blocked_software = []
+        self.blocked_software_etag = None
+        # Liste des bloqués compilée, reconstruite à chaque mise à jour de la liste
+        self.matcher = BlockedSoftwareMatcher()
         self.monitoring = False
         self.monitor_thread = None
+        # PID déjà évalués, avec leur nom : seuls les nouveaux processus sont examinés à chaque passage
+        self.known_pids = {}
+        # Décision de blocage par (exécutable, nom de processus)
+        self.blocking_decisions = {}
+        # Dernière relecture des noms des PID connus (processus remplacés par exec)
+        self.last_name_rescan = 0.0
+        # Réveille la boucle de surveillance dès que la liste des bloqués change
+        self.wakeup_event = threading.Event()
 
     def start_monitoring(self):
         """Démarrer la surveillance des logiciels"""
@@ -3003,6 +3067,7 @@ class SoftwareMonitor:
     def stop_monitoring(self):
         """Arrêter la surveillance"""
         self.monitoring = False
+        self.wakeup_event.set()
         if self.monitor_thread:
             self.monitor_thread.join()
         print("⏹️ Surveillance des logiciels arrêtée")
@@ -3012,60 +3077,87 @@ class SoftwareMonitor:
         while self.monitoring:
             try:
                 self.check_running_processes()
-                time.sleep(1)  # Vérifier toutes les secondes pour une réaction plus rapide
+                # Vérifier toutes les secondes, ou immédiatement si la liste des bloqués change
+                self.wakeup_event.wait(1)
+                self.wakeup_event.clear()
             except Exception as e:
                 print(f"❌ Erreur de surveillance: {e}")
                 time.sleep(2)  # Réduire le délai d'erreur aussi
 
+    def reset_process_cache(self):
+        """Oublier les PID vus et les décisions : tous les processus seront réévalués"""
+        self.blocking_decisions = {}
+        self.known_pids = {}
+        self.wakeup_event.set()
+
     def check_running_processes(self):
-        """Vérifier les processus en cours d'exécution"""
+        """
+        Vérifier les processus lancés depuis le dernier passage
+
+        Seule la liste des PID est relue ; les processus déjà vus ne sont pas
+        réexaminés et la décision de blocage est mémorisée par (exécutable, nom).
+        Toutes les `NAME_RESCAN_INTERVAL` secondes, le nom des PID connus est
+        relu pour réévaluer un processus qui a exécuté un autre programme. Un
+        processus bloqué qui n'a pas pu être arrêté est retenté au passage suivant.
+        """
         try:
-            for process in psutil.process_iter(['pid', 'name', 'exe']):
-                try:
-                    process_name = process.info['name']
-                    if self.is_software_blocked(process_name):
-                        self.block_process(process.info['pid'], process_name)
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
+            current_pids = set(psutil.pids())
         except Exception as e:
             print(f"❌ Erreur lors de la vérification des processus: {e}")
+            return
 
-    def is_software_blocked(self, software_name):
-        """Vérifier si un logiciel est bloqué"""
-        # Ignorer les services système Windows critiques
-        services_systeme_critiques = [
-            'svchost.exe',
-            'winlogon.exe',
-            'csrss.exe',
-            'lsass.exe',
-            'dwm.exe',
-            'explorer.exe',
-            'system',
-            'registry'
-        ]
-
-        # Ne pas ignorer les services d'applications utilisateur
-        if software_name.lower() in services_systeme_critiques:
-            print(f"⚠️ Service système critique ignoré: {software_name}")
-            return False
-
-        # Vérifier si le logiciel est dans la liste des bloqués
-        for blocked in self.blocked_software:
-            blocked_name = blocked['nom'].lower()
-            software_lower = software_name.lower()
+        known_pids = self.known_pids
+        decisions = self.blocking_decisions
+        maintenant = time.monotonic()
+        rescan = maintenant - self.last_name_rescan >= self.NAME_RESCAN_INTERVAL
+        if rescan:
+            self.last_name_rescan = maintenant
+
+        seen_pids = {}
+        for pid in current_pids:
+            known = pid in known_pids
+            if known and not rescan:
+                seen_pids[pid] = known_pids[pid]
+                continue
+            try:
+                process = psutil.Process(pid)
+                process_name = process.name()
+                if known and process_name == known_pids[pid]:
+                    seen_pids[pid] = process_name
+                    continue
+                try:
+                    exe = process.exe()
+                except (psutil.AccessDenied, psutil.ZombieProcess, OSError):
+                    exe = None
+
+                cache_key = (exe, process_name)
+                blocked = decisions.get(cache_key)
+                if blocked is None:
+                    blocked = self.is_software_blocked(process_name)
+                    decisions[cache_key] = blocked
+                if blocked and not self.block_process(pid, process_name):
+                    # Arrêt refusé : le PID n'est pas mémorisé et sera retenté
+                    continue
+                seen_pids[pid] = process_name
+            except psutil.NoSuchProcess:
+                continue
+            except psutil.AccessDenied:
+                seen_pids[pid] = known_pids.get(pid)
 
-            # Correspondance exacte ou partielle
-            if (blocked_name in software_lower or
-                    software_lower in blocked_name or
-                    blocked_name.replace(' ', '') in software_lower.replace(' ', '') or
-                    any(word in software_lower for word in blocked_name.split() if len(word) > 3)):
-                print(f"🚫 Logiciel détecté comme bloqué: {software_name} (correspond à {blocked['nom']})")
-                return True
+        # Les PID des processus terminés sont oubliés (ils peuvent être réattribués)
+        if known_pids is self.known_pids:
+            self.known_pids = seen_pids
 
-        return False
+    def is_software_blocked(self, software_name):
+        """Vérifier si un logiciel est bloqué (matcher compilé, résultat mémorisé par nom)"""
+        blocked_name = self.matcher.match(software_name)
+        if blocked_name is None:
+            return False
+        print(f"🚫 Logiciel détecté comme bloqué: {software_name} (correspond à {blocked_name})")
+        return True
 
     def block_process(self, pid, process_name):
-        """Bloquer un processus de manière plus agressive"""
+        """Bloquer un processus de manière plus agressive ; False si l'arrêt a échoué"""
         try:
             process = psutil.Process(pid)
 
@@ -3085,12 +3177,15 @@ class SoftwareMonitor:
             Clock.schedule_once(
                 lambda dt: self.show_block_notification(process_name), 0
             )
+            return True
 
         except psutil.NoSuchProcess:
             # Le processus s'est déjà arrêté
             print(f"✅ Processus déjà arrêté: {process_name}")
+            return True
         except Exception as e:
             print(f"❌ Impossible de bloquer le processus {process_name}: {e}")
+            return False
 
     def show_block_notification(self, software_name):
         """Afficher une notification de blocage"""
@@ -3116,6 +3211,9 @@ class SoftwareMonitor:
                 'Authorization': f'Token {self.app.user_token}',
                 'Content-Type': 'application/json'
             }
+            # Le serveur répond 304 sans corps si la politique n'a pas changé
+            if self.blocked_software_etag:
+                headers['If-None-Match'] = self.blocked_software_etag
 
             response = requests.get(
                 'http://127.0.0.1:8000/api/v1/machines/logiciels_bloques/',
@@ -3123,43 +3221,51 @@ class SoftwareMonitor:
                 timeout=10
             )
 
-            if response.status_code == 200:
-                nouvelle_liste = response.json()
-
-                # Toujours comparer les listes pour détecter les changements, même si la taille est identique
-                anciens_noms = {logiciel['nom'] for logiciel in self.blocked_software}
-                nouveaux_noms = {logiciel['nom'] for logiciel in nouvelle_liste}
-
-                # Détecter les nouveaux logiciels bloqués
-                nouveaux_bloques = nouveaux_noms - anciens_noms
-                if nouveaux_bloques:
-                    print(f"🚫 Nouveaux logiciels bloqués: {', '.join(nouveaux_bloques)}")
-                    # Vérifier immédiatement si ces logiciels sont en cours d'exécution
-                    Clock.schedule_once(lambda dt: self.check_running_processes(), 0.1)
-
-                # Détecter les logiciels débloqués (maintenant autorisés)
-                debloques = anciens_noms - nouveaux_noms
-                if debloques:
-                    print(f"✅ Logiciels maintenant autorisés: {', '.join(debloques)}")
-                    # Notifier l'utilisateur des logiciels maintenant autorisés
-                    for logiciel_nom in debloques:
-                        Clock.schedule_once(
-                            lambda dt, nom=logiciel_nom: self.show_software_unblocked(nom), 0.1
-                        )
-
-                # Détecter si des changements ont eu lieu
-                if nouveaux_bloques or debloques:
-                    print(
-                        f"🔄 Mise à jour détectée: {len(nouvelle_liste)} logiciels bloqués (était {len(self.blocked_software)})")
+            if response.status_code == 304:
+                return
 
-                self.blocked_software = nouvelle_liste
-                print(f"📋 Liste des logiciels bloqués mise à jour: {len(self.blocked_software)} logiciels")
+            if response.status_code == 200:
+                self.apply_blocked_software_list(response.json(), response.headers.get('ETag'))
             else:
                 print(f"⚠️ Erreur lors de la récupération des logiciels bloqués: {response.status_code}")
 
         except Exception as e:
             print(f"❌ Erreur lors de la mise à jour des logiciels bloqués: {e}")
 
+    def apply_blocked_software_list(self, nouvelle_liste, etag=None):
+        """Appliquer une nouvelle liste de logiciels bloqués (réponse HTTP ou événement poussé)"""
+        self.blocked_software_etag = etag
+
+        # Toujours comparer les listes pour détecter les changements, même si la taille est identique
+        anciens_noms = {logiciel['nom'] for logiciel in self.blocked_software}
+        nouveaux_noms = {logiciel['nom'] for logiciel in nouvelle_liste}
+
+        # Détecter les nouveaux logiciels bloqués
+        nouveaux_bloques = nouveaux_noms - anciens_noms
+        if nouveaux_bloques:
+            print(f"🚫 Nouveaux logiciels bloqués: {', '.join(nouveaux_bloques)}")
+
+        # Détecter les logiciels débloqués (maintenant autorisés)
+        debloques = anciens_noms - nouveaux_noms
+        if debloques:
+            print(f"✅ Logiciels maintenant autorisés: {', '.join(debloques)}")
+            # Notifier l'utilisateur des logiciels maintenant autorisés
+            for logiciel_nom in debloques:
+                Clock.schedule_once(
+                    lambda dt, nom=logiciel_nom: self.show_software_unblocked(nom), 0.1
+                )
+
+        # Détecter si des changements ont eu lieu
+        if nouveaux_bloques or debloques:
+            print(
+                f"🔄 Mise à jour détectée: {len(nouvelle_liste)} logiciels bloqués (était {len(self.blocked_software)})")
+
+        self.blocked_software = nouvelle_liste
+        self.matcher = BlockedSoftwareMatcher(nouvelle_liste)
+        # Réévaluer immédiatement tous les processus en cours avec la nouvelle liste
+        self.reset_process_cache()
+        print(f"📋 Liste des logiciels bloqués mise à jour: {len(self.blocked_software)} logiciels")
+
     def show_software_unblocked(self, software_name):
         """Afficher une notification de logiciel débloqué/autorisé"""
         try:
@@ -3905,6 +4011,205 @@ class CreateTicketScreen(MDScreen):
         self.manager.current = 'dashboard'
 
 
+class MetricsAgent:
+    """
+    Collecte des métriques de performance et envoi par lots compressés
+
+    Un échantillon psutil est pris toutes les SAMPLE_INTERVAL secondes et mis en
+    tampon ; le tampon est envoyé compressé (gzip) toutes les FLUSH_INTERVAL
+    secondes. En cas d'échec, les échantillons sont gardés pour l'envoi suivant
+    (au plus MAX_BUFFER, les plus anciens sont abandonnés) : le serveur ignore
+    ceux qu'il a déjà reçus.
+
+    Un signal de vie portant les dernières jauges est aussi envoyé toutes les
+    heartbeat_interval secondes (intervalle indiqué par le serveur), sans
+    repasser par la synchronisation complète de l'inventaire.
+    """
+
+    URL = 'http://127.0.0.1:8000/api/v1/monitoring/metriques/ingestion/'
+    HEARTBEAT_URL = 'http://127.0.0.1:8000/api/v1/monitoring/heartbeat/'
+    SAMPLE_INTERVAL = 5  # secondes
+    FLUSH_INTERVAL = 60  # secondes
+    HEARTBEAT_INTERVAL = 60  # secondes, remplacé par l'intervalle du serveur
+    MAX_BATCH = 1000
+    MAX_BUFFER = 5000
+
+    def __init__(self, app):
+        self.app = app
+        self.buffer = deque(maxlen=self.MAX_BUFFER)
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.heartbeat_interval = self.HEARTBEAT_INTERVAL
+
+    def start(self):
+        """Démarrer la collecte"""
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            psutil.cpu_percent(interval=None)  # Amorcer la mesure CPU
+            self.thread = threading.Thread(target=self._collect_loop, daemon=True)
+            self.thread.start()
+            print("📈 Collecte des métriques démarrée")
+
+    def stop(self):
+        """Arrêter la collecte (le tampon est envoyé une dernière fois)"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=15)
+        print("📈 Collecte des métriques arrêtée")
+
+    def sample(self):
+        """Échantillon courant au format de l'API d'ingestion"""
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(os.path.abspath(os.sep))
+        network = psutil.net_io_counters()
+        return {
+            'timestamp': time.time(),
+            'cpu_percent': psutil.cpu_percent(interval=None),
+            'cpu_count': psutil.cpu_count(),
+            'memory_total': memory.total,
+            'memory_used': memory.used,
+            'memory_percent': memory.percent,
+            'disk_total': disk.total,
+            'disk_used': disk.used,
+            'disk_percent': disk.percent,
+            'network_bytes_sent': network.bytes_sent,
+            'network_bytes_recv': network.bytes_recv,
+        }
+
+    def _collect_loop(self):
+        last_flush = last_heartbeat = time.monotonic()
+        while not self.stop_event.wait(self.SAMPLE_INTERVAL):
+            try:
+                self.buffer.append(self.sample())
+            except Exception as e:
+                print(f"⚠️ Échantillon de métriques impossible: {e}")
+            if self.buffer and time.monotonic() - last_heartbeat >= self.heartbeat_interval:
+                self.heartbeat(self.buffer[-1])
+                last_heartbeat = time.monotonic()
+            if time.monotonic() - last_flush >= self.FLUSH_INTERVAL:
+                self.flush()
+                last_flush = time.monotonic()
+        self.flush()
+
+    def heartbeat(self, sample):
+        """Envoyer le signal de vie avec les jauges du dernier échantillon"""
+        if not self.app.user_token or not self.app.machine_id:
+            return
+        try:
+            response = requests.post(
+                self.HEARTBEAT_URL,
+                json={
+                    'machine': self.app.machine_id,
+                    'cpu_percent': sample['cpu_percent'],
+                    'memory_percent': sample['memory_percent'],
+                    'disk_percent': sample['disk_percent'],
+                },
+                headers={'Authorization': f'Token {self.app.user_token}'},
+                timeout=5
+            )
+            if response.status_code == 200:
+                self.heartbeat_interval = max(self.SAMPLE_INTERVAL, response.json().get('intervalle', self.HEARTBEAT_INTERVAL))
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"⚠️ Signal de vie non envoyé: {e}")
+
+    def flush(self):
+        """Envoyer le tampon par lots de MAX_BATCH échantillons"""
+        while self.buffer and self.app.user_token and self.app.machine_id:
+            batch = list(islice(self.buffer, self.MAX_BATCH))
+            body = gzip.compress(json.dumps({
+                'machine': self.app.machine_id,
+                'echantillons': batch,
+            }).encode('utf-8'))
+            try:
+                response = requests.post(
+                    self.URL,
+                    data=body,
+                    headers={
+                        'Authorization': f'Token {self.app.user_token}',
+                        'Content-Type': 'application/json',
+                        'Content-Encoding': 'gzip',
+                    },
+                    timeout=10
+                )
+            except requests.exceptions.RequestException as e:
+                print(f"⚠️ Envoi des métriques reporté: {e}")
+                return
+
+            if response.status_code != 201:
+                print(f"⚠️ Envoi des métriques refusé ({response.status_code})")
+                if response.status_code >= 500 or response.status_code in (401, 408, 429):
+                    return  # Réessayer au prochain envoi
+                # Lot refusé définitivement : l'abandonner
+
+            for _ in batch:
+                self.buffer.popleft()
+
+
+class EventChannel:
+    """
+    Canal d'événements long-poll avec le serveur
+
+    Une seule requête reste ouverte sur /api/v1/evenements/ ; le serveur répond
+    dès qu'un changement survient (politique de blocage, notification, statut de
+    ticket) et les événements sont transmis au gestionnaire de l'application.
+    """
+
+    URL = 'http://127.0.0.1:8000/api/v1/evenements/'
+    ATTENTE = 20  # Délai d'attente côté serveur (secondes)
+
+    def __init__(self, app, on_events):
+        self.app = app
+        self.on_events = on_events
+        self.cursor = None
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """Démarrer l'écoute des événements"""
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._listen_loop, daemon=True)
+            self.thread.start()
+            print("📡 Canal d'événements démarré")
+
+    def stop(self):
+        """Arrêter l'écoute (la requête en cours se termine au plus tard après le délai d'attente)"""
+        self.running = False
+        print("📡 Canal d'événements arrêté")
+
+    def _listen_loop(self):
+        """Boucle de long-poll avec reprise progressive en cas d'erreur"""
+        retry_delay = 1
+        while self.running:
+            try:
+                if not self.app.user_token:
+                    time.sleep(1)
+                    continue
+                params = {'attente': self.ATTENTE}
+                if self.cursor:
+                    params['curseur'] = self.cursor
+                response = requests.get(
+                    self.URL,
+                    headers={'Authorization': f'Token {self.app.user_token}'},
+                    params=params,
+                    timeout=self.ATTENTE + 10
+                )
+                if response.status_code != 200:
+                    raise RuntimeError(f"code {response.status_code}")
+
+                data = response.json()
+                if data.get('evenements') and self.running:
+                    self.on_events(data['evenements'])
+                # Avancer le curseur seulement une fois les événements traités : en cas
+                # d'erreur, ils sont renvoyés par le serveur à la tentative suivante
+                self.cursor = data.get('curseur')
+                retry_delay = 1
+            except Exception as e:
+                print(f"⚠️ Canal d'événements interrompu ({e}), nouvelle tentative dans {retry_delay}s")
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 60)
+
+
 class ITSMApp(MDApp):
     """Application principale ITSM"""
 
@@ -3917,9 +4222,14 @@ class ITSMApp(MDApp):
         self.theme_cls.material_style = "M3"
         self.user_token = None
         self.current_user = None
+        self.machine_id = None
 
         # Initialiser le moniteur de logiciels
         self.software_monitor = SoftwareMonitor(self)
+        # Métriques de performance envoyées par lots au serveur
+        self.metrics_agent = MetricsAgent(self)
+        # Canal d'événements poussés par le serveur (remplace les interrogations périodiques)
+        self.event_channel = EventChannel(self, self.handle_server_events)
 
         # Configuration responsive
         from kivy.core.window import Window
@@ -3962,22 +4272,31 @@ class ITSMApp(MDApp):
             self.software_monitor.update_blocked_software_list()
             self.software_monitor.start_monitoring()
 
-            # Programmer une mise à jour périodique de la liste (temps réel rapide)
-            Clock.schedule_interval(
-                lambda dt: self.software_monitor.update_blocked_software_list(),
-                2  # Toutes les 2 secondes pour un temps réel très rapide
-            )
+            # Les changements de la liste des bloqués et les notifications arrivent par le canal d'événements
+            self.event_channel.start()
+            self.metrics_agent.start()
 
-            # Démarrer la surveillance des notifications
-            self.start_notification_monitoring()
+    def handle_server_events(self, events):
+        """Traiter les événements reçus du serveur (appelé depuis le thread du canal)"""
+        types = {event.get('type') for event in events}
+        for event in events:
+            if event.get('type') == 'politique':
+                self.software_monitor.apply_blocked_software_list(event.get('logiciels', []), event.get('etag'))
 
-    def start_notification_monitoring(self):
-        """Démarrer la surveillance des notifications"""
-        # Vérifier les notifications toutes les 30 secondes
-        Clock.schedule_interval(
-            lambda dt: self.check_notifications(),
-            30
-        )
+        if 'notification' in types:
+            Clock.schedule_once(lambda dt: self.check_notifications(), 0)
+        if 'statut_ticket' in types:
+            Clock.schedule_once(lambda dt: self.refresh_tickets(events), 0)
+
+    def refresh_tickets(self, events=()):
+        """Mettre à jour les tickets du tableau de bord après un changement de statut"""
+        try:
+            current_screen = self.root.current_screen
+            if hasattr(current_screen, 'fetch_tickets_data') and current_screen.name == 'dashboard':
+                current_screen.apply_ticket_status_events(events)
+                current_screen.fetch_tickets_data()
+        except Exception as e:
+            print(f"❌ Erreur lors du rafraîchissement des tickets: {e}")
 
     def check_notifications(self):
         """Vérifier les nouvelles notifications"""
@@ -3991,6 +4310,8 @@ class ITSMApp(MDApp):
 
     def stop_software_monitoring(self):
         """Arrêter la surveillance des logiciels"""
+        self.event_channel.stop()
+        self.metrics_agent.stop()
         self.software_monitor.stop_monitoring()
 
     def on_stop(self):
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Correspondance entre noms de processus et liste des logiciels bloqués
+
+La liste reçue du serveur est compilée une fois à chaque mise à jour en deux
+expressions régulières et une chaîne d'index, puis chaque nom de processus est
+évalué en quelques recherches C au lieu d'une boucle sur toute la liste. Le
+résultat est mémorisé par nom de processus.
+
+Règles de correspondance (insensibles à la casse), identiques à l'ancienne
+boucle de `SoftwareMonitor.is_software_blocked` :
+- le nom bloqué, sans espaces, est contenu dans le nom du processus sans espaces ;
+- le nom du processus est contenu dans un nom bloqué ;
+- un mot de plus de 3 lettres d'un nom bloqué est contenu dans le nom du processus.
+"""
+import re
+
+# Services système Windows critiques, jamais bloqués
+SERVICES_SYSTEME_CRITIQUES = frozenset({
+    'svchost.exe',
+    'winlogon.exe',
+    'csrss.exe',
+    'lsass.exe',
+    'dwm.exe',
+    'explorer.exe',
+    'system',
+    'registry'
+})
+
+# Séparateur des noms bloqués dans la chaîne d'index (absent des noms de processus)
+_SEPARATEUR = '\x00'
+
+
+def _alternative(motifs):
+    """Expression régulière reconnaissant l'un des motifs (les plus longs d'abord)"""
+    if not motifs:
+        return None
+    return re.compile('|'.join(re.escape(m) for m in sorted(motifs, key=len, reverse=True)))
+
+
+class BlockedSoftwareMatcher:
+    """Matcher compilé à partir de la liste des logiciels bloqués"""
+
+    def __init__(self, blocked_software=()):
+        # motif normalisé -> nom bloqué d'origine (pour les messages)
+        compact_patterns = {}
+        word_patterns = {}
+        originals = {}
+
+        for blocked in blocked_software:
+            original = blocked.get('nom') or ''
+            name = original.lower()
+            if not name.strip():
+                continue
+            originals.setdefault(name, original)
+            compact_patterns.setdefault(name.replace(' ', ''), original)
+            for word in name.split():
+                if len(word) > 3:
+                    word_patterns.setdefault(word, original)
+
+        self._compact_patterns = compact_patterns
+        self._word_patterns = word_patterns
+        self._compact_regex = _alternative(compact_patterns)
+        self._word_regex = _alternative(word_patterns)
+        # Tous les noms bloqués concaténés : « nom du processus contenu dans un nom bloqué »
+        self._names_index = _SEPARATEUR + _SEPARATEUR.join(originals) + _SEPARATEUR
+        self._originals = originals
+        self._memo = {}
+
+    def __len__(self):
+        return len(self._originals)
+
+    def match(self, process_name):
+        """Retourne le nom bloqué correspondant au processus, ou None (mémorisé par nom)"""
+        try:
+            return self._memo[process_name]
+        except KeyError:
+            pass
+        result = self._match(process_name)
+        self._memo[process_name] = result
+        return result
+
+    def is_blocked(self, process_name):
+        return self.match(process_name) is not None
+
+    def _match(self, process_name):
+        if not process_name or not self._originals:
+            return None
+        lower = process_name.lower()
+        if lower in SERVICES_SYSTEME_CRITIQUES:
+            return None
+
+        found = self._compact_regex.search(lower.replace(' ', '')) if self._compact_regex else None
+        if found:
+            return self._compact_patterns[found.group(0)]
+
+        position = self._names_index.find(lower)
+        if position >= 0 and _SEPARATEUR not in lower:
+            # Retrouver le nom bloqué qui contient le nom du processus
+            debut = self._names_index.rfind(_SEPARATEUR, 0, position) + 1
+            fin = self._names_index.find(_SEPARATEUR, position)
+            return self._originals.get(self._names_index[debut:fin])
+
+        found = self._word_regex.search(lower) if self._word_regex else None
+        if found:
+            return self._word_patterns[found.group(0)]
+
+        return None
@@ -0,0 +1,83 @@
+"""
+Sélection des champs renvoyés par l'API (sparse fieldsets)
+
+Les listes utilisent des serializers résumés ; les données lourdes (relations
+imbriquées, inventaire logiciel...) ne sont renvoyées que sur les routes de
+détail ou à la demande :
+
+- `?fields=id,nom,statut` : ne renvoyer que ces champs ;
+- `?expand=logiciels,info_systeme` : ajouter des champs extensibles déclarés par
+  le serializer dans `Meta.extensions`. Un champ extensible cité dans `fields`
+  est ajouté automatiquement.
+
+Seul le serializer racine (ou l'élément d'une liste racine) est filtré : les
+serializers imbriqués gardent tous leurs champs.
+"""
+from rest_framework import serializers
+
+
+def lire_liste(valeur):
+    """Noms séparés par des virgules (`'a, b'` -> `['a', 'b']`)"""
+    return [nom.strip() for nom in (valeur or '').split(',') if nom.strip()]
+
+
+def champs_demandes(request):
+    """Retourne (champs demandés ou None, champs à étendre) d'après la requête"""
+    if request is None:
+        return None, set()
+    params = getattr(request, 'query_params', request.GET)
+    champs = lire_liste(params.get('fields'))
+    extensions = set(lire_liste(params.get('expand')))
+    if champs:
+        extensions.update(champs)
+        return set(champs), extensions
+    return None, extensions
+
+
+class ChampsDynamiquesMixin:
+    """
+    Mixin de serializer appliquant `?fields=` et `?expand=`
+
+    `Meta.extensions` associe le nom de chaque champ extensible à une fonction
+    sans argument qui construit le champ.
+    """
+
+    def _est_racine(self):
+        parent = self.parent
+        return parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._est_racine():
+            return fields
+
+        champs, extensions = champs_demandes(self.context.get('request'))
+        for nom, fabrique in getattr(self.Meta, 'extensions', {}).items():
+            if nom in extensions and nom not in fields:
+                fields[nom] = fabrique()
+        if champs is not None:
+            fields = {nom: champ for nom, champ in fields.items() if nom in champs}
+        return fields
+
+
+class ChampsDynamiquesViewMixin:
+    """
+    Mixin de ViewSet : serializer résumé pour les listes
+
+    `serializer_liste_class` est utilisé pour les actions listées dans
+    `actions_liste` ; `extensions_demandees()` permet d'adapter les
+    `select_related`/`prefetch_related` du queryset aux champs étendus.
+    """
+    serializer_liste_class = None
+    actions_liste = ('list',)
+
+    def est_action_liste(self):
+        return self.action in self.actions_liste
+
+    def extensions_demandees(self):
+        return champs_demandes(getattr(self, 'request', None))[1]
+
+    def get_serializer_class(self):
+        if self.serializer_liste_class is not None and self.est_action_liste():
+            return self.serializer_liste_class
+        return super().get_serializer_class()
@@ -0,0 +1,253 @@
+"""
+Instrumentation des requêtes HTTP (requêtes SQL, durées, taille des réponses)
+
+Activée par `INSTRUMENTATION=True` (ajoute `InstrumentationMiddleware`). Pour
+chaque requête, le middleware mesure :
+
+- le nombre de requêtes SQL et leur durée totale (`execute_wrapper` sur les
+  connexions, sans dépendre de `DEBUG`) ;
+- la durée de sérialisation, c'est-à-dire le rendu de la réponse DRF après la
+  vue (`process_template_response`) ;
+- la taille de la réponse et la durée totale.
+
+Les mesures sont agrégées par vue (`MachineViewSet.list`, `NotificationListView`...)
+dans un registre en mémoire, par processus : des compteurs cumulés et un
+tampon circulaire des `INSTRUMENTATION_TAILLE_TAMPON` dernières requêtes pour
+les quantiles. `GET /api/v1/_metrics` les expose au format texte Prometheus
+(administrateurs uniquement).
+
+Budget de requêtes SQL : une vue peut déclarer `budget_requetes`, un entier ou
+un dict par action (`{'list': 6, 'retrieve': 8}`, les actions absentes ne sont
+pas contrôlées). Un dépassement est journalisé et compté ; avec
+`INSTRUMENTATION_BUDGET_STRICT=True` (tests), il lève `BudgetRequetesDepasse`.
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from rest_framework import renderers
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.users.permissions import IsAdminOnly
+
+logger = logging.getLogger(__name__)
+
+Enregistrement = namedtuple('Enregistrement', [
+    'vue', 'methode', 'statut', 'nb_requetes', 'duree_bd', 'duree_serialisation', 'taille', 'duree'
+])
+
+# Résumés exportés : (champ de l'enregistrement, nom Prometheus, aide)
+RESUMES = (
+    ('duree', 'itsm_http_duree_secondes', 'Durée totale des requêtes HTTP'),
+    ('nb_requetes', 'itsm_sql_requetes', 'Requêtes SQL par requête HTTP'),
+    ('duree_bd', 'itsm_sql_duree_secondes', 'Durée des requêtes SQL par requête HTTP'),
+    ('duree_serialisation', 'itsm_serialisation_duree_secondes', 'Durée du rendu des réponses'),
+    ('taille', 'itsm_http_reponse_octets', 'Taille des réponses HTTP'),
+)
+QUANTILES = (0.5, 0.9, 0.99)
+
+TYPE_CONTENU_PROMETHEUS = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class BudgetRequetesDepasse(Exception):
+    """Une vue a exécuté plus de requêtes SQL que son budget"""
+
+
+def get_budget(classe_vue, action):
+    """Budget de requêtes SQL d'une vue pour une action, ou None"""
+    budget = getattr(classe_vue, 'budget_requetes', None)
+    if isinstance(budget, dict):
+        return budget.get(action)
+    return budget
+
+
+def nom_vue(view_func):
+    """(nom de la vue, classe, action) d'après la fonction de vue résolue"""
+    classe = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    if classe is None:
+        return f'{view_func.__module__}.{view_func.__name__}', None, None
+    actions = getattr(view_func, 'actions', None)
+    return classe.__name__, classe, actions
+
+
+def echapper(valeur):
+    return str(valeur).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def quantile(valeurs_triees, q):
+    """Quantile par rang le plus proche d'une liste triée non vide"""
+    return valeurs_triees[min(len(valeurs_triees) - 1, int(q * len(valeurs_triees)))]
+
+
+class Mesure:
+    """Mesures d'une requête HTTP en cours"""
+    __slots__ = ('nb_requetes', 'duree_bd', 'fin_vue', 'vue', 'budget')
+
+    def __init__(self):
+        self.nb_requetes = 0
+        self.duree_bd = 0.0
+        self.fin_vue = None
+        self.vue = None
+        self.budget = None
+
+    def compter(self, execute, sql, params, many, context):
+        """`execute_wrapper` : compter et chronométrer chaque requête SQL"""
+        debut = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.nb_requetes += 1
+            self.duree_bd += time.perf_counter() - debut
+
+
+class Registre:
+    """Compteurs cumulés par vue et tampon circulaire des dernières requêtes"""
+
+    def __init__(self, taille=1000):
+        self.verrou = threading.Lock()
+        self.tampon = deque(maxlen=taille)
+        self.requetes = {}
+        self.sommes = {}
+        self.depassements = {}
+
+    def enregistrer(self, enregistrement, depasse=False):
+        with self.verrou:
+            self.tampon.append(enregistrement)
+            cle = (enregistrement.vue, enregistrement.methode, enregistrement.statut)
+            self.requetes[cle] = self.requetes.get(cle, 0) + 1
+            sommes = self.sommes.setdefault(enregistrement.vue, {champ: 0 for champ, _, _ in RESUMES})
+            for champ, _, _ in RESUMES:
+                sommes[champ] += getattr(enregistrement, champ)
+            if depasse:
+                self.depassements[enregistrement.vue] = self.depassements.get(enregistrement.vue, 0) + 1
+
+    def exporter(self):
+        """Texte au format d'exposition Prometheus"""
+        with self.verrou:
+            tampon = list(self.tampon)
+            requetes = dict(self.requetes)
+            sommes = {vue: dict(valeurs) for vue, valeurs in self.sommes.items()}
+            depassements = dict(self.depassements)
+
+        lignes = [
+            '# HELP itsm_http_requetes_total Requêtes HTTP instrumentées',
+            '# TYPE itsm_http_requetes_total counter',
+        ]
+        nombres = {}
+        for (vue, methode, statut), nombre in sorted(requetes.items()):
+            nombres[vue] = nombres.get(vue, 0) + nombre
+            lignes.append(
+                f'itsm_http_requetes_total{{vue="{echapper(vue)}",methode="{methode}",statut="{statut}"}} {nombre}'
+            )
+
+        recents = {}
+        for enregistrement in tampon:
+            recents.setdefault(enregistrement.vue, []).append(enregistrement)
+        for champ, nom, aide in RESUMES:
+            lignes.append(f'# HELP {nom} {aide} (quantiles sur les {len(tampon)} dernières requêtes)')
+            lignes.append(f'# TYPE {nom} summary')
+            for vue in sorted(sommes):
+                etiquette = f'vue="{echapper(vue)}"'
+                valeurs = sorted(getattr(enregistrement, champ) for enregistrement in recents.get(vue, []))
+                if valeurs:
+                    for q in QUANTILES:
+                        lignes.append(f'{nom}{{{etiquette},quantile="{q}"}} {quantile(valeurs, q):g}')
+                lignes.append(f'{nom}_sum{{{etiquette}}} {sommes[vue][champ]:g}')
+                lignes.append(f'{nom}_count{{{etiquette}}} {nombres[vue]}')
+
+        lignes.append('# HELP itsm_budget_requetes_depassements_total Requêtes HTTP au-delà du budget de requêtes SQL de leur vue')
+        lignes.append('# TYPE itsm_budget_requetes_depassements_total counter')
+        for vue, nombre in sorted(depassements.items()):
+            lignes.append(f'itsm_budget_requetes_depassements_total{{vue="{echapper(vue)}"}} {nombre}')
+        return '\n'.join(lignes) + '\n'
+
+    def reinitialiser(self):
+        """Oublier toutes les mesures (tests)"""
+        with self.verrou:
+            self.tampon.clear()
+            self.requetes = {}
+            self.sommes = {}
+            self.depassements = {}
+
+
+registre = Registre(getattr(settings, 'INSTRUMENTATION_TAILLE_TAMPON', 1000))
+
+
+class InstrumentationMiddleware:
+    """Mesurer chaque requête et l'enregistrer dans `registre`"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mesure = Mesure()
+        request.instrumentation = mesure
+        debut = time.perf_counter()
+        with ExitStack() as pile:
+            for connexion in connections.all():
+                pile.enter_context(connexion.execute_wrapper(mesure.compter))
+            response = self.get_response(request)
+        fin = time.perf_counter()
+
+        if response.streaming:
+            taille = int(response.get('Content-Length') or 0)
+        else:
+            taille = len(response.content)
+        depasse = mesure.budget is not None and mesure.nb_requetes > mesure.budget
+        registre.enregistrer(Enregistrement(
+            vue=mesure.vue or 'non_resolue',
+            methode=request.method,
+            statut=response.status_code,
+            nb_requetes=mesure.nb_requetes,
+            duree_bd=mesure.duree_bd,
+            duree_serialisation=fin - mesure.fin_vue if mesure.fin_vue else 0.0,
+            taille=taille,
+            duree=fin - debut,
+        ), depasse)
+
+        if depasse:
+            message = (f'Budget de requêtes SQL dépassé pour {mesure.vue} ({request.method} {request.path}) : '
+                       f'{mesure.nb_requetes} > {mesure.budget}')
+            if getattr(settings, 'INSTRUMENTATION_BUDGET_STRICT', False):
+                raise BudgetRequetesDepasse(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        nom, classe, actions = nom_vue(view_func)
+        action = actions.get(request.method.lower()) if actions else None
+        mesure = request.instrumentation
+        mesure.vue = f'{nom}.{action}' if action else nom
+        if classe is not None:
+            mesure.budget = get_budget(classe, action)
+
+    def process_template_response(self, request, response):
+        # La vue est terminée : la suite est le rendu de la réponse
+        request.instrumentation.fin_vue = time.perf_counter()
+        return response
+
+
+class RenduPrometheus(renderers.BaseRenderer):
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Les erreurs (authentification, permission) sont des dicts DRF
+        texte = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+        return texte.encode(self.charset)
+
+
+class MetriquesInstrumentationView(APIView):
+    """Mesures du registre au format texte Prometheus (processus courant)"""
+    permission_classes = [IsAdminOnly]
+    renderer_classes = [RenduPrometheus]
+
+    def get(self, request):
+        return Response(registre.exporter(), content_type=TYPE_CONTENU_PROMETHEUS)
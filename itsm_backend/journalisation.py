@@ -0,0 +1,133 @@
+"""
+Journalisation structurée
+
+Remplace les `print` des chemins chauds (synchronisation, autorisations) par
+le module `logging`, configuré dans `settings.LOGGING` :
+
+- niveau par module : `LOG_LEVEL` pour l'ensemble des applications, surchargé
+  par `LOG_LEVELS` (`apps.machines=DEBUG,apps.monitoring=WARNING`) ; un message
+  sous le niveau de son logger n'est ni formaté ni écrit ;
+- formatage paresseux : les messages utilisent les arguments de `logging`
+  (`logger.debug('%s logiciels', nb)`), formatés seulement s'ils sont écrits ;
+- échantillonnage du niveau DEBUG (`FiltreEchantillonnage`) : un message DEBUG
+  sur `LOG_DEBUG_ECHANTILLON` est écrit pour chaque emplacement d'appel ;
+- `resume_requete()` : une seule ligne INFO par requête, avec les compteurs et
+  durées renseignés au fil du traitement (`completer_resume`), au lieu d'une
+  ligne par étape ou par logiciel ;
+- `FormateurJson` (`LOG_FORMAT=json`) : une ligne JSON par message, avec les
+  champs du résumé.
+"""
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# Attributs standard d'un LogRecord (les autres viennent de `extra`)
+ATTRIBUTS_STANDARD = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_resume = contextvars.ContextVar('resume_requete', default=None)
+
+
+def niveaux_modules(valeur):
+    """Niveaux par logger (`'apps.machines=DEBUG, apps.tickets=WARNING'` -> dict)"""
+    niveaux = {}
+    for element in (valeur or '').split(','):
+        nom, _, niveau = element.partition('=')
+        if nom.strip() and niveau.strip():
+            niveaux[nom.strip()] = niveau.strip().upper()
+    return niveaux
+
+
+class Champs:
+    """Champs `clé=valeur` d'une ligne de journal, formatés seulement à l'écriture"""
+    __slots__ = ('champs',)
+
+    def __init__(self, champs):
+        self.champs = champs
+
+    def __str__(self):
+        return ' '.join(f'{cle}={valeur}' for cle, valeur in aplatir(self.champs))
+
+
+def aplatir(champs, prefixe=''):
+    """(clé, valeur) avec les dictionnaires imbriqués en clés pointées (`durees_ms.total`)"""
+    for cle, valeur in champs.items():
+        if isinstance(valeur, dict):
+            yield from aplatir(valeur, f'{prefixe}{cle}.')
+        else:
+            yield f'{prefixe}{cle}', valeur
+
+
+class FiltreEchantillonnage(logging.Filter):
+    """
+    Ne laisser passer qu'un message DEBUG sur `taux` par emplacement d'appel
+
+    Le premier message de chaque emplacement passe toujours ; les niveaux
+    INFO et supérieurs ne sont jamais filtrés.
+    """
+
+    def __init__(self, taux=100, name=''):
+        super().__init__(name)
+        self.taux = max(1, int(taux))
+        self.verrou = threading.Lock()
+        self.compteurs = {}
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.taux == 1:
+            return True
+        cle = (record.pathname, record.lineno)
+        with self.verrou:
+            compteur = self.compteurs.get(cle, 0)
+            self.compteurs[cle] = compteur + 1
+        return compteur % self.taux == 0
+
+
+class FormateurJson(logging.Formatter):
+    """Une ligne JSON par message, avec les champs passés dans `extra`"""
+
+    def format(self, record):
+        ligne = {
+            'date': self.formatTime(record),
+            'niveau': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for cle, valeur in vars(record).items():
+            if cle not in ATTRIBUTS_STANDARD and not cle.startswith('_'):
+                ligne[cle] = valeur
+        if record.exc_info:
+            ligne['exception'] = self.formatException(record.exc_info)
+        return json.dumps(ligne, ensure_ascii=False, default=str)
+
+
+def completer_resume(**champs):
+    """Ajouter des champs au résumé de la requête en cours (sans effet hors requête)"""
+    resume = _resume.get()
+    if resume is not None:
+        resume.update(champs)
+
+
+@contextmanager
+def resume_requete(logger, evenement, **champs):
+    """
+    Collecter les compteurs d'une requête et les écrire en une ligne INFO à la fin
+
+    Les champs sont aussi passés dans `extra['resume']` pour `FormateurJson`.
+    La durée totale est ajoutée (`duree_ms`) ; une exception non rattrapée est
+    notée dans `resultat` puis propagée.
+    """
+    resume = dict(champs)
+    jeton = _resume.set(resume)
+    debut = time.perf_counter()
+    try:
+        yield resume
+    except Exception:
+        resume.setdefault('resultat', 'erreur')
+        raise
+    finally:
+        _resume.reset(jeton)
+        resume['duree_ms'] = round((time.perf_counter() - debut) * 1000, 1)
+        # stacklevel : attribuer la ligne au code appelant, pas à ce module ni à contextlib
+        logger.info('%s %s', evenement, Champs(resume), extra={'resume': resume}, stacklevel=3)
@@ -0,0 +1,135 @@
+"""
+Pagination par curseur (keyset) pour les tables volumineuses en ajout
+
+`PageNumberPagination` compte toutes les lignes (COUNT(*)) et parcourt l'OFFSET
+à chaque page, ce qui coûte de plus en plus cher en profondeur. Ici chaque page
+reprend après la dernière ligne vue, repérée par le couple (date, id), avec un
+ordre stable (`-date, -id`) servi par un index composite sur ces colonnes.
+
+- `next` : page suivante (éléments plus anciens), None en fin de liste ;
+- `previous` : éléments plus récents que le premier de la page. Il est fourni
+  même s'il n'y en a pas encore, pour que les clients récupèrent les nouveaux
+  éléments de façon incrémentale au lieu de recharger la première page.
+
+L'ordre étant imposé par le curseur, le paramètre `ordering` (OrderingFilter)
+est refusé (400) plutôt qu'ignoré.
+"""
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class PaginationCurseur(BasePagination):
+    """
+    Pagination keyset sur (`champ_date`, id)
+
+    La vue peut préciser le champ de date avec l'attribut `champ_curseur`.
+    """
+    page_size = api_settings.PAGE_SIZE or 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    champ_date = 'date_creation'
+    message_invalide = 'Curseur invalide.'
+    message_tri = "Tri non disponible avec la pagination par curseur (du plus récent au plus ancien)."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            raise ValidationError({api_settings.ORDERING_PARAM: [self.message_tri]})
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.champ = getattr(view, 'champ_curseur', self.champ_date)
+        taille = self.get_page_size(request)
+
+        curseur = self.decoder_curseur(request, queryset.model)
+        self.curseur = curseur
+        self.vers_recents = bool(curseur and curseur['r'])
+
+        if curseur is None:
+            queryset = queryset.order_by(f'-{self.champ}', '-pk')
+        elif self.vers_recents:
+            queryset = queryset.filter(
+                Q(**{f'{self.champ}__gt': curseur['d']}) | Q(**{self.champ: curseur['d'], 'pk__gt': curseur['i']})
+            ).order_by(self.champ, 'pk')
+        else:
+            queryset = queryset.filter(
+                Q(**{f'{self.champ}__lt': curseur['d']}) | Q(**{self.champ: curseur['d'], 'pk__lt': curseur['i']})
+            ).order_by(f'-{self.champ}', '-pk')
+
+        elements = list(queryset[:taille + 1])
+        self.encore = len(elements) > taille
+        elements = elements[:taille]
+        if self.vers_recents:
+            elements.reverse()
+        self.page = elements
+        return elements
+
+    def get_page_size(self, request):
+        try:
+            taille = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(taille, self.max_page_size))
+
+    def encoder_curseur(self, element, vers_recents):
+        valeur = getattr(element, self.champ)
+        contenu = {'d': valeur.isoformat(), 'i': str(element.pk), 'r': vers_recents}
+        jeton = base64.urlsafe_b64encode(json.dumps(contenu, separators=(',', ':')).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, jeton)
+
+    def decoder_curseur(self, request, modele):
+        """Curseur de la requête ({'d': date, 'i': clé primaire, 'r': vers les récents}) ou None"""
+        jeton = request.query_params.get(self.cursor_query_param)
+        if not jeton:
+            return None
+        try:
+            curseur = json.loads(base64.urlsafe_b64decode(jeton.encode('ascii')))
+            date = parse_datetime(curseur['d'])
+            if date is None or not curseur['i']:
+                raise ValueError
+            # Un identifiant forgé ne doit pas atteindre la requête SQL
+            pk = modele._meta.pk.to_python(curseur['i'])
+            return {'d': date, 'i': pk, 'r': bool(curseur.get('r'))}
+        except (binascii.Error, ValueError, UnicodeError, KeyError, TypeError, DjangoValidationError):
+            raise NotFound(self.message_invalide)
+
+    def get_next_link(self):
+        # En remontant vers les plus récents, la page d'où l'on vient existe toujours
+        if self.page and (self.encore or self.vers_recents):
+            return self.encoder_curseur(self.page[-1], vers_recents=False)
+        return None
+
+    def get_previous_link(self):
+        if self.page:
+            return self.encoder_curseur(self.page[0], vers_recents=True)
+        if self.curseur and self.vers_recents:
+            # Pas encore d'éléments plus récents : le même curseur reste valable
+            return self.base_url
+        return None
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -6,6 +6,8 @@ import os
 from pathlib import Path
 from decouple import config
 
+from itsm_backend.journalisation import niveaux_modules
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -59,6 +61,15 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Instrumentation des requêtes (requêtes SQL, durées, taille des réponses), exposée
+# sur /api/v1/_metrics - voir itsm_backend/instrumentation.py
+INSTRUMENTATION = config('INSTRUMENTATION', default=False, cast=bool)
+INSTRUMENTATION_TAILLE_TAMPON = config('INSTRUMENTATION_TAILLE_TAMPON', default=1000, cast=int)
+# Lever une exception quand une vue dépasse son budget de requêtes SQL (tests)
+INSTRUMENTATION_BUDGET_STRICT = config('INSTRUMENTATION_BUDGET_STRICT', default=False, cast=bool)
+if INSTRUMENTATION:
+    MIDDLEWARE.insert(0, 'itsm_backend.instrumentation.InstrumentationMiddleware')
+
 ROOT_URLCONF = 'itsm_backend.urls'
 
 TEMPLATES = [
@@ -84,6 +95,11 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Attendre le verrou d'écriture (allocation des numéros de ticket,
+            # compteurs de charge) au lieu d'échouer avec « database is locked »
+            'timeout': config('DATABASE_TIMEOUT', default=20, cast=int),
+        },
     }
 }
 
@@ -120,6 +136,35 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Cache (snapshots de politique de blocage, etc.)
+# En production avec plusieurs workers, utiliser un cache partagé (Redis, Memcached) :
+# `manage.py check --deploy` échoue avec LocMemCache quand DEBUG est désactivé
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='itsm-cache'),
+    }
+}
+
+# Assignation automatique des nouveaux tickets : moins_charge, round_robin ou ponderee_sla
+TICKETS_STRATEGIE_ASSIGNATION = config('TICKETS_STRATEGIE_ASSIGNATION', default='moins_charge')
+
+# Rétention des métriques de performance en jours (0 : conservation illimitée)
+# Les échantillons bruts sont conservés tant qu'ils ne sont pas agrégés dans tous les niveaux
+MONITORING_RETENTION_BRUTES = config('MONITORING_RETENTION_BRUTES', default=7, cast=int)
+MONITORING_RETENTION_1M = config('MONITORING_RETENTION_1M', default=30, cast=int)
+MONITORING_RETENTION_1H = config('MONITORING_RETENTION_1H', default=365, cast=int)
+MONITORING_RETENTION_1D = config('MONITORING_RETENTION_1D', default=0, cast=int)
+
+# Sondage d'accessibilité des machines : connexion TCP sur le port, ou GET HTTP sur le chemin s'il est défini
+MONITORING_SONDE_PORT = config('MONITORING_SONDE_PORT', default=445, cast=int)
+MONITORING_SONDE_CHEMIN = config('MONITORING_SONDE_CHEMIN', default='')
+MONITORING_SONDE_CONCURRENCE = config('MONITORING_SONDE_CONCURRENCE', default=500, cast=int)
+MONITORING_SONDE_DELAI = config('MONITORING_SONDE_DELAI', default=2.0, cast=float)
+
+# Intervalle minimal (secondes) entre deux écritures du signal de vie d'une machine
+MONITORING_INTERVALLE_HEARTBEAT = config('MONITORING_INTERVALLE_HEARTBEAT', default=60, cast=int)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -163,6 +208,12 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 
 # Logging
+# Journalisation (voir itsm_backend/journalisation.py)
+# LOG_LEVELS surcharge le niveau de certains modules : apps.machines=DEBUG,apps.monitoring=WARNING
+LOG_LEVEL = config('LOG_LEVEL', default='INFO').upper()
+LOG_FORMAT = config('LOG_FORMAT', default='verbose')
+# Le dossier des journaux n'est pas versionné
+(BASE_DIR / 'logs').mkdir(exist_ok=True)
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -171,24 +222,42 @@ LOGGING = {
             'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'itsm_backend.journalisation.FormateurJson',
+        },
+    },
+    'filters': {
+        'echantillonnage': {
+            '()': 'itsm_backend.journalisation.FiltreEchantillonnage',
+            'taux': config('LOG_DEBUG_ECHANTILLON', default=100, cast=int),
+        },
     },
     'handlers': {
         'file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
             'filename': BASE_DIR / 'logs' / 'itsm.log',
-            'formatter': 'verbose',
+            'formatter': LOG_FORMAT,
         },
         'console': {
             'level': 'DEBUG',
             'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
+            'formatter': LOG_FORMAT,
+            'filters': ['echantillonnage'],
         },
     },
     'root': {
         'handlers': ['console', 'file'],
         'level': 'INFO',
     },
+    'loggers': {
+        'apps': {'level': LOG_LEVEL},
+        'itsm_backend': {'level': LOG_LEVEL},
+        **{
+            nom: {'level': niveau}
+            for nom, niveau in niveaux_modules(config('LOG_LEVELS', default='')).items()
+        },
+    },
 }
 
 # Sécurité
@@ -7,6 +7,9 @@ from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
 from rest_framework.authtoken.views import obtain_auth_token
+from apps.tickets.urls import notifications_urlpatterns
+from apps.tickets.views import EvenementsView
+from itsm_backend.instrumentation import MetriquesInstrumentationView
 
 # Configuration du routeur principal pour l'API
 router = DefaultRouter()
@@ -34,9 +37,13 @@ urlpatterns = [
     path('api/v1/reports/', include('apps.reports.urls')),
     
     # Endpoint direct pour les notifications (contournement)
-    path('api/v1/notifications/', include([
-        path('', include('apps.tickets.urls')),
-    ])),
+    path('api/v1/notifications/', include(notifications_urlpatterns)),
+    
+    # Canal d'événements long-poll pour les clients desktop et mobile
+    path('api/v1/evenements/', EvenementsView.as_view(), name='evenements'),
+    
+    # Mesures des requêtes au format Prometheus (INSTRUMENTATION=True)
+    path('api/v1/_metrics', MetriquesInstrumentationView.as_view(), name='metriques_instrumentation'),
     
     # Interface Web (optionnelle)
     path('', include('apps.web.urls')),
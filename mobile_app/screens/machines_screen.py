@@ -152,7 +152,7 @@ class MachinesScreen(Screen):
                 item = ThreeLineListItem(
                     text=f"{icon} {machine.get('nom', 'Machine sans nom')}",
                     secondary_text=f"{status_icon} {status.replace('_', ' ').title()} - {machine.get('type', 'Type inconnu')}",
-                    tertiary_text=f"IP: {machine.get('adresse_ip', 'Non définie')} | Utilisateur: {machine.get('utilisateur', 'Non assigné')}",
+                    tertiary_text=f"IP: {machine.get('adresse_ip', 'Non définie')} | Utilisateur: {machine.get('utilisateur_nom') or 'Non assigné'}",
                     on_release=lambda x, m=machine: self.show_machine_detail(m)
                 )
                 
@@ -259,7 +259,7 @@ Nom: {machine.get('nom', 'Non défini')}
 Type: {machine.get('type', 'Inconnu')}
 Statut: {machine.get('statut', 'Inconnu')}
 Adresse IP: {machine.get('adresse_ip', 'Non définie')}
-Utilisateur: {machine.get('utilisateur', 'Non assigné')}
+Utilisateur: {machine.get('utilisateur_nom') or 'Non assigné'}
 Localisation: {machine.get('localisation', 'Non définie')}
 
 Spécifications:
@@ -27,6 +27,12 @@ class APIClient:
         self.token = None
         self.storage = StorageManager()
         
+        # Listes déjà chargées : (endpoint, filtres) -> état (éléments, jeton de synchronisation)
+        self._lists = {}
+        # Statut et jeton de synchronisation (en-tête X-Sync-Token) de la dernière réponse
+        self.last_status_code = None
+        self.last_sync_token = None
+        
         # Charger le token sauvegardé
         self._load_token()
     
@@ -55,10 +61,14 @@ class APIClient:
             Logger.error(f"APIClient: Erreur lors de la sauvegarde du token: {e}")
     
     def _make_request(self, method: str, endpoint: str, data: dict = None, 
-                     params: dict = None) -> Tuple[bool, dict]:
+                     params: dict = None, timeout: int = 10) -> Tuple[bool, dict]:
         """Effectuer une requête HTTP"""
         try:
-            url = f"{self.api_url}/{endpoint.lstrip('/')}"
+            # Les liens de pagination (next/previous) sont des URL absolues
+            if endpoint.startswith(('http://', 'https://')):
+                url = endpoint
+            else:
+                url = f"{self.api_url}/{endpoint.lstrip('/')}"
             
             # Préparer les headers
             headers = {
@@ -68,17 +78,19 @@ class APIClient:
             
             # Effectuer la requête
             if method.upper() == 'GET':
-                response = self.session.get(url, params=params, headers=headers, timeout=10)
+                response = self.session.get(url, params=params, headers=headers, timeout=timeout)
             elif method.upper() == 'POST':
-                response = self.session.post(url, json=data, headers=headers, timeout=10)
+                response = self.session.post(url, json=data, headers=headers, timeout=timeout)
             elif method.upper() == 'PUT':
-                response = self.session.put(url, json=data, headers=headers, timeout=10)
+                response = self.session.put(url, json=data, headers=headers, timeout=timeout)
             elif method.upper() == 'DELETE':
-                response = self.session.delete(url, headers=headers, timeout=10)
+                response = self.session.delete(url, headers=headers, timeout=timeout)
             else:
                 return False, {'error': f'Méthode HTTP non supportée: {method}'}
             
             # Traiter la réponse
+            self.last_status_code = response.status_code
+            self.last_sync_token = response.headers.get('X-Sync-Token')
             if response.status_code in [200, 201]:
                 try:
                     return True, response.json()
@@ -159,6 +171,7 @@ class APIClient:
             self.storage.clear_auth_token()
             if 'Authorization' in self.session.headers:
                 del self.session.headers['Authorization']
+            self._lists.clear()
             Logger.info("APIClient: Déconnexion effectuée")
         except Exception as e:
             Logger.error(f"APIClient: Erreur lors de la déconnexion: {e}")
@@ -167,14 +180,114 @@ class APIClient:
         """Récupérer le profil utilisateur"""
         return self._make_request('GET', 'users/profile/')
     
+    # === LISTES PAGINÉES PAR CURSEUR ===
+    
+    def _list_key(self, endpoint: str, params: dict = None) -> tuple:
+        return endpoint, tuple(sorted((params or {}).items()))
+    
+    def _sync_changes(self, endpoint: str, params: dict, state: dict,
+                      date_key: str, newest_first: bool = True) -> Tuple[bool, dict]:
+        """
+        Fusionner dans une liste chargée les changements depuis son jeton (`?since=`)
+        
+        Les éléments créés ou modifiés remplacent ceux de même id, les supprimés
+        sont retirés, puis la liste est retriée selon `date_key`.
+        """
+        while True:
+            success, response = self._make_request(
+                'GET', endpoint, params={**(params or {}), 'since': state['token']})
+            if not success:
+                return False, response
+            changed = {item.get('id'): item for item in response.get('results', [])}
+            removed = set(response.get('supprimes', [])) | set(changed)
+            state['items'] = list(changed.values()) + [
+                item for item in state['items'] if item.get('id') not in removed
+            ]
+            state['token'] = response.get('jeton', state['token'])
+            if response.get('complet', True):
+                break
+        state['items'].sort(key=lambda item: item.get(date_key) or '', reverse=newest_first)
+        return True, response
+    
+    def _get_cursor_list(self, endpoint: str, params: dict = None,
+                         date_key: str = 'date_creation') -> Tuple[bool, List[dict]]:
+        """
+        Récupérer une liste paginée par curseur, de façon incrémentale
+        
+        Le premier appel charge la première page et conserve le jeton de
+        synchronisation renvoyé. Les suivants ne demandent que les éléments
+        créés, modifiés ou supprimés depuis (`?since=`), au lieu de recharger la
+        première page. `_load_more` suit le lien `next`.
+        """
+        key = self._list_key(endpoint, params)
+        state = self._lists.get(key)
+        
+        if state is None or not state['token']:
+            success, response = self._make_request('GET', endpoint, params=params)
+            if not success:
+                return False, response
+            if not isinstance(response, dict) or 'results' not in response:
+                return True, response  # Liste non paginée
+            self._lists[key] = state = {
+                'items': list(response['results']),
+                'older': response.get('next'),
+                'token': self.last_sync_token,
+            }
+            return True, list(state['items'])
+        
+        success, response = self._sync_changes(endpoint, params, state, date_key)
+        if not success:
+            if self.last_status_code == 410:
+                # Jeton expiré : recharger la liste
+                del self._lists[key]
+                return self._get_cursor_list(endpoint, params, date_key)
+            return False, response
+        return True, list(state['items'])
+    
+    def _get_synced_list(self, endpoint: str, params: dict = None,
+                         date_key: str = 'date_creation', newest_first: bool = True) -> Tuple[bool, List[dict]]:
+        """Récupérer une liste complète, puis uniquement ses changements (`?since=0` au premier appel)"""
+        key = self._list_key(endpoint, params)
+        state = self._lists.setdefault(key, {'items': [], 'older': None, 'token': '0'})
+        success, response = self._sync_changes(endpoint, params, state, date_key, newest_first)
+        if not success:
+            del self._lists[key]
+            if self.last_status_code == 410:
+                return self._get_synced_list(endpoint, params, date_key, newest_first)
+            return False, response
+        return True, list(state['items'])
+    
+    def _load_more(self, endpoint: str, params: dict = None) -> Tuple[bool, List[dict]]:
+        """Charger la page suivante (éléments plus anciens) d'une liste déjà chargée"""
+        state = self._lists.get(self._list_key(endpoint, params))
+        if state is None:
+            return self._get_cursor_list(endpoint, params)
+        if state['older']:
+            success, response = self._make_request('GET', state['older'])
+            if not success:
+                return False, response
+            ids = {item.get('id') for item in state['items']}
+            state['items'] += [item for item in response.get('results', []) if item.get('id') not in ids]
+            state['older'] = response.get('next')
+        return True, list(state['items'])
+    
+    def _update_cached_items(self, endpoint: str, item_id, changes: dict):
+        """Répercuter une modification locale dans les listes déjà chargées"""
+        for (list_endpoint, _), state in self._lists.items():
+            if list_endpoint == endpoint:
+                for item in state['items']:
+                    if item.get('id') == item_id:
+                        item.update(changes)
+    
     # === GESTION DES TICKETS ===
     
     def get_tickets(self, filters: dict = None) -> Tuple[bool, List[dict]]:
-        """Récupérer la liste des tickets"""
-        success, response = self._make_request('GET', 'tickets/', params=filters)
-        if success:
-            return True, response.get('results', response)
-        return False, response
+        """Récupérer la liste des tickets (seuls les changements sont demandés aux appels suivants)"""
+        return self._get_cursor_list('tickets/', filters)
+    
+    def load_more_tickets(self, filters: dict = None) -> Tuple[bool, List[dict]]:
+        """Charger les tickets plus anciens"""
+        return self._load_more('tickets/', filters)
     
     def get_ticket_detail(self, ticket_id: str) -> Tuple[bool, dict]:
         """Récupérer les détails d'un ticket"""
@@ -194,12 +307,9 @@ class APIClient:
         return self._make_request('POST', 'tickets/commentaires/', comment_data)
     
     def get_ticket_comments(self, ticket_id: str) -> Tuple[bool, List[dict]]:
-        """Récupérer les commentaires d'un ticket"""
-        success, response = self._make_request('GET', 'tickets/commentaires/', 
-                                             params={'ticket': ticket_id})
-        if success:
-            return True, response.get('results', response)
-        return False, response
+        """Récupérer les commentaires d'un ticket (seuls les changements aux appels suivants)"""
+        return self._get_synced_list('tickets/commentaires/', {'ticket': ticket_id},
+                                     newest_first=False)
     
     # === GESTION DES MACHINES ===
     
@@ -239,22 +349,34 @@ class APIClient:
             params['lu'] = 'false'
         
         # Utiliser l'endpoint correct pour les notifications
-        success, response = self._make_request('GET', 'notifications/', params=params)
-        if success:
-            return True, response.get('results', response)
-        return False, response
+        return self._get_cursor_list('notifications/', params, date_key='date')
+    
+    def wait_events(self, cursor: str = None, wait: int = 20) -> Tuple[bool, dict]:
+        """
+        Attendre les événements poussés par le serveur (long-poll)
+        
+        Sans curseur, le serveur répond immédiatement avec un curseur initial.
+        Retourne {'curseur': ..., 'evenements': [...]} en cas de succès.
+        """
+        params = {'attente': wait}
+        if cursor:
+            params['curseur'] = cursor
+        return self._make_request('GET', 'evenements/', params=params, timeout=wait + 10)
     
     def mark_notification_read(self, notification_id: str) -> Tuple[bool, dict]:
         """Marquer une notification comme lue"""
-        return self._make_request('PUT', f'tickets/notifications/{notification_id}/', 
-                                {'lu': True})
+        success, response = self._make_request('PUT', f'tickets/notifications/{notification_id}/', 
+                                               {'lu': True})
+        if success:
+            self._update_cached_items('notifications/', notification_id, {'lu': True})
+        return success, response
     
     def get_unread_count(self) -> int:
         """Récupérer le nombre de notifications non lues"""
         try:
             success, notifications = self.get_notifications(unread_only=True)
             if success:
-                return len(notifications)
+                return sum(1 for notification in notifications if not notification.get('lu'))
         except Exception as e:
             Logger.error(f"APIClient: Erreur lors du comptage des notifications: {e}")
         return 0
@@ -38,7 +38,9 @@ class NotificationManager:
     def __init__(self):
         self.user_id = None
         self.is_running = False
-        self.check_interval = 30  # Vérifier toutes les 30 secondes
+        self.check_interval = 30  # Délai maximal de reprise après une erreur du canal
+        self.event_wait = 20  # Durée d'attente d'une requête long-poll
+        self.event_cursor = None
         self.last_notification_count = 0
         self.notification_callbacks = []
         self.check_thread = None
@@ -112,18 +114,47 @@ class NotificationManager:
         """Arrêter complètement le gestionnaire"""
         self.stop_monitoring()
         self.user_id = None
+        self.event_cursor = None
         self.notification_callbacks.clear()
     
     def _notification_loop(self):
-        """Boucle principale de vérification des notifications"""
+        """Boucle principale : écoute du canal d'événements du serveur (long-poll)"""
+        # Importer ici pour éviter les imports circulaires
+        from .api_client import APIClient
+        
+        api_client = APIClient()
+        retry_delay = 1
         while self.is_running:
             try:
-                if self.preferences.get('enabled', True):
-                    self.check_notifications()
-                time.sleep(self.check_interval)
+                success, data = api_client.wait_events(self.event_cursor, self.event_wait)
+                if not success:
+                    raise RuntimeError(data.get('error', 'réponse invalide'))
+                
+                self.event_cursor = data.get('curseur')
+                if data.get('evenements') and self.preferences.get('enabled', True):
+                    self._handle_events(data['evenements'])
+                retry_delay = 1
             except Exception as e:
                 Logger.error(f"NotificationManager: Erreur dans la boucle: {e}")
-                time.sleep(self.check_interval)
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, self.check_interval)
+    
+    def _handle_events(self, events: List[Dict]):
+        """Traiter les deltas reçus du serveur"""
+        notifications = [e['notification'] for e in events if e.get('type') == 'notification']
+        for notification_data in notifications:
+            self._show_notification(notification_data)
+        if notifications:
+            self.last_notification_count += len(notifications)
+            Clock.schedule_once(lambda dt: self._notify_callbacks(notifications), 0)
+        
+        if self.preferences.get('tickets', True):
+            for event in events:
+                if event.get('type') == 'statut_ticket':
+                    self.show_local_notification(
+                        f"Ticket {event.get('numero', 'N/A')}",
+                        f"{event.get('titre', '')} : {event.get('statut', '')}"
+                    )
     
     def check_notifications(self):
         """Vérifier les nouvelles notifications"""
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Simulation des stratégies d'assignation automatique des tickets
+
+Rejoue l'arrivée de tickets synthétiques (catégorie, site, priorité) et leur
+résolution après une durée dépendant de la priorité, en appliquant chaque
+stratégie de `apps.tickets.assignation` sur des compteurs de charge en mémoire.
+Le choix utilise un tas par groupe de candidats (compétence + site, compétence,
+tous) avec invalidation paresseuse : O(log n) par décision, comme la requête
+indexée en production. L'ancien tirage aléatoire sert de référence.
+
+Mesures : temps par décision, écart moyen entre le technicien le plus et le
+moins chargé, charge maximale observée, part des tickets assignés hors site.
+
+Usage : python scripts/benchmark_assignation.py [nb_tickets] [nb_techniciens]
+"""
+import heapq
+import os
+import random
+import statistics
+import sys
+import time
+
+import django
+
+# Ajouter le répertoire parent au path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configuration Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'itsm_backend.settings')
+django.setup()
+
+from apps.tickets.assignation import STRATEGIES
+from apps.tickets.models import POIDS_PRIORITE
+
+CATEGORIES = ['materiel', 'reseau', 'logiciel', 'compte', 'impression', 'telephonie']
+SITES = ['siege', 'agence-nord', 'agence-sud']
+PRIORITES = ['basse', 'normale', 'haute', 'critique', 'urgente']
+REPARTITION_PRIORITES = [20, 50, 20, 8, 2]
+# Durée moyenne de traitement (en nombre d'arrivées de tickets) par priorité
+DUREE_TRAITEMENT = {'basse': 400, 'normale': 250, 'haute': 120, 'critique': 50, 'urgente': 40}
+
+
+class ChargeSimulee:
+    """Équivalent en mémoire de ChargeTechnicien"""
+
+    def __init__(self, indice, site, competences):
+        self.indice = indice
+        self.site = site
+        self.competences = competences
+        self.tickets_ouverts = 0
+        self.charge_ponderee = 0
+        self.derniere_assignation = None
+        self.version = 0
+
+
+class RepartiteurSimule:
+    """Choix par tas, avec les mêmes groupes de candidats et relâchements que choisir_technicien"""
+
+    def __init__(self, strategie, charges):
+        self.strategie = strategie
+        self.charges = charges
+        self.tas = {}
+        for charge in charges:
+            for groupe in self.groupes(charge):
+                self.tas.setdefault(groupe, []).append(self.entree(charge))
+        for tas in self.tas.values():
+            heapq.heapify(tas)
+
+    @staticmethod
+    def groupes(charge):
+        yield None, None
+        for categorie in charge.competences:
+            yield categorie, None
+            yield categorie, charge.site
+
+    def entree(self, charge):
+        return self.strategie.cle(charge) + (charge.indice, charge.version)
+
+    def mettre_a_jour(self, charge):
+        charge.version += 1
+        for groupe in self.groupes(charge):
+            heapq.heappush(self.tas[groupe], self.entree(charge))
+
+    def choisir(self, categorie, site):
+        for groupe in ((categorie, site), (categorie, None), (None, None)):
+            tas = self.tas.get(groupe)
+            while tas:
+                *cle, indice, version = tas[0]
+                if version == self.charges[indice].version:
+                    return self.charges[indice]
+                heapq.heappop(tas)  # entrée périmée
+        return None
+
+
+class RepartiteurAleatoire:
+    """Ancien comportement : technicien tiré au hasard"""
+
+    def __init__(self, charges, aleatoire):
+        self.charges = charges
+        self.aleatoire = aleatoire
+
+    def mettre_a_jour(self, charge):
+        pass
+
+    def choisir(self, categorie, site):
+        return self.aleatoire.choice(self.charges)
+
+
+def generer_techniciens(nb_techniciens, aleatoire):
+    charges = []
+    for indice in range(nb_techniciens):
+        competences = set(aleatoire.sample(CATEGORIES, aleatoire.randint(1, 3)))
+        charges.append(ChargeSimulee(indice, aleatoire.choice(SITES), competences))
+    # Chaque catégorie a au moins un technicien compétent
+    for categorie in CATEGORIES:
+        if not any(categorie in c.competences for c in charges):
+            aleatoire.choice(charges).competences.add(categorie)
+    return charges
+
+
+def generer_tickets(nb_tickets, aleatoire):
+    for _ in range(nb_tickets):
+        priorite = aleatoire.choices(PRIORITES, REPARTITION_PRIORITES)[0]
+        yield (
+            aleatoire.choice(CATEGORIES),
+            aleatoire.choice(SITES),
+            priorite,
+            max(1, int(aleatoire.expovariate(1 / DUREE_TRAITEMENT[priorite]))),
+        )
+
+
+def simuler(nom, nb_tickets, nb_techniciens, graine=42):
+    aleatoire = random.Random(graine)
+    charges = generer_techniciens(nb_techniciens, aleatoire)
+    tickets = list(generer_tickets(nb_tickets, aleatoire))
+    if nom == 'aleatoire':
+        repartiteur = RepartiteurAleatoire(charges, random.Random(graine))
+    else:
+        repartiteur = RepartiteurSimule(STRATEGIES[nom](), charges)
+
+    resolutions = []  # (instant, technicien, poids)
+    ecarts = []
+    charge_max = 0
+    hors_site = 0
+    duree_choix = 0.0
+
+    for instant, (categorie, site, priorite, duree) in enumerate(tickets):
+        # Résolutions arrivées à échéance
+        while resolutions and resolutions[0][0] <= instant:
+            _, indice, poids = heapq.heappop(resolutions)
+            charge = charges[indice]
+            charge.tickets_ouverts -= 1
+            charge.charge_ponderee -= poids
+            repartiteur.mettre_a_jour(charge)
+
+        debut = time.perf_counter()
+        charge = repartiteur.choisir(categorie, site)
+        duree_choix += time.perf_counter() - debut
+
+        poids = POIDS_PRIORITE[priorite]
+        charge.tickets_ouverts += 1
+        charge.charge_ponderee += poids
+        charge.derniere_assignation = instant + 1
+        repartiteur.mettre_a_jour(charge)
+        heapq.heappush(resolutions, (instant + duree, charge.indice, poids))
+        hors_site += charge.site != site
+
+        if instant % 100 == 0:
+            ouverts = [c.tickets_ouverts for c in charges]
+            ecarts.append(max(ouverts) - min(ouverts))
+            charge_max = max(charge_max, max(ouverts))
+
+    return {
+        'us_par_choix': duree_choix / nb_tickets * 1e6,
+        'ecart_moyen': statistics.mean(ecarts),
+        'charge_max': charge_max,
+        'hors_site': hors_site / nb_tickets * 100,
+    }
+
+
+def main():
+    nb_tickets = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    nb_techniciens = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    print(f"📊 {nb_tickets} tickets, {nb_techniciens} techniciens, "
+          f"{len(CATEGORIES)} catégories, {len(SITES)} sites")
+    print(f"  {'stratégie':<14} {'µs/choix':>9} {'écart moyen':>12} {'charge max':>11} {'hors site':>10}")
+    for nom in ['aleatoire', *STRATEGIES]:
+        resultat = simuler(nom, nb_tickets, nb_techniciens)
+        print(f"  {nom:<14} {resultat['us_par_choix']:9.2f} {resultat['ecart_moyen']:12.1f} "
+              f"{resultat['charge_max']:11d} {resultat['hors_site']:9.1f}%")
+
+
+if __name__ == '__main__':
+    main()
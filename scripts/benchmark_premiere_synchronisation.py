@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Latence de la première synchronisation d'une machine (création de l'inventaire)
+
+Sur une base de test créée pour l'occasion (migrations appliquées), mesure :
+
+- `unitaire` : l'écriture de référence des logiciels, un
+  `LogicielInstalle.objects.create()` par logiciel en autocommit (une
+  transaction, donc un fsync, par ligne), comme avant la création groupée ;
+- `synchronisation` : `POST /api/v1/machines/synchroniser_machine_locale/`
+  complet pour une nouvelle machine (validation, création en une transaction,
+  liaison aux références et autorisations), avec le détail `durees_ms` renvoyé.
+
+La base utilisée est celle des settings : SQLite par défaut, dans un fichier
+temporaire (une base en mémoire masquerait le coût des commits). Pour mesurer
+sur PostgreSQL, définir `ITSM_BENCHMARK_DATABASE_URL` (voir
+benchmark_ingestion_metriques.py).
+
+Usage : python scripts/benchmark_premiere_synchronisation.py [nb_logiciels] [repetitions]
+"""
+import os
+import statistics
+import sys
+import time
+
+# Ajouter le répertoire parent au path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configuration Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'itsm_backend.settings')
+
+# Configure la base de mesure (fichier temporaire ou PostgreSQL) et initialise Django
+import benchmark_ingestion_metriques  # noqa: E402,F401
+
+from django.conf import settings
+from django.db import connection
+from rest_framework.test import APIClient
+from apps.machines.models import LogicielInstalle, Machine
+from apps.users.models import Structure, User
+
+URL = '/api/v1/machines/synchroniser_machine_locale/'
+
+
+def generer_inventaire(nb_logiciels, suffixe):
+    """Inventaire d'agent avec nb_logiciels paquets (noms partagés entre machines)"""
+    return {
+        'nom': f'PC-BENCH-{suffixe}',
+        'info_systeme': {'os_nom': 'Windows', 'os_version': '11', 'cpu_nom': 'Bench CPU', 'ram_totale': 16 * 1024**3},
+        'interfaces_reseau': [
+            {'nom': 'Ethernet', 'type_interface': 'ethernet', 'adresse_ip': '10.0.0.10'},
+            {'nom': 'Wi-Fi', 'type_interface': 'wifi'},
+        ],
+        'logiciels': [
+            {'nom': f'Paquet {i:05d}', 'version': f'{i % 7}.{i % 13}', 'editeur': f'Editeur {i % 50}', 'taille': 1024 * i}
+            for i in range(nb_logiciels)
+        ],
+    }
+
+
+def mesurer_unitaire(structure, inventaire):
+    machine = Machine.objects.create(nom='PC-BENCH-UNITAIRE', structure=structure)
+    debut = time.perf_counter()
+    for logiciel in inventaire['logiciels']:
+        LogicielInstalle.objects.create(machine=machine, **logiciel)
+    return (time.perf_counter() - debut) * 1000
+
+
+def mesurer_synchronisation(structure, nb_logiciels, indice):
+    user = User.objects.create_user(
+        username=f'@bench.{indice}', prenom='Bench', nom=str(indice),
+        email=f'bench{indice}@example.com', structure=structure, password='bench'
+    )
+    client = APIClient()
+    client.force_authenticate(user)
+    inventaire = generer_inventaire(nb_logiciels, indice)
+    debut = time.perf_counter()
+    response = client.post(URL, {'machine': inventaire}, format='json')
+    duree = (time.perf_counter() - debut) * 1000
+    if response.status_code != 201:
+        raise RuntimeError(f'Synchronisation refusée ({response.status_code}) : {response.content[:500]}')
+    return duree, response.json()['durees_ms']
+
+
+def main():
+    nb_logiciels = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    settings.ALLOWED_HOSTS.append('testserver')
+
+    nom_base = connection.creation.create_test_db(verbosity=0)
+    try:
+        structure = Structure.objects.create(nom='Benchmark', code='bench')
+        print(f"📊 Première synchronisation, {nb_logiciels} logiciels, {repetitions} répétition(s) "
+              f"({connection.vendor}, {nom_base})")
+
+        duree_unitaire = mesurer_unitaire(structure, generer_inventaire(nb_logiciels, 'unitaire'))
+        print(f"  {'unitaire':<16} {duree_unitaire:10,.0f} ms (écriture des logiciels seule)")
+
+        durees = []
+        ecritures = []
+        for indice in range(repetitions):
+            duree, detail = mesurer_synchronisation(structure, nb_logiciels, indice)
+            durees.append(duree)
+            ecritures.append(detail.get('ecriture', duree))
+            etapes = ', '.join(f'{etape} {valeur:.0f}' for etape, valeur in detail.items() if isinstance(valeur, (int, float)))
+            print(f"  {'synchronisation':<16} {duree:10,.0f} ms ({etapes})")
+        print(f"  médiane : {statistics.median(durees):,.0f} ms, écriture groupée "
+              f"{statistics.median(ecritures):,.0f} ms (gain ×{duree_unitaire / statistics.median(ecritures):.1f})")
+    finally:
+        connection.creation.destroy_test_db(nom_base, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
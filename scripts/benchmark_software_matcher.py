@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark du matcher des logiciels bloqués de l'agent desktop
+
+Mesure le coût d'un passage sur les processus en cours avec 500 logiciels
+bloqués : ancienne boucle de correspondance, matcher compilé à froid (premier
+passage après une mise à jour de la liste) et à chaud (résultats mémorisés).
+
+Usage : python scripts/benchmark_software_matcher.py [nb_bloques] [nb_processus]
+"""
+import os
+import random
+import sys
+import time
+
+# Ajouter le répertoire parent au path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from desktop_app.software_matcher import BlockedSoftwareMatcher, SERVICES_SYSTEME_CRITIQUES
+
+
+def ancienne_correspondance(blocked_software, software_name):
+    """Ancienne boucle de SoftwareMonitor.is_software_blocked (référence)"""
+    if software_name.lower() in SERVICES_SYSTEME_CRITIQUES:
+        return False
+    for blocked in blocked_software:
+        blocked_name = blocked['nom'].lower()
+        software_lower = software_name.lower()
+        if (blocked_name in software_lower or
+                software_lower in blocked_name or
+                blocked_name.replace(' ', '') in software_lower.replace(' ', '') or
+                any(word in software_lower for word in blocked_name.split() if len(word) > 3)):
+            return True
+    return False
+
+
+def generer_donnees(nb_bloques, nb_processus, graine=42):
+    """Liste de logiciels bloqués et noms de processus réalistes"""
+    aleatoire = random.Random(graine)
+    syllabes = ['nova', 'tek', 'lum', 'pix', 'zor', 'quan', 'vel', 'dri', 'mox', 'sar', 'bli', 'keto']
+
+    def mot():
+        return ''.join(aleatoire.choice(syllabes) for _ in range(aleatoire.randint(2, 3)))
+
+    bloques = [
+        {'nom': ' '.join(mot().capitalize() for _ in range(aleatoire.randint(1, 3)))}
+        for _ in range(nb_bloques)
+    ]
+    processus = [f"{mot()}.exe" for _ in range(nb_processus)]
+    # Quelques processus bloqués et services système parmi les processus
+    processus += [f"{b['nom'].split()[0].lower()}.exe" for b in aleatoire.sample(bloques, 10)]
+    processus += sorted(SERVICES_SYSTEME_CRITIQUES)
+    return bloques, processus
+
+
+def mesurer(fonction, repetitions):
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        fonction()
+    return (time.perf_counter() - debut) / repetitions * 1000
+
+
+def main():
+    nb_bloques = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    nb_processus = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    bloques, processus = generer_donnees(nb_bloques, nb_processus)
+
+    # Les deux implémentations doivent donner les mêmes décisions
+    matcher = BlockedSoftwareMatcher(bloques)
+    for nom in processus:
+        assert matcher.is_blocked(nom) == ancienne_correspondance(bloques, nom), nom
+
+    ancienne = mesurer(lambda: [ancienne_correspondance(bloques, nom) for nom in processus], 3)
+    compilation = mesurer(lambda: BlockedSoftwareMatcher(bloques), 10)
+    froid = mesurer(lambda: [m.is_blocked(nom) for m in [BlockedSoftwareMatcher(bloques)] for nom in processus], 10)
+    chaud = mesurer(lambda: [matcher.is_blocked(nom) for nom in processus], 100)
+
+    print(f"📊 {len(bloques)} logiciels bloqués, {len(processus)} processus par passage")
+    print(f"  - Ancienne boucle          : {ancienne:8.2f} ms/passage")
+    print(f"  - Compilation du matcher   : {compilation:8.2f} ms (à chaque mise à jour de la liste)")
+    print(f"  - Matcher, premier passage : {froid:8.2f} ms/passage (compilation incluse)")
+    print(f"  - Matcher, résultats mémo. : {chaud:8.3f} ms/passage")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Tests unitaires pour les composants de l'agent desktop
+"""
+import importlib.util
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+from desktop_app.software_matcher import BlockedSoftwareMatcher
+
+# L'application (main.py) dépend de Kivy : ses tests ne tournent que s'il est installé
+KIVY_DISPONIBLE = importlib.util.find_spec('kivymd') is not None
+
+
+class BlockedSoftwareMatcherTest(SimpleTestCase):
+    """Tests pour le matcher compilé des logiciels bloqués"""
+
+    def setUp(self):
+        self.matcher = BlockedSoftwareMatcher([
+            {'nom': 'Steam Client'},
+            {'nom': 'uTorrent'},
+            {'nom': 'VLC'},
+        ])
+
+    def test_nom_bloque_contenu_dans_le_processus(self):
+        self.assertEqual(self.matcher.match('uTorrent.exe'), 'uTorrent')
+        self.assertEqual(self.matcher.match('SteamClient.exe'), 'Steam Client')
+
+    def test_processus_contenu_dans_un_nom_bloque(self):
+        self.assertEqual(self.matcher.match('vl'), 'VLC')
+
+    def test_mot_long_du_nom_bloque(self):
+        self.assertEqual(self.matcher.match('steamwebhelper.exe'), 'Steam Client')
+
+    def test_processus_autorises(self):
+        self.assertIsNone(self.matcher.match('firefox.exe'))
+        self.assertIsNone(self.matcher.match(''))
+        # Les services système critiques ne sont jamais bloqués
+        self.assertIsNone(BlockedSoftwareMatcher([{'nom': 'explorer'}]).match('explorer.exe'))
+
+    def test_liste_vide(self):
+        self.assertFalse(BlockedSoftwareMatcher().is_blocked('steam.exe'))
+
+
+@unittest.skipUnless(KIVY_DISPONIBLE, "Kivy n'est pas installé")
+class EvenementsPolitiqueTest(SimpleTestCase):
+    """Tests pour l'application des événements de politique reçus du serveur"""
+
+    def setUp(self):
+        from desktop_app import main
+        self.main = main
+        self.app = SimpleNamespace(user_token='jeton')
+        self.app.software_monitor = main.SoftwareMonitor(self.app)
+
+    def test_evenement_politique_met_a_jour_le_moniteur(self):
+        monitor = self.app.software_monitor
+        monitor.known_pids = {1: 'steam.exe', 2: 'vlc.exe'}
+        evenements = [{'type': 'politique', 'etag': '"v2"', 'logiciels': [{'nom': 'uTorrent'}]}]
+
+        with mock.patch.object(self.main, 'Clock'):
+            self.main.ITSMApp.handle_server_events(self.app, evenements)
+
+        self.assertEqual(monitor.blocked_software, [{'nom': 'uTorrent'}])
+        self.assertEqual(monitor.blocked_software_etag, '"v2"')
+        self.assertEqual(monitor.matcher.match('uTorrent.exe'), 'uTorrent')
+        # Les processus en cours sont réévalués avec la nouvelle liste
+        self.assertEqual(monitor.known_pids, {})
+
+    def test_logiciel_debloque_notifie(self):
+        monitor = self.app.software_monitor
+        monitor.apply_blocked_software_list([{'nom': 'VLC'}], '"v1"')
+
+        with mock.patch.object(self.main, 'Clock') as clock:
+            self.main.ITSMApp.handle_server_events(self.app, [{'type': 'politique', 'etag': '"v2"', 'logiciels': []}])
+
+        self.assertEqual(monitor.blocked_software, [])
+        self.assertIsNone(monitor.matcher.match('vlc.exe'))
+        clock.schedule_once.assert_called_once()
+
+    def test_curseur_avance_apres_traitement(self):
+        """Test qu'un lot d'événements en erreur n'est pas perdu : le curseur n'avance pas"""
+        reponse = mock.Mock(status_code=200)
+        reponse.json.return_value = {'curseur': 'c2', 'evenements': [{'type': 'politique', 'logiciels': []}]}
+        canal = self.main.EventChannel(self.app, mock.Mock(side_effect=RuntimeError('échec')))
+        canal.cursor = 'c1'
+        canal.running = True
+
+        def arreter(_delai):
+            canal.running = False
+
+        with mock.patch.object(self.main.requests, 'get', return_value=reponse), \
+                mock.patch.object(self.main.time, 'sleep', side_effect=arreter):
+            canal._listen_loop()
+        self.assertEqual(canal.cursor, 'c1')
+
+
+@unittest.skipUnless(KIVY_DISPONIBLE, "Kivy n'est pas installé")
+class SurveillanceProcessusTest(SimpleTestCase):
+    """Tests pour la surveillance incrémentale des processus"""
+
+    def setUp(self):
+        from desktop_app import main
+        self.main = main
+        self.monitor = main.SoftwareMonitor(SimpleNamespace(user_token='jeton'))
+        self.monitor.matcher = BlockedSoftwareMatcher([{'nom': 'uTorrent'}])
+        # pid -> (nom, exécutable)
+        self.processus = {}
+        self.block_process = mock.Mock(return_value=True)
+        self.monitor.block_process = self.block_process
+
+    def _process(self, pid):
+        nom, exe = self.processus[pid]
+        return mock.Mock(**{'name.return_value': nom, 'exe.return_value': exe})
+
+    def _passage(self, rescan=False):
+        if rescan:
+            self.monitor.last_name_rescan = 0.0
+        with mock.patch.object(self.main.psutil, 'pids', return_value=list(self.processus)), \
+                mock.patch.object(self.main.psutil, 'Process', side_effect=self._process):
+            self.monitor.check_running_processes()
+
+    def test_decision_par_executable_et_nom(self):
+        """Test qu'un exécutable partagé ne fige pas la décision pour un autre nom de processus"""
+        self.processus = {1: ('python.exe', '/usr/bin/python'), 2: ('utorrent', '/usr/bin/python')}
+        self._passage()
+        self.block_process.assert_called_once_with(2, 'utorrent')
+
+    def test_echec_d_arret_retente(self):
+        """Test qu'un processus bloqué qui n'a pas pu être arrêté est retenté au passage suivant"""
+        self.processus = {1: ('uTorrent.exe', 'C:/uTorrent.exe')}
+        self.block_process.return_value = False
+        self._passage()
+        self.assertNotIn(1, self.monitor.known_pids)
+
+        self.block_process.return_value = True
+        self._passage()
+        self.assertEqual(self.block_process.call_count, 2)
+        self.assertIn(1, self.monitor.known_pids)
+
+    def test_processus_remplace_par_exec(self):
+        """Test qu'un PID connu qui exécute un programme bloqué est réévalué à la relecture des noms"""
+        self.processus = {1: ('bash', '/bin/bash')}
+        self._passage()
+        self.processus = {1: ('utorrent', '/opt/utorrent')}
+        self._passage()
+        self.block_process.assert_not_called()
+
+        self._passage(rescan=True)
+        self.block_process.assert_called_once_with(1, 'utorrent')
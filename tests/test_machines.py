@@ -0,0 +1,1154 @@
+"""
+Tests unitaires pour l'application machines
+"""
+import importlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from apps.users.models import Structure, Groupe
+from apps.machines.models import (
+    Machine, LogicielInstalle, LogicielReference, AutorisationLogiciel, HistoriqueMachine,
+    SynchronisationCatalogue, InformationSysteme, InterfaceReseau
+)
+from apps.machines.autorisations import evaluer_autorisations
+from apps.machines import catalogue, inventaire, politique
+from apps.machines.checks import verifier_cache_partage
+from apps.machines.references import normaliser_nom, resolveur
+from itsm_backend.instrumentation import BudgetRequetesDepasse, Enregistrement, Registre, registre
+from itsm_backend.journalisation import FiltreEchantillonnage, FormateurJson, niveaux_modules
+from apps.machines.views import MachineViewSet
+
+User = get_user_model()
+
+
+class LogicielsBloquesSnapshotTest(TestCase):
+    """Tests pour le snapshot de politique servi par logiciels_bloques"""
+
+    url = '/api/v1/machines/logiciels_bloques/'
+
+    def setUp(self):
+        cache.clear()
+        self.structure = Structure.objects.create(
+            nom='Test Entreprise',
+            code='test'
+        )
+
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+
+        self.machine = Machine.objects.create(
+            nom='PC-TEST',
+            structure=self.structure,
+            utilisateur=self.user
+        )
+
+        self.reference = LogicielReference.objects.create(nom='Jeu')
+        LogicielInstalle.objects.create(machine=self.machine, nom='Jeu', version='1.0')
+        LogicielInstalle.objects.create(machine=self.machine, nom='Editeur', version='2.0')
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_liste_vide_avec_etag(self):
+        """Test de la réponse initiale avec ETag"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+        self.assertTrue(response['ETag'])
+
+    def test_304_si_rien_ne_change(self):
+        """Test du 304 quand l'ETag envoyé est à jour"""
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_304_sans_requete_sql(self):
+        """Test que le snapshot en cache est servi sans requête SQL"""
+        etag = self.client.get(self.url)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_invalidation_par_autorisation_refusee(self):
+        """Test qu'un refus pour la structure invalide le snapshot"""
+        etag = self.client.get(self.url)['ETag']
+
+        AutorisationLogiciel.objects.create(
+            logiciel=self.reference,
+            type_autorisation='structure',
+            structure=self.structure,
+            statut='refuse',
+            motif='Interdit au travail'
+        )
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual([l['nom'] for l in response.json()], ['Jeu'])
+        self.assertEqual(response.json()[0]['motif_blocage'], 'Interdit au travail')
+
+    def test_invalidation_par_niveau_securite(self):
+        """Test qu'un passage au niveau 'interdit' invalide le snapshot"""
+        etag = self.client.get(self.url)['ETag']
+
+        reference = LogicielReference.objects.get(pk=self.reference.pk)
+        reference.niveau_securite = 'interdit'
+        reference.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([l['nom'] for l in response.json()], ['Jeu'])
+
+    def test_duree_snapshot_cache_local(self):
+        """Test qu'un cache propre au processus borne la durée de vie du snapshot"""
+        with mock.patch.object(politique, 'cache', wraps=cache) as espion:
+            politique.get_snapshot(self.user)
+        self.assertEqual(espion.set.call_args.kwargs['timeout'], politique.DUREE_SNAPSHOT_LOCAL)
+
+    def test_verification_cache_partage(self):
+        """Test que check --deploy refuse un cache par processus hors DEBUG"""
+        with override_settings(DEBUG=False):
+            erreurs = verifier_cache_partage(None)
+        self.assertEqual([e.id for e in erreurs], ['machines.E001'])
+
+        with override_settings(DEBUG=True):
+            self.assertEqual(verifier_cache_partage(None), [])
+        partage = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache'}}
+        with override_settings(DEBUG=False, CACHES=partage):
+            self.assertEqual(verifier_cache_partage(None), [])
+
+
+class EvaluationAutorisationsTest(TestCase):
+    """Tests pour l'évaluation en masse des autorisations"""
+
+    def setUp(self):
+        self.structure = Structure.objects.create(
+            nom='Test Entreprise',
+            code='test'
+        )
+        self.groupe = Groupe.objects.create(nom='Compta', structure=self.structure)
+
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            groupe=self.groupe,
+            password='testpass123'
+        )
+        self.machine = Machine.objects.create(
+            nom='PC-TEST',
+            structure=self.structure,
+            utilisateur=self.user
+        )
+
+    def test_nombre_de_requetes_constant(self):
+        """Test que le nombre de requêtes ne dépend pas du nombre de logiciels"""
+        for i in range(50):
+            LogicielReference.objects.create(nom=f'Logiciel {i}', niveau_securite='interdit' if i % 2 else 'libre')
+            LogicielInstalle.objects.create(machine=self.machine, nom=f'logiciel {i}', version='1.0')
+
+        # Logiciels, liens vers les références, niveaux, refus, bulk_update
+        with self.assertNumQueries(5):
+            resultats = evaluer_autorisations(LogicielInstalle.objects.filter(machine=self.machine))
+
+        self.assertEqual(resultats['total_logiciels'], 50)
+        self.assertEqual(resultats['logiciels_lies'], 50)
+        self.assertEqual(resultats['logiciels_bloques'], 25)
+        self.assertEqual(LogicielInstalle.objects.filter(bloque=True).count(), 25)
+        self.assertFalse(LogicielInstalle.objects.filter(logiciel_reference__isnull=True).exists())
+
+    def test_precedence_utilisateur_avant_groupe(self):
+        """Test que le refus le plus spécifique fournit le motif"""
+        reference = LogicielReference.objects.create(nom='Jeu')
+        logiciel = LogicielInstalle.objects.create(machine=self.machine, nom='Jeu', version='1.0')
+        AutorisationLogiciel.objects.create(
+            logiciel=reference, type_autorisation='groupe', groupe=self.groupe,
+            statut='refuse', motif='Refus groupe'
+        )
+        AutorisationLogiciel.objects.create(
+            logiciel=reference, type_autorisation='utilisateur', utilisateur=self.user,
+            statut='refuse', motif='Refus utilisateur'
+        )
+
+        logiciel.verifier_autorisation()
+        logiciel.refresh_from_db()
+
+        self.assertTrue(logiciel.bloque)
+        self.assertFalse(logiciel.autorise)
+        self.assertEqual(logiciel.motif_blocage, 'Refus utilisateur')
+
+    def test_creation_des_references_manquantes(self):
+        """Test de la création en masse des références manquantes"""
+        LogicielInstalle.objects.create(machine=self.machine, nom='Nouveau', version='1.0')
+
+        evaluer_autorisations(
+            LogicielInstalle.objects.filter(machine=self.machine),
+            creer_references_manquantes=True
+        )
+
+        reference = LogicielReference.objects.get(nom='Nouveau')
+        self.assertEqual(reference.niveau_securite, 'libre')
+        self.assertEqual(LogicielInstalle.objects.get(nom='Nouveau').logiciel_reference, reference)
+
+
+class SynchronisationDifferentielleTest(TestCase):
+    """Tests pour la mise à jour différentielle des logiciels d'une machine"""
+
+    def setUp(self):
+        cache.clear()
+        self.structure = Structure.objects.create(
+            nom='Test Entreprise',
+            code='test'
+        )
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+        self.machine = Machine.objects.create(
+            nom='PC-TEST',
+            structure=self.structure,
+            utilisateur=self.user
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/v1/machines/{self.machine.id}/'
+
+    def _synchroniser(self, logiciels):
+        return self.client.patch(self.url, {'logiciels': logiciels}, format='json')
+
+    def test_conserve_les_logiciels_inchanges(self):
+        """Test que les lignes inchangées gardent leur identité et leur référence"""
+        reference = LogicielReference.objects.create(nom='Editeur')
+        existant = LogicielInstalle.objects.create(
+            machine=self.machine, nom='Editeur', version='2.0', logiciel_reference=reference
+        )
+        LogicielInstalle.objects.create(machine=self.machine, nom='Ancien', version='1.0')
+
+        response = self._synchroniser([
+            {'nom': 'Editeur', 'version': '2.0'},
+            {'nom': 'Editeur', 'version': '2.0'},
+            {'nom': 'Nouveau', 'version': '1.0', 'editeur': 'ACME'},
+        ])
+        self.assertEqual(response.status_code, 200)
+
+        existant_apres = LogicielInstalle.objects.get(pk=existant.pk)
+        self.assertEqual(existant_apres.date_detection, existant.date_detection)
+        self.assertEqual(existant_apres.logiciel_reference, reference)
+        self.assertEqual(
+            sorted(self.machine.logiciels.values_list('nom', flat=True)),
+            ['Editeur', 'Nouveau']
+        )
+
+    def test_met_a_jour_uniquement_les_champs_modifies(self):
+        """Test que seules les lignes modifiées sont réécrites"""
+        LogicielInstalle.objects.create(machine=self.machine, nom='Outil', version='1.0', editeur='Ancien')
+
+        self._synchroniser([{'nom': 'Outil', 'version': '1.0', 'editeur': 'Nouveau'}])
+
+        logiciel = LogicielInstalle.objects.get(machine=self.machine)
+        self.assertEqual(logiciel.editeur, 'Nouveau')
+
+    def test_nombre_de_requetes_independant_du_volume(self):
+        """Test que le diff ne fait pas de requête par logiciel"""
+        logiciels = [{'nom': f'Logiciel {i}', 'version': '1.0'} for i in range(200)]
+        self._synchroniser(logiciels[:10] + logiciels[100:110])
+
+        with CaptureQueriesContext(connection) as requetes:
+            self._synchroniser(logiciels[20:100] + logiciels[110:200])
+
+        # 170 ajouts et 20 suppressions : seuls les lots de bulk_create varient
+        self.assertLess(len(requetes.captured_queries), 20)
+        self.assertEqual(self.machine.logiciels.count(), 170)
+
+
+class SynchronisationEmpreintesTest(TestCase):
+    """Tests pour le court-circuit par empreintes de synchroniser_machine_locale"""
+
+    url = '/api/v1/machines/synchroniser_machine_locale/'
+
+    def setUp(self):
+        cache.clear()
+        self.structure = Structure.objects.create(
+            nom='Test Entreprise',
+            code='test'
+        )
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.inventaire = {
+            'nom': 'PC-TEST',
+            'info_systeme': {'os_nom': 'Linux', 'os_version': '6.1', 'ram_disponible': 1024},
+            'interfaces_reseau': [{'nom': 'eth0', 'type_interface': 'ethernet', 'adresse_ip': '10.0.0.2'}],
+            'logiciels': [{'nom': 'Editeur', 'version': '2.0'}, {'nom': 'Outil', 'version': '1.0'}],
+        }
+
+    def _synchroniser(self, machine, empreintes=None):
+        return self.client.post(self.url, {'machine': machine, 'empreintes': empreintes or {}}, format='json')
+
+    def test_creation_enregistre_les_empreintes(self):
+        """Test que la première synchronisation crée la machine et ses empreintes"""
+        response = self._synchroniser(self.inventaire)
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('total', response.json()['durees_ms'])
+
+        machine = Machine.objects.get(utilisateur=self.user)
+        self.assertEqual(set(machine.empreintes_inventaire), {'info_systeme', 'interfaces_reseau', 'logiciels'})
+        self.assertEqual(machine.logiciels.count(), 2)
+
+    def test_inventaire_inchange(self):
+        """Test qu'un inventaire identique ne touche que derniere_synchronisation"""
+        self._synchroniser(self.inventaire)
+        machine = Machine.objects.get(utilisateur=self.user)
+        nb_historiques = machine.historique.count()
+
+        # Seule une valeur volatile change, l'ordre des logiciels aussi
+        inventaire = dict(self.inventaire)
+        inventaire['info_systeme'] = dict(self.inventaire['info_systeme'], ram_disponible=2048)
+        inventaire['logiciels'] = list(reversed(self.inventaire['logiciels']))
+
+        with CaptureQueriesContext(connection) as requetes:
+            response = self._synchroniser(inventaire)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['sections_modifiees'], [])
+        self.assertEqual(len(requetes.captured_queries), 2)
+        self.assertEqual(machine.historique.count(), nb_historiques)
+        self.assertGreater(
+            Machine.objects.get(pk=machine.pk).derniere_synchronisation,
+            machine.derniere_synchronisation
+        )
+
+    def test_seule_la_section_modifiee_est_traitee(self):
+        """Test qu'une section modifiée est réécrite sans toucher aux autres"""
+        self._synchroniser(self.inventaire)
+        machine = Machine.objects.get(utilisateur=self.user)
+        interface = machine.interfaces_reseau.get()
+
+        inventaire = dict(self.inventaire, logiciels=self.inventaire['logiciels'] + [{'nom': 'Nouveau', 'version': '1.0'}])
+        response = self._synchroniser(inventaire)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['sections_modifiees'], ['logiciels'])
+        self.assertEqual(machine.logiciels.count(), 3)
+        self.assertEqual(machine.interfaces_reseau.get().date_derniere_maj, interface.date_derniere_maj)
+
+    def test_empreintes_envoyees_par_l_agent(self):
+        """Test qu'une empreinte seule suffit si la section n'a pas changé"""
+        self._synchroniser(self.inventaire, empreintes={'logiciels': 'abc'})
+
+        response = self._synchroniser({'nom': 'PC-TEST'}, empreintes={'logiciels': 'abc'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['sections_modifiees'], [])
+
+        response = self._synchroniser({'nom': 'PC-TEST'}, empreintes={'logiciels': 'def'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['sections_requises'], ['logiciels'])
+
+
+class PremiereSynchronisationTest(TestCase):
+    """Tests pour la création transactionnelle d'une machine à sa première synchronisation"""
+
+    url = '/api/v1/machines/synchroniser_machine_locale/'
+
+    def setUp(self):
+        cache.clear()
+        self.structure = Structure.objects.create(nom='Test Entreprise', code='test')
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _inventaire(self, logiciels):
+        return {
+            'nom': 'PC-TEST',
+            'info_systeme': {'os_nom': 'Linux', 'os_version': '6.1'},
+            'interfaces_reseau': [
+                {'nom': 'eth0', 'type_interface': 'ethernet'},
+                {'nom': 'eth0', 'type_interface': 'wifi'},
+            ],
+            'logiciels': logiciels,
+        }
+
+    def _synchroniser(self, inventaire):
+        return self.client.post(self.url, {'machine': inventaire}, format='json')
+
+    def test_insertions_groupees(self):
+        """Test que 3 000 logiciels sont insérés par lots, pas un par un"""
+        logiciels = [{'nom': f'Logiciel {i}', 'version': '1.0', 'editeur': 'ACME'} for i in range(3000)]
+        logiciels.append({'nom': 'Logiciel 0', 'version': '1.0'})
+
+        with CaptureQueriesContext(connection) as requetes:
+            response = self._synchroniser(self._inventaire(logiciels))
+
+        self.assertEqual(response.status_code, 201)
+        machine = Machine.objects.get(utilisateur=self.user)
+        self.assertEqual(machine.logiciels.count(), 3000)
+        self.assertEqual(
+            sorted(machine.interfaces_reseau.values_list('nom', flat=True)), ['eth0', 'eth0 (1)']
+        )
+        insertions = [r for r in requetes.captured_queries if r['sql'].startswith('INSERT INTO "machines_logicielinstalle"')]
+        # Lots bornés par la limite de paramètres de SQLite (environ 70 lignes)
+        self.assertLess(len(insertions), 50)
+        # Seule la transaction de la vue (point de sauvegarde sous TestCase), aucune par ligne ni par section
+        self.assertLessEqual(len([r for r in requetes.captured_queries if r['sql'].startswith('SAVEPOINT')]), 1)
+
+    def test_taille_nulle_comme_en_mise_a_jour(self):
+        """Test qu'une taille 0 est enregistrée comme inconnue, sans réécriture à la synchronisation suivante"""
+        logiciels = [{'nom': 'Outil', 'version': '1.0', 'taille': 0}]
+        self.assertEqual(self._synchroniser(self._inventaire(logiciels)).status_code, 201)
+        machine = Machine.objects.get(utilisateur=self.user)
+        logiciel = machine.logiciels.get()
+        self.assertIsNone(logiciel.taille)
+
+        self.client.patch(f'/api/v1/machines/{machine.pk}/', {'logiciels': logiciels}, format='json')
+        self.assertEqual(machine.logiciels.get().date_derniere_maj, logiciel.date_derniere_maj)
+
+    def test_ligne_invalide_rapportee(self):
+        """Test qu'un logiciel invalide est rapporté avec son indice et que rien n'est écrit"""
+        logiciels = [{'nom': f'Logiciel {i}', 'version': '1.0'} for i in range(5)]
+        logiciels[3]['taille'] = 'beaucoup'
+
+        response = self._synchroniser(self._inventaire(logiciels))
+
+        self.assertEqual(response.status_code, 400)
+        erreurs = response.json()['logiciels']
+        self.assertEqual(list(erreurs), ['3'])
+        self.assertEqual(erreurs['3']['nom'], 'Logiciel 3')
+        self.assertIn('taille', erreurs['3']['erreurs'])
+        self.assertFalse(Machine.objects.filter(utilisateur=self.user).exists())
+
+    def test_echec_d_ecriture_annule_la_creation(self):
+        """Test qu'une erreur pendant l'écriture ne laisse pas de machine incomplète"""
+        logiciels = [{'nom': f'Logiciel {i}', 'version': '1.0'} for i in range(10)]
+        with mock.patch.object(LogicielInstalle.objects, 'bulk_create', side_effect=RuntimeError('disque plein')):
+            response = self._synchroniser(self._inventaire(logiciels))
+
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(Machine.objects.filter(utilisateur=self.user).exists())
+        self.assertFalse(HistoriqueMachine.objects.exists())
+
+
+class JournalisationSynchronisationTest(TestCase):
+    """Tests pour la journalisation structurée de la synchronisation"""
+
+    url = '/api/v1/machines/synchroniser_machine_locale/'
+
+    def setUp(self):
+        cache.clear()
+        self.structure = Structure.objects.create(nom='Test Entreprise', code='test')
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_une_ligne_de_resume_par_requete(self):
+        """Test qu'une synchronisation écrit une seule ligne avec ses compteurs et durées"""
+        inventaire = {
+            'nom': 'PC-TEST',
+            'logiciels': [{'nom': f'Logiciel {i}', 'version': '1.0'} for i in range(200)],
+        }
+        with self.assertLogs('apps.machines', level='INFO') as journaux:
+            response = self.client.post(self.url, {'machine': inventaire}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(len(journaux.records), 1)
+        record = journaux.records[0]
+        self.assertEqual(record.name, 'apps.machines.views')
+        message = record.getMessage()
+        self.assertTrue(message.startswith('synchronisation '))
+        for champ in ('resultat=creation', 'statut=201', 'nb_logiciels=200', 'utilisateur=@john.doe.test',
+                      'durees_ms.ecriture='):
+            self.assertIn(champ, message)
+        self.assertEqual(record.resume['nb_logiciels'], 200)
+
+    def test_debug_echantillonne(self):
+        """Test que seul un message DEBUG sur N est écrit par emplacement, jamais les autres niveaux"""
+        filtre = FiltreEchantillonnage(taux=100)
+
+        def record(niveau, ligne):
+            return logging.LogRecord('apps.machines', niveau, __file__, ligne, 'message %s', ('x',), None)
+
+        debug = [filtre.filter(record(logging.DEBUG, 10)) for _ in range(250)]
+        self.assertEqual(sum(debug), 3)
+        self.assertTrue(debug[0])
+        self.assertTrue(filtre.filter(record(logging.DEBUG, 11)))
+        self.assertTrue(all(filtre.filter(record(logging.INFO, 10)) for _ in range(10)))
+
+    def test_formateur_json(self):
+        """Test que le formateur JSON reprend le message et les champs du résumé"""
+        record = logging.LogRecord('apps.machines.views', logging.INFO, __file__, 1, '%s %s', ('synchronisation', 'x=1'), None)
+        record.resume = {'resultat': 'creation', 'durees_ms': {'total': 12.5}}
+
+        ligne = json.loads(FormateurJson().format(record))
+        self.assertEqual(ligne['niveau'], 'INFO')
+        self.assertEqual(ligne['message'], 'synchronisation x=1')
+        self.assertEqual(ligne['resume']['durees_ms']['total'], 12.5)
+
+    def test_niveaux_modules(self):
+        """Test la lecture des niveaux par module"""
+        self.assertEqual(
+            niveaux_modules('apps.machines=debug, apps.monitoring = WARNING,,invalide'),
+            {'apps.machines': 'DEBUG', 'apps.monitoring': 'WARNING'}
+        )
+
+
+class CacheInventaireTest(TestCase):
+    """Tests pour le cache disque des logiciels de l'inventaire local"""
+
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.cache_logiciels = inventaire.CacheLogiciels(os.path.join(dossier, 'inventaire.json'))
+        self.collecteur = mock.Mock(return_value=[{'nom': 'Outil', 'version': '1.0'}])
+
+    def _sonder(self, signature):
+        with mock.patch.object(inventaire, 'signature_base_paquets', return_value=signature), \
+                mock.patch.dict(inventaire.COLLECTEURS_LOGICIELS, {inventaire.platform.system(): self.collecteur}):
+            return inventaire.sonder_logiciels(self.cache_logiciels)
+
+    def test_base_inchangee_relue_depuis_le_cache(self):
+        """Test que la requête au gestionnaire de paquets n'est pas relancée"""
+        self._sonder([['/var/lib/dpkg/status', 1]])
+        logiciels = self._sonder([['/var/lib/dpkg/status', 1]])
+
+        self.assertEqual(self.collecteur.call_count, 1)
+        self.assertEqual(logiciels, [{'nom': 'Outil', 'version': '1.0'}])
+
+    def test_base_modifiee_recollectee(self):
+        """Test qu'un changement de mtime relance la collecte"""
+        self._sonder([['/var/lib/dpkg/status', 1]])
+        self._sonder([['/var/lib/dpkg/status', 2]])
+
+        self.assertEqual(self.collecteur.call_count, 2)
+
+    def test_sans_signature_pas_de_cache(self):
+        """Test que la collecte est toujours relancée sans signature disponible"""
+        self._sonder(None)
+        self._sonder(None)
+
+        self.assertEqual(self.collecteur.call_count, 2)
+
+    def test_collecte_vide_ou_en_echec_pas_de_cache(self):
+        """Test qu'une collecte vide ou en erreur n'est pas figée dans le cache"""
+        signature = [['/var/lib/dpkg/status', 1]]
+        self.collecteur.return_value = []
+        self._sonder(signature)
+        self.collecteur.side_effect = OSError('base verrouillée')
+        self.assertEqual(self._sonder(signature), [])
+
+        self.collecteur.side_effect = None
+        self.collecteur.return_value = [{'nom': 'Outil', 'version': '1.0'}]
+        self.assertEqual(self._sonder(signature), [{'nom': 'Outil', 'version': '1.0'}])
+        self.assertEqual(self.collecteur.call_count, 3)
+
+    def test_signature_windows_suit_les_sous_cles(self):
+        """Test que la mise à jour d'un logiciel (écriture dans sa seule sous-clé) change la signature"""
+        # Date de dernière écriture de chaque clé : la clé Uninstall et ses sous-clés
+        dates = {'Uninstall': 100, 'Outil': 150, 'Autre': 120}
+
+        class Cle:
+            def __init__(self, nom):
+                self.nom = nom
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                return False
+
+        winreg = SimpleNamespace(
+            HKEY_LOCAL_MACHINE='HKLM',
+            HKEY_CURRENT_USER='HKCU',
+            OpenKey=lambda parent, chemin: Cle('Uninstall' if parent in ('HKLM', 'HKCU') else chemin),
+            EnumKey=lambda cle, i: ['Outil', 'Autre'][i],
+            QueryInfoKey=lambda cle: (2 if cle.nom == 'Uninstall' else 0, 0, dates[cle.nom]),
+        )
+        with mock.patch.dict(sys.modules, {'winreg': winreg}):
+            avant = inventaire.signature_base_paquets('Windows')
+            dates['Outil'] = 200
+            apres = inventaire.signature_base_paquets('Windows')
+
+        self.assertEqual({date for _, date in avant}, {150})
+        self.assertEqual({date for _, date in apres}, {200})
+
+
+NB_PAQUETS_BENCHMARK = 5000
+
+
+def _sortie_dpkg(nb):
+    entete = [
+        'Desired=Unknown/Install/Remove/Purge/Hold',
+        '| Status=Not/Inst/Conf-files/Unpacked/halF-conf/Half-inst/trig-aWait/Trig-pend',
+        '|/ Err?=(none)/Reinst-required (Status,Err: uppercase=bad)',
+        '||/ Name           Version      Architecture Description',
+        '+++-==============-============-============-=================',
+    ]
+    return entete + [f'ii  paquet{i}:amd64  1.{i}-1  amd64  Paquet de test {i}' for i in range(nb)]
+
+
+def _statut_dpkg(nb):
+    lignes = []
+    for i in range(nb):
+        lignes += [
+            f'Package: paquet{i}',
+            'Status: install ok installed' if i % 10 else 'Status: deinstall ok config-files',
+            'Installed-Size: 12',
+            'Multi-Arch: same',
+            'Architecture: amd64',
+            f'Version: 1.{i}-1',
+            f'Description: Paquet de test {i}',
+            ' Description longue',
+            ' .',
+            '',
+        ]
+    return lignes
+
+
+class ParseursPaquetsTest(TestCase):
+    """Tests et benchmark des parseurs de gestionnaires de paquets (5 000 paquets)"""
+
+    # Budget large : le but est de détecter une régression d'un ordre de grandeur
+    BUDGET_SECONDES = 0.5
+
+    def _mesurer(self, parseur, lignes):
+        debut = time.perf_counter()
+        paquets = list(parseur(lignes))
+        duree = time.perf_counter() - debut
+        self.assertLess(duree, self.BUDGET_SECONDES, f'{parseur.__name__}: {duree:.3f}s')
+        return paquets
+
+    def test_dpkg(self):
+        paquets = self._mesurer(inventaire.parser_dpkg, _sortie_dpkg(NB_PAQUETS_BENCHMARK))
+        self.assertEqual(len(paquets), NB_PAQUETS_BENCHMARK)
+        self.assertEqual(paquets[3], ('paquet3:amd64', '1.3-1', None))
+
+    def test_statut_dpkg_sans_processus(self):
+        """Test de la lecture directe de /var/lib/dpkg/status"""
+        paquets = self._mesurer(inventaire.parser_statut_dpkg, _statut_dpkg(NB_PAQUETS_BENCHMARK))
+        # Les paquets désinstallés (1 sur 10) sont ignorés
+        self.assertEqual(len(paquets), NB_PAQUETS_BENCHMARK * 9 // 10)
+        self.assertEqual(paquets[0], ('paquet1:amd64', '1.1-1', 12 * 1024))
+
+    def test_rpm(self):
+        lignes = [f'paquet{i}\t1.{i}\t2048\n' for i in range(NB_PAQUETS_BENCHMARK - 1)]
+        lignes.append('glibc-2.34-60.el9.x86_64\n')
+        paquets = self._mesurer(inventaire.parser_rpm, lignes)
+        self.assertEqual(len(paquets), NB_PAQUETS_BENCHMARK)
+        self.assertEqual(paquets[0], ('paquet0', '1.0', 2048))
+        self.assertEqual(paquets[-1], ('glibc', '2.34', None))
+
+    def test_pacman(self):
+        lignes = [f'paquet{i} 1.{i}-1\n' for i in range(NB_PAQUETS_BENCHMARK)]
+        paquets = self._mesurer(inventaire.parser_pacman, lignes)
+        self.assertEqual(len(paquets), NB_PAQUETS_BENCHMARK)
+
+    def test_apk(self):
+        lignes = [
+            f'paquet-{i}-1.{i}.0-r2 x86_64 {{paquet-{i}}} (MIT) [installed]\n'
+            for i in range(NB_PAQUETS_BENCHMARK)
+        ]
+        paquets = self._mesurer(inventaire.parser_apk, lignes)
+        self.assertEqual(len(paquets), NB_PAQUETS_BENCHMARK)
+        self.assertEqual(paquets[7], ('paquet-7', '1.7.0-r2', None))
+
+
+class ChampsDynamiquesMachinesTest(TestCase):
+    """Tests pour les listes résumées et les paramètres ?fields= / ?expand="""
+
+    url = '/api/v1/machines/'
+
+    def setUp(self):
+        self.structure = Structure.objects.create(nom='Test Entreprise', code='test')
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+        self.machines = []
+        for i in range(3):
+            machine = Machine.objects.create(nom=f'PC-{i}', structure=self.structure, utilisateur=self.user)
+            LogicielInstalle.objects.bulk_create([
+                LogicielInstalle(machine=machine, nom=f'Logiciel {j}', version='1.0') for j in range(50)
+            ])
+            self.machines.append(machine)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_liste_resumee_par_defaut(self):
+        """Test que la liste ne contient ni inventaire ni utilisateur imbriqué"""
+        with CaptureQueriesContext(connection) as contexte:
+            response = self.client.get(self.url)
+        machine = response.json()['results'][0]
+
+        self.assertEqual(machine['utilisateur_nom'], 'John Doe')
+        for champ in ('logiciels', 'interfaces_reseau', 'info_systeme', 'utilisateur_info'):
+            self.assertNotIn(champ, machine)
+        self.assertFalse([q for q in contexte.captured_queries if 'machines_logicielinstalle' in q['sql']])
+
+    def test_expand(self):
+        """Test que ?expand= ajoute l'inventaire demandé en une requête par relation"""
+        with CaptureQueriesContext(connection) as contexte:
+            response = self.client.get(self.url, {'expand': 'logiciels'})
+        machine = response.json()['results'][0]
+
+        self.assertEqual(len(machine['logiciels']), 50)
+        self.assertNotIn('interfaces_reseau', machine)
+        self.assertEqual(len([q for q in contexte.captured_queries if 'machines_logicielinstalle' in q['sql']]), 1)
+
+    def test_fields(self):
+        """Test que ?fields= ne renvoie que les champs demandés, extensibles compris"""
+        response = self.client.get(self.url, {'fields': 'id,nom,logiciels'})
+        machine = response.json()['results'][0]
+
+        self.assertEqual(set(machine), {'id', 'nom', 'logiciels'})
+        self.assertEqual(len(machine['logiciels']), 50)
+
+    def test_detail_complet(self):
+        """Test que la route de détail garde l'inventaire complet et accepte ?fields="""
+        url = f'{self.url}{self.machines[0].pk}/'
+        machine = self.client.get(url).json()
+        self.assertEqual(len(machine['logiciels']), 50)
+        self.assertIn('utilisateur_info', machine)
+
+        machine = self.client.get(url, {'fields': 'nom,statut'}).json()
+        self.assertEqual(set(machine), {'nom', 'statut'})
+
+
+class PaginationHistoriqueTest(TestCase):
+    """Tests pour la pagination par curseur de l'historique des machines"""
+
+    def setUp(self):
+        self.structure = Structure.objects.create(nom='Test Entreprise', code='test')
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+        machine = Machine.objects.create(nom='PC-TEST', structure=self.structure, utilisateur=self.user)
+        HistoriqueMachine.objects.bulk_create([
+            HistoriqueMachine(machine=machine, type_modification='synchronisation', description=f'Synchro {i}')
+            for i in range(12)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_parcours(self):
+        """Test que l'historique se parcourt page par page sans doublon"""
+        url, ids = '/api/v1/machines/historique/?page_size=5', []
+        while url:
+            donnees = self.client.get(url).json()
+            self.assertNotIn('count', donnees)
+            ids += [h['id'] for h in donnees['results']]
+            url = donnees['next']
+
+        self.assertEqual(len(ids), 12)
+        self.assertEqual(len(set(ids)), 12)
+
+
+class SynchronisationCatalogueTest(TestCase):
+    """Tests pour la synchronisation ensembliste du catalogue des logiciels de référence"""
+
+    def setUp(self):
+        self.structure = Structure.objects.create(nom='Test Entreprise', code='test')
+        self.machines = [
+            Machine.objects.create(nom=f'PC-{i}', structure=self.structure) for i in range(2)
+        ]
+
+    def installer(self, nom, editeur='', machine=0):
+        return LogicielInstalle.objects.create(machine=self.machines[machine], nom=nom, editeur=editeur)
+
+    def test_creation_et_editeurs(self):
+        """Test de la création des références manquantes et du complément des éditeurs"""
+        self.installer('Firefox', '')
+        self.installer('Firefox', 'Mozilla', machine=1)
+        self.installer('Notepad')
+        self.installer('VLC', 'VideoLAN')
+        self.installer('')
+        LogicielReference.objects.create(nom='VLC')
+        LogicielReference.objects.create(nom='Jeu', editeur='Studio', niveau_securite='interdit')
+
+        resultats = LogicielReference.synchroniser_depuis_logiciels_installes()
+
+        self.assertEqual(resultats, {'crees': 2, 'mis_a_jour': 1, 'total_traites': 2})
+        self.assertEqual(LogicielReference.objects.get(nom='Firefox').editeur, 'Mozilla')
+        self.assertEqual(LogicielReference.objects.get(nom='Notepad').niveau_securite, 'libre')
+        self.assertEqual(LogicielReference.objects.get(nom='VLC').editeur, 'VideoLAN')
+        self.assertEqual(LogicielReference.objects.get(nom='Jeu').niveau_securite, 'interdit')
+        self.assertFalse(LogicielReference.objects.filter(nom='').exists())
+        self.assertEqual(SynchronisationCatalogue.objects.get().statut, 'terminee')
+
+    def test_requetes_par_lot(self):
+        """Test que le nombre de requêtes dépend du nombre de lots, pas du nombre de logiciels"""
+        LogicielInstalle.objects.bulk_create([
+            LogicielInstalle(machine=self.machines[0], nom=f'Logiciel {i:04d}') for i in range(500)
+        ])
+        avancement = []
+        with mock.patch.object(catalogue, 'TAILLE_LOT', 100):
+            with CaptureQueriesContext(connection) as contexte:
+                LogicielReference.synchroniser_depuis_logiciels_installes(
+                    progression=lambda tache: avancement.append(tache.pourcentage)
+                )
+
+        self.assertEqual(LogicielReference.objects.count(), 500)
+        self.assertLess(len(contexte.captured_queries), 45)
+        self.assertEqual(avancement, [0, 20, 40, 60, 80, 100])
+
+    def test_reprise_apres_interruption(self):
+        """Test qu'une synchronisation interrompue reprend au lot suivant"""
+        LogicielInstalle.objects.bulk_create([
+            LogicielInstalle(machine=self.machines[0], nom=f'Logiciel {i:04d}') for i in range(250)
+        ])
+
+        def interrompre(tache):
+            if tache.crees:
+                raise KeyboardInterrupt
+
+        with mock.patch.object(catalogue, 'TAILLE_LOT', 100):
+            with self.assertRaises(KeyboardInterrupt):
+                catalogue.synchroniser_catalogue(progression=interrompre)
+            tache = SynchronisationCatalogue.objects.get()
+            self.assertEqual((tache.statut, tache.crees, tache.curseur), ('echec', 100, 'Logiciel 0099'))
+
+            reprise = catalogue.synchroniser_catalogue()
+
+        self.assertEqual(reprise.pk, tache.pk)
+        self.assertEqual((reprise.statut, reprise.crees, reprise.total), ('terminee', 250, 250))
+        self.assertEqual(LogicielReference.objects.count(), 250)
+
+    def test_variantes_de_casse_et_d_espaces(self):
+        """Test qu'une variante de casse ou d'espaces d'une référence n'est ni créée ni comptée"""
+        LogicielReference.objects.create(nom='Firefox')
+        self.installer('FIREFOX')
+        self.installer('Mozilla  Thunderbird')
+        self.installer('Mozilla Thunderbird', machine=1)
+        self.installer('Notepad')
+
+        resultats = LogicielReference.synchroniser_depuis_logiciels_installes()
+        self.assertEqual(resultats['crees'], 2)
+        self.assertEqual(LogicielReference.objects.count(), 3)
+
+        self.assertEqual(LogicielReference.synchroniser_depuis_logiciels_installes()['crees'], 0)
+        self.assertEqual(LogicielReference.objects.count(), 3)
+
+    def test_reprise_apres_echec(self):
+        """Test qu'une synchronisation en échec reprend au lot suivant"""
+        LogicielInstalle.objects.bulk_create([
+            LogicielInstalle(machine=self.machines[0], nom=f'Logiciel {i:04d}') for i in range(150)
+        ])
+        creer_lot = catalogue.creer_lot
+
+        def echouer_au_second_lot(lot):
+            if catalogue.SynchronisationCatalogue.objects.get().crees:
+                raise RuntimeError('base indisponible')
+            return creer_lot(lot)
+
+        with mock.patch.object(catalogue, 'TAILLE_LOT', 100):
+            with mock.patch.object(catalogue, 'creer_lot', side_effect=echouer_au_second_lot):
+                with self.assertRaises(RuntimeError):
+                    catalogue.synchroniser_catalogue()
+            tache = SynchronisationCatalogue.objects.get()
+            self.assertEqual((tache.statut, tache.crees), ('echec', 100))
+
+            reprise = catalogue.synchroniser_catalogue()
+
+        self.assertEqual(reprise.pk, tache.pk)
+        self.assertEqual((reprise.statut, reprise.crees, reprise.erreur), ('terminee', 150, ''))
+        self.assertEqual(LogicielReference.objects.count(), 150)
+
+    def test_lancement_deja_actif(self):
+        """Test qu'une synchronisation active n'est pas lancée une seconde fois"""
+        tache = SynchronisationCatalogue.objects.create()
+        with mock.patch.object(catalogue.threading, 'Thread') as thread:
+            self.assertEqual(catalogue.lancer_synchronisation_catalogue(), (tache, False))
+        thread.assert_not_called()
+
+    def test_commande_deja_active(self):
+        """Test que la commande n'exécute pas une synchronisation qui avance déjà ailleurs"""
+        self.installer('Firefox')
+        tache = SynchronisationCatalogue.objects.create()
+
+        sortie = io.StringIO()
+        call_command('synchroniser_catalogue_logiciels', stdout=sortie)
+
+        self.assertIn('déjà en cours', sortie.getvalue())
+        self.assertEqual(list(SynchronisationCatalogue.objects.all()), [tache])
+        self.assertFalse(LogicielReference.objects.exists())
+
+    def test_lot_insere_par_un_autre_processus(self):
+        """Test qu'un nom inséré entre-temps par une autre exécution n'est pas compté"""
+        self.installer('Firefox')
+        self.installer('VLC')
+        lot = list(catalogue.noms_manquants())
+        LogicielReference.objects.create(nom='Firefox')
+
+        self.assertEqual(catalogue.creer_lot(lot), 1)
+        self.assertEqual(LogicielReference.objects.count(), 2)
+
+
+class ResolutionReferencesTest(TestCase):
+    """Tests pour le nom normalisé des références et le cache de résolution"""
+
+    def setUp(self):
+        cache.clear()
+        resolveur.vider()
+        self.structure = Structure.objects.create(nom='Test Entreprise', code='test')
+        self.machine = Machine.objects.create(nom='PC-TEST', structure=self.structure)
+
+    def requetes_references(self, contexte):
+        return [r['sql'] for r in contexte.captured_queries if 'FROM "machines_logicielreference"' in r['sql']]
+
+    def test_normalisation(self):
+        """Test du nom normalisé et de son unicité"""
+        self.assertEqual(normaliser_nom('  Mozilla   FIREFOX\t'), 'mozilla firefox')
+        reference = LogicielReference.objects.create(nom='Mozilla  Firefox')
+        self.assertEqual(reference.nom_normalise, 'mozilla firefox')
+
+        with self.assertRaises(ValidationError):
+            LogicielReference(nom='mozilla firefox').full_clean()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            LogicielReference.objects.create(nom='MOZILLA FIREFOX')
+
+    def test_migration_fusionne_les_doublons(self):
+        """Test que la migration du nom normalisé fusionne les références en doublon"""
+        from django.apps import apps as registre_apps
+        migration = importlib.import_module('apps.machines.migrations.0010_nom_normalise_reference')
+
+        user = User.objects.create_user(
+            username='@john.doe.test', prenom='John', nom='Doe', email='john.doe@test.com',
+            structure=self.structure, password='testpass123'
+        )
+        autre = User.objects.create_user(
+            username='@jane.doe.test', prenom='Jane', nom='Doe', email='jane.doe@test.com',
+            structure=self.structure, password='testpass123'
+        )
+        # Références antérieures à l'index unique : nom_normalise non renseigné
+        gardee, doublon, espaces = LogicielReference.objects.bulk_create([
+            LogicielReference(nom='Firefox', niveau_securite='libre'),
+            LogicielReference(nom='firefox', niveau_securite='interdit'),
+            LogicielReference(nom=' FireFox '),
+        ])
+        installe = LogicielInstalle.objects.create(machine=self.machine, nom='firefox', logiciel_reference=doublon)
+        AutorisationLogiciel.objects.create(logiciel=gardee, type_autorisation='utilisateur', utilisateur=user)
+        AutorisationLogiciel.objects.create(logiciel=doublon, type_autorisation='utilisateur', utilisateur=user)
+        deplacee = AutorisationLogiciel.objects.create(logiciel=espaces, type_autorisation='utilisateur', utilisateur=autre)
+
+        migration.normaliser_noms(registre_apps, None)
+
+        self.assertEqual(list(LogicielReference.objects.values_list('id', flat=True)), [gardee.id])
+        gardee.refresh_from_db()
+        self.assertEqual(gardee.nom_normalise, 'firefox')
+        self.assertEqual(gardee.niveau_securite, 'interdit')
+        installe.refresh_from_db()
+        self.assertEqual(installe.logiciel_reference_id, gardee.id)
+        self.assertEqual(
+            set(AutorisationLogiciel.objects.values_list('logiciel_id', 'utilisateur_id')),
+            {(gardee.id, user.id), (gardee.id, autre.id)}
+        )
+        self.assertTrue(AutorisationLogiciel.objects.filter(pk=deplacee.pk).exists())
+
+        # La référence gardée s'enregistre normalement
+        gardee.niveau_securite = 'controle'
+        gardee.save()
+
+    def test_liaison_2000_logiciels_une_requete(self):
+        """Test que 2 000 logiciels sont liés avec une seule requête IN, puis depuis le cache"""
+        LogicielReference.objects.bulk_create([
+            LogicielReference(nom=f'Logiciel {i}', nom_normalise=f'logiciel {i}') for i in range(2000)
+        ])
+        LogicielInstalle.objects.bulk_create([
+            LogicielInstalle(machine=self.machine, nom=f'LOGICIEL  {i}') for i in range(2000)
+        ])
+
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as contexte:
+            resultats = evaluer_autorisations(LogicielInstalle.objects.filter(machine=self.machine))
+        self.assertEqual(resultats['logiciels_lies'], 2000)
+        resolutions = [sql for sql in self.requetes_references(contexte) if 'nom_normalise' in sql]
+        self.assertEqual(len(resolutions), 1)
+
+        LogicielInstalle.objects.update(logiciel_reference=None)
+        with CaptureQueriesContext(connection) as contexte:
+            evaluer_autorisations(LogicielInstalle.objects.filter(machine=self.machine))
+        self.assertFalse([sql for sql in self.requetes_references(contexte) if 'nom_normalise' in sql])
+        self.assertEqual(LogicielInstalle.objects.filter(logiciel_reference__isnull=True).count(), 0)
+
+    def test_invalidation(self):
+        """Test que le cache est vidé quand une référence est renommée ou supprimée"""
+        reference = LogicielReference.objects.create(nom='Ancien nom')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(resolveur.resoudre(['ancien NOM']), {'ancien nom': reference.pk})
+        self.assertIn('ancien nom', resolveur.identifiants)
+
+        reference.nom = 'Nouveau nom'
+        reference.save()
+        self.assertEqual(resolveur.resoudre(['Ancien nom', 'Nouveau nom']), {'nouveau nom': reference.pk})
+
+        reference.delete()
+        self.assertEqual(resolveur.resoudre(['Nouveau nom']), {})
+
+    def test_transaction_annulee(self):
+        """Test qu'une référence créée dans une transaction annulée n'est pas gardée en cache"""
+        with transaction.atomic():
+            reference = LogicielReference.objects.create(nom='Temporaire')
+            self.assertEqual(resolveur.resoudre(['temporaire']), {'temporaire': reference.pk})
+            transaction.set_rollback(True)
+        self.assertEqual(resolveur.identifiants, {})
+        self.assertEqual(resolveur.resoudre(['temporaire']), {})
+
+    def test_creation_references_manquantes(self):
+        """Test que les variantes de casse d'un même nom partagent une seule référence"""
+        for nom in ('7-Zip', '7-ZIP', ' 7-zip '):
+            LogicielInstalle.objects.create(machine=self.machine, nom=nom, version=nom)
+        evaluer_autorisations(LogicielInstalle.objects.filter(machine=self.machine), creer_references_manquantes=True)
+
+        self.assertEqual(LogicielReference.objects.count(), 1)
+        reference = LogicielReference.objects.get()
+        self.assertEqual(LogicielInstalle.objects.filter(logiciel_reference=reference).count(), 3)
+
+
+@override_settings(
+    MIDDLEWARE=['itsm_backend.instrumentation.InstrumentationMiddleware', *settings.MIDDLEWARE],
+    INSTRUMENTATION_BUDGET_STRICT=True
+)
+class InstrumentationRequetesTest(TestCase):
+    """Tests pour l'instrumentation des requêtes et les budgets de requêtes SQL"""
+
+    def setUp(self):
+        cache.clear()
+        registre.reinitialiser()
+        self.structure = Structure.objects.create(nom='Test Entreprise', code='test')
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+        self.admin = User.objects.create_user(
+            username='@admin.test',
+            prenom='Admin',
+            nom='Test',
+            email='admin@test.com',
+            structure=self.structure,
+            password='testpass123',
+            role='admin'
+        )
+        for i in range(15):
+            machine = Machine.objects.create(nom=f'PC-{i}', structure=self.structure, utilisateur=self.user)
+            InformationSysteme.objects.create(machine=machine, os_nom='Linux')
+            InterfaceReseau.objects.create(machine=machine, nom='eth0', type_interface='ethernet')
+            LogicielInstalle.objects.create(machine=machine, nom=f'Logiciel {i}')
+        self.machine = machine
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_budgets_machines(self):
+        """Test que les lectures de MachineViewSet restent dans leur budget, quel que soit le nombre de machines"""
+        urls = {
+            'MachineViewSet.list': '/api/v1/machines/?expand=logiciels,info_systeme,interfaces_reseau,utilisateur_info',
+            'MachineViewSet.retrieve': f'/api/v1/machines/{self.machine.pk}/',
+            'MachineViewSet.mes_machines': '/api/v1/machines/mes_machines/',
+        }
+        for vue, url in urls.items():
+            self.assertEqual(self.client.get(url).status_code, 200)
+            mesure = registre.tampon[-1]
+            self.assertEqual(mesure.vue, vue)
+            self.assertLessEqual(mesure.nb_requetes, MachineViewSet.budget_requetes[vue.split('.')[1]])
+            self.assertGreater(mesure.taille, 0)
+
+    def test_depassement_budget(self):
+        """Test qu'un dépassement échoue en mode strict et n'est que compté sinon"""
+        with mock.patch.object(MachineViewSet, 'budget_requetes', {'list': 1}):
+            with self.assertRaises(BudgetRequetesDepasse):
+                self.client.get('/api/v1/machines/')
+            with override_settings(INSTRUMENTATION_BUDGET_STRICT=False), \
+                    self.assertLogs('itsm_backend.instrumentation', level='WARNING'):
+                self.assertEqual(self.client.get('/api/v1/machines/').status_code, 200)
+
+        self.assertIn(
+            'itsm_budget_requetes_depassements_total{vue="MachineViewSet.list"} 2',
+            registre.exporter()
+        )
+
+    def test_metriques_prometheus(self):
+        """Test l'export au format texte Prometheus, réservé aux administrateurs"""
+        self.client.get('/api/v1/machines/')
+        self.client.get('/api/v1/machines/')
+
+        self.assertEqual(self.client.get('/api/v1/_metrics').status_code, 403)
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/v1/_metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        texte = response.content.decode()
+        self.assertIn('itsm_http_requetes_total{vue="MachineViewSet.list",methode="GET",statut="200"} 2', texte)
+        self.assertIn('itsm_sql_requetes_count{vue="MachineViewSet.list"} 2', texte)
+        self.assertIn('itsm_sql_requetes{vue="MachineViewSet.list",quantile="0.99"} 2', texte)
+        self.assertIn('# TYPE itsm_serialisation_duree_secondes summary', texte)
+
+    def test_tampon_circulaire(self):
+        """Test que le tampon ne garde que les dernières requêtes et que les compteurs restent cumulés"""
+        registre_test = Registre(taille=3)
+        for i in range(5):
+            registre_test.enregistrer(Enregistrement('Vue', 'GET', 200, i, 0.001, 0.0005, 100, 0.01))
+
+        self.assertEqual([e.nb_requetes for e in registre_test.tampon], [2, 3, 4])
+        texte = registre_test.exporter()
+        self.assertIn('itsm_sql_requetes_count{vue="Vue"} 5', texte)
+        self.assertIn('itsm_sql_requetes_sum{vue="Vue"} 10', texte)
+        self.assertIn('itsm_sql_requetes{vue="Vue",quantile="0.5"} 3', texte)
@@ -0,0 +1,528 @@
+"""
+Tests unitaires pour l'application monitoring
+"""
+import asyncio
+import gzip
+import json
+import socket
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.users.models import Structure
+from apps.machines.models import InterfaceReseau, Machine
+from apps.monitoring.agregation import agreger_metriques, choisir_niveau, debut_intervalle, purger_metriques
+from apps.monitoring.alertes import moteur
+from apps.monitoring.ingestion import ingerer_metriques
+from apps.monitoring.models import (
+    AgregatMetrique, AlerteSysteme, EtatAgregation, MetriquePerformance, SeuillAlerte, StatusMachine
+)
+from apps.monitoring.sondage import Cible, sonder_cibles, sonder_machines
+
+User = get_user_model()
+
+
+def echantillon(timestamp, **valeurs):
+    """Échantillon tel qu'envoyé par l'agent"""
+    return {
+        'timestamp': timestamp,
+        'cpu_percent': 10.0,
+        'cpu_count': 4,
+        'memory_total': 8 * 1024**3,
+        'memory_used': 4 * 1024**3,
+        'memory_percent': 50.0,
+        'disk_total': 500 * 1024**3,
+        'disk_used': 100 * 1024**3,
+        'disk_percent': 20.0,
+        'network_bytes_sent': 1000,
+        'network_bytes_recv': 2000,
+        **valeurs,
+    }
+
+
+class IngestionMetriquesTest(TestCase):
+    """Tests pour l'ingestion par lots des métriques de performance"""
+
+    url = '/api/v1/monitoring/metriques/ingestion/'
+
+    def setUp(self):
+        self.structure = Structure.objects.create(nom='Test Entreprise', code='test')
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+        self.machine = Machine.objects.create(nom='PC-TEST', structure=self.structure, utilisateur=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.debut = time.time() - 3600
+
+    def _envoyer(self, echantillons, compresse=True, machine=None):
+        corps = json.dumps({'machine': str(machine or self.machine.pk), 'echantillons': echantillons}).encode('utf-8')
+        extra = {}
+        if compresse:
+            corps = gzip.compress(corps)
+            extra['HTTP_CONTENT_ENCODING'] = 'gzip'
+        return self.client.post(self.url, data=corps, content_type='application/json', **extra)
+
+    def test_lot_compresse_en_une_insertion(self):
+        """Test qu'un lot compressé est écrit par INSERT groupés, pas un par échantillon"""
+        echantillons = [echantillon(self.debut + i * 5) for i in range(200)]
+        with CaptureQueriesContext(connection) as contexte:
+            response = self._envoyer(echantillons)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['acceptes'], 200)
+        self.assertEqual(MetriquePerformance.objects.filter(machine=self.machine).count(), 200)
+        insertions = [q for q in contexte.captured_queries if q['sql'].startswith('INSERT')]
+        # SQLite limite le nombre de paramètres par requête : quelques INSERT au plus
+        self.assertLessEqual(len(insertions), 3)
+
+    def test_renvoi_sans_doublon(self):
+        """Test qu'un lot renvoyé après une erreur réseau n'est pas dupliqué"""
+        echantillons = [echantillon(self.debut + i) for i in range(10)]
+        self._envoyer(echantillons)
+        self._envoyer(echantillons + [echantillon(self.debut + 10)])
+        self.assertEqual(MetriquePerformance.objects.count(), 11)
+
+    def test_echantillons_invalides_rejetes(self):
+        """Test que les échantillons invalides sont signalés sans bloquer le lot"""
+        echantillons = [
+            echantillon(self.debut),
+            echantillon('pas-une-date'),
+            {'timestamp': self.debut + 1, 'cpu_percent': 5},
+            echantillon(self.debut + 2, cpu_percent='beaucoup'),
+            echantillon(time.time() + 86400),
+        ]
+        donnees = self._envoyer(echantillons, compresse=False).json()
+        self.assertEqual(donnees['acceptes'], 1)
+        self.assertEqual([r['indice'] for r in donnees['rejetes']], [1, 2, 3, 4])
+
+    def test_valeurs_hors_limites_rejetees(self):
+        """Test que les valeurs non finies ou hors des limites de la base sont rejetées, pas une erreur 500"""
+        echantillons = [
+            echantillon(self.debut),
+            echantillon(self.debut + 1, cpu_percent='nan'),
+            echantillon(self.debut + 2, memory_percent='inf'),
+            echantillon(self.debut + 3, network_bytes_sent=2 ** 70),
+            echantillon(self.debut + 4, disk_used=-1),
+            echantillon(self.debut + 5, cpu_count=2 ** 40),
+            echantillon(self.debut + 6, memory_total=1e300),
+        ]
+        response = self._envoyer(echantillons, compresse=False)
+        self.assertEqual(response.status_code, 201)
+        donnees = response.json()
+        self.assertEqual(donnees['acceptes'], 1)
+        self.assertEqual([r['indice'] for r in donnees['rejetes']], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(donnees['rejetes'][2]['erreur'], 'network_bytes_sent hors limites')
+        self.assertEqual(MetriquePerformance.objects.count(), 1)
+
+    def test_machine_d_un_autre_utilisateur(self):
+        """Test qu'un utilisateur ne peut pas envoyer les métriques d'une autre machine"""
+        autre = User.objects.create_user(
+            username='@jane.doe.test', prenom='Jane', nom='Doe', email='jane.doe@test.com',
+            structure=self.structure, password='testpass123'
+        )
+        machine = Machine.objects.create(nom='PC-AUTRE', structure=self.structure, utilisateur=autre)
+        self.assertEqual(self._envoyer([echantillon(self.debut)], machine=machine.pk).status_code, 404)
+
+    def test_contenu_compresse_invalide(self):
+        """Test du refus d'un corps annoncé compressé mais illisible"""
+        response = self.client.post(
+            self.url, data=b'pas du gzip', content_type='application/json', HTTP_CONTENT_ENCODING='gzip'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class AgregationMetriquesTest(TestCase):
+    """Tests pour les niveaux d'agrégation et la rétention des métriques"""
+
+    def setUp(self):
+        self.structure = Structure.objects.create(nom='Test Entreprise', code='test')
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            role='admin',
+            password='testpass123'
+        )
+        self.machine = Machine.objects.create(nom='PC-TEST', structure=self.structure, utilisateur=self.user)
+        # Deux heures d'échantillons toutes les 5 secondes, à partir de minuit UTC il y a trois jours
+        self.base = debut_intervalle(timezone.now() - timedelta(days=3), timedelta(days=1))
+        MetriquePerformance.objects.bulk_create([
+            MetriquePerformance(
+                machine=self.machine,
+                timestamp=self.base + timedelta(seconds=5 * i),
+                cpu_percent=i % 12,
+                cpu_count=4,
+                memory_total=100,
+                memory_used=50,
+                memory_percent=50.0,
+                disk_total=100,
+                disk_used=20,
+                disk_percent=20.0,
+                network_bytes_sent=1000 * i,
+                network_bytes_recv=0,
+            )
+            for i in range(1440)
+        ])
+        self.maintenant = self.base + timedelta(hours=2, minutes=5)
+
+    def test_niveaux_agreges(self):
+        """Test du nombre d'intervalles clos par niveau et des statistiques d'une minute"""
+        ecrits = agreger_metriques(self.maintenant)
+        self.assertEqual(ecrits, {'1m': 120, '1h': 2, '1d': 0})
+
+        minute = AgregatMetrique.objects.get(niveau='1m', debut=self.base + timedelta(minutes=1))
+        self.assertEqual(minute.nb_echantillons, 12)
+        self.assertEqual((minute.cpu_min, minute.cpu_avg, minute.cpu_max, minute.cpu_p95), (0, 5.5, 11, 11))
+        self.assertEqual(minute.network_sent_avg, 200)
+
+        # Les intervalles déjà agrégés ne sont pas recalculés
+        self.assertEqual(agreger_metriques(self.maintenant), {'1m': 0, '1h': 0, '1d': 0})
+
+    def test_echantillon_tardif_reagrege(self):
+        """Test qu'un échantillon reçu après l'agrégation de son intervalle est pris en compte au passage suivant"""
+        agreger_metriques(self.maintenant)
+        tardif = self.base + timedelta(minutes=10, seconds=2)
+        ingerer_metriques(self.machine, [echantillon(tardif.timestamp(), cpu_percent=90.0)])
+
+        etats = dict(EtatAgregation.objects.values_list('niveau', 'a_recalculer_depuis'))
+        self.assertEqual(etats, {'1m': tardif, '1h': tardif, '1d': None})
+
+        ecrits = agreger_metriques(self.maintenant)
+        self.assertEqual(ecrits, {'1m': 110, '1h': 2, '1d': 0})
+        minute = AgregatMetrique.objects.get(niveau='1m', debut=self.base + timedelta(minutes=10))
+        self.assertEqual((minute.nb_echantillons, minute.cpu_max), (13, 90))
+        self.assertEqual(AgregatMetrique.objects.get(niveau='1h', debut=self.base).nb_echantillons, 721)
+        self.assertFalse(EtatAgregation.objects.filter(a_recalculer_depuis__isnull=False).exists())
+        self.assertEqual(agreger_metriques(self.maintenant), {'1m': 0, '1h': 0, '1d': 0})
+
+    @override_settings(MONITORING_RETENTION_BRUTES=1)
+    def test_purge_apres_agregation(self):
+        """Test que les échantillons bruts ne sont purgés qu'une fois agrégés dans tous les niveaux"""
+        plus_tard = self.base + timedelta(days=10)
+        self.assertEqual(purger_metriques(plus_tard)['brut'], 0)
+
+        agreger_metriques(plus_tard)
+        self.assertEqual(purger_metriques(plus_tard)['brut'], 1440)
+        self.assertEqual(AgregatMetrique.objects.filter(niveau='1d').count(), 1)
+        self.assertEqual(AgregatMetrique.objects.filter(niveau='1m').count(), 120)
+
+    def test_choix_du_niveau(self):
+        """Test du choix du niveau selon la période et le nombre de points"""
+        fin = self.maintenant
+        self.assertEqual(choisir_niveau(fin - timedelta(minutes=10), fin, 300, fin), 'brut')
+        self.assertEqual(choisir_niveau(fin - timedelta(hours=2), fin, 300, fin), '1m')
+        self.assertEqual(choisir_niveau(fin - timedelta(days=7), fin, 300, fin), '1h')
+        self.assertEqual(choisir_niveau(fin - timedelta(days=90), fin, 300, fin), '1d')
+
+    def test_serie_api(self):
+        """Test de la série servie depuis les agrégats d'une minute"""
+        agreger_metriques(self.maintenant)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/v1/monitoring/metriques/serie/', {
+            'machine': str(self.machine.pk),
+            'debut': self.base.isoformat(),
+            'fin': (self.base + timedelta(hours=2)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        donnees = response.json()
+        self.assertEqual(donnees['niveau'], '1m')
+        self.assertEqual(len(donnees['points']), 120)
+        self.assertEqual(donnees['points'][1]['cpu']['max'], 11)
+
+
+class AlertesSeuilsTest(TestCase):
+    """Tests pour l'évaluation des seuils d'alerte à l'ingestion"""
+
+    def setUp(self):
+        moteur.reinitialiser()
+        self.structure = Structure.objects.create(nom='Test Entreprise', code='test')
+        self.machine = Machine.objects.create(nom='PC-TEST', structure=self.structure)
+        self.seuil = SeuillAlerte.objects.create(
+            nom='CPU', metrique='cpu', seuil_warning=80, seuil_critical=95, structure=self.structure
+        )
+        self.debut = time.time() - 3600
+        self.suivant = 0
+
+    def _ingerer(self, *valeurs_cpu):
+        echantillons = []
+        for cpu in valeurs_cpu:
+            echantillons.append(echantillon(self.debut + self.suivant * 5, cpu_percent=cpu))
+            self.suivant += 1
+        ingerer_metriques(self.machine, echantillons)
+
+    def test_alerte_apres_echantillons_consecutifs(self):
+        """Test qu'une alerte n'est ouverte qu'après plusieurs dépassements consécutifs"""
+        self._ingerer(50, 85, 85)
+        self.assertFalse(AlerteSysteme.objects.exists())
+
+        self._ingerer(85)
+        alerte = AlerteSysteme.objects.get()
+        self.assertEqual((alerte.metrique, alerte.niveau, alerte.valeur_seuil), ('cpu', 'warning', 80))
+        self.assertFalse(alerte.resolu)
+
+    def test_valeur_oscillante(self):
+        """Test qu'une valeur qui oscille autour du seuil ne crée pas d'alerte"""
+        self._ingerer(*[81, 79] * 50)
+        self.assertFalse(AlerteSysteme.objects.exists())
+
+    def test_une_alerte_ouverte_par_metrique(self):
+        """Test que l'alerte ouverte est mise à jour (aggravation) au lieu d'être dupliquée"""
+        self._ingerer(85, 85, 85)
+        premiere = AlerteSysteme.objects.get()
+        self._ingerer(*[85] * 20)
+        self._ingerer(97, 97, 97)
+
+        alerte = AlerteSysteme.objects.get()
+        self.assertEqual(alerte.pk, premiere.pk)
+        self.assertEqual((alerte.niveau, alerte.valeur_seuil, alerte.valeur_actuelle), ('critical', 95, 97))
+
+    def test_resolution_avec_hysteresis(self):
+        """Test que l'alerte n'est résolue que sous le seuil moins l'hystérésis"""
+        self._ingerer(85, 85, 85)
+        self._ingerer(78, 78, 78, 78)
+        self.assertFalse(AlerteSysteme.objects.get().resolu)
+
+        self._ingerer(60, 60, 60)
+        alerte = AlerteSysteme.objects.get()
+        self.assertTrue(alerte.resolu)
+        self.assertIsNone(alerte.cle_deduplication)
+        self.assertIsNotNone(alerte.date_resolution)
+
+        # Un nouveau dépassement ouvre une nouvelle alerte
+        self._ingerer(85, 85, 85)
+        self.assertEqual(AlerteSysteme.objects.count(), 2)
+        self.assertEqual(AlerteSysteme.objects.filter(resolu=False).count(), 1)
+
+    def test_lot_renvoye_ignore(self):
+        """Test qu'un lot renvoyé par l'agent n'est pas évalué deux fois"""
+        echantillons = [echantillon(self.debut + i * 5, cpu_percent=85) for i in range(2)]
+        ingerer_metriques(self.machine, echantillons)
+        ingerer_metriques(self.machine, echantillons)
+        self.assertFalse(AlerteSysteme.objects.exists())
+
+    def test_seuils_recharges_apres_modification(self):
+        """Test que la modification d'un seuil est prise en compte au lot suivant"""
+        self._ingerer(70, 70, 70)
+        self.assertFalse(AlerteSysteme.objects.exists())
+
+        self.seuil.seuil_warning = 60
+        self.seuil.save()
+        self._ingerer(70, 70, 70)
+        self.assertEqual(AlerteSysteme.objects.get().valeur_seuil, 60)
+
+    def test_etat_repris_des_alertes_ouvertes(self):
+        """Test qu'un processus redémarré reprend les alertes ouvertes sans les dupliquer"""
+        self._ingerer(85, 85, 85)
+        moteur.reinitialiser()
+        self._ingerer(85, 85, 85)
+        self.assertEqual(AlerteSysteme.objects.count(), 1)
+
+    def test_etat_relu_apres_resolution_manuelle(self):
+        """Test qu'une alerte résolue manuellement est rouverte au dépassement suivant"""
+        self._ingerer(85, 85, 85)
+        alerte = AlerteSysteme.objects.get()
+        alerte.resolu = True
+        alerte.save()
+
+        self._ingerer(85, 85, 85)
+        self.assertEqual(AlerteSysteme.objects.count(), 2)
+        self.assertEqual(AlerteSysteme.objects.filter(resolu=False).count(), 1)
+
+    def test_lot_sans_changement_sans_ecriture(self):
+        """Test qu'un lot sans changement de niveau n'écrit aucune alerte"""
+        self._ingerer(50)
+        echantillons = [echantillon(self.debut + (self.suivant + i) * 5, cpu_percent=50) for i in range(100)]
+        with CaptureQueriesContext(connection) as contexte:
+            ingerer_metriques(self.machine, echantillons)
+        self.assertFalse(any('alertesysteme' in requete['sql'] for requete in contexte.captured_queries))
+
+
+def port_ferme():
+    """Port local sur lequel rien n'écoute (connexion refusée)"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def sonder_avec_ecouteurs(nb_ecouteurs, cibles_par_ecouteur, nb_fermees, concurrence, chemin=''):
+    """Démarrer de faux services locaux puis sonder leurs ports et un port fermé"""
+    async def repondre(reader, writer):
+        if chemin:
+            requete = await reader.readline()
+            statut = b'200 OK' if requete.split()[1:2] == [chemin.encode()] else b'503 Service Unavailable'
+            writer.write(b'HTTP/1.0 ' + statut + b'\r\n\r\n')
+            await writer.drain()
+        writer.close()
+
+    serveurs = [
+        await asyncio.start_server(repondre, '127.0.0.1', 0, backlog=1024)
+        for _ in range(nb_ecouteurs)
+    ]
+    try:
+        ports = [serveur.sockets[0].getsockname()[1] for serveur in serveurs]
+        cibles = [Cible(f'{port}-{i}', '127.0.0.1', port) for port in ports for i in range(cibles_par_ecouteur)]
+        ferme = port_ferme()
+        cibles += [Cible(f'ferme-{i}', '127.0.0.1', ferme) for i in range(nb_fermees)]
+        debut = time.perf_counter()
+        resultats = await sonder_cibles(cibles, concurrence, delai=5.0, chemin=chemin)
+        return resultats, time.perf_counter() - debut
+    finally:
+        for serveur in serveurs:
+            serveur.close()
+            await serveur.wait_closed()
+
+
+class SondageMachinesTest(TestCase):
+    """Tests pour le sondage d'accessibilité des machines sur des services locaux"""
+
+    def test_balayage_5000_cibles(self):
+        """Test que 5 000 cibles sont sondées en quelques secondes avec une concurrence bornée"""
+        resultats, duree = asyncio.run(sonder_avec_ecouteurs(40, 100, 1000, concurrence=500))
+
+        self.assertEqual(len(resultats), 5000)
+        accessibles = [resultat for resultat in resultats if resultat.succes]
+        self.assertEqual(len(accessibles), 4000)
+        self.assertTrue(all(resultat.machine_id.startswith('ferme') for resultat in resultats if not resultat.succes))
+        self.assertTrue(all(resultat.temps_reponse is not None for resultat in accessibles))
+        self.assertLess(duree, 15)
+
+    def test_sondage_http(self):
+        """Test du sondage par chemin HTTP : seule une réponse 2xx compte"""
+        resultats, _ = asyncio.run(sonder_avec_ecouteurs(2, 10, 5, concurrence=8, chemin='/heartbeat'))
+        self.assertEqual(sum(resultat.succes for resultat in resultats), 20)
+
+        async def mauvais_chemin():
+            async def repondre(reader, writer):
+                await reader.readline()
+                writer.write(b'HTTP/1.0 503 Service Unavailable\r\n\r\n')
+                writer.close()
+            serveur = await asyncio.start_server(repondre, '127.0.0.1', 0)
+            async with serveur:
+                port = serveur.sockets[0].getsockname()[1]
+                return await sonder_cibles([Cible('m', '127.0.0.1', port)], 1, 5.0, chemin='/heartbeat')
+
+        self.assertFalse(asyncio.run(mauvais_chemin())[0].succes)
+
+    def test_statuts_enregistres(self):
+        """Test de l'écriture groupée des statuts des machines sondées"""
+        structure = Structure.objects.create(nom='Test Entreprise', code='test')
+        ecouteur = socket.socket()
+        ecouteur.bind(('127.0.0.1', 0))
+        ecouteur.listen(16)
+        self.addCleanup(ecouteur.close)
+        port = ecouteur.getsockname()[1]
+
+        accessible = Machine.objects.create(nom='PC-1', structure=structure)
+        deja_sondee = Machine.objects.create(nom='PC-2', structure=structure)
+        eteinte = Machine.objects.create(nom='PC-3', structure=structure)
+        retiree = Machine.objects.create(nom='PC-4', structure=structure, statut='retire')
+        sans_adresse = Machine.objects.create(nom='PC-5', structure=structure)
+        for machine in (accessible, deja_sondee, retiree):
+            InterfaceReseau.objects.create(machine=machine, nom='eth0', type_interface='ethernet', adresse_ip='127.0.0.1')
+        InterfaceReseau.objects.create(machine=eteinte, nom='eth0', type_interface='ethernet', adresse_ip='127.0.0.2')
+        ancien = StatusMachine.objects.create(machine=deja_sondee, statut='offline')
+
+        with self.settings(MONITORING_SONDE_CHEMIN=''):
+            # Le port fermé de 127.0.0.2 refuse la connexion
+            with CaptureQueriesContext(connection) as contexte:
+                resume = sonder_machines(port=port, delai=2.0)
+
+        self.assertEqual((resume['cibles'], resume['accessibles']), (3, 2))
+        self.assertEqual(sum('INSERT' in requete['sql'] for requete in contexte.captured_queries), 1)
+        statuts = {statut.machine_id: statut for statut in StatusMachine.objects.all()}
+        self.assertEqual(set(statuts), {accessible.pk, deja_sondee.pk, eteinte.pk})
+        self.assertEqual(statuts[deja_sondee.pk].pk, ancien.pk)
+        self.assertEqual(statuts[deja_sondee.pk].statut, 'online')
+        self.assertTrue(statuts[accessible.pk].ping_success)
+        self.assertIsNotNone(statuts[accessible.pk].temps_reponse)
+        self.assertFalse(statuts[eteinte.pk].ping_success)
+        self.assertEqual(statuts[eteinte.pk].statut, 'offline')
+
+        self.assertTrue(Machine.objects.get(pk=accessible.pk).est_en_ligne)
+        self.assertFalse(Machine.objects.get(pk=eteinte.pk).est_en_ligne)
+        self.assertFalse(sans_adresse.est_en_ligne)
+
+
+class HeartbeatTest(TestCase):
+    """Tests pour le signal de vie des agents"""
+
+    url = '/api/v1/monitoring/heartbeat/'
+
+    def setUp(self):
+        cache.clear()
+        self.structure = Structure.objects.create(nom='Test Entreprise', code='test')
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+        self.machine = Machine.objects.create(nom='PC-TEST', structure=self.structure, utilisateur=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_un_seul_update(self):
+        """Test qu'un signal de vie sans jauges coûte un seul UPDATE"""
+        self.assertFalse(self.machine.est_en_ligne)
+        with CaptureQueriesContext(connection) as contexte:
+            response = self.client.post(self.url, {'machine': str(self.machine.pk)}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['enregistre'])
+        ecritures = [r['sql'] for r in contexte.captured_queries if not r['sql'].startswith('SELECT')]
+        self.assertEqual(len(ecritures), 1)
+        self.assertTrue(ecritures[0].startswith('UPDATE'))
+        self.assertTrue(Machine.objects.get(pk=self.machine.pk).est_en_ligne)
+        self.assertFalse(StatusMachine.objects.exists())
+
+    def test_signaux_regroupes(self):
+        """Test qu'un signal reçu avant la fin de l'intervalle n'écrit rien"""
+        self.client.post(self.url, {'machine': str(self.machine.pk)}, format='json')
+        with CaptureQueriesContext(connection) as contexte:
+            response = self.client.post(self.url, {'machine': str(self.machine.pk)}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['enregistre'])
+        self.assertEqual(response.json()['intervalle'], 60)
+        self.assertEqual(len(contexte.captured_queries), 0)
+
+    def test_jauges(self):
+        """Test de l'enregistrement des jauges dans StatusMachine"""
+        response = self.client.post(self.url, {
+            'machine': str(self.machine.pk), 'cpu_percent': 12.5, 'memory_percent': 40, 'disk_percent': 71,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        statut = StatusMachine.objects.get(machine=self.machine)
+        self.assertEqual((statut.statut, statut.cpu_usage, statut.ram_usage, statut.disk_usage), ('online', 12.5, 40, 71))
+
+        response = self.client.post(self.url, {'machine': str(self.machine.pk), 'cpu_percent': 'x'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_machine_non_visible(self):
+        """Test qu'un utilisateur ne peut pas signaler la machine d'un autre"""
+        autre = Machine.objects.create(nom='PC-AUTRE', structure=self.structure)
+        for machine_id in (str(autre.pk), 'invalide'):
+            response = self.client.post(self.url, {'machine': machine_id}, format='json')
+            self.assertEqual(response.status_code, 404)
+        # L'échec n'est pas mis en cache
+        response = self.client.post(self.url, {'machine': str(autre.pk)}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(Machine.objects.get(pk=autre.pk).derniere_synchronisation)
+        self.assertEqual(self.client.post(self.url, {}, format='json').status_code, 400)
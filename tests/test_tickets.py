@@ -1,14 +1,39 @@
 """
 Tests unitaires pour l'application tickets
 """
-from django.test import TestCase
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, OperationalError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.urls import include, path
 from django.utils import timezone
-from apps.users.models import Structure
-from apps.tickets.models import CategorieTicket, Ticket, CommentaireTicket, SLA
+from rest_framework.test import APIClient
+from apps.users.models import Structure, Site
+from apps.tickets.assignation import StrategieAssignation, choisir_technicien
+from apps.tickets.evenements import decoder_curseur, encoder_curseur
+from apps.tickets.models import (
+    CategorieTicket, Ticket, CommentaireTicket, SLA, CompteurTicket, ChargeTechnicien,
+    NotificationTicket, SuppressionSynchronisee
+)
+from apps.tickets.views import NotificationListView, NotificationTicketViewSet, TicketViewSet
+from apps.machines.models import Machine, LogicielInstalle, LogicielReference
+from itsm_backend.instrumentation import BudgetRequetesDepasse, registre
 
 User = get_user_model()
 
+# NotificationListView est masquée par la route `notifications` du routeur :
+# ces URLs la rendent accessible aux tests de budget (ROOT_URLCONF=__name__)
+urlpatterns = [
+    path('liste-notifications/', NotificationListView.as_view()),
+    path('', include('itsm_backend.urls')),
+]
+
 
 class CategorieTicketModelTest(TestCase):
     """Tests pour le modèle CategorieTicket"""
@@ -171,4 +196,879 @@ class SLAModelTest(TestCase):
         """Test de la méthode get_temps_resolution"""
         self.assertEqual(self.sla.get_temps_resolution('critique'), 4)
         self.assertEqual(self.sla.get_temps_resolution('normale'), 48)
-        self.assertEqual(self.sla.get_temps_resolution('inexistant'), 48)  # Valeur par défaut
\ No newline at end of file
+        self.assertEqual(self.sla.get_temps_resolution('inexistant'), 48)  # Valeur par défaut
+
+class EvenementsLongPollTest(TestCase):
+    """Tests pour le canal d'événements long-poll"""
+    
+    url = '/api/v1/evenements/'
+    
+    def setUp(self):
+        cache.clear()
+        self.structure = Structure.objects.create(
+            nom='Test Entreprise',
+            code='test'
+        )
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+        self.technicien = User.objects.create_user(
+            username='@jane.tech.test',
+            prenom='Jane',
+            nom='Tech',
+            email='jane.tech@test.com',
+            structure=self.structure,
+            role='technicien',
+            password='testpass123'
+        )
+        self.ticket = Ticket.objects.create(
+            titre='Problème d\'écran',
+            description='L\'écran ne s\'allume plus',
+            demandeur=self.user,
+            assigne_a=self.technicien
+        )
+        self.client = APIClient()
+    
+    def _curseur(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()['evenements'], [])
+        return response.json()['curseur']
+    
+    def _attendre(self, curseur):
+        return self.client.get(self.url, {'curseur': curseur, 'attente': 0}).json()
+    
+    def test_aucun_evenement(self):
+        """Test qu'un état inchangé ne renvoie aucun delta"""
+        curseur = self._curseur(self.user)
+        
+        donnees = self._attendre(curseur)
+        self.assertEqual(donnees['evenements'], [])
+    
+    def test_changement_de_statut(self):
+        """Test qu'un changement de statut est transmis au demandeur"""
+        curseur = self._curseur(self.user)
+        
+        ticket = Ticket.objects.get(pk=self.ticket.pk)
+        ticket.titre = 'Titre modifié'
+        ticket.save()
+        self.assertEqual(self._attendre(curseur)['evenements'], [])
+        
+        ticket.statut = 'resolu'
+        ticket.save()
+        donnees = self._attendre(curseur)
+        self.assertEqual([e['type'] for e in donnees['evenements']], ['statut_ticket'])
+        self.assertEqual(donnees['evenements'][0]['statut'], 'resolu')
+        
+        # Le nouveau curseur ne renvoie pas deux fois le même changement
+        self.assertEqual(self._attendre(donnees['curseur'])['evenements'], [])
+    
+    def test_nouvelle_notification(self):
+        """Test qu'une notification de commentaire est transmise au technicien"""
+        curseur = self._curseur(self.technicien)
+        
+        CommentaireTicket.objects.create(ticket=self.ticket, auteur=self.user, contenu='Toujours en panne')
+        
+        donnees = self._attendre(curseur)
+        self.assertEqual([e['type'] for e in donnees['evenements']], ['notification'])
+    
+    def test_notifications_meme_date(self):
+        """Test qu'une notification créée à la même date que la dernière transmise n'est pas perdue"""
+        curseur = decoder_curseur(self._curseur(self.technicien))
+        for contenu in ('Premier', 'Second'):
+            CommentaireTicket.objects.create(ticket=self.ticket, auteur=self.user, contenu=contenu)
+        notifications = NotificationTicket.objects.filter(destinataire=self.technicien)
+        date = timezone.now()
+        notifications.update(date_creation=date)
+        premiere, seconde = notifications.order_by('pk')
+        
+        # Le client a déjà reçu la première : seule la seconde reste à transmettre
+        curseur.update({'n': date.isoformat(), 'ni': str(premiere.pk)})
+        donnees = self._attendre(encoder_curseur(curseur))
+        self.assertEqual(
+            [e['notification']['id'] for e in donnees['evenements']],
+            [str(seconde.pk)]
+        )
+        self.assertEqual(self._attendre(donnees['curseur'])['evenements'], [])
+    
+    def test_changement_de_politique(self):
+        """Test qu'un logiciel nouvellement interdit est transmis"""
+        machine = Machine.objects.create(nom='PC-TEST', structure=self.structure, utilisateur=self.user)
+        LogicielInstalle.objects.create(machine=machine, nom='Jeu', version='1.0')
+        reference = LogicielReference.objects.create(nom='Jeu')
+        curseur = self._curseur(self.user)
+        
+        reference.niveau_securite = 'interdit'
+        reference.save()
+        
+        donnees = self._attendre(curseur)
+        self.assertEqual([e['type'] for e in donnees['evenements']], ['politique'])
+        self.assertEqual([l['nom'] for l in donnees['evenements'][0]['logiciels']], ['Jeu'])
+    
+    def test_curseur_mal_forme(self):
+        """Test qu'un curseur aux valeurs invalides est remplacé par le curseur initial"""
+        self.client.force_authenticate(self.user)
+        maintenant = timezone.now().isoformat()
+        for curseur in (
+            {'n': 'pas-une-date', 't': maintenant, 'v': '1.1', 'e': 'x'},
+            {'n': 5, 't': maintenant, 'v': '1.1', 'e': 'x'},
+            {'n': maintenant, 't': '2024-13-45T00:00:00', 'v': '1.1', 'e': 'x'},
+            {'n': maintenant, 't': maintenant, 'v': None, 'e': 'x'},
+            {'n': maintenant, 'ni': 'pas-un-uuid', 't': maintenant, 'v': '1.1', 'e': 'x'},
+        ):
+            response = self.client.get(self.url, {'curseur': encoder_curseur(curseur), 'attente': 0})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['evenements'], [])
+            self.assertNotEqual(response.json()['curseur'], encoder_curseur(curseur))
+
+
+class CompteurTicketTest(TestCase):
+    """Tests pour l'allocation des numéros de ticket"""
+    
+    def setUp(self):
+        self.structure = Structure.objects.create(nom='Test Entreprise', code='test')
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+        self.annee = timezone.now().year
+    
+    def _creer_ticket(self, titre='Ticket'):
+        return Ticket.objects.create(titre=titre, description='Description', demandeur=self.user)
+    
+    def test_numeros_consecutifs(self):
+        """Test que les numéros suivent la séquence annuelle"""
+        premier = self._creer_ticket()
+        second = self._creer_ticket()
+        
+        self.assertEqual(premier.numero, f'T{self.annee}000001')
+        self.assertEqual(second.numero, f'T{self.annee}000002')
+        self.assertEqual(CompteurTicket.objects.get(annee=self.annee).dernier_numero, 2)
+    
+    def test_reprise_des_numeros_existants(self):
+        """Test que le compteur démarre après les tickets créés avant son introduction"""
+        ticket = self._creer_ticket()
+        Ticket.objects.filter(pk=ticket.pk).update(numero=f'T{self.annee}000041')
+        CompteurTicket.objects.all().delete()
+        
+        self.assertEqual(self._creer_ticket().numero, f'T{self.annee}000042')
+    
+    def test_allocation_sans_comptage(self):
+        """Test que l'allocation ne dépend pas du nombre de tickets existants"""
+        for i in range(20):
+            self._creer_ticket(f'Ticket {i}')
+        
+        with CaptureQueriesContext(connection) as contexte:
+            self._creer_ticket('Dernier')
+        self.assertFalse(any('COUNT(' in q['sql'].upper() for q in contexte.captured_queries))
+    
+    def test_trous_toleres_apres_annulation(self):
+        """Test qu'un numéro perdu n'est jamais réattribué"""
+        self._creer_ticket()
+        CompteurTicket.allouer(self.annee)  # numéro réservé puis abandonné
+        
+        self.assertEqual(self._creer_ticket().numero, f'T{self.annee}000003')
+
+
+class CompteurTicketConcurrenceTest(TransactionTestCase):
+    """Tests de création concurrente de tickets depuis plusieurs threads"""
+    
+    NB_THREADS = 8
+    TICKETS_PAR_THREAD = 10
+    
+    def setUp(self):
+        self.structure = Structure.objects.create(nom='Test Entreprise', code='test')
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+    
+    def test_creation_concurrente(self):
+        """Test qu'aucun numéro n'est attribué deux fois sous concurrence"""
+        depart = threading.Barrier(self.NB_THREADS)
+        erreurs = []
+        
+        def enregistrer(ticket):
+            # SQLite en mémoire (cache partagé) échoue au lieu d'attendre le verrou
+            # d'écriture : rejouer l'enregistrement comme le ferait busy_timeout
+            for _ in range(500):
+                try:
+                    return ticket.save()
+                except OperationalError as e:
+                    if 'locked' not in str(e):
+                        raise
+                    time.sleep(0.005)
+            raise OperationalError('database table is locked')
+        
+        def creer_tickets(indice):
+            try:
+                depart.wait()
+                for i in range(self.TICKETS_PAR_THREAD):
+                    enregistrer(Ticket(
+                        titre=f'Ticket {indice}-{i}',
+                        description='Description',
+                        demandeur=self.user
+                    ))
+            except Exception as e:
+                erreurs.append(e)
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=creer_tickets, args=(i,)) for i in range(self.NB_THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(erreurs, [])
+        numeros = list(Ticket.objects.values_list('numero', flat=True))
+        total = self.NB_THREADS * self.TICKETS_PAR_THREAD
+        self.assertEqual(len(numeros), total)
+        self.assertEqual(len(set(numeros)), total)
+        annee = timezone.now().year
+        self.assertEqual(CompteurTicket.objects.get(annee=annee).dernier_numero, total)
+
+
+class StatistiquesTicketTest(TestCase):
+    """Tests pour les statistiques agrégées des tickets"""
+    
+    url = '/api/v1/tickets/statistiques/'
+    
+    def setUp(self):
+        cache.clear()
+        self.structure = Structure.objects.create(nom='Test Entreprise', code='test')
+        self.admin = User.objects.create_user(
+            username='@admin.test',
+            prenom='Alice',
+            nom='Admin',
+            email='admin@test.com',
+            structure=self.structure,
+            role='admin',
+            password='testpass123'
+        )
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+        self.technicien = User.objects.create_user(
+            username='@jane.tech.test',
+            prenom='Jane',
+            nom='Tech',
+            email='jane.tech@test.com',
+            structure=self.structure,
+            role='technicien',
+            password='testpass123'
+        )
+        self.categorie = CategorieTicket.objects.create(nom='Matériel')
+        Ticket.objects.create(titre='A', description='A', demandeur=self.user, priorite='haute',
+                              categorie=self.categorie, assigne_a=self.technicien, statut='assigne')
+        Ticket.objects.create(titre='B', description='B', demandeur=self.user, statut='resolu',
+                              date_resolution=timezone.now())
+        Ticket.objects.create(titre='C', description='C', demandeur=self.admin,
+                              date_echeance=timezone.now() - timezone.timedelta(days=1))
+        self.client = APIClient()
+    
+    def test_statistiques_en_une_requete(self):
+        """Test que les statistiques globales tiennent en une requête d'agrégation"""
+        self.client.force_authenticate(self.admin)
+        
+        with CaptureQueriesContext(connection) as contexte:
+            response = self.client.get(self.url)
+        stats = response.json()
+        
+        self.assertEqual(stats['total'], 3)
+        self.assertEqual(stats['par_statut']['resolu'], 1)
+        self.assertEqual(stats['par_statut']['assigne'], 1)
+        self.assertEqual(stats['par_priorite']['haute'], 1)
+        self.assertEqual(stats['par_priorite']['normale'], 2)
+        self.assertEqual(stats['en_retard'], 1)
+        self.assertEqual(stats['resolus_ce_mois'], 1)
+        requetes_tickets = [q for q in contexte.captured_queries if 'tickets_ticket' in q['sql']]
+        self.assertEqual(len(requetes_tickets), 1)
+    
+    def test_portee_du_role(self):
+        """Test que chaque utilisateur ne compte que les tickets qu'il voit"""
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(self.url).json()['total'], 2)
+        
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.get(self.url).json()['total'], 3)
+    
+    def test_ventilations(self):
+        """Test des répartitions par catégorie, technicien et mois"""
+        self.client.force_authenticate(self.admin)
+        
+        stats = self.client.get(self.url, {'ventilation': 'categorie,technicien,mois'}).json()
+        
+        self.assertIn({'categorie': self.categorie.pk, 'nom': 'Matériel', 'total': 1}, stats['par_categorie'])
+        technicien = next(l for l in stats['par_technicien'] if l['technicien'] == str(self.technicien.pk))
+        self.assertEqual((technicien['nom'], technicien['total'], technicien['ouverts']), ('Jane Tech', 1, 1))
+        self.assertEqual(stats['par_mois'], [
+            {'mois': timezone.localtime().strftime('%Y-%m'), 'crees': 3, 'resolus': 1}
+        ])
+    
+    def test_cache_invalide_par_enregistrement(self):
+        """Test que les statistiques sont servies du cache jusqu'au prochain enregistrement"""
+        self.client.force_authenticate(self.admin)
+        self.client.get(self.url)
+        
+        with CaptureQueriesContext(connection) as contexte:
+            self.assertEqual(self.client.get(self.url).json()['total'], 3)
+        self.assertFalse([q for q in contexte.captured_queries if 'tickets_ticket' in q['sql']])
+        
+        Ticket.objects.create(titre='D', description='D', demandeur=self.user)
+        self.assertEqual(self.client.get(self.url).json()['total'], 4)
+
+
+class AssignationTechnicienTest(TestCase):
+    """Tests pour l'assignation automatique selon la charge des techniciens"""
+    
+    def setUp(self):
+        self.structure = Structure.objects.create(nom='Test Entreprise', code='test')
+        self.site = Site.objects.create(nom='Siège', adresse='1 rue du Test', structure=self.structure)
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+        self.techniciens = [
+            User.objects.create_user(
+                username=f'@tech{i}.test',
+                prenom=f'Tech{i}',
+                nom='Test',
+                email=f'tech{i}@test.com',
+                structure=self.structure,
+                role='technicien',
+                password='testpass123'
+            )
+            for i in range(3)
+        ]
+        self.categorie = CategorieTicket.objects.create(nom='Réseau')
+    
+    def _creer_ticket(self, technicien=None, **kwargs):
+        return Ticket.objects.create(
+            titre='Ticket', description='Description', demandeur=self.user,
+            assigne_a=technicien, statut='assigne' if technicien else 'nouveau', **kwargs
+        )
+    
+    def _charge(self, technicien):
+        return ChargeTechnicien.objects.get(technicien=technicien)
+    
+    def test_compteurs_incrementaux(self):
+        """Test que les compteurs suivent assignation, réassignation, résolution et suppression"""
+        tech_a, tech_b, _ = self.techniciens
+        ticket = self._creer_ticket(tech_a, priorite='haute')
+        self.assertEqual((self._charge(tech_a).tickets_ouverts, self._charge(tech_a).charge_ponderee), (1, 4))
+        
+        ticket = Ticket.objects.get(pk=ticket.pk)
+        ticket.assigne_a = tech_b
+        ticket.save()
+        self.assertEqual(self._charge(tech_a).tickets_ouverts, 0)
+        self.assertEqual(self._charge(tech_b).tickets_ouverts, 1)
+        
+        ticket.statut = 'resolu'
+        ticket.save()
+        self.assertEqual((self._charge(tech_b).tickets_ouverts, self._charge(tech_b).charge_ponderee), (0, 0))
+        
+        autre = self._creer_ticket(tech_b)
+        Ticket.objects.get(pk=autre.pk).delete()
+        self.assertEqual(self._charge(tech_b).tickets_ouverts, 0)
+
+    def test_ticket_rejete_hors_charge(self):
+        """Test qu'un ticket rejeté ne compte plus dans la charge, y compris après recalcul"""
+        tech_a = self.techniciens[0]
+        ticket = self._creer_ticket(tech_a)
+        ticket.statut = 'rejete'
+        ticket.save()
+        self.assertEqual(self._charge(tech_a).tickets_ouverts, 0)
+
+        ChargeTechnicien.recalculer()
+        self.assertEqual(self._charge(tech_a).tickets_ouverts, 0)
+
+    def test_recalculer(self):
+        """Test de la reconstruction des compteurs après une mise à jour en masse"""
+        tech_a = self.techniciens[0]
+        self._creer_ticket(tech_a)
+        self._creer_ticket(tech_a, priorite='critique')
+        Ticket.objects.update(statut='en_cours')
+        ChargeTechnicien.objects.update(tickets_ouverts=0, charge_ponderee=0)
+        
+        ChargeTechnicien.recalculer()
+        self.assertEqual((self._charge(tech_a).tickets_ouverts, self._charge(tech_a).charge_ponderee), (2, 10))
+    
+    def test_moins_charge(self):
+        """Test que le technicien le moins chargé est choisi en une requête indexée"""
+        tech_a, tech_b, tech_c = self.techniciens
+        self._creer_ticket(tech_a)
+        self._creer_ticket(tech_b)
+        
+        with self.assertNumQueries(2):
+            self.assertEqual(choisir_technicien(strategie='moins_charge'), tech_c)
+    
+    def test_ponderee_sla(self):
+        """Test que la stratégie pondérée tient compte de la priorité des tickets ouverts"""
+        tech_a, tech_b, tech_c = self.techniciens
+        self._creer_ticket(tech_a, priorite='critique')
+        for technicien, nombre in ((tech_b, 2), (tech_c, 3)):
+            for _ in range(nombre):
+                self._creer_ticket(technicien)
+        
+        self.assertEqual(choisir_technicien(strategie='moins_charge'), tech_a)
+        self.assertEqual(choisir_technicien(strategie='ponderee_sla'), tech_b)
+    
+    def test_round_robin(self):
+        """Test que chaque technicien est choisi à son tour"""
+        choisis = [choisir_technicien(strategie='round_robin') for _ in range(6)]
+        
+        self.assertEqual(set(choisis[:3]), set(self.techniciens))
+        self.assertEqual(choisis[3:], choisis[:3])
+    
+    def test_competences_et_site(self):
+        """Test que les techniciens compétents du site du demandeur sont privilégiés"""
+        tech_a, tech_b, tech_c = self.techniciens
+        self.categorie.techniciens.add(tech_b, tech_c)
+        tech_c.site = self.site
+        tech_c.save()
+        self._creer_ticket(tech_c)
+        self._creer_ticket(tech_c)
+        
+        self.assertEqual(choisir_technicien(categorie=self.categorie, site=self.site.pk), tech_c)
+        self.assertEqual(choisir_technicien(categorie=self.categorie), tech_b)
+        # Aucun technicien compétent sur un autre site : contrainte de site relâchée
+        autre_site = Site.objects.create(nom='Agence', adresse='2 rue du Test', structure=self.structure)
+        self.assertIn(choisir_technicien(categorie=self.categorie, site=autre_site.pk), [tech_b, tech_c])
+    
+    def test_creation_via_api(self):
+        """Test que la création d'un ticket l'assigne au technicien le moins chargé"""
+        tech_a, tech_b, tech_c = self.techniciens
+        self._creer_ticket(tech_a)
+        self._creer_ticket(tech_c)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        
+        response = client.post('/api/v1/tickets/', {'titre': 'Écran noir', 'description': 'Plus d\'image'})
+        self.assertEqual(response.status_code, 201)
+        ticket = Ticket.objects.get(titre='Écran noir')
+        self.assertEqual(ticket.assigne_a, tech_b)
+        self.assertEqual(self._charge(tech_b).tickets_ouverts, 1)
+
+
+class AssignationConcurrenceTest(TransactionTestCase):
+    """Tests de l'assignation automatique de tickets créés simultanément"""
+    
+    def setUp(self):
+        self.structure = Structure.objects.create(nom='Test Entreprise', code='test')
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+        self.techniciens = [
+            User.objects.create_user(
+                username=f'@tech{i}.test',
+                prenom=f'Tech{i}',
+                nom='Test',
+                email=f'tech{i}@test.com',
+                structure=self.structure,
+                role='technicien',
+                password='testpass123'
+            )
+            for i in range(2)
+        ]
+    
+    def _creer(self, titre):
+        # Le client de test propage aux autres threads les exceptions d'une requête
+        # (signal global) : juger chaque requête sur son seul code de retour. SQLite
+        # en mémoire (cache partagé) échoue au lieu d'attendre le verrou : rejouer
+        # la création comme le ferait busy_timeout.
+        client = APIClient(raise_request_exception=False)
+        client.force_authenticate(self.user)
+        for _ in range(500):
+            response = client.post('/api/v1/tickets/', {'titre': titre, 'description': 'D'})
+            if response.status_code != 500:
+                return response
+            time.sleep(0.005)
+        return response
+    
+    def test_creations_simultanees(self):
+        """Test qu'une création pendant le choix d'une autre ne retient pas le même technicien"""
+        choisi = threading.Event()
+        reprendre = threading.Event()
+        choisir = StrategieAssignation.choisir
+        premier = []
+        erreurs = []
+        
+        def choisir_puis_attendre(strategie, charges):
+            # La première création s'arrête entre le choix et l'enregistrement du ticket
+            charge = choisir(strategie, charges)
+            if not premier:
+                premier.append(charge)
+                choisi.set()
+                reprendre.wait(5)
+            return charge
+        
+        def creer(titre):
+            try:
+                self.assertEqual(self._creer(titre).status_code, 201)
+            except Exception as e:
+                erreurs.append(e)
+            finally:
+                connection.close()
+        
+        with mock.patch.object(StrategieAssignation, 'choisir', choisir_puis_attendre):
+            premiere = threading.Thread(target=creer, args=('Premier',))
+            premiere.start()
+            self.assertTrue(choisi.wait(5))
+            seconde = threading.Thread(target=creer, args=('Second',))
+            seconde.start()
+            time.sleep(0.2)
+            reprendre.set()
+            premiere.join()
+            seconde.join()
+        
+        self.assertEqual(erreurs, [])
+        self.assertEqual(Ticket.objects.count(), 2)
+        assignes = set(Ticket.objects.values_list('assigne_a', flat=True))
+        self.assertEqual(assignes, {technicien.pk for technicien in self.techniciens})
+        for technicien in self.techniciens:
+            self.assertEqual(ChargeTechnicien.objects.get(technicien=technicien).tickets_ouverts, 1)
+
+
+class ChampsDynamiquesTicketsTest(TestCase):
+    """Tests pour les listes résumées de tickets"""
+    
+    url = '/api/v1/tickets/'
+    
+    def setUp(self):
+        self.structure = Structure.objects.create(nom='Test Entreprise', code='test')
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+        for i in range(5):
+            Ticket.objects.create(titre=f'Ticket {i}', description='Description', demandeur=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def test_liste_resumee(self):
+        """Test que la liste renvoie les noms sans utilisateurs imbriqués, en une requête"""
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        ticket = response.json()['results'][0]
+        
+        self.assertEqual(ticket['demandeur_nom'], 'John Doe')
+        self.assertNotIn('demandeur_info', ticket)
+        self.assertIn('description', ticket)
+    
+    def test_expand_et_fields(self):
+        """Test des paramètres ?expand= et ?fields="""
+        ticket = self.client.get(self.url, {'expand': 'demandeur_info'}).json()['results'][0]
+        self.assertEqual(ticket['demandeur_info']['structure_nom'], 'Test Entreprise')
+        
+        ticket = self.client.get(self.url, {'fields': 'numero,statut'}).json()['results'][0]
+        self.assertEqual(set(ticket), {'numero', 'statut'})
+    
+    def test_detail_complet(self):
+        """Test que le détail garde les informations complètes"""
+        ticket = Ticket.objects.first()
+        donnees = self.client.get(f'{self.url}{ticket.pk}/').json()
+        self.assertIn('demandeur_info', donnees)
+        self.assertIn('temps_ouvert', donnees)
+
+
+class PaginationCurseurTicketsTest(TestCase):
+    """Tests pour la pagination par curseur des tickets et notifications"""
+    
+    url = '/api/v1/tickets/'
+    
+    def setUp(self):
+        self.structure = Structure.objects.create(nom='Test Entreprise', code='test')
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+        # Dates identiques pour vérifier le départage par id
+        meme_date = timezone.now() - timezone.timedelta(days=1)
+        for i in range(25):
+            ticket = Ticket.objects.create(titre=f'Ticket {i}', description='Description', demandeur=self.user)
+            if i < 10:
+                Ticket.objects.filter(pk=ticket.pk).update(date_creation=meme_date)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def _parcourir(self, url, cle='next'):
+        ids = []
+        while url:
+            donnees = self.client.get(url).json()
+            ids += [t['id'] for t in donnees['results']]
+            url = donnees[cle]
+        return ids
+    
+    def test_parcours_complet_sans_doublon(self):
+        """Test que le suivi des liens next renvoie chaque ticket une fois, du plus récent au plus ancien"""
+        with CaptureQueriesContext(connection) as contexte:
+            ids = self._parcourir(f'{self.url}?page_size=7')
+        
+        attendus = [str(pk) for pk in Ticket.objects.order_by('-date_creation', '-id').values_list('id', flat=True)]
+        self.assertEqual(ids, attendus)
+        self.assertFalse(any('COUNT(' in q['sql'].upper() for q in contexte.captured_queries))
+        self.assertFalse(any('OFFSET' in q['sql'].upper() for q in contexte.captured_queries))
+    
+    def test_nouveaux_elements_via_previous(self):
+        """Test que le lien previous de la première page ne renvoie que les nouveaux tickets"""
+        donnees = self.client.get(self.url).json()
+        previous = donnees['previous']
+        self.assertEqual(self.client.get(previous).json()['results'], [])
+        
+        nouveaux = [Ticket.objects.create(titre=f'Nouveau {i}', description='D', demandeur=self.user) for i in range(3)]
+        donnees = self.client.get(previous).json()
+        self.assertEqual([t['id'] for t in donnees['results']], [str(t.pk) for t in reversed(nouveaux)])
+        self.assertEqual(self.client.get(donnees['previous']).json()['results'], [])
+    
+    def test_curseur_invalide(self):
+        """Test qu'un curseur illisible est refusé"""
+        self.assertEqual(self.client.get(self.url, {'cursor': 'pas-un-curseur'}).status_code, 404)
+    
+    def test_curseur_identifiant_invalide(self):
+        """Test qu'un curseur forgé avec un identifiant qui n'est pas un UUID est refusé"""
+        curseur = encoder_curseur({'d': timezone.now().isoformat(), 'i': 'pas-un-uuid', 'r': False})
+        self.assertEqual(self.client.get(self.url, {'cursor': curseur}).status_code, 404)
+    
+    def test_tri_refuse(self):
+        """Test que le paramètre ordering est refusé plutôt qu'ignoré"""
+        response = self.client.get(self.url, {'ordering': 'titre'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.json())
+        self.assertEqual(self.client.get('/api/v1/notifications/', {'ordering': '-date_creation'}).status_code, 400)
+    
+    def test_notifications(self):
+        """Test de la pagination des notifications sur l'endpoint direct"""
+        technicien = User.objects.create_user(
+            username='@jane.tech.test', prenom='Jane', nom='Tech', email='jane.tech@test.com',
+            structure=self.structure, role='technicien', password='testpass123'
+        )
+        ticket = Ticket.objects.create(titre='Assigné', description='D', demandeur=self.user, assigne_a=technicien)
+        for i in range(5):
+            CommentaireTicket.objects.create(ticket=ticket, auteur=self.user, contenu=f'Commentaire {i}')
+        self.client.force_authenticate(technicien)
+        
+        ids = self._parcourir('/api/v1/notifications/?page_size=2')
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(len(set(ids)), 5)
+
+
+class SynchronisationIncrementaleTest(TestCase):
+    """Tests pour la synchronisation incrémentale (?since=)"""
+    
+    url = '/api/v1/tickets/'
+    
+    def setUp(self):
+        self.structure = Structure.objects.create(nom='Test Entreprise', code='test')
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+        self.technicien = User.objects.create_user(
+            username='@jane.tech.test', prenom='Jane', nom='Tech', email='jane.tech@test.com',
+            structure=self.structure, role='technicien', password='testpass123'
+        )
+        self.tickets = [
+            Ticket.objects.create(titre=f'Ticket {i}', description='Description', demandeur=self.user)
+            for i in range(5)
+        ]
+        # Tickets synchronisés il y a longtemps
+        hier = timezone.now() - timezone.timedelta(days=1)
+        Ticket.objects.update(date_modification=hier)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def _synchroniser(self, url, jeton):
+        response = self.client.get(url, {'since': jeton})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+    
+    def test_jeton_dans_les_listes(self):
+        """Test que les listes fournissent un jeton de synchronisation"""
+        response = self.client.get(self.url)
+        self.assertIn('X-Sync-Token', response)
+        donnees = self._synchroniser(self.url, response['X-Sync-Token'])
+        self.assertEqual(donnees['results'], [])
+        self.assertEqual(donnees['supprimes'], [])
+        self.assertTrue(donnees['complet'])
+    
+    def test_delta_modifies_crees_supprimes(self):
+        """Test que le delta ne contient que les tickets créés, modifiés ou supprimés"""
+        jeton = self.client.get(self.url)['X-Sync-Token']
+        
+        modifie = self.tickets[0]
+        modifie.titre = 'Titre modifié'
+        modifie.save()
+        cree = Ticket.objects.create(titre='Nouveau', description='D', demandeur=self.user)
+        supprime_id = self.tickets[1].pk
+        self.tickets[1].delete()
+        
+        donnees = self._synchroniser(self.url, jeton)
+        self.assertEqual({t['id'] for t in donnees['results']}, {str(modifie.pk), str(cree.pk)})
+        self.assertEqual(donnees['supprimes'], [str(supprime_id)])
+        self.assertTrue(SuppressionSynchronisee.objects.filter(modele='ticket', objet_id=supprime_id).exists())
+        
+        # Le nouveau jeton ne renvoie plus que la marge de sécurité, fusionnable par id
+        suivant = self._synchroniser(self.url, donnees['jeton'])
+        self.assertLessEqual({t['id'] for t in suivant['results']}, {str(modifie.pk), str(cree.pk)})
+    
+    def test_horodatage_iso(self):
+        """Test que since accepte un horodatage ISO 8601"""
+        avant = timezone.now()
+        self.tickets[2].save()
+        donnees = self._synchroniser(self.url, avant.isoformat())
+        self.assertEqual([t['id'] for t in donnees['results']], [str(self.tickets[2].pk)])
+    
+    def test_synchronisation_par_lots(self):
+        """Test que la synchronisation complète se poursuit par lots sans doublon"""
+        ids = []
+        jeton = '0'
+        with mock.patch('apps.tickets.synchronisation.TAILLE_LOT', 2):
+            while True:
+                donnees = self._synchroniser(self.url, jeton)
+                ids += [t['id'] for t in donnees['results']]
+                jeton = donnees['jeton']
+                if donnees['complet']:
+                    break
+        self.assertEqual(sorted(ids), sorted(str(t.pk) for t in self.tickets))
+    
+    def test_jeton_invalide_ou_expire(self):
+        """Test du refus des jetons illisibles et des jetons antérieurs à la rétention"""
+        self.assertEqual(self.client.get(self.url, {'since': 'pas-un-jeton'}).status_code, 400)
+        forge = encoder_curseur({'d': timezone.now().isoformat(), 'i': 'pas-un-uuid'})
+        self.assertEqual(self.client.get(self.url, {'since': forge}).status_code, 400)
+        ancien = (timezone.now() - timezone.timedelta(days=365)).isoformat()
+        self.assertEqual(self.client.get(self.url, {'since': ancien}).status_code, 410)
+    
+    def test_commentaires_prives_exclus(self):
+        """Test que le delta des commentaires respecte leur visibilité"""
+        jeton = self.client.get('/api/v1/tickets/commentaires/')['X-Sync-Token']
+        public = CommentaireTicket.objects.create(ticket=self.tickets[0], auteur=self.technicien, contenu='Public')
+        CommentaireTicket.objects.create(ticket=self.tickets[0], auteur=self.technicien, contenu='Privé', prive=True)
+        
+        donnees = self._synchroniser('/api/v1/tickets/commentaires/', jeton)
+        self.assertEqual([c['id'] for c in donnees['results']], [str(public.pk)])
+    
+    def test_notifications_lues(self):
+        """Test que le marquage en masse des notifications apparaît dans le delta"""
+        ticket = Ticket.objects.create(titre='Assigné', description='D', demandeur=self.user, assigne_a=self.technicien)
+        for i in range(3):
+            CommentaireTicket.objects.create(ticket=ticket, auteur=self.user, contenu=f'Commentaire {i}')
+        self.client.force_authenticate(self.technicien)
+        url = '/api/v1/notifications/'
+        
+        donnees = self._synchroniser(url, '0')
+        self.assertEqual(len(donnees['results']), 3)
+        avant = timezone.now()
+        NotificationTicket.objects.update(date_modification=avant - timezone.timedelta(hours=1))
+        
+        self.client.post(f'{url}mark_all_read/')
+        donnees = self._synchroniser(url, avant.isoformat())
+        self.assertEqual(len(donnees['results']), 3)
+        self.assertTrue(all(n['lu'] for n in donnees['results']))
+
+
+@override_settings(
+    MIDDLEWARE=['itsm_backend.instrumentation.InstrumentationMiddleware', *settings.MIDDLEWARE],
+    INSTRUMENTATION_BUDGET_STRICT=True,
+    ROOT_URLCONF=__name__
+)
+class BudgetRequetesTicketsTest(TestCase):
+    """Tests pour les budgets de requêtes SQL des tickets et notifications"""
+    
+    def setUp(self):
+        registre.reinitialiser()
+        self.structure = Structure.objects.create(nom='Test Entreprise', code='test')
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+        self.technicien = User.objects.create_user(
+            username='@tech.test',
+            prenom='Tech',
+            nom='Test',
+            email='tech@test.com',
+            structure=self.structure,
+            password='testpass123',
+            role='technicien'
+        )
+        for i in range(15):
+            self.ticket = Ticket.objects.create(
+                titre=f'Ticket {i}', description='Description', demandeur=self.user, assigne_a=self.technicien
+            )
+            CommentaireTicket.objects.create(ticket=self.ticket, auteur=self.user, contenu=f'Commentaire {i}')
+        self.client = APIClient()
+    
+    def _verifier(self, url, vue, budget):
+        self.assertEqual(self.client.get(url).status_code, 200)
+        mesure = registre.tampon[-1]
+        self.assertEqual(mesure.vue, vue)
+        self.assertLessEqual(mesure.nb_requetes, budget)
+    
+    def test_budgets_tickets(self):
+        """Test que les lectures de TicketViewSet restent dans leur budget"""
+        budgets = TicketViewSet.budget_requetes
+        self.client.force_authenticate(self.user)
+        self._verifier('/api/v1/tickets/?expand=demandeur_info,assigne_a_info', 'TicketViewSet.list', budgets['list'])
+        self._verifier(f'/api/v1/tickets/{self.ticket.pk}/', 'TicketViewSet.retrieve', budgets['retrieve'])
+        self._verifier('/api/v1/tickets/mes_tickets/', 'TicketViewSet.mes_tickets', budgets['mes_tickets'])
+        self.client.force_authenticate(self.technicien)
+        self._verifier('/api/v1/tickets/assignes/', 'TicketViewSet.assignes', budgets['assignes'])
+    
+    def test_budgets_notifications(self):
+        """Test que les listes de notifications restent dans leur budget"""
+        self.client.force_authenticate(self.technicien)
+        self._verifier('/liste-notifications/', 'NotificationListView', NotificationListView.budget_requetes)
+        self._verifier('/api/v1/notifications/', 'NotificationTicketViewSet.list',
+                       NotificationTicketViewSet.budget_requetes['list'])
+        self.assertEqual(len(self.client.get('/liste-notifications/').json()['results']), 15)
+    
+    def test_depassement_budget(self):
+        """Test qu'une requête de plus que le budget fait échouer le test"""
+        self.client.force_authenticate(self.technicien)
+        with mock.patch.object(NotificationListView, 'budget_requetes', 0):
+            with self.assertRaises(BudgetRequetesDepasse):
+                self.client.get('/liste-notifications/')
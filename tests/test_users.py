@@ -3,6 +3,7 @@ Tests unitaires pour l'application users
 """
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
 from apps.users.models import Structure, Groupe, Site, JournalConnexion
 
 User = get_user_model()
@@ -167,4 +168,52 @@ class JournalConnexionModelTest(TestCase):
     def test_journal_str(self):
         """Test de la représentation string"""
         expected = f"{self.user.nom_complet} - {self.journal.date_connexion}"
-        self.assertEqual(str(self.journal), expected)
\ No newline at end of file
+        self.assertEqual(str(self.journal), expected)
+
+
+class JournalConnexionApiTest(TestCase):
+    """Tests pour la liste paginée du journal des connexions"""
+    
+    url = '/api/v1/users/connexions/'
+    
+    def setUp(self):
+        self.structure = Structure.objects.create(
+            nom='Test Entreprise',
+            code='test'
+        )
+        self.user = User.objects.create_user(
+            username='@john.doe.test',
+            prenom='John',
+            nom='Doe',
+            email='john.doe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+        self.autre = User.objects.create_user(
+            username='@jane.roe.test',
+            prenom='Jane',
+            nom='Roe',
+            email='jane.roe@test.com',
+            structure=self.structure,
+            password='testpass123'
+        )
+        for utilisateur in (self.user, self.autre):
+            JournalConnexion.objects.bulk_create([
+                JournalConnexion(utilisateur=utilisateur, adresse_ip='127.0.0.1') for _ in range(6)
+            ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def test_connexions_de_l_utilisateur(self):
+        """Test que l'utilisateur parcourt ses seules connexions par curseur"""
+        url, ids = f'{self.url}?page_size=4', []
+        while url:
+            donnees = self.client.get(url).json()
+            ids += [c['id'] for c in donnees['results']]
+            url = donnees['next']
+        
+        self.assertEqual(len(set(ids)), 6)
+        self.assertEqual(
+            set(ids),
+            {str(pk) for pk in JournalConnexion.objects.filter(utilisateur=self.user).values_list('id', flat=True)}
+        )